@@ -4,7 +4,7 @@ High-performance modular components with native caching and fragments
 """
 
 # Component imports for easy access
-from .file_processor import process_file_content, validate_file_structure, process_file_ilector_compatible
+from .file_processor import process_file_content, validate_file_structure, process_file_ilector_compatible, parse_file_shared
 from .ai_analyzer import analyze_comments_optimized, get_openai_client
 from .chart_generator import create_analysis_dashboard
 from .progress_tracker import show_batch_progress, start_progress_tracking
@@ -14,6 +14,7 @@ __all__ = [
     'process_file_content',
     'validate_file_structure',
     'process_file_ilector_compatible',
+    'parse_file_shared',
     'analyze_comments_optimized',
     'get_openai_client',
     'create_analysis_dashboard',
@@ -11,6 +11,9 @@ from datetime import datetime
 from io import BytesIO
 import logging
 
+from src.infrastructure.file_handlers.lector_archivos_excel import LectorArchivosExcel
+from src.infrastructure.cache.cache_archivos_parseados import ArchivoParseado
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,31 +35,28 @@ def process_file_content(file_content: bytes, file_name: str) -> Tuple[List[str]
         Tuple of (comments_list, metadata_dict)
     """
     try:
-        # Determine file type and process accordingly
-        if file_name.lower().endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file_content, engine='openpyxl')
-        elif file_name.lower().endswith('.csv'):
-            # Try different encodings for CSV robustness
-            try:
-                df = pd.read_csv(file_content)
-            except UnicodeDecodeError:
-                df = pd.read_csv(file_content, encoding='latin-1')
-        else:
+        if not file_name.lower().endswith(('.xlsx', '.xls', '.csv')):
             raise ValueError(f"Tipo de archivo no soportado: {file_name}")
         
-        # Extract comments with smart column detection
-        comments = extract_comments_from_dataframe(df)
+        # Shared parse: the analysis of this same file reuses it instead of parsing again
+        parsed = parse_file_shared(file_content, file_name)
+        
+        # Keep only substantial comments for the preview list
+        comments = [text for text in parsed.textos
+                    if len(text) >= 10 and text.lower() not in ['n/a', 'none', 'null']]
         
         # Generate comprehensive metadata
         metadata = {
             'file_name': file_name,
-            'total_rows': len(df),
+            'total_rows': parsed.total_filas,
             'valid_comments': len(comments),
-            'columns': df.columns.tolist(),
+            'columns': parsed.columnas,
+            'comment_column': parsed.columna_comentario,
+            'encoding': parsed.encoding,
             'file_size_bytes': len(file_content),
             'file_size_mb': len(file_content) / (1024 * 1024),
             'processed_at': datetime.now().isoformat(),
-            'file_hash': hashlib.md5(file_content).hexdigest()[:8],
+            'file_hash': parsed.huella[:8] or hashlib.md5(file_content).hexdigest()[:8],
             'comment_avg_length': sum(len(c) for c in comments) / len(comments) if comments else 0
         }
         
@@ -298,22 +298,7 @@ def process_file_ilector_compatible(file_content: bytes, file_name: str) -> List
     try:
         logger.info(f"🔄 Processing file with Streamlit caching: {file_name}")
         
-        # Read DataFrame based on file type
-        df = _read_dataframe_cached(file_content, file_name)
-        
-        if df.empty:
-            logger.warning(f"⚠️ Empty file: {file_name}")
-            return []
-        
-        # Find comment column using same logic as LectorArchivosExcel
-        comment_column = _find_comment_column_compatible(df)
-        
-        if not comment_column:
-            logger.error(f"❌ No comment column found in {file_name}")
-            return []
-        
-        # Extract comments in exact same format as existing system
-        comments = _extract_comments_compatible(df, comment_column)
+        comments = parse_file_shared(file_content, file_name).comentarios()
         
         logger.info(f"✅ Extracted {len(comments)} comments from {file_name} (cached)")
         return comments
@@ -323,95 +308,18 @@ def process_file_ilector_compatible(file_content: bytes, file_name: str) -> List
         return []
 
 
-def _read_dataframe_cached(file_content: bytes, file_name: str) -> pd.DataFrame:
-    """Read DataFrame with same logic as LectorArchivosExcel but with caching context"""
-    try:
-        if file_name.lower().endswith('.csv'):
-            return _read_csv_compatible(file_content)
-        else:
-            return _read_excel_compatible(file_content)
-    except Exception as e:
-        logger.error(f"❌ Error reading dataframe: {str(e)}")
-        return pd.DataFrame()
-
-
-def _read_csv_compatible(file_content: bytes) -> pd.DataFrame:
-    """Read CSV with same encoding detection as LectorArchivosExcel"""
-    try:
-        # Try UTF-8 first (most common)
-        return pd.read_csv(BytesIO(file_content), encoding='utf-8')
-    except UnicodeDecodeError:
-        try:
-            # Fallback to latin-1 (common in Paraguay legacy systems)
-            return pd.read_csv(BytesIO(file_content), encoding='latin-1')
-        except Exception:
-            # Ultimate fallback
-            return pd.read_csv(BytesIO(file_content), encoding='utf-8', errors='replace')
-
-
-def _read_excel_compatible(file_content: bytes) -> pd.DataFrame:
-    """Read Excel with same method as LectorArchivosExcel"""
-    return pd.read_excel(BytesIO(file_content), engine='openpyxl')
-
-
-def _find_comment_column_compatible(df: pd.DataFrame) -> Optional[str]:
-    """Find comment column using EXACT same logic as LectorArchivosExcel"""
-    # Same column names as existing system
-    comment_columns = [
-        'comentario final', 'comment', 'comments', 'feedback', 
-        'review', 'texto', 'comentario', 'comentarios', 
-        'respuesta', 'opinion', 'observacion'
-    ]
-    
-    # Search by exact names or containing keywords
-    for col in df.columns:
-        col_lower = str(col).lower()
-        if any(name in col_lower for name in comment_columns):
-            return col
-    
-    # Fallback: first text column with data
-    for col in df.columns:
-        if df[col].dtype == 'object' and not df[col].dropna().empty:
-            return col
-    
-    return None
-
-
-def _extract_comments_compatible(df: pd.DataFrame, comment_column: str) -> List[Dict[str, Any]]:
-    """Extract comments using EXACT same logic as LectorArchivosExcel"""
-    comments = []
+def parse_file_shared(file_content: bytes, file_name: str) -> ArchivoParseado:
+    """
+    Parse through the process-wide parsed-file cache
     
-    for index, row in df.iterrows():
-        comment_text = str(row[comment_column]).strip()
-        
-        # Filter invalid comments (same logic as existing system)
-        if not comment_text or comment_text.lower() in ['nan', 'none', '']:
-            continue
-        
-        # Create comment data dict with exact same structure
-        comment_data = {
-            'comentario': comment_text,
-            'indice_original': index
-        }
-        
-        # Add NPS if exists (same logic as existing system)
-        if 'NPS' in df.columns:
-            nps_value = row.get('NPS')
-            if pd.notna(nps_value):
-                try:
-                    comment_data['nps'] = int(float(nps_value))
-                except (ValueError, TypeError):
-                    pass
-        
-        # Add Nota if exists (same logic as existing system)
-        if 'Nota' in df.columns:
-            nota_value = row.get('Nota')
-            if pd.notna(nota_value):
-                try:
-                    comment_data['nota'] = float(nota_value)
-                except (ValueError, TypeError):
-                    pass
-        
-        comments.append(comment_data)
+    Same reader (LectorArchivosExcel) and same cache as the analysis use case:
+    encoding detection, comment column choice and extraction run once per
+    file content, whichever of preview, validation or analysis comes first.
+    Large files are parsed in the worker process pool, so the script thread
+    only waits on the result instead of holding the GIL inside openpyxl.
+    """
+    from config import config
     
-    return comments
\ No newline at end of file
+    archivo = BytesIO(file_content)
+    archivo.name = file_name
+    return LectorArchivosExcel.desde_configuracion(config).leer_archivo_parseado(archivo)
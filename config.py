@@ -45,6 +45,7 @@ def _load_config() -> Dict[str, Any]:
         # UNIFIED: Single source for all configuration
         'openai_api_key': get_value('OPENAI_API_KEY', ''),
         'openai_modelo': get_value('OPENAI_MODEL', 'gpt-4o-mini'),
+        'openai_base_url': get_value('OPENAI_BASE_URL', ''),
         'openai_max_tokens': int(get_value('OPENAI_MAX_TOKENS', '12000')),  # OPTIMIZED
         'openai_temperatura': float(get_value('OPENAI_TEMPERATURE', '0.0')),
         'max_comments': int(get_value('MAX_COMMENTS_PER_BATCH', '200')),  # EXTREME PERFORMANCE: Optimized for parallel processing
@@ -67,7 +68,63 @@ def _load_config() -> Dict[str, Any]:
         'max_file_comments': int(get_value('MAX_FILE_COMMENTS', '2000')),
         'min_file_comments_info': int(get_value('MIN_FILE_COMMENTS_INFO', '100')),
         'preview_length': int(get_value('PREVIEW_LENGTH', '100')),
-        'memory_threshold_mb': int(get_value('MEMORY_THRESHOLD_MB', '400'))
+        'memory_threshold_mb': int(get_value('MEMORY_THRESHOLD_MB', '400')),
+        
+        # CONCURRENCY: Async engine and in-flight batch limits
+        'use_async_engine': str(get_value('USE_ASYNC_ENGINE', 'true')).lower() == 'true',
+        'max_concurrent_batches': int(get_value('MAX_CONCURRENT_BATCHES', '8')),
+        'use_streaming_responses': str(get_value('USE_STREAMING_RESPONSES', 'true')).lower() == 'true',
+        'token_aware_batching': str(get_value('TOKEN_AWARE_BATCHING', 'true')).lower() == 'true',
+        'api_health_ttl_seconds': int(get_value('API_HEALTH_TTL_SECONDS', '300')),
+        'gap_recovery_rounds': int(get_value('GAP_RECOVERY_ROUNDS', '1')),
+        'dedup_enabled': str(get_value('DEDUP_ENABLED', 'true')).lower() == 'true',
+        'dedup_near_duplicates': str(get_value('DEDUP_NEAR_DUPLICATES', 'false')).lower() == 'true',
+        'dedup_similarity_threshold': float(get_value('DEDUP_SIMILARITY_THRESHOLD', '0.85')),
+        'local_classifier_enabled': str(get_value('LOCAL_CLASSIFIER_ENABLED', 'true')).lower() == 'true',
+        'local_classifier_threshold': float(get_value('LOCAL_CLASSIFIER_THRESHOLD', '0.9')),
+        
+        # OFFLINE BENCHMARKS: Record/replay LLM backend ('openai' | 'record' | 'replay')
+        'llm_backend': str(get_value('LLM_BACKEND', 'openai')).lower(),
+        'llm_cassette_path': get_value('LLM_CASSETTE_PATH', '.cache/cassettes/llm.jsonl'),
+        'llm_replay_latency_p50': float(get_value('LLM_REPLAY_LATENCY_P50', '0')),
+        'llm_replay_latency_p95': float(get_value('LLM_REPLAY_LATENCY_P95', '0')),
+        'llm_replay_latency_scale': float(get_value('LLM_REPLAY_LATENCY_SCALE', '1.0')),
+        
+        # RATE LIMITS: Process-wide RPM/TPM scheduler fed by x-ratelimit-* headers
+        'rate_limit_scheduler_enabled': str(get_value('RATE_LIMIT_SCHEDULER_ENABLED', 'true')).lower() == 'true',
+        'rate_limit_rpm': int(get_value('RATE_LIMIT_RPM', '500')),
+        'rate_limit_tpm': int(get_value('RATE_LIMIT_TPM', '200000')),
+        'request_coalescing_enabled': str(get_value('REQUEST_COALESCING_ENABLED', 'true')).lower() == 'true',
+        'shared_resources_enabled': str(get_value('SHARED_RESOURCES_ENABLED', 'true')).lower() == 'true',
+        
+        # PERSISTENT CACHE: Per-comment results reused across uploads and restarts
+        'result_cache_enabled': str(get_value('RESULT_CACHE_ENABLED', 'true')).lower() == 'true',
+        'result_cache_path': get_value('RESULT_CACHE_PATH', '.cache/resultados_comentarios.sqlite3'),
+        'result_cache_ttl_days': int(get_value('RESULT_CACHE_TTL_DAYS', '30')),
+        
+        # CHECKPOINTS: Per-batch results on disk so interrupted jobs resume
+        'checkpoints_enabled': str(get_value('CHECKPOINTS_ENABLED', 'true')).lower() == 'true',
+        'checkpoint_dir': get_value('CHECKPOINT_DIR', '.cache/checkpoints'),
+        'checkpoint_ttl_hours': int(get_value('CHECKPOINT_TTL_HOURS', '72')),
+        
+        # PARSED FILES: One parse per file content, shared by preview, validation and analysis
+        'parsed_file_cache_enabled': str(get_value('PARSED_FILE_CACHE_ENABLED', 'true')).lower() == 'true',
+        'parsed_file_cache_dir': get_value('PARSED_FILE_CACHE_DIR', '.cache/archivos_parseados'),
+        'parsed_file_cache_max_entries': int(get_value('PARSED_FILE_CACHE_MAX_ENTRIES', '16')),
+        'parsed_file_cache_spill_comments': int(get_value('PARSED_FILE_CACHE_SPILL_COMMENTS', '5000')),
+        'parsed_file_cache_ttl_hours': int(get_value('PARSED_FILE_CACHE_TTL_HOURS', '24')),
+        # Single-core hosts: a worker process only adds IPC and memory, parse in-process
+        'parse_process_workers': int(get_value('PARSE_PROCESS_WORKERS', str(min(2, (os.cpu_count() or 1) - 1)))),
+        'parse_process_min_mb': float(get_value('PARSE_PROCESS_MIN_MB', '1')),
+        'excel_read_all_sheets': str(get_value('EXCEL_READ_ALL_SHEETS', 'false')).lower() == 'true',
+        
+        # COMMENT REPOSITORY: 'memory' (per session, bounded) or 'sqlite' (persistent history)
+        'comment_repository_backend': str(get_value('COMMENT_REPOSITORY_BACKEND', 'memory')).lower(),
+        'comment_repository_path': get_value('COMMENT_REPOSITORY_PATH', '.cache/comentarios.sqlite3'),
+        
+        # BACKGROUND JOBS: Analyses run in a process-wide worker pool, not in the script thread
+        'analysis_job_workers': int(get_value('ANALYSIS_JOB_WORKERS', '2')),
+        'analysis_job_retention_minutes': int(get_value('ANALYSIS_JOB_RETENTION_MINUTES', '60'))
     }
 
 # Global configuration
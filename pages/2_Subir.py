@@ -39,36 +39,107 @@ except ImportError as e:
     st.stop()
 
 
+def _obtener_gestor_trabajos():
+    """Gestor de trabajos del proceso (compartido por todas las sesiones)"""
+    from config import config
+    from src.infrastructure.jobs.gestor_trabajos_analisis import obtener_gestor_trabajos
+    return obtener_gestor_trabajos(config)
+
+
+def _parsear_archivo_subido(uploaded_file):
+    """Archivo subido parseado a través de la cache del proceso (compartida con el análisis)"""
+    from components.file_processor import parse_file_shared
+    return parse_file_shared(uploaded_file.getvalue(), uploaded_file.name)
+
+
+def _obtener_propietario_trabajos() -> str:
+    """Identificador estable de la sesión para sus trabajos en segundo plano"""
+    if 'analysis_job_owner' not in st.session_state:
+        import uuid
+        st.session_state.analysis_job_owner = uuid.uuid4().hex
+    return st.session_state.analysis_job_owner
+
+
 @st.fragment(run_every=0.5)
 def live_batch_progress():
     """
     OPTIMIZATION: Real-time progress updates using Streamlit fragments
     Updates every 0.5s without full page rerun (Streamlit-native pattern)
+    
+    Consulta el gestor de trabajos: el análisis corre en un worker del proceso,
+    así que el script queda libre y los trabajos sobreviven a los reruns.
     """
-    if 'batch_progress_data' not in st.session_state:
+    trabajos = st.session_state.get('analysis_jobs', [])
+    if not trabajos:
         return
     
-    progress_data = st.session_state.batch_progress_data
+    gestor = _obtener_gestor_trabajos()
+    for trabajo_id in list(trabajos):
+        estado = gestor.estado(trabajo_id)
+        if estado is None:
+            trabajos.remove(trabajo_id)
+            continue
+        
+        if estado['estado'] == 'completado':
+            resultado = gestor.obtener_resultado(trabajo_id)
+            trabajos.remove(trabajo_id)
+            # Memory management: cleanup previous analysis before storing new one
+            _cleanup_previous_analysis()
+            st.session_state.analysis_results = resultado
+            st.session_state.analysis_type = "maestro_ia"
+            st.rerun()
+        
+        elif estado['estado'] in ('fallido', 'cancelado'):
+            with st.container():
+                if estado['estado'] == 'fallido':
+                    st.error(f"Error en análisis IA de **{estado['nombre']}**: {estado['error']}")
+                    st.info("Verifica el archivo y que tu OpenAI API key esté configurada correctamente.")
+                else:
+                    st.warning(f"Análisis de **{estado['nombre']}** cancelado")
+                if st.button("Descartar", key=f"descartar_{trabajo_id}"):
+                    gestor.olvidar(trabajo_id)
+                    trabajos.remove(trabajo_id)
+                    st.rerun()
+        
+        elif estado['estado'] == 'en_cola':
+            with st.container():
+                posicion = estado.get('posicion_cola')
+                st.info(f"⏳ **{estado['nombre']}** en cola" + (f" (posición {posicion})" if posicion else ""))
+                if st.button("Cancelar", key=f"cancelar_{trabajo_id}"):
+                    gestor.cancelar(trabajo_id)
+                    st.rerun()
+        
+        else:
+            _mostrar_progreso_lote(estado['nombre'], estado['progreso'])
+
+
+def _mostrar_progreso_lote(nombre_archivo, progress_data):
+    """Progreso del trabajo en ejecución según el último evento del caso de uso"""
     action = progress_data.get('action', 'unknown')
     
     # Show progress container
     with st.container():
-        st.markdown("### 🚀 Progreso del Análisis IA")
+        st.markdown(f"### 🚀 Progreso del Análisis IA: {nombre_archivo}")
         
         if action == 'start':
             total_batches = progress_data.get('total_batches', 0)
             total_comments = progress_data.get('total_comments', 0)
             
+            # Pre-escaneo: cifras estimadas hasta que termina la lectura del archivo
+            aprox = "~" if progress_data.get('estimated') else ""
+            
             if total_comments > 0:  # Only show if we have real data
-                st.progress(0.0, text=f"🚀 Iniciando análisis: {total_comments} comentarios en {total_batches} lotes")
+                st.progress(0.0, text=f"🚀 Iniciando análisis: {aprox}{total_comments} comentarios en {aprox}{total_batches} lotes")
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.metric("📊 Comentarios", total_comments)
+                    st.metric("📊 Comentarios", f"{aprox}{total_comments}")
                 with col2:
-                    st.metric("📦 Lotes", total_batches)
+                    st.metric("📦 Lotes", f"{aprox}{total_batches}")
                 with col3:
-                    st.metric("⚡ Modo", "AsyncIO" if total_batches > 2 else "Secuencial")
+                    estimated_minutes = total_batches * 0.5  # Same per-batch estimate as the batch ETA
+                    st.metric("⏱️ ETA", "<1 min" if estimated_minutes < 1 else f"{aprox}{estimated_minutes:.1f} min")
+                    st.caption("⚡ AsyncIO" if total_batches > 2 else "⚡ Secuencial")
             else:
                 st.info("🔄 Preparando análisis...")
                 
@@ -131,6 +202,22 @@ def live_batch_progress():
                     st.metric("⏱️ ETA", "Finalizando")
                     st.caption("🎊 ¡Listo!")
                 
+        elif action == 'comment_streamed':
+            current_batch = progress_data.get('current_batch', 0)
+            total_batches = progress_data.get('total_batches', 1)
+            progress_pct = progress_data.get('progress_percentage', 0.0)
+            received = progress_data.get('comments_received', 0)
+            total_comments = progress_data.get('total_comments', 0)
+            
+            # Streaming: los comentarios llegan uno a uno mientras la IA responde
+            st.progress(min(progress_pct / 100, 1.0), text=f"📡 Recibiendo resultados: {received}/{total_comments} comentarios (lote {current_batch}/{total_batches})")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("📈 Progreso", f"{progress_pct:.1f}%")
+            with col2:
+                st.metric("💬 Analizados", received)
+                
         elif action == 'batch_failure':
             current_batch = progress_data.get('current_batch', 0)
             total_batches = progress_data.get('total_batches', 1)
@@ -146,53 +233,12 @@ def live_batch_progress():
             st.progress(0.0, text="Inicializando sistema de IA...")
 
 def _run_analysis(uploaded_file, analysis_type):
-    """Run pure IA analysis using maestro system with enhanced fragment-based progress tracking"""
-    
-    # OPTIMIZATION: Fragment-based progress display (no containers needed)
-    # The live_batch_progress fragment will handle all display logic
-    st.markdown("### 🚀 Análisis en Progreso")
-    
-    # Initialize session state for fragment communication
-    if 'batch_progress_data' not in st.session_state:
-        st.session_state.batch_progress_data = {'action': 'initialize'}
-    
-    # Display live progress using fragment (auto-updates every 0.5s)
-    live_batch_progress()
-    
-    # Create enhanced progress callback for fragment communication
-    def create_enhanced_progress_callback():
-        """Create callback that updates session state for fragment display"""
-        def update_progress(progress_data):
-            # Store in session state for fragment access
-            st.session_state.batch_progress_data = progress_data.copy()
-            
-            # Add processing mode info
-            if 'total_batches' in progress_data:
-                total_batches = progress_data['total_batches']
-                st.session_state.batch_progress_data['processing_mode'] = (
-                    'AsyncIO' if total_batches > 2 else 'Secuencial'
-                )
-            
-            # Fragment will auto-update based on session state
-            # No manual container updates needed
-        
-        return update_progress
-    
-    # Create the enhanced progress callback
-    progress_callback = create_enhanced_progress_callback()
-    
-    # Initialize progress state (fragment will display)
-    st.session_state.batch_progress_data = {
-        'action': 'start',
-        'total_batches': 0,
-        'total_comments': 0,
-        'current_batch': 0,
-        'progress_percentage': 0.0
-    }
+    """
+    Encola el análisis IA maestro en el gestor de trabajos y vuelve de inmediato
     
-    # Mark analysis as in progress
-    st.session_state.ai_analysis_in_progress = True
-        
+    El caso de uso corre en un worker del proceso; live_batch_progress muestra
+    su progreso y recoge el resultado. El usuario puede encolar varios archivos.
+    """
     try:
         # Use session validator for architecture validation
         from src.presentation.streamlit.session_validator import ensure_session_initialized
@@ -201,33 +247,11 @@ def _run_analysis(uploaded_file, analysis_type):
         if not ensure_session_initialized(['contenedor']):
             return  # ensure_session_initialized handles error display
         
-        # Get caso uso maestro WITH progress callback for this analysis
-        try:
-            caso_uso_maestro = st.session_state.contenedor.obtener_caso_uso_maestro(progress_callback)
-        except Exception as e:
-            st.error(f"❌ Error obteniendo sistema de análisis: {str(e)}")
-            st.info("💡 Posibles causas:")
-            st.info("- OpenAI API key no configurada o inválida")
-            st.info("- Problemas de conexión a internet") 
-            st.info("- Configuración incorrecta en variables de entorno")
-            return
-            
-        if not caso_uso_maestro:
-            st.error("❌ Sistema de análisis IA no está disponible")
-            st.info("🔧 Configurar variables de entorno requeridas:")
-            # Use actual configuration values instead of hardcoded ones
-            from config import config
-            st.code(f"""
-OPENAI_API_KEY=your-api-key-here
-OPENAI_MODEL={config.get('openai_modelo', 'gpt-4o-mini')}
-OPENAI_MAX_TOKENS={config.get('openai_max_tokens', 12000)}
-MAX_COMMENTS_PER_BATCH={config.get('max_comments', 100)}
-            """)
-            return
+        contenedor = st.session_state.contenedor
         
         # Verificar disponibilidad del analizador IA específicamente
         try:
-            analizador = st.session_state.contenedor.obtener_analizador_maestro_ia()
+            analizador = contenedor.obtener_analizador_maestro_ia()
             if not analizador.es_disponible():
                 st.warning("⚠️ Sistema IA en modo degradado - API no disponible")
                 col1, col2 = st.columns(2)
@@ -258,91 +282,49 @@ MAX_COMMENTS_PER_BATCH={config.get('max_comments', 100)}
         except Exception as e:
             logger.warning(f"Could not verify IA analyzer availability: {e}")
             # Continue anyway - let the analysis attempt fail gracefully
-                
-        from src.application.use_cases.analizar_excel_maestro_caso_uso import ComandoAnalisisExcelMaestro
-        import inspect
         
-        # DEBUG: Verify command class version (force cache refresh)
-        sig = inspect.signature(ComandoAnalisisExcelMaestro.__init__)
-        logger.info(f"🔍 ComandoAnalisisExcelMaestro signature: {sig}")
+        # Copia de los bytes: el UploadedFile pertenece al script y cambia con cada rerun
+        import io
+        archivo = io.BytesIO(uploaded_file.getvalue())
+        archivo.name = uploaded_file.name
+        nombre_archivo = uploaded_file.name
         
-        # Backwards-compatible command creation (handle old cached versions)
-        try:
-            # Try with progress_callback (new version)
+        def ejecutar_trabajo(reportar_progreso):
+            """Corre en el worker: sin st.* aquí, solo el callback del gestor"""
+            from src.application.use_cases.analizar_excel_maestro_caso_uso import ComandoAnalisisExcelMaestro
+            
+            def progress_callback(progress_data):
+                datos = dict(progress_data)
+                if 'total_batches' in datos:
+                    datos['processing_mode'] = 'AsyncIO' if datos['total_batches'] > 2 else 'Secuencial'
+                reportar_progreso(datos)
+            
+            caso_uso_maestro = contenedor.obtener_caso_uso_maestro(progress_callback)
+            if not caso_uso_maestro:
+                raise IAException("Sistema de análisis IA no está disponible")
+            
+            from config import config
             comando = ComandoAnalisisExcelMaestro(
-                archivo_cargado=uploaded_file,
-                nombre_archivo=uploaded_file.name,
-                limpiar_repositorio=True,
+                archivo_cargado=archivo,
+                nombre_archivo=nombre_archivo,
+                # El repositorio SQLite acumula el histórico: no se vacía en cada análisis
+                limpiar_repositorio=config.get('comment_repository_backend', 'memory') != 'sqlite',
                 progress_callback=progress_callback
             )
-            logger.info("✅ Using NEW command version with progress_callback")
-        except TypeError as e:
-            # Fallback for cached old version
-            logger.warning(f"⚠️ Fallback to old command version: {str(e)}")
-            comando = ComandoAnalisisExcelMaestro(
-                archivo_cargado=uploaded_file,
-                nombre_archivo=uploaded_file.name,
-                limpiar_repositorio=True
-            )
-            # Set progress callback on caso_uso directly as fallback
-            caso_uso_maestro.progress_callback = progress_callback
-            logger.info("✅ Using OLD command version + direct progress_callback assignment")
-        
-        # Initialize progress display for real-time updates
-        st.info("🤖 Iniciando análisis con Inteligencia Artificial...")
-        
-        # Display live progress fragment (updates every 0.5s automatically)
-        live_batch_progress()
-        
-        # Execute analysis with progress callback
-        resultado = caso_uso_maestro.ejecutar(comando)
+            resultado = caso_uso_maestro.ejecutar(comando)
+            if not resultado.es_exitoso():
+                raise IAException(resultado.mensaje)
+            return resultado
         
-        # Clear progress state after analysis
-        if 'batch_progress_data' in st.session_state:
-            del st.session_state.batch_progress_data
-        
-        if resultado.es_exitoso():
-            # Memory management: cleanup previous analysis before storing new one
-            _cleanup_previous_analysis()
-            
-            # PROGRESS TRACKING: Clear progress state on success
-            if 'batch_progress_data' in st.session_state:
-                del st.session_state.batch_progress_data
-            
-            st.session_state.analysis_results = resultado
-            st.session_state.analysis_type = "maestro_ia"
-            st.success("Análisis IA completado!")
-            st.balloons()
-            st.rerun()
-        else:
-            # PROGRESS TRACKING: Clear progress state on failure
-            if 'batch_progress_data' in st.session_state:
-                del st.session_state.batch_progress_data
-            
-            st.error(f"Error en análisis IA: {resultado.mensaje}")
+        trabajo_id = _obtener_gestor_trabajos().enviar(
+            _obtener_propietario_trabajos(), nombre_archivo, ejecutar_trabajo
+        )
+        st.session_state.setdefault('analysis_jobs', []).append(trabajo_id)
+        st.info(f"🤖 Análisis de **{nombre_archivo}** encolado. Puedes seguir usando la página mientras se procesa.")
             
-    except ArchivoException as e:
-        # PROGRESS TRACKING: Clear progress state on error
-        if 'batch_progress_data' in st.session_state:
-            del st.session_state.batch_progress_data
-        st.error(f"Error procesando archivo: {str(e)}")
-    except IAException as e:
-        # PROGRESS TRACKING: Clear progress state on error
-        if 'batch_progress_data' in st.session_state:
-            del st.session_state.batch_progress_data
-        st.error(f"Error de servicio IA: {str(e)}")
-        st.info("Verifica que tu OpenAI API key esté configurada correctamente.")
     except Exception as e:
-        # PROGRESS TRACKING: Clear progress state on error
-        if 'batch_progress_data' in st.session_state:
-            del st.session_state.batch_progress_data
         st.error(f"Error inesperado: {str(e)}")
         st.error("Este es un error no manejado. Por favor contacta soporte técnico.")
-    finally:
-        # PROGRESS TRACKING: Final cleanup guarantee
-        st.session_state.ai_analysis_in_progress = False
-        if 'batch_progress_data' in st.session_state:
-            del st.session_state.batch_progress_data
 
 
 def _create_comprehensive_emotions_chart(emociones_predominantes):
@@ -1055,28 +1037,24 @@ if uploaded_file:
     # Enhanced file preview with glassmorphism if available
     with st.expander("👀 Vista Previa del Archivo", expanded=True):
         try:
+            # Un solo parseo por contenido: el análisis de este archivo lo reutiliza desde la cache
+            parseado = _parsear_archivo_subido(uploaded_file)
+            uploaded_file.seek(0)
             if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file, nrows=5)
-                df_full = pd.read_csv(uploaded_file)
+                df = pd.read_csv(uploaded_file, nrows=5, encoding=parseado.encoding or 'utf-8')
             else:
                 df = pd.read_excel(uploaded_file, nrows=5)
-                df_full = pd.read_excel(uploaded_file)
+            uploaded_file.seek(0)
             
             # File stats with enhanced display
             col_stats1, col_stats2, col_stats3 = st.columns(3)
             with col_stats1:
-                st.metric("📊 Total Filas", len(df_full))
+                st.metric("📊 Total Filas", parseado.total_filas)
             with col_stats2:
-                st.metric("📋 Columnas", len(df_full.columns))
+                st.metric("📋 Columnas", len(parseado.columnas))
             with col_stats3:
-                # Detect comment column
-                comment_cols = ['comentario', 'comment', 'comentarios', 'feedback', 'review']
-                comment_col = None
-                for col in df_full.columns:
-                    if any(cc in col.lower() for cc in comment_cols):
-                        comment_col = col
-                        break
-                st.metric("💬 Comentarios", len(df_full[comment_col].dropna()) if comment_col else "No detectados")
+                comment_col = parseado.columna_comentario
+                st.metric("💬 Comentarios", len(parseado))
             
             # Data preview
             st.markdown("**Primeras 5 filas:**")
@@ -1088,6 +1066,8 @@ if uploaded_file:
             else:
                 st.warning("⚠️ No se detectó columna de comentarios clara")
                 
+        except ArchivoException as e:
+            st.warning(f"⚠️ {str(e)}")
         except Exception as e:
             st.warning(f"No se pudo generar vista previa: {str(e)}")
     
@@ -1111,6 +1091,9 @@ if uploaded_file:
     if st.button("Analizar con Inteligencia Artificial", type="primary", width="stretch"):
         _run_analysis(uploaded_file, "ai")
 
+# Trabajos en segundo plano de esta sesión (siguen corriendo entre reruns)
+live_batch_progress()
+
 # Results section
 if 'analysis_results' in st.session_state:
     st.markdown("---")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Análisis maestro IA por lotes de archivos, sin Streamlit (cron, pipelines nocturnos)
+Purpose: Procesar decenas de exportaciones con concurrencia y cache compartidas y volcar resultados a disco
+Usage: python scripts/analisis_masivo.py exports/*.xlsx --salida resultados/ --formato jsonl xlsx
+       python scripts/analisis_masivo.py exports/ --paralelo 4 --formato parquet
+"""
+
+import io
+import sys
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Nunca importar Streamlit: config.py y el tracker de progreso lo importan de forma
+# opcional; bloquearlo evita su costo de arranque y los avisos de "missing ScriptRunContext"
+sys.modules.setdefault('streamlit', None)
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import config
+from src.application.use_cases.analizar_excel_maestro_caso_uso import ComandoAnalisisExcelMaestro
+from src.infrastructure.dependency_injection.contenedor_dependencias import ContenedorDependencias
+from src.infrastructure.jobs.gestor_trabajos_analisis import GestorTrabajosAnalisis
+from src.shared.exceptions.ia_exception import IAException
+
+logger = logging.getLogger('analisis_masivo')
+
+EXTENSIONES = ('.xlsx', '.xls', '.csv')
+FORMATOS = ('jsonl', 'parquet', 'xlsx')
+
+
+class LectorCronometrado:
+    """Envuelve el lector del contenedor para medir la etapa de lectura"""
+
+    def __init__(self, lector):
+        self._lector = lector
+        self.segundos = 0.0
+
+    def leer_comentarios(self, archivo):
+        inicio = time.perf_counter()
+        try:
+            return self._lector.leer_comentarios(archivo)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+
+    def leer_comentarios_por_bloques(self, archivo, *args, **kwargs):
+        """Cuenta solo el tiempo dentro del lector, no el que el llamador pasa entre bloques"""
+        bloques = self._lector.leer_comentarios_por_bloques(archivo, *args, **kwargs)
+        try:
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    bloque = next(bloques)
+                except StopIteration:
+                    return
+                finally:
+                    self.segundos += time.perf_counter() - inicio
+                yield bloque
+        finally:
+            bloques.close()
+
+    def __getattr__(self, nombre):
+        return getattr(self._lector, nombre)
+
+
+def expandir_entradas(entradas: List[str]) -> List[Path]:
+    """Archivos sueltos, globs ya expandidos por el shell o carpetas (se recorren sin recursión)"""
+    archivos: List[Path] = []
+    for entrada in entradas:
+        ruta = Path(entrada)
+        if ruta.is_dir():
+            archivos.extend(sorted(p for p in ruta.iterdir() if p.suffix.lower() in EXTENSIONES))
+        elif ruta.is_file() and ruta.suffix.lower() in EXTENSIONES:
+            archivos.append(ruta)
+        else:
+            logger.warning(f"⚠️ Entrada ignorada (no existe o formato no soportado): {entrada}")
+    # Sin duplicados, conservando el orden
+    return list(dict.fromkeys(p.resolve() for p in archivos))
+
+
+def filas_resultado(resultado, archivo: Path) -> List[Dict[str, Any]]:
+    """Una fila plana por comentario analizado"""
+    filas = []
+    for comentario in resultado.comentarios_analizados or []:
+        filas.append({
+            'archivo': archivo.name,
+            'indice': comentario.indice_original,
+            'comentario': comentario.texto_original,
+            'sentimiento': comentario.sentimiento.categoria.value,
+            'confianza_sentimiento': comentario.sentimiento.confianza,
+            'emociones': ', '.join(e.tipo.value for e in comentario.emociones),
+            'temas': ', '.join(t.categoria.value for t in comentario.temas),
+            'puntos_dolor': ', '.join(d.tipo.value for d in comentario.puntos_dolor),
+            'severidad_max': max((d.severidad for d in comentario.puntos_dolor), default=0.0),
+            'critico': comentario.es_critico(),
+            'confianza': comentario.confianza_general,
+            'nps': comentario.calificacion_nps,
+            'nota': comentario.calificacion_nota,
+            'modelo': comentario.modelo_ia_utilizado,
+        })
+    return filas
+
+
+def escribir_resultados(filas: List[Dict[str, Any]], destino: Path, formatos: List[str]) -> List[Path]:
+    """Escribe las filas en cada formato pedido; devuelve las rutas generadas"""
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for formato in formatos:
+        ruta = destino.parent / f"{destino.name}.{formato}"
+        if formato == 'jsonl':
+            with open(ruta, 'w', encoding='utf-8') as f:
+                for fila in filas:
+                    f.write(json.dumps(fila, ensure_ascii=False, default=str) + '\n')
+        else:
+            import pandas as pd
+            df = pd.DataFrame(filas)
+            if formato == 'parquet':
+                try:
+                    df.to_parquet(ruta, index=False)
+                except ImportError as e:
+                    raise RuntimeError(f"Parquet requiere pyarrow o fastparquet instalado: {str(e)}")
+            else:
+                df.to_excel(ruta, index=False, sheet_name='Análisis IA')
+        rutas.append(ruta)
+    return rutas
+
+
+def crear_trabajo(archivo: Path, salida: Path, formatos: List[str], configuracion: Dict[str, Any]):
+    """Función del gestor de trabajos para un archivo: contenedor propio, recursos pesados compartidos"""
+
+    def ejecutar(reportar_progreso) -> Dict[str, Any]:
+        # Mismo config → mismo analizador, cliente HTTP y cache del registro del proceso
+        contenedor = ContenedorDependencias(configuracion)
+        caso_uso = contenedor.obtener_caso_uso_maestro(reportar_progreso)
+        if not caso_uso:
+            raise IAException("Sistema de análisis IA no está disponible")
+        lector = LectorCronometrado(caso_uso.lector_archivos)
+        caso_uso.lector_archivos = lector
+
+        datos = io.BytesIO(archivo.read_bytes())
+        datos.name = archivo.name
+
+        inicio = time.perf_counter()
+        resultado = caso_uso.ejecutar(ComandoAnalisisExcelMaestro(
+            archivo_cargado=datos, nombre_archivo=archivo.name, limpiar_repositorio=True
+        ))
+        total_caso_uso = time.perf_counter() - inicio
+        if not resultado.es_exitoso():
+            raise IAException(resultado.mensaje)
+
+        inicio = time.perf_counter()
+        rutas = escribir_resultados(filas_resultado(resultado, archivo), salida / f"{archivo.stem}.analisis", formatos)
+        escritura = time.perf_counter() - inicio
+
+        analisis = resultado.analisis_completo_ia
+        return {
+            'archivo': str(archivo),
+            'comentarios': resultado.total_comentarios,
+            'tokens': analisis.tokens_utilizados if analisis else 0,
+            'etapas': {
+                'lectura': lector.segundos,
+                'analisis_ia': max(0.0, total_caso_uso - lector.segundos),
+                'escritura': escritura,
+            },
+            'salidas': [str(r) for r in rutas],
+        }
+
+    return ejecutar
+
+
+def ejecutar_lote(archivos: List[Path], salida: Path, formatos: List[str], paralelo: int,
+                  configuracion: Dict[str, Any], intervalo: float = 0.5) -> List[Dict[str, Any]]:
+    """
+    Encola todos los archivos en un gestor de trabajos y espera a que terminen
+
+    Cada archivo es su propio propietario, así que el pool (paralelo) es el único
+    límite de archivos simultáneos; dentro de cada uno rigen MAX_CONCURRENT_BATCHES
+    y el planificador RPM/TPM del proceso, compartido por todos.
+    """
+    gestor = GestorTrabajosAnalisis(max_workers=paralelo, retencion_segundos=None)
+    trabajos = {
+        gestor.enviar(str(archivo), archivo.name, crear_trabajo(archivo, salida, formatos, configuracion)): archivo
+        for archivo in archivos
+    }
+    informes: List[Dict[str, Any]] = []
+    try:
+        pendientes = dict(trabajos)
+        while pendientes:
+            for trabajo_id, archivo in list(pendientes.items()):
+                estado = gestor.estado(trabajo_id)
+                if not estado['terminado']:
+                    continue
+                del pendientes[trabajo_id]
+                if estado['estado'] == 'completado':
+                    informe = gestor.obtener_resultado(trabajo_id)
+                    logger.info(f"✅ {archivo.name}: {informe['comentarios']} comentarios, "
+                                f"{informe['tokens']:,} tokens")
+                else:
+                    informe = {'archivo': str(archivo), 'error': estado['error'] or estado['estado']}
+                    logger.error(f"❌ {archivo.name}: {informe['error']}")
+                if estado['iniciado'] and estado['finalizado']:
+                    informe['duracion'] = estado['finalizado'] - estado['iniciado']
+                informes.append(informe)
+            if pendientes:
+                time.sleep(intervalo)
+    finally:
+        gestor.cerrar(esperar=False)
+    orden = {str(a): i for i, a in enumerate(archivos)}
+    return sorted(informes, key=lambda inf: orden.get(inf['archivo'], 0))
+
+
+def imprimir_resumen(informes: List[Dict[str, Any]], duracion_total: float) -> None:
+    """Tiempos por etapa y tokens por archivo, más los totales del lote"""
+    print(f"\n{'Archivo':<40} {'Coment.':>8} {'Tokens':>10} {'Lectura':>9} {'IA':>9} {'Escritura':>10}")
+    print('-' * 90)
+    totales = {'comentarios': 0, 'tokens': 0, 'lectura': 0.0, 'analisis_ia': 0.0, 'escritura': 0.0}
+    for informe in informes:
+        nombre = Path(informe['archivo']).name[:40]
+        if 'error' in informe:
+            print(f"{nombre:<40} ERROR: {informe['error']}")
+            continue
+        etapas = informe['etapas']
+        print(f"{nombre:<40} {informe['comentarios']:>8} {informe['tokens']:>10,} "
+              f"{etapas['lectura']:>8.2f}s {etapas['analisis_ia']:>8.2f}s {etapas['escritura']:>9.2f}s")
+        totales['comentarios'] += informe['comentarios']
+        totales['tokens'] += informe['tokens']
+        for etapa in ('lectura', 'analisis_ia', 'escritura'):
+            totales[etapa] += etapas[etapa]
+    print('-' * 90)
+    print(f"{'TOTAL':<40} {totales['comentarios']:>8} {totales['tokens']:>10,} "
+          f"{totales['lectura']:>8.2f}s {totales['analisis_ia']:>8.2f}s {totales['escritura']:>9.2f}s")
+    fallidos = sum(1 for i in informes if 'error' in i)
+    print(f"\n{len(informes) - fallidos}/{len(informes)} archivos completados en {duracion_total:.1f}s (reloj)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Análisis maestro IA de muchos archivos sin Streamlit')
+    parser.add_argument('entradas', nargs='+', help='Archivos .xlsx/.xls/.csv o carpetas que los contienen')
+    parser.add_argument('--salida', default='resultados', help='Carpeta donde se escriben los resultados')
+    parser.add_argument('--formato', nargs='+', choices=FORMATOS, default=['jsonl'],
+                        help='Uno o más formatos de salida por archivo')
+    parser.add_argument('--paralelo', type=int, default=config.get('analysis_job_workers', 2),
+                        help='Archivos analizados a la vez (ANALYSIS_JOB_WORKERS)')
+    parser.add_argument('--informe', help='Ruta opcional para guardar el informe del lote en JSON')
+    parser.add_argument('--verbose', action='store_true', help='Logs detallados de cada lote')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    logger.setLevel(logging.INFO)
+
+    archivos = expandir_entradas(args.entradas)
+    if not archivos:
+        logger.error("No hay archivos para analizar")
+        return 2
+
+    inicio = time.perf_counter()
+    informes = ejecutar_lote(archivos, Path(args.salida), args.formato, args.paralelo, config)
+    imprimir_resumen(informes, time.perf_counter() - inicio)
+
+    if args.informe:
+        Path(args.informe).write_text(json.dumps(informes, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    return 1 if any('error' in i for i in informes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Servidor local compatible con OpenAI (chat completions) para pruebas de carga sin red
+Purpose: Ejercitar lotes paralelos, reintentos y límites RPM/TPM contra un endpoint realista
+Usage: python scripts/servidor_openai_simulado.py --rpm 500 --tpm 200000 --p50 1.5 --p95 4
+       OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run streamlit_app.py
+"""
+
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.infrastructure.external_services.backend_grabacion_llm import ModeloLatencia
+from src.infrastructure.external_services.planificador_limites_api import CubetaTokens
+from src.infrastructure.text_processing.analizador_lexico_local import AnalizadorLexicoLocal
+
+CHARS_POR_TOKEN = 4
+PATRON_COMENTARIO = re.compile(r'^(\d+)\. (.*)$')
+
+
+def formatear_duracion(segundos: float) -> str:
+    """Duración con el formato de los headers x-ratelimit-reset-* ('20ms', '1.5s', '6m0s')"""
+    if segundos < 1:
+        return f"{max(1, int(segundos * 1000))}ms"
+    if segundos < 60:
+        return f"{segundos:.3f}".rstrip('0').rstrip('.') + 's'
+    minutos, resto = divmod(segundos, 60)
+    return f"{int(minutos)}m{int(resto)}s"
+
+
+class LimitadorRPMTPM:
+    """Emula los límites por minuto de OpenAI (peticiones y tokens)"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.peticiones = CubetaTokens(rpm)
+        self.tokens = CubetaTokens(tpm)
+        self._lock = threading.Lock()
+
+    def intentar(self, tokens: int) -> Tuple[bool, Optional[str], Dict[str, str]]:
+        """
+        Consume una petición y 'tokens' si hay cupo
+
+        Returns:
+            (aceptada, tipo_limite_excedido, headers x-ratelimit-*)
+        """
+        with self._lock:
+            espera_peticion = self.peticiones.espera_para(1)
+            espera_tokens = self.tokens.espera_para(tokens)
+            aceptada = espera_peticion == 0 and espera_tokens == 0
+            if aceptada:
+                self.peticiones.consumir(1)
+                self.tokens.consumir(tokens)
+            headers = {
+                'x-ratelimit-limit-requests': str(self.peticiones.capacidad),
+                'x-ratelimit-limit-tokens': str(self.tokens.capacidad),
+                'x-ratelimit-remaining-requests': str(max(0, int(self.peticiones.disponible))),
+                'x-ratelimit-remaining-tokens': str(max(0, int(self.tokens.disponible))),
+                'x-ratelimit-reset-requests': formatear_duracion(
+                    espera_peticion or (self.peticiones.capacidad - self.peticiones.disponible) * 60.0 / self.peticiones.capacidad
+                ),
+                'x-ratelimit-reset-tokens': formatear_duracion(
+                    espera_tokens or (self.tokens.capacidad - self.tokens.disponible) * 60.0 / self.tokens.capacidad
+                ),
+            }
+            if aceptada:
+                return True, None, headers
+            headers['retry-after'] = f"{max(espera_peticion, espera_tokens):.3f}"
+            return False, 'requests' if espera_peticion else 'tokens', headers
+
+
+class ServidorOpenAISimulado:
+    """
+    Servidor HTTP local que habla el protocolo chat.completions
+
+    - Responde JSON válido del formato abreviado del AnalizadorMaestroIA
+      (o el array del AnalizadorOpenAI), un item por comentario numerado.
+    - Emula límites RPM/TPM con 429 y headers x-ratelimit-* / retry-after.
+    - Latencia lognormal (p50/p95) más un costo opcional por token de salida.
+    - Una fracción configurable de respuestas llega truncada (finish_reason 'length').
+    - Soporta stream=True (SSE) con uso en el último chunk.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', puerto: int = 0, rpm: int = 500, tpm: int = 200000,
+                 latencia_p50: float = 0.5, latencia_p95: float = 1.5, segundos_por_token: float = 0.0,
+                 prob_truncado: float = 0.0, semilla: int = 12345):
+        self.host = host
+        self.puerto = puerto
+        self.limitador = LimitadorRPMTPM(rpm, tpm)
+        self.latencia = ModeloLatencia(latencia_p50, latencia_p95, semilla=semilla)
+        self.segundos_por_token = segundos_por_token
+        self.prob_truncado = prob_truncado
+        self.clasificador = AnalizadorLexicoLocal(umbral_confianza=0.0)
+        self._aleatorio = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor: Optional[ThreadingHTTPServer] = None
+        self._hilo: Optional[threading.Thread] = None
+        self.estadisticas = {'peticiones': 0, 'aceptadas': 0, 'rechazadas_429': 0, 'truncadas': 0, 'tokens': 0}
+
+    # ---- ciclo de vida -------------------------------------------------
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.puerto}/v1"
+
+    def iniciar(self) -> str:
+        """Arranca en un hilo de fondo y devuelve la base_url para el cliente OpenAI"""
+        servidor = self
+
+        class _Manejador(ManejadorOpenAISimulado):
+            simulador = servidor
+
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), _Manejador)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="openai-simulado", daemon=True)
+        self._hilo.start()
+        return self.base_url
+
+    def detener(self) -> None:
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+    def __enter__(self) -> 'ServidorOpenAISimulado':
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.detener()
+
+    def _contar(self, clave: str, cantidad: int = 1) -> None:
+        with self._lock:
+            self.estadisticas[clave] += cantidad
+
+    # ---- simulación ----------------------------------------------------
+
+    def atender_chat(self, cuerpo: Dict[str, Any]) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """
+        Decide la respuesta de una petición chat.completions
+
+        Returns:
+            (status, headers, respuesta) donde respuesta incluye 'content',
+            'finish_reason', 'usage' y 'latencia' para el éxito, o el error 429
+        """
+        self._contar('peticiones')
+        mensajes = cuerpo.get('messages', [])
+        tokens_prompt = sum(len(str(m.get('content', ''))) for m in mensajes) // CHARS_POR_TOKEN + 1
+        max_tokens = int(cuerpo.get('max_tokens') or cuerpo.get('max_completion_tokens') or 1000)
+
+        aceptada, limite, headers = self.limitador.intentar(tokens_prompt + max_tokens)
+        if not aceptada:
+            self._contar('rechazadas_429')
+            return 429, headers, {'error': {
+                'message': f"Rate limit reached for {cuerpo.get('model')} on {limite} (simulated)",
+                'type': limite,
+                'param': None,
+                'code': 'rate_limit_exceeded',
+            }}
+
+        prompt = str(mensajes[-1].get('content', '')) if mensajes else ''
+        contenido = self._generar_contenido(prompt)
+        finish_reason = 'stop'
+        with self._lock:
+            truncar = self._aleatorio.random() < self.prob_truncado
+            corte = self._aleatorio.uniform(0.4, 0.8)
+        if truncar:
+            contenido = contenido[:int(len(contenido) * corte)]
+            finish_reason = 'length'
+            self._contar('truncadas')
+
+        tokens_salida = min(max_tokens, len(contenido) // CHARS_POR_TOKEN + 1)
+        self._contar('aceptadas')
+        self._contar('tokens', tokens_prompt + tokens_salida)
+        return 200, headers, {
+            'content': contenido,
+            'finish_reason': finish_reason,
+            'usage': {
+                'prompt_tokens': tokens_prompt,
+                'completion_tokens': tokens_salida,
+                'total_tokens': tokens_prompt + tokens_salida,
+            },
+            'latencia': self.latencia.muestrear() + tokens_salida * self.segundos_por_token,
+        }
+
+    def _generar_contenido(self, prompt: str) -> str:
+        comentarios = []
+        for linea in prompt.split('\n'):
+            coincidencia = PATRON_COMENTARIO.match(linea.strip())
+            if coincidencia:
+                comentarios.append(coincidencia.group(2))
+
+        clasificados = [self.clasificador.clasificar(c) or
+                        {'sent': 'neu', 'conf': 0.7, 'tema': 'ser', 'emo': 'neu', 'urg': 'b'}
+                        for c in comentarios]
+
+        if '"sent"' not in prompt:
+            # Formato del AnalizadorOpenAI: array con sentiment/confidence
+            etiquetas = {'pos': 'positive', 'neg': 'negative', 'neu': 'neutral'}
+            return json.dumps([
+                {'sentiment': etiquetas[c['sent']], 'confidence': c['conf'], 'themes': [],
+                 'pain_points': [], 'emotions': []}
+                for c in clasificados
+            ], ensure_ascii=False)
+
+        conteo = {'pos': 0, 'neu': 0, 'neg': 0}
+        for c in clasificados:
+            conteo[c['sent']] += 1
+        dominante = max(conteo, key=conteo.get)
+        return json.dumps({
+            'general': {
+                'total': len(clasificados),
+                'tendencia': {'pos': 'positiva', 'neu': 'neutral', 'neg': 'negativa'}[dominante],
+                'resumen': f"Simulado: {len(clasificados)} comentarios",
+            },
+            'comentarios': [dict(c, i=i + 1) for i, c in enumerate(clasificados)],
+            'stats': dict(conteo, tema_top='ser', urg=sum(1 for c in clasificados if c['urg'] in ('a', 'c'))),
+        }, ensure_ascii=False)
+
+
+class ManejadorOpenAISimulado(BaseHTTPRequestHandler):
+    """Traduce HTTP ↔ ServidorOpenAISimulado"""
+
+    simulador: ServidorOpenAISimulado = None
+    protocol_version = 'HTTP/1.1'
+    CARACTERES_POR_CHUNK = 48
+
+    def log_message(self, formato, *args):
+        pass  # Silencioso: el cliente ya registra lo relevante
+
+    def do_GET(self):
+        if self.path.startswith('/v1/models/'):
+            modelo = self.path.rsplit('/', 1)[-1]
+            self._enviar_json(200, {'id': modelo, 'object': 'model', 'created': 0, 'owned_by': 'simulado'})
+        else:
+            self._enviar_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+
+    def do_POST(self):
+        longitud = int(self.headers.get('Content-Length', 0))
+        try:
+            cuerpo = json.loads(self.rfile.read(longitud) or b'{}')
+        except json.JSONDecodeError:
+            self._enviar_json(400, {'error': {'message': 'Invalid JSON', 'type': 'invalid_request_error'}})
+            return
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._enviar_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+
+        status, headers, respuesta = self.simulador.atender_chat(cuerpo)
+        if status != 200:
+            self._enviar_json(status, respuesta, headers)
+            return
+
+        modelo = cuerpo.get('model', 'gpt-4o-mini')
+        identificador = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        if cuerpo.get('stream'):
+            incluir_uso = bool((cuerpo.get('stream_options') or {}).get('include_usage'))
+            self._enviar_stream(identificador, modelo, respuesta, headers, incluir_uso)
+            return
+
+        time.sleep(respuesta['latencia'])
+        self._enviar_json(200, {
+            'id': identificador,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': modelo,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': respuesta['content']},
+                'finish_reason': respuesta['finish_reason'],
+            }],
+            'usage': respuesta['usage'],
+        }, headers)
+
+    def _enviar_json(self, status: int, cuerpo: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _enviar_stream(self, identificador: str, modelo: str, respuesta: Dict[str, Any],
+                       headers: Dict[str, str], incluir_uso: bool):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        for nombre, valor in headers.items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.close_connection = True
+
+        contenido = respuesta['content']
+        partes = [contenido[i:i + self.CARACTERES_POR_CHUNK] for i in range(0, len(contenido), self.CARACTERES_POR_CHUNK)]
+        espera = respuesta['latencia'] / (len(partes) + 1)
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage=None, choices=True):
+            evento = {
+                'id': identificador,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': modelo,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}] if choices else [],
+            }
+            if usage is not None:
+                evento['usage'] = usage
+            self.wfile.write(f"data: {json.dumps(evento, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        time.sleep(espera)
+        chunk({'role': 'assistant', 'content': ''})
+        for parte in partes:
+            time.sleep(espera)
+            chunk({'content': parte})
+        chunk({}, finish_reason=respuesta['finish_reason'])
+        if incluir_uso:
+            chunk({}, usage=respuesta['usage'], choices=False)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Servidor local compatible con OpenAI para pruebas de carga')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--rpm', type=int, default=500, help='Peticiones por minuto antes de responder 429')
+    parser.add_argument('--tpm', type=int, default=200000, help='Tokens por minuto (prompt + max_tokens)')
+    parser.add_argument('--p50', type=float, default=0.5, help='Latencia mediana en segundos')
+    parser.add_argument('--p95', type=float, default=1.5, help='Latencia p95 en segundos')
+    parser.add_argument('--segundos-por-token', type=float, default=0.0, help='Costo adicional por token de salida')
+    parser.add_argument('--prob-truncado', type=float, default=0.0, help='Fracción de respuestas truncadas (0-1)')
+    parser.add_argument('--semilla', type=int, default=12345)
+    args = parser.parse_args()
+
+    servidor = ServidorOpenAISimulado(
+        host=args.host, puerto=args.puerto, rpm=args.rpm, tpm=args.tpm,
+        latencia_p50=args.p50, latencia_p95=args.p95, segundos_por_token=args.segundos_por_token,
+        prob_truncado=args.prob_truncado, semilla=args.semilla
+    )
+    base_url = servidor.iniciar()
+    print(f"🧪 Servidor OpenAI simulado en {base_url} (RPM={args.rpm}, TPM={args.tpm})")
+    print(f"   export OPENAI_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print(f"\n📊 Estadísticas: {servidor.estadisticas}")
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
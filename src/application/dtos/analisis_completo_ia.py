@@ -9,6 +9,32 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def indexar_por_i(resultados: List[Dict[str, Any]], total: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Resultados abreviados por posición (0-based) de su comentario, según 'i' (1..total)
+    
+    Un 'i' fuera de rango o repetido se descarta (gana el primero). Solo si ningún
+    resultado trae 'i' y hay exactamente uno por comentario se asume el orden
+    posicional: en una respuesta corta sin 'i' no se sabe qué comentario falta.
+    """
+    por_posicion: Dict[int, Dict[str, Any]] = {}
+    con_indice = False
+    for resultado in resultados:
+        if not isinstance(resultado, dict) or resultado.get('i') is None:
+            continue
+        con_indice = True
+        try:
+            indice = int(resultado['i'])
+        except (TypeError, ValueError):
+            continue
+        if 1 <= indice <= total and indice - 1 not in por_posicion:
+            por_posicion[indice - 1] = resultado
+    
+    if not con_indice and len(resultados) == total:
+        por_posicion = {posicion: r for posicion, r in enumerate(resultados) if isinstance(r, dict)}
+    return por_posicion
+
+
 @dataclass
 class AnalisisCompletoIA:
     """
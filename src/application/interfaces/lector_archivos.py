@@ -2,7 +2,7 @@
 Interface para lectura de archivos
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 
 
 class ILectorArchivos(ABC):
@@ -18,6 +18,28 @@ class ILectorArchivos(ABC):
         """
         pass
     
+    def leer_comentarios_por_bloques(self, archivo, tamano_bloque: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lee comentarios en bloques de hasta tamano_bloque, en el orden del archivo
+        
+        Implementación por defecto sobre leer_comentarios; los lectores que
+        pueden recorrer el archivo fila a fila la sobrescriben para no
+        cargarlo entero y para que el llamador pueda dejar de leer antes.
+        """
+        comentarios = self.leer_comentarios(archivo)
+        for inicio in range(0, len(comentarios), tamano_bloque):
+            yield comentarios[inicio:inicio + tamano_bloque]
+    
+    def preescanear(self, archivo) -> Optional[Dict[str, Any]]:
+        """
+        Inspección rápida antes de leer el archivo completo
+        
+        Retorna columna de comentarios, columnas y filas estimadas (ver
+        LectorArchivosExcel.preescanear), o None si el lector no sabe
+        estimarlas; un archivo inválido lanza la misma excepción que la lectura.
+        """
+        return None
+    
     @abstractmethod
     def es_formato_soportado(self, nombre_archivo: str) -> bool:
         """
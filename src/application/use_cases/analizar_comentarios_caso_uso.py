@@ -14,6 +14,7 @@ from ..interfaces.lector_archivos import ILectorArchivos
 from ..interfaces.procesador_texto import IProcesadorTexto
 from ..interfaces.detector_temas import IDetectorTemas
 from ..dtos.resultado_analisis import ResultadoAnalisis
+from ...shared.utils.identificadores import id_estable
 
 
 @dataclass
@@ -60,7 +61,7 @@ class AnalizarComentariosCasoUso:
                 return self._crear_resultado_error("No se encontraron comentarios válidos en el archivo")
             
             # 3. Procesar y limpiar textos
-            comentarios = self._crear_entidades_comentarios(comentarios_raw)
+            comentarios = self._crear_entidades_comentarios(comentarios_raw, comando.nombre_archivo)
             
             # 4. Análisis de sentimientos
             comentarios = self.servicio_sentimientos.analizar_lote_comentarios(comentarios)
@@ -78,7 +79,8 @@ class AnalizarComentariosCasoUso:
         except Exception as e:
             return self._crear_resultado_error(f"Error durante el análisis: {str(e)}")
     
-    def _crear_entidades_comentarios(self, comentarios_raw: List[Dict[str, Any]]) -> List[Comentario]:
+    def _crear_entidades_comentarios(self, comentarios_raw: List[Dict[str, Any]],
+                                     nombre_archivo: str = '') -> List[Comentario]:
         """
         Crea entidades de comentarios a partir de datos raw
         """
@@ -96,7 +98,7 @@ class AnalizarComentariosCasoUso:
             
             # Crear comentario
             comentario = Comentario(
-                id=f"comentario_{i}_{hash(texto)}",
+                id=id_estable("comentario", i, texto, nombre_archivo),
                 texto=texto,
                 texto_limpio=texto_limpio,
                 frecuencia=raw.get('frecuencia', 1),
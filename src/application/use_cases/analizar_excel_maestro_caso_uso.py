@@ -2,12 +2,15 @@
 Caso de uso simplificado para análisis maestro con IA
 """
 from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
 import logging
 import time
 import gc
-from threading import Thread
+import asyncio
+import queue
+import hashlib
+from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Optional imports for enhanced functionality
@@ -24,10 +27,12 @@ from ...domain.value_objects.emocion import Emocion, TipoEmocion
 from ...domain.value_objects.tema_principal import TemaPrincipal, CategoriaTemaTelco
 from ...domain.value_objects.punto_dolor import PuntoDolor, TipoPuntoDolor, NivelImpacto
 from ..interfaces.lector_archivos import ILectorArchivos
-from ..dtos.analisis_completo_ia import AnalisisCompletoIA
+from ..dtos.analisis_completo_ia import AnalisisCompletoIA, indexar_por_i
 from ...infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+from ...infrastructure.external_services.ai_engine_constants import AIEngineConstants
 from ...shared.exceptions.archivo_exception import ArchivoException
 from ...shared.exceptions.ia_exception import IAException
+from ...shared.utils.identificadores import id_estable
 
 # PHASE 3: Import intelligent retry strategy
 try:
@@ -93,6 +98,9 @@ class AnalizarExcelMaestroCasoUso:
     4. Guardar en repositorio
     """
     
+    # Intervalo mínimo entre notificaciones de comentarios recibidos en streaming
+    INTERVALO_PROGRESO_STREAMING = 0.2
+    
     def __init__(
         self,
         repositorio_comentarios: IRepositorioComentarios,
@@ -101,12 +109,29 @@ class AnalizarExcelMaestroCasoUso:
         max_comments_per_batch: int = 120,  # OPTIMIZATION: Increased for better performance (up to 850 comments in 20-30s)
         ai_configuration=None,
         progress_callback=None,
-        configuracion=None
+        configuracion=None,
+        cache_resultados=None,
+        deduplicador=None,
+        clasificador_local=None,
+        almacen_checkpoints=None
     ):
         self.repositorio_comentarios = repositorio_comentarios
         self.lector_archivos = lector_archivos
         self.analizador_maestro = analizador_maestro
         
+        # Cache persistente por comentario (opcional): solo los fallos van a la API
+        self.cache_resultados = cache_resultados
+        
+        # Agrupación de duplicados (opcional): un representante por grupo va a la IA
+        self.deduplicador = deduplicador
+        
+        # Clasificador local (opcional): los comentarios triviales no llegan a la IA
+        self.clasificador_local = clasificador_local
+        
+        # Checkpoints por lote (opcional): un trabajo interrumpido se reanuda sin re-facturar
+        self.almacen_checkpoints = almacen_checkpoints
+        self._trabajo_checkpoint: Optional[str] = None
+        
         # Store general configuration for validation limits
         self.configuracion = configuracion
         
@@ -138,6 +163,7 @@ class AnalizarExcelMaestroCasoUso:
         
         # PROGRESS INTEGRATION: Store progress callback for real-time updates
         self.progress_callback = progress_callback
+        self._iniciar_progreso_streaming(0, 0)
         if progress_callback:
             logger.info(f"📊 Real-time progress tracking enabled")
         
@@ -161,8 +187,15 @@ class AnalizarExcelMaestroCasoUso:
                 self.repositorio_comentarios.limpiar()
                 logger.info("🧹 Repositorio limpiado")
             
-            # 2. Leer archivo
-            comentarios_raw_data = self.lector_archivos.leer_comentarios(comando.archivo_cargado)
+            # CONFIGURABLE: Validar límites de procesamiento
+            max_file_size = self.configuracion.get('max_file_comments', 2000) if self.configuracion else 2000
+            min_file_info = self.configuracion.get('min_file_comments_info', 100) if self.configuracion else 100
+            
+            # 2. Pre-escaneo: plan de lotes estimado al instante; un archivo inválido falla aquí
+            self._preescanear_archivo(comando.archivo_cargado, max_file_size)
+            
+            # 3. Leer archivo (por bloques: no se lee más allá del límite)
+            comentarios_raw_data = self._leer_comentarios(comando.archivo_cargado, max_file_size)
             
             if not comentarios_raw_data:
                 return self._crear_resultado_error("No se encontraron comentarios válidos en el archivo")
@@ -179,12 +212,8 @@ class AnalizarExcelMaestroCasoUso:
             if not comentarios_validos:
                 return self._crear_resultado_error("No se encontraron comentarios válidos después del filtrado")
             
-            # CONFIGURABLE: Validar límites de procesamiento
-            max_file_size = self.configuracion.get('max_file_comments', 2000) if self.configuracion else 2000
-            min_file_info = self.configuracion.get('min_file_comments_info', 100) if self.configuracion else 100
-            
             if len(comentarios_validos) > max_file_size:
-                logger.warning(f"🚨 ARCHIVO MUY GRANDE: {len(comentarios_validos)} comentarios, limitando a {max_file_size}")
+                logger.warning(f"🚨 ARCHIVO MUY GRANDE: más de {max_file_size} comentarios, limitando a {max_file_size}")
                 comentarios_validos = comentarios_validos[:max_file_size]
                 comentarios_raw_data = comentarios_raw_data[:max_file_size]
             elif len(comentarios_validos) < min_file_info:
@@ -192,26 +221,25 @@ class AnalizarExcelMaestroCasoUso:
             
             logger.info(f"📊 Procesando {len(comentarios_validos)} comentarios válidos en lotes de {self.max_comments_per_batch}")
             
-            # 3. Procesamiento unificado (eliminada bifurcación innecesaria)
-            if len(comentarios_validos) <= self.max_comments_per_batch:
-                # Archivo pequeño - procesamiento directo
-                analisis_completo_ia = self.analizador_maestro.analizar_excel_completo(comentarios_validos)
-            else:
-                # Archivo grande - procesamiento en múltiples lotes
-                analisis_completo_ia = self._procesar_en_lotes(comentarios_validos)
+            # 4. Procesamiento unificado: duplicados colapsados + cache persistente + API solo para los fallos
+            self._trabajo_checkpoint = self._crear_trabajo_checkpoint(comando.archivo_cargado, comentarios_validos)
+            analisis_completo_ia = self._analizar_deduplicado(comentarios_validos)
             
             if not analisis_completo_ia.es_exitoso():
                 return self._crear_resultado_error("Error en análisis IA")
             
-            # 4. Mapear resultados IA a entidades de dominio
+            # Trabajo completo: sus checkpoints ya no hacen falta
+            self._descartar_checkpoints()
+            
+            # 5. Mapear resultados IA a entidades de dominio
             comentarios_analizados = self._mapear_a_entidades_dominio(
-                analisis_completo_ia, comentarios_raw_data
+                analisis_completo_ia, comentarios_raw_data, comando.nombre_archivo
             )
             
-            # 5. Guardar en repositorio
+            # 6. Guardar en repositorio
             self.repositorio_comentarios.guardar_lote(comentarios_analizados)
             
-            # 6. Generar resultado final
+            # 7. Generar resultado final
             tiempo_transcurrido = (datetime.now() - inicio_tiempo).total_seconds()
             
             resultado = ResultadoAnalisisMaestro(
@@ -239,14 +267,282 @@ class AnalizarExcelMaestroCasoUso:
             logger.error(f"💥 Error inesperado: {str(e)}")
             return self._crear_resultado_error(f"Error inesperado: {str(e)}")
     
+    def _preescanear_archivo(self, archivo: Any, limite: int) -> None:
+        """
+        Notifica un plan de lotes estimado (encabezado + muestra) antes de la lectura completa
+        
+        El progreso muestra comentarios, lotes y ETA en milisegundos; el plan
+        real se notifica al empezar los lotes. Un archivo vacío o sin columna
+        de comentarios lanza ArchivoException sin leerlo entero.
+        """
+        preescanear = getattr(self.lector_archivos, 'preescanear', None)
+        if preescanear is None:
+            return
+        try:
+            preescaneo = preescanear(archivo)
+        except ArchivoException:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Pre-escaneo no disponible, se sigue con la lectura: {str(e)}")
+            return
+        
+        estimados = preescaneo and (preescaneo.get('comentarios') or preescaneo.get('filas_estimadas'))
+        if not estimados:
+            return
+        if estimados > limite:
+            logger.warning(f"🚨 ARCHIVO MUY GRANDE: ~{estimados} filas, se analizarán los primeros {limite} comentarios")
+        estimados = min(estimados, limite)
+        total_lotes = max(1, -(-estimados // self.max_comments_per_batch))
+        logger.info(f"🔎 Pre-escaneo ({preescaneo.get('metodo_estimacion')}): ~{estimados} comentarios en "
+                    f"~{total_lotes} lotes, columna '{preescaneo.get('columna_comentario')}'")
+        self._notify_progress_start(total_lotes, estimados, estimado=True)
+    
+    def _leer_comentarios(self, archivo: Any, limite: int) -> List[Dict[str, Any]]:
+        """
+        Lee hasta limite + 1 comentarios (el +1 detecta que el archivo es más grande)
+        
+        Con un lector por bloques el resto del archivo nunca se recorre; un
+        lector sin bloques se lee completo como antes.
+        """
+        leer_por_bloques = getattr(self.lector_archivos, 'leer_comentarios_por_bloques', None)
+        if leer_por_bloques is None:
+            return self.lector_archivos.leer_comentarios(archivo)
+        
+        comentarios: List[Dict[str, Any]] = []
+        bloques = leer_por_bloques(archivo)
+        try:
+            for bloque in bloques:
+                comentarios.extend(bloque)
+                if len(comentarios) > limite:
+                    break
+        finally:
+            if hasattr(bloques, 'close'):
+                bloques.close()
+        logger.info(f"📄 Leídos {len(comentarios)} comentarios desde {getattr(archivo, 'name', 'archivo')}")
+        return comentarios[:limite + 1]
+    
+    def _crear_trabajo_checkpoint(self, archivo: Any, comentarios: List[str]) -> Optional[str]:
+        """
+        Clave del trabajo: hash del contenido del archivo + configuración que determina los lotes
+        
+        Si el archivo no expone sus bytes (p. ej. un DataFrame) se usa el hash de los comentarios.
+        """
+        if not self.almacen_checkpoints:
+            return None
+        
+        contenido = None
+        try:
+            if hasattr(archivo, 'getvalue'):
+                contenido = archivo.getvalue()
+            elif isinstance(archivo, (str, Path)) and Path(archivo).is_file():
+                contenido = Path(archivo).read_bytes()
+        except (OSError, TypeError, ValueError):
+            contenido = None
+        if not isinstance(contenido, bytes):
+            contenido = '\x1f'.join(comentarios).encode('utf-8')
+        huella_archivo = hashlib.sha256(contenido).hexdigest()
+        
+        configuracion = self.configuracion or {}
+        configuracion_lotes = {
+            'modelo': getattr(self.analizador_maestro, 'modelo', None),
+            'seed': getattr(self.analizador_maestro, 'seed', None),
+            'temperatura': getattr(self.analizador_maestro, 'temperatura', None),
+            'prompt': AIEngineConstants.PROMPT_VERSION,
+            'max_comments_per_batch': self.max_comments_per_batch,
+            'max_file_comments': configuracion.get('max_file_comments', 2000),
+            'token_aware_batching': configuracion.get('token_aware_batching', True),
+            'dedup': (configuracion.get('dedup_enabled', True), configuracion.get('dedup_near_duplicates', False),
+                      configuracion.get('dedup_similarity_threshold', 0.85)),
+            'clasificador_local': (configuracion.get('local_classifier_enabled', True),
+                                   configuracion.get('local_classifier_threshold', 0.9)),
+        }
+        trabajo = self.almacen_checkpoints.clave_trabajo(huella_archivo, configuracion_lotes)
+        guardados = self.almacen_checkpoints.lotes_guardados(trabajo)
+        if guardados:
+            logger.info(f"♻️ Reanudando trabajo {trabajo[:8]}: {len(guardados)} lotes ya completados en disco")
+        return trabajo
+    
+    def _restaurar_checkpoint(self, batch_number: int, lote: List[str]) -> Optional[AnalisisCompletoIA]:
+        """Resultado del lote guardado por una ejecución anterior del mismo trabajo"""
+        if not self.almacen_checkpoints or not self._trabajo_checkpoint:
+            return None
+        restaurado = self.almacen_checkpoints.cargar_lote(self._trabajo_checkpoint, batch_number, lote)
+        if restaurado is not None:
+            logger.info(f"♻️ Lote {batch_number} restaurado desde checkpoint (sin llamada a la API)")
+        return restaurado
+    
+    def _guardar_checkpoint(self, batch_number: int, lote: List[str], resultado: AnalisisCompletoIA) -> None:
+        """Persiste un lote exitoso; un error de disco no interrumpe el análisis"""
+        if not self.almacen_checkpoints or not self._trabajo_checkpoint:
+            return
+        try:
+            self.almacen_checkpoints.guardar_lote(self._trabajo_checkpoint, batch_number, lote, resultado)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar el checkpoint del lote {batch_number}: {str(e)}")
+    
+    def _descartar_checkpoints(self) -> None:
+        if self.almacen_checkpoints and self._trabajo_checkpoint:
+            try:
+                self.almacen_checkpoints.descartar(self._trabajo_checkpoint)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudieron eliminar los checkpoints: {str(e)}")
+        self._trabajo_checkpoint = None
+    
+    def _analizar_comentarios_api(self, comentarios: List[str]) -> AnalisisCompletoIA:
+        """Envía los comentarios a la IA, en una llamada o en lotes según el tamaño"""
+        lotes = self._dividir_en_lotes(comentarios)
+        if len(lotes) <= 1:
+            # Archivo pequeño - procesamiento directo
+            self._iniciar_progreso_streaming(len(comentarios), 1)
+            resultado = self.analizador_maestro.analizar_excel_completo(
+                comentarios, on_comentario=self._crear_callback_streaming(1, 1)
+            )
+            if not isinstance(resultado, AnalisisCompletoIA):
+                return resultado
+            indexados = self._comentarios_con_indice_global([comentarios], {1: resultado})
+            if indexados == resultado.comentarios_analizados:
+                return resultado
+            return replace(resultado, comentarios_analizados=indexados)
+        # Archivo grande - procesamiento en múltiples lotes
+        return self._procesar_en_lotes(comentarios, lotes)
+    
+    def _analizar_deduplicado(self, comentarios: List[str]) -> AnalisisCompletoIA:
+        """
+        Analiza un representante por grupo de duplicados y copia su resultado a cada fila
+        
+        El resultado tiene una entrada por comentario original, en el mismo orden,
+        así _mapear_a_entidades_dominio conserva indice_original.
+        """
+        if not self.deduplicador or not hasattr(self.analizador_maestro, 'consolidar_resultados'):
+            return self._analizar_con_clasificador_local(comentarios)
+        
+        grupos = self.deduplicador.agrupar(comentarios)
+        if not grupos.duplicados_removidos:
+            return self._analizar_con_clasificador_local(comentarios)
+        
+        analisis = self._analizar_con_clasificador_local(grupos.representantes)
+        if not analisis.es_exitoso():
+            return analisis
+        
+        return self.analizador_maestro.consolidar_resultados(
+            grupos.expandir(analisis.comentarios_analizados),
+            tiempo_analisis=analisis.tiempo_analisis,
+            tokens_utilizados=analisis.tokens_utilizados
+        )
+    
+    def _analizar_con_clasificador_local(self, comentarios: List[str]) -> AnalisisCompletoIA:
+        """
+        Resuelve localmente los comentarios triviales y envía el resto al cache/API
+        """
+        if not self.clasificador_local or not hasattr(self.analizador_maestro, 'consolidar_resultados'):
+            return self._analizar_con_cache(comentarios)
+        
+        locales = self.clasificador_local.clasificar_lote(comentarios)
+        if not locales:
+            return self._analizar_con_cache(comentarios)
+        
+        indices_pendientes = [i for i in range(len(comentarios)) if i not in locales]
+        logger.info(f"⚡ Clasificador local: {len(locales)} resueltos sin IA, {len(indices_pendientes)} pendientes")
+        
+        analisis_api = None
+        if indices_pendientes:
+            analisis_api = self._analizar_con_cache([comentarios[i] for i in indices_pendientes])
+            if not analisis_api.es_exitoso():
+                return analisis_api
+        
+        return self._combinar_en_orden(
+            len(comentarios), {i: dict(r, _origen='local') for i, r in locales.items()},
+            indices_pendientes, analisis_api
+        )
+    
+    def _combinar_en_orden(self, total: int, resueltos: Dict[int, Dict[str, Any]],
+                           indices_pendientes: List[int],
+                           analisis_api: Optional[AnalisisCompletoIA]) -> AnalisisCompletoIA:
+        """
+        Intercala resultados ya resueltos y los de la API en el orden original
+        
+        Cada resultado de la API se ubica por su 'i' sobre indices_pendientes. Un
+        comentario que la API no devolvió queda sin resultado (se omite) en lugar
+        de recibir el de otro comentario.
+        """
+        resultados = {posicion: resultado for posicion, resultado in resueltos.items()}
+        if analisis_api:
+            por_posicion = indexar_por_i(analisis_api.comentarios_analizados, len(indices_pendientes))
+            for posicion_api, resultado in por_posicion.items():
+                resultados[indices_pendientes[posicion_api]] = resultado
+        
+        sin_resultado = total - len(resultados)
+        if sin_resultado:
+            logger.warning(f"⚠️ {sin_resultado}/{total} comentarios sin resultado de la IA - omitidos")
+        
+        return self.analizador_maestro.consolidar_resultados(
+            [dict(resultados[posicion], i=posicion + 1) for posicion in sorted(resultados)],
+            tiempo_analisis=analisis_api.tiempo_analisis if analisis_api else 0.0,
+            tokens_utilizados=analisis_api.tokens_utilizados if analisis_api else 0
+        )
+    
+    def _analizar_con_cache(self, comentarios: List[str]) -> AnalisisCompletoIA:
+        """
+        Resuelve primero desde el cache persistente y envía a la API solo los fallos
+        
+        El resultado combinado conserva el orden original de los comentarios.
+        """
+        if not self.cache_resultados or not hasattr(self.analizador_maestro, 'consolidar_resultados'):
+            return self._analizar_comentarios_api(comentarios)
+        
+        modelo = self.analizador_maestro.modelo
+        seed = getattr(self.analizador_maestro, 'seed', None)
+        version_prompt = AIEngineConstants.PROMPT_VERSION
+        
+        try:
+            aciertos = self.cache_resultados.obtener_lote(comentarios, modelo, seed, version_prompt)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache persistente no disponible, analizando todo: {str(e)}")
+            return self._analizar_comentarios_api(comentarios)
+        
+        indices_pendientes = [i for i in range(len(comentarios)) if i not in aciertos]
+        logger.info(f"💾 Cache persistente: {len(aciertos)} resueltos, {len(indices_pendientes)} a la API")
+        
+        analisis_api = None
+        if indices_pendientes:
+            pendientes = [comentarios[i] for i in indices_pendientes]
+            analisis_api = self._analizar_comentarios_api(pendientes)
+            
+            if not analisis_api.es_exitoso():
+                return analisis_api
+            
+            # Solo se guardan los 'i' que la API devolvió (ver _analizar_comentarios_api)
+            if self.analizador_maestro.is_deterministic():
+                try:
+                    self.cache_resultados.guardar_lote(
+                        pendientes, analisis_api.comentarios_analizados, modelo, seed, version_prompt
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo actualizar el cache persistente: {str(e)}")
+        
+        if not aciertos:
+            return analisis_api
+        
+        # Combinar aciertos y resultados de la API en el orden original
+        return self._combinar_en_orden(
+            len(comentarios), {i: dict(r, _origen='cache') for i, r in aciertos.items()},
+            indices_pendientes, analisis_api
+        )
+    
     def _mapear_a_entidades_dominio(self, analisis_ia: AnalisisCompletoIA, 
-                                   datos_originales: List[Dict[str, Any]]) -> List[AnalisisComentario]:
+                                   datos_originales: List[Dict[str, Any]],
+                                   nombre_archivo: str = '') -> List[AnalisisComentario]:
         """
         Mapea los resultados del AnalizadorMaestroIA a entidades de dominio
+        
+        Los ids son estables entre procesos (ver id_estable): re-analizar el mismo
+        archivo reemplaza sus filas en un repositorio persistente en lugar de duplicarlas.
         """
         comentarios_analizados = []
         
-        for i, comentario_ia in enumerate(analisis_ia.comentarios_analizados):
+        for posicion, comentario_ia in enumerate(analisis_ia.comentarios_analizados):
+            # 'i' ubica la fila original (puede faltar alguna sin resultado); sin 'i', orden posicional
+            i = self._indice_fila(comentario_ia, posicion, len(datos_originales))
             try:
                 # Datos originales
                 datos_orig = datos_originales[i] if i < len(datos_originales) else {}
@@ -272,7 +568,7 @@ class AnalizarExcelMaestroCasoUso:
                 
                 # Crear entidad
                 analisis_comentario = AnalisisComentario(
-                    id=f"analisis_{i}_{hash(texto_original)}",
+                    id=id_estable("analisis", i, texto_original, nombre_archivo),
                     indice_original=i,
                     texto_original=texto_original,
                     sentimiento=sentimiento,
@@ -295,10 +591,19 @@ class AnalizarExcelMaestroCasoUso:
             except Exception as e:
                 logger.warning(f"⚠️ Error mapeando comentario {i}: {str(e)}")
                 # Crear análisis básico en caso de error
-                comentarios_analizados.append(self._crear_analisis_basico(i, datos_orig))
+                comentarios_analizados.append(self._crear_analisis_basico(i, datos_orig, nombre_archivo))
         
         return comentarios_analizados
     
+    @staticmethod
+    def _indice_fila(comentario_ia: Any, posicion: int, total: int) -> int:
+        """Fila original (0-based) de un resultado según su 'i'"""
+        try:
+            indice = int(comentario_ia.get('i')) - 1
+        except (AttributeError, TypeError, ValueError):
+            return posicion
+        return indice if 0 <= indice < total else posicion
+    
     def _mapear_sentimiento(self, sentimiento_data: Dict[str, Any]) -> Sentimiento:
         """Mapea datos de sentimiento a value object"""
         try:
@@ -563,12 +868,13 @@ class AnalizarExcelMaestroCasoUso:
         
         return sum(confianzas) / len(confianzas) if confianzas else 0.5
     
-    def _crear_analisis_basico(self, indice: int, datos_orig: Dict[str, Any]) -> AnalisisComentario:
+    def _crear_analisis_basico(self, indice: int, datos_orig: Dict[str, Any],
+                               nombre_archivo: str = '') -> AnalisisComentario:
         """Crea un análisis básico en caso de error de mapeo"""
         texto = str(datos_orig.get('comentario', datos_orig.get('texto', 'Sin texto')))
         
         return AnalisisComentario(
-            id=f"analisis_error_{indice}_{hash(texto)}",
+            id=id_estable("analisis_error", indice, texto, nombre_archivo),
             indice_original=indice,
             texto_original=texto,
             sentimiento=Sentimiento.crear_neutral(0.3, "manual"),
@@ -577,7 +883,8 @@ class AnalizarExcelMaestroCasoUso:
             modelo_ia_utilizado="error_fallback"
         )
     
-    def _procesar_en_lotes(self, comentarios_validos: List[str]) -> AnalisisCompletoIA:
+    def _procesar_en_lotes(self, comentarios_validos: List[str],
+                           lotes: Optional[List[List[str]]] = None) -> AnalisisCompletoIA:
         """
         Procesa comentarios en múltiples lotes y agrega los resultados
         OPTIMIZATION: Uses parallel processing for faster throughput
@@ -585,20 +892,22 @@ class AnalizarExcelMaestroCasoUso:
         try:
             logger.info(f"🔄 Iniciando procesamiento por lotes: {len(comentarios_validos)} comentarios")
             
-            # Dividir en lotes
-            lotes = [
-                comentarios_validos[i:i + self.max_comments_per_batch]
-                for i in range(0, len(comentarios_validos), self.max_comments_per_batch)
-            ]
+            # Dividir en lotes (por presupuesto de tokens si está disponible)
+            if lotes is None:
+                lotes = self._dividir_en_lotes(comentarios_validos)
             
             logger.info(f"📦 Creados {len(lotes)} lotes para procesar")
             
             # PROGRESS INTEGRATION: Initialize batch progress tracking
             total_lotes = len(lotes)
             self._notify_progress_start(total_lotes, len(comentarios_validos))
+            self._iniciar_progreso_streaming(len(comentarios_validos), total_lotes)
             
             # PERFORMANCE OPTIMIZATION: Use parallel processing for large files
             if len(lotes) >= 3 and len(comentarios_validos) >= 150:  # OPTIMIZED: Reduced threshold for more parallel processing
+                if self._usar_motor_async():
+                    logger.info(f"🚀 Using ASYNC engine for {len(lotes)} lotes (PERFORMANCE TARGET)")
+                    return self._procesar_lotes_async(lotes, total_lotes)
                 logger.info(f"🚀 Using PARALLEL processing for {len(lotes)} lotes (PERFORMANCE TARGET)")
                 return self._procesar_lotes_paralelo(lotes, total_lotes)
             else:
@@ -626,13 +935,33 @@ class AnalizarExcelMaestroCasoUso:
                 emociones_predominantes={}
             )
     
+    def _dividir_en_lotes(self, comentarios: List[str]) -> List[List[str]]:
+        """
+        Divide los comentarios en lotes
+        
+        Con 'token_aware_batching' activo, el empaquetador del analizador llena cada
+        petición hasta los límites de tokens y de comentarios por llamada; si no,
+        se usan lotes fijos de max_comments_per_batch.
+        """
+        usar_tokens = self.configuracion.get('token_aware_batching', True) if self.configuracion else True
+        if usar_tokens and hasattr(self.analizador_maestro, 'crear_empaquetador_lotes'):
+            try:
+                empaquetador = self.analizador_maestro.crear_empaquetador_lotes(self.max_comments_per_batch)
+                return empaquetador.empaquetar(comentarios)
+            except Exception as e:
+                logger.warning(f"⚠️ Empaquetado por tokens falló, usando lotes fijos: {e}")
+        
+        return [
+            comentarios[i:i + self.max_comments_per_batch]
+            for i in range(0, len(comentarios), self.max_comments_per_batch)
+        ]
+    
     def _procesar_lotes_secuencial(self, lotes: List[List[str]], total_lotes: int) -> AnalisisCompletoIA:
         """Sequential processing for small files (≤2 batches)"""
         logger.info(f"📈 Using sequential processing for {len(lotes)} lotes")
         
         # Procesar cada lote secuencialmente
-        resultados_lotes = []
-        comentarios_analizados_total = []
+        resultados_por_lote = {}
         
         for i, lote in enumerate(lotes):
             batch_number = i + 1
@@ -648,13 +977,16 @@ class AnalizarExcelMaestroCasoUso:
                 logger.debug(f"🔍 Lote {batch_number} contenido: {preview}")
             
             # PHASE 3: Intelligent retry processing with smart decisions
-            resultado_lote = self._process_batch_with_intelligent_retry(batch_number, lote)
+            resultado_lote = self._restaurar_checkpoint(batch_number, lote)
+            if resultado_lote is None:
+                resultado_lote = self._process_batch_with_intelligent_retry(batch_number, lote)
+                if resultado_lote and resultado_lote.es_exitoso():
+                    self._guardar_checkpoint(batch_number, lote, resultado_lote)
             
             # PROGRESS INTEGRATION: Notify batch completion
             if resultado_lote and resultado_lote.es_exitoso():
                 self._notify_batch_success(batch_number, total_lotes, resultado_lote.confianza_general)
-                resultados_lotes.append(resultado_lote)
-                comentarios_analizados_total.extend(resultado_lote.comentarios_analizados)
+                resultados_por_lote[batch_number] = resultado_lote
             else:
                 self._notify_batch_failure(batch_number, total_lotes, "Validation failed")
                 logger.error(f"❌ Lote {i+1} SALTADO - No se pudo procesar exitosamente")
@@ -684,107 +1016,186 @@ class AnalizarExcelMaestroCasoUso:
         gc.collect()
         
         # Agregar resultados de todos los lotes
-        return self._agregar_resultados_lotes(resultados_lotes, comentarios_analizados_total, len(lotes) * self.max_comments_per_batch)
+        resultados_lotes = [resultados_por_lote[n] for n in sorted(resultados_por_lote)]
+        comentarios_analizados_total = self._comentarios_con_indice_global(lotes, resultados_por_lote)
+        total_comentarios = sum(len(lote) for lote in lotes)
+        return self._agregar_resultados_lotes(resultados_lotes, comentarios_analizados_total, total_comentarios)
     
     def _procesar_lotes_paralelo(self, lotes: List[List[str]], total_lotes: int) -> AnalisisCompletoIA:
         """
-        EXTREME PERFORMANCE: Process batches in parallel using threading (Streamlit-compatible)
-        Target: 850+ comments in 20-30 seconds total
-        """
-        import time
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        Procesa los lotes con un pool de hilos acotado (Streamlit-compatible)
         
-        logger.info(f"🚀 PARALLEL PROCESSING: {len(lotes)} lotes en paralelo (TARGET: 20-30s)")
+        Los workers no ejecutan comandos de Streamlit: cada lote terminado se publica
+        en una cola de finalización y el hilo llamador solo se despierta cuando llega
+        un resultado, para notificar el progreso y agregar en orden de lote.
+        """
+        max_workers = min(len(lotes), self._obtener_max_workers())
+        logger.info(f"🚀 PARALLEL PROCESSING: {len(lotes)} lotes con {max_workers} workers")
         
-        resultados_lotes = []
-        comentarios_analizados_total = []
         inicio_paralelo = time.time()
+        cola_completados: "queue.Queue" = queue.Queue()
         
-        # WORKER THREAD CLASS (Streamlit Pattern 1 - No Streamlit commands)
-        class BatchWorkerThread(Thread):
-            def __init__(self, lote, batch_id, analizador_maestro, parent_caso_uso):
-                super().__init__()
-                self.lote = lote
-                self.batch_id = batch_id
-                self.analizador_maestro = analizador_maestro
-                self.parent_caso_uso = parent_caso_uso
-                self.resultado = None
-                self.error = None
-                self.start_time = None
-                self.end_time = None
-                
-            def run(self):
-                """Execute batch analysis in worker thread (NO Streamlit commands)"""
-                try:
-                    self.start_time = time.time()
-                    logger.info(f"🔄 Thread {self.batch_id}: Processing {len(self.lote)} comments")
-                    
-                    # Direct API call without Streamlit dependencies
-                    self.resultado = self.analizador_maestro.analizar_excel_completo(self.lote)
-                    
-                    self.end_time = time.time()
-                    duration = self.end_time - self.start_time
-                    logger.info(f"✅ Thread {self.batch_id}: Completed in {duration:.1f}s")
-                    
-                except Exception as e:
-                    self.error = e
-                    self.end_time = time.time()
-                    logger.error(f"❌ Thread {self.batch_id}: Error - {str(e)}")
-        
-        # Calculate optimal worker count based on batches
-        max_workers = min(len(lotes), 8)  # Max 8 concurrent workers (OPTIMIZED for performance)
-        logger.info(f"👥 Using {max_workers} parallel workers for {len(lotes)} batches")
-        
-        # Create and start worker threads
-        workers = []
-        for i, lote in enumerate(lotes):
-            worker = BatchWorkerThread(lote, i+1, self.analizador_maestro, self)
-            workers.append(worker)
-            worker.start()
-            
-        logger.info(f"🚀 {len(workers)} parallel threads STARTED")
+        def procesar_lote(batch_id: int, lote: List[str]) -> AnalisisCompletoIA:
+            """Ejecuta el análisis de un lote en un worker (SIN comandos Streamlit)"""
+            restaurado = self._restaurar_checkpoint(batch_id, lote)
+            if restaurado is not None:
+                return restaurado
+            inicio_lote = time.time()
+            logger.info(f"🔄 Worker lote {batch_id}: Processing {len(lote)} comments")
+            # Los comentarios en streaming también viajan por la cola hacia el hilo llamador
+            on_comentario = (lambda _c: cola_completados.put(('comentario', batch_id, None))) if self.progress_callback else None
+            resultado = self.analizador_maestro.analizar_excel_completo(lote, on_comentario=on_comentario)
+            logger.info(f"✅ Worker lote {batch_id}: Completed in {time.time() - inicio_lote:.1f}s")
+            if resultado and resultado.es_exitoso():
+                self._guardar_checkpoint(batch_id, lote, resultado)
+            return resultado
         
-        # Wait for all workers to complete (with progress updates)
-        completed_count = 0
-        while completed_count < len(workers):
-            time.sleep(0.1)  # Small delay to prevent busy waiting
+        resultados_por_lote = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lote-ia") as executor:
+            for batch_id, lote in enumerate(lotes, start=1):
+                future = executor.submit(procesar_lote, batch_id, lote)
+                future.add_done_callback(lambda f, b=batch_id: cola_completados.put(('lote', b, f)))
             
-            # Check completed workers
-            newly_completed = []
-            for worker in workers:
-                if not worker.is_alive() and worker not in newly_completed:
-                    newly_completed.append(worker)
-                    
-            if newly_completed:
-                completed_count += len(newly_completed)
+            # El hilo llamador bloquea en la cola: sin polling y progreso inmediato
+            completados = 0
+            while completados < len(lotes):
+                tipo, batch_id, future = cola_completados.get()
+                if tipo == 'comentario':
+                    self._registrar_comentario_streaming(batch_id, total_lotes)
+                    continue
+                
+                completados += 1
+                error = future.exception()
+                resultado = future.result() if error is None else None
+                
+                if resultado and resultado.es_exitoso():
+                    resultados_por_lote[batch_id] = resultado
+                    self._notify_batch_success(batch_id, total_lotes, resultado.confianza_general)
+                else:
+                    motivo = str(error) if error else "Validation failed"
+                    if error:
+                        logger.error(f"❌ Worker lote {batch_id}: Error - {motivo}")
+                    self._notify_batch_failure(batch_id, total_lotes, motivo)
+                    logger.error(f"❌ Lote {batch_id} SALTADO - No se pudo procesar exitosamente")
                 
-                # Process results from completed workers
-                for worker in newly_completed:
-                    if worker.resultado and worker.resultado.es_exitoso():
-                        resultados_lotes.append(worker.resultado)
-                        comentarios_analizados_total.extend(worker.resultado.comentarios_analizados)
-                        
-                        # Notify progress (main thread can call Streamlit commands)
-                        self._notify_batch_success(worker.batch_id, total_lotes, worker.resultado.confianza_general)
-                        
-                    elif worker.error:
-                        self._notify_batch_failure(worker.batch_id, total_lotes, str(worker.error))
-                        
                 elapsed = time.time() - inicio_paralelo
-                progress_pct = (completed_count / len(workers)) * 100
-                logger.info(f"📊 Parallel progress: {completed_count}/{len(workers)} ({progress_pct:.1f}%) - {elapsed:.1f}s elapsed")
+                logger.info(f"📊 Parallel progress: {completados}/{len(lotes)} ({completados / len(lotes) * 100:.1f}%) - {elapsed:.1f}s elapsed")
+        
+        # Reordenar por número de lote para mantener alineación con los datos originales
+        resultados_lotes = [resultados_por_lote[n] for n in sorted(resultados_por_lote)]
+        comentarios_analizados_total = self._comentarios_con_indice_global(lotes, resultados_por_lote)
         
-        # Final cleanup
-        for worker in workers:
-            worker.join(timeout=1.0)  # Ensure all threads are properly closed
-            
         tiempo_total = time.time() - inicio_paralelo
         logger.info(f"🎉 PARALLEL PROCESSING COMPLETED in {tiempo_total:.1f}s")
         logger.info(f"🎯 TARGET STATUS: {'✅ ACHIEVED' if tiempo_total <= 30 else '❌ EXCEEDED'} (target: 20-30s)")
         
-        return self._agregar_resultados_lotes(resultados_lotes, comentarios_analizados_total, len(lotes) * self.max_comments_per_batch)
+        total_comentarios = sum(len(lote) for lote in lotes)
+        return self._agregar_resultados_lotes(resultados_lotes, comentarios_analizados_total, total_comentarios)
+    
+    def _obtener_max_workers(self) -> int:
+        """Límite de lotes simultáneos (compartido con el motor async)"""
+        valor = self.configuracion.get('max_concurrent_batches', 8) if self.configuracion else 8
+        try:
+            return max(1, int(valor))
+        except (TypeError, ValueError):
+            return 8
     
-    # REMOVED: AsyncIO code completely eliminated (80 lines of dead code)
+    def _usar_motor_async(self) -> bool:
+        """Indica si el motor async del analizador está habilitado y disponible"""
+        habilitado = self.configuracion.get('use_async_engine', True) if self.configuracion else True
+        return habilitado and hasattr(self.analizador_maestro, 'procesar_lotes_async')
+    
+    def _procesar_lotes_async(self, lotes: List[List[str]], total_lotes: int) -> AnalisisCompletoIA:
+        """
+        Procesa los lotes con el motor async del analizador maestro
+        
+        El event loop corre en el hilo que llama a ejecutar(), de modo que los
+        callbacks de progreso se emiten en ese mismo hilo (el de Streamlit).
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # Ya hay un loop activo en este hilo: asyncio.run() no es posible
+            logger.warning("⚠️ Event loop activo en el hilo actual - usando procesamiento con hilos")
+            return self._procesar_lotes_paralelo(lotes, total_lotes)
+        
+        inicio_async = time.time()
+        resultados_por_lote = asyncio.run(self._consumir_lotes_async(lotes, total_lotes))
+        
+        # Reordenar por número de lote para mantener alineación con los datos originales
+        resultados_lotes = [resultados_por_lote[n] for n in sorted(resultados_por_lote)]
+        comentarios_analizados_total = self._comentarios_con_indice_global(lotes, resultados_por_lote)
+        
+        tiempo_total = time.time() - inicio_async
+        logger.info(f"🎉 ASYNC PROCESSING COMPLETED in {tiempo_total:.1f}s")
+        logger.info(f"🎯 TARGET STATUS: {'✅ ACHIEVED' if tiempo_total <= 30 else '❌ EXCEEDED'} (target: 20-30s)")
+        
+        total_comentarios = sum(len(lote) for lote in lotes)
+        return self._agregar_resultados_lotes(resultados_lotes, comentarios_analizados_total, total_comentarios)
+    
+    async def _consumir_lotes_async(self, lotes: List[List[str]], total_lotes: int) -> Dict[int, AnalisisCompletoIA]:
+        """Consume los lotes completados del motor async notificando el progreso"""
+        resultados_por_lote = {}
+        completados = 0
+        
+        # Lotes ya completados por una ejecución anterior del mismo trabajo
+        numeros_pendientes = []
+        for numero_lote, lote in enumerate(lotes, start=1):
+            restaurado = self._restaurar_checkpoint(numero_lote, lote)
+            if restaurado is not None:
+                completados += 1
+                resultados_por_lote[numero_lote] = restaurado
+                self._notify_batch_success(numero_lote, total_lotes, restaurado.confianza_general)
+            else:
+                numeros_pendientes.append(numero_lote)
+        if not numeros_pendientes:
+            return resultados_por_lote
+        
+        # El motor numera los lotes que recibe desde 1: se traducen al número original
+        on_comentario = None
+        if self.progress_callback:
+            on_comentario = lambda posicion, _c: self._registrar_comentario_streaming(
+                numeros_pendientes[posicion - 1], total_lotes)
+        
+        async for posicion, resultado, error in self.analizador_maestro.procesar_lotes_async(
+                [lotes[n - 1] for n in numeros_pendientes], on_comentario=on_comentario):
+            numero_lote = numeros_pendientes[posicion - 1]
+            completados += 1
+            if resultado and resultado.es_exitoso():
+                resultados_por_lote[numero_lote] = resultado
+                self._guardar_checkpoint(numero_lote, lotes[numero_lote - 1], resultado)
+                self._notify_batch_success(numero_lote, total_lotes, resultado.confianza_general)
+            else:
+                motivo = str(error) if error else "Validation failed"
+                self._notify_batch_failure(numero_lote, total_lotes, motivo)
+                logger.error(f"❌ Lote {numero_lote} SALTADO - No se pudo procesar exitosamente")
+            
+            logger.info(f"📊 Async progress: {completados}/{total_lotes} lotes")
+        
+        return resultados_por_lote
+    
+    @staticmethod
+    def _comentarios_con_indice_global(lotes: List[List[str]],
+                                       resultados_por_lote: Dict[int, AnalisisCompletoIA]) -> List[Dict]:
+        """
+        Une los comentarios de los lotes con 'i' sobre el total (1-based)
+        
+        Cada resultado se ubica por su 'i' dentro de su lote; los comentarios sin
+        resultado (omitidos por la IA o de un lote saltado) no ocupan lugar, así
+        ningún resultado posterior se corre hacia otro comentario.
+        """
+        comentarios = []
+        desplazamiento = 0
+        for numero_lote, lote in enumerate(lotes, start=1):
+            resultado = resultados_por_lote.get(numero_lote)
+            if resultado is not None:
+                por_posicion = indexar_por_i(resultado.comentarios_analizados, len(lote))
+                for posicion in sorted(por_posicion):
+                    comentarios.append(dict(por_posicion[posicion], i=desplazamiento + posicion + 1))
+            desplazamiento += len(lote)
+        return comentarios
     
     def _agregar_resultados_lotes(self, resultados_lotes: List[AnalisisCompletoIA], 
                                  comentarios_analizados_total: List[Dict], 
@@ -881,15 +1292,6 @@ class AnalizarExcelMaestroCasoUso:
             AnalisisCompletoIA or None if failed after all retries
         """
         try:
-            # Memory management: Clean cache every 5 batches
-            if batch_number % 5 == 0:
-                logger.info(f"🧹 Limpieza de memoria después de {batch_number} lotes")
-                try:
-                    self.analizador_maestro.limpiar_cache()
-                    gc.collect()
-                except Exception as cleanup_error:
-                    logger.warning(f"⚠️ Error en limpieza de memoria: {cleanup_error}")
-            
             # Get configuration for retry decisions
             max_retries = 2  # Default
             if self.ai_configuration:
@@ -900,12 +1302,21 @@ class AnalizarExcelMaestroCasoUso:
             resultado_lote = None
             last_error = None
             original_temperature = getattr(self.analizador_maestro, 'temperatura', 0.0)
+            # El analizador es compartido entre sesiones: la temperatura de reintento
+            # viaja en cada llamada en lugar de escribirse en la instancia
+            temperatura_reintento = None
             is_deterministic = getattr(self.analizador_maestro, '_is_deterministic', True)
             
             while batch_retry_count <= max_retries:
                 try:
                     # AI processing with exception handling
-                    resultado_lote = self.analizador_maestro.analizar_excel_completo(lote)
+                    kwargs_llamada = {}
+                    if temperatura_reintento is not None:
+                        kwargs_llamada['temperatura'] = temperatura_reintento
+                    resultado_lote = self.analizador_maestro.analizar_excel_completo(
+                        lote, on_comentario=self._crear_callback_streaming(batch_number, self._total_lotes_streaming),
+                        **kwargs_llamada
+                    )
                     
                     # Enhanced success validation
                     if resultado_lote and resultado_lote.es_exitoso():
@@ -960,7 +1371,7 @@ class AnalizarExcelMaestroCasoUso:
                                 # Apply temperature variation if recommended
                                 if retry_result.new_temperature is not None:
                                     logger.info(f"🌡️ Aplicando variación de temperatura: {original_temperature:.3f} → {retry_result.new_temperature:.3f}")
-                                    self.analizador_maestro.temperatura = retry_result.new_temperature
+                                    temperatura_reintento = retry_result.new_temperature
                                 
                                 logger.warning(f"⚠️ Lote {batch_number} reintento {batch_retry_count}/{max_retries} en {retry_result.delay_seconds:.1f}s")
                                 logger.info(f"🧠 Estrategia: {retry_result.reason}")
@@ -978,10 +1389,7 @@ class AnalizarExcelMaestroCasoUso:
                             else:
                                 logger.error(f"❌ Lote {batch_number} ABANDONADO después de {max_retries} intentos")
                                 break
-                        
-                        # Reset temperature if it was changed
-                        if self.retry_strategy and batch_retry_count > max_retries:
-                            self.analizador_maestro.temperatura = original_temperature
+
                                 
                 except Exception as e:
                     # CRITICAL FIX: Catch all exceptions during AI processing
@@ -1029,10 +1437,6 @@ class AnalizarExcelMaestroCasoUso:
                             logger.error(f"❌ Lote {batch_number} ABANDONADO por excepciones después de {max_retries} intentos")
                             break
             
-            # Reset temperature after all retries
-            if hasattr(self.analizador_maestro, 'temperatura'):
-                self.analizador_maestro.temperatura = original_temperature
-            
             # Final failure handling
             if not resultado_lote or not resultado_lote.es_exitoso():
                 logger.error(f"❌ Lote {batch_number} SALTADO - No se pudo procesar exitosamente")
@@ -1048,13 +1452,37 @@ class AnalizarExcelMaestroCasoUso:
             logger.error(f"❌ Error crítico en procesamiento de lote {batch_number}: {str(e)}")
             return None
 
-    def _notify_progress_start(self, total_lotes: int, total_comentarios: int):
-        """Notify progress start with batch info"""
+    def _iniciar_progreso_streaming(self, total_comentarios: int, total_lotes: int):
+        """Reinicia los contadores de comentarios recibidos en streaming"""
+        self._total_comentarios_streaming = total_comentarios
+        self._total_lotes_streaming = total_lotes
+        self._comentarios_recibidos = 0
+        self._ultima_notificacion_streaming = 0.0
+    
+    def _crear_callback_streaming(self, batch_number: int, total_lotes: int):
+        """Callback por comentario para llamadas en el hilo llamador (None sin progress_callback)"""
+        if not self.progress_callback:
+            return None
+        return lambda _comentario: self._registrar_comentario_streaming(batch_number, total_lotes)
+    
+    def _registrar_comentario_streaming(self, batch_number: int, total_lotes: int):
+        """Cuenta un comentario recibido y notifica el progreso con límite de frecuencia"""
+        total = self._total_comentarios_streaming
+        self._comentarios_recibidos = min(self._comentarios_recibidos + 1, total or 1)
+        
+        ahora = time.time()
+        if ahora - self._ultima_notificacion_streaming >= self.INTERVALO_PROGRESO_STREAMING or self._comentarios_recibidos == total:
+            self._ultima_notificacion_streaming = ahora
+            self._notify_comment_streamed(batch_number, total_lotes, self._comentarios_recibidos, total)
+    
+    def _notify_progress_start(self, total_lotes: int, total_comentarios: int, estimado: bool = False):
+        """Notify progress start with batch info (estimado=True: plan from the pre-scan)"""
         if self.progress_callback:
             self.progress_callback({
                 'action': 'start',
                 'total_batches': total_lotes,
                 'total_comments': total_comentarios,
+                'estimated': estimado,
                 'current_batch': 0,
                 'progress_percentage': 0.0
             })
@@ -1098,6 +1526,20 @@ class AnalizarExcelMaestroCasoUso:
                 'status': f'❌ Lote {batch_number}/{total_lotes} falló'
             })
 
+    def _notify_comment_streamed(self, batch_number: int, total_lotes: int, recibidos: int, total_comentarios: int):
+        """Notify comments received from the streaming response"""
+        if self.progress_callback:
+            progress_pct = (recibidos / total_comentarios) * 100 if total_comentarios else 0.0
+            self.progress_callback({
+                'action': 'comment_streamed',
+                'current_batch': batch_number,
+                'total_batches': total_lotes,
+                'comments_received': recibidos,
+                'total_comments': total_comentarios,
+                'progress_percentage': progress_pct,
+                'status': f'📡 {recibidos}/{total_comentarios} comentarios recibidos'
+            })
+
     def _crear_resultado_error(self, mensaje: str) -> ResultadoAnalisisMaestro:
         """Crea un resultado de error"""
         return ResultadoAnalisisMaestro(
@@ -0,0 +1,122 @@
+"""
+Checkpoints en disco de los lotes ya analizados, para reanudar trabajos interrumpidos
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ...application.dtos.analisis_completo_ia import AnalisisCompletoIA
+
+logger = logging.getLogger(__name__)
+
+
+class AlmacenCheckpoints:
+    """
+    Un archivo JSON por lote exitoso: <directorio>/<trabajo>/lote_<n>.json
+
+    El trabajo se identifica por el hash del contenido del archivo + la huella
+    de la configuración que determina los lotes (modelo, seed, prompt, tamaños).
+    Cada checkpoint guarda además el hash de los comentarios del lote: si el
+    lote n de una nueva ejecución no coincide, el checkpoint se ignora.
+
+    Las escrituras son atómicas (archivo temporal + os.replace), así un proceso
+    que muere a mitad de escritura nunca deja un checkpoint corrupto.
+    """
+
+    def __init__(self, directorio: str, ttl_segundos: Optional[int] = None):
+        """
+        Args:
+            directorio: Carpeta raíz de los checkpoints (se crea si no existe)
+            ttl_segundos: Antigüedad máxima de un trabajo sin terminar; None = sin expiración
+        """
+        self.directorio = Path(directorio)
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+        if ttl_segundos:
+            self.purgar_expirados()
+
+    @staticmethod
+    def huella_lote(comentarios: List[str]) -> str:
+        return hashlib.sha256('\x1f'.join(comentarios).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def clave_trabajo(huella_archivo: str, configuracion: Dict[str, Any]) -> str:
+        """Identificador del trabajo: contenido del archivo + configuración relevante"""
+        huella_config = json.dumps(configuracion, sort_keys=True, default=str)
+        return hashlib.sha256(f"{huella_archivo}|{huella_config}".encode('utf-8')).hexdigest()[:32]
+
+    def _ruta_lote(self, trabajo: str, numero_lote: int) -> Path:
+        return self.directorio / trabajo / f"lote_{numero_lote:05d}.json"
+
+    def guardar_lote(self, trabajo: str, numero_lote: int, comentarios: List[str],
+                     analisis: AnalisisCompletoIA) -> None:
+        """Persiste el resultado exitoso de un lote"""
+        datos = asdict(analisis)
+        datos['fecha_analisis'] = analisis.fecha_analisis.isoformat()
+        registro = {'huella_lote': self.huella_lote(comentarios), 'guardado_en': time.time(), 'analisis': datos}
+
+        ruta = self._ruta_lote(trabajo, numero_lote)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix='.tmp_', suffix='.json')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+                json.dump(registro, archivo, ensure_ascii=False, default=str)
+            os.replace(temporal, ruta)
+        except Exception:
+            Path(temporal).unlink(missing_ok=True)
+            raise
+        logger.debug(f"💾 Checkpoint guardado: trabajo {trabajo[:8]} lote {numero_lote}")
+
+    def cargar_lote(self, trabajo: str, numero_lote: int, comentarios: List[str]) -> Optional[AnalisisCompletoIA]:
+        """Resultado guardado del lote, o None si no existe, no coincide o está dañado"""
+        ruta = self._ruta_lote(trabajo, numero_lote)
+        if not ruta.exists():
+            return None
+        try:
+            registro = json.loads(ruta.read_text(encoding='utf-8'))
+            if registro.get('huella_lote') != self.huella_lote(comentarios):
+                logger.info(f"⚠️ Checkpoint del lote {numero_lote} no corresponde a los comentarios actuales")
+                return None
+            datos = dict(registro['analisis'])
+            datos['fecha_analisis'] = datetime.fromisoformat(datos['fecha_analisis'])
+            return AnalisisCompletoIA(**datos)
+        except Exception as e:
+            logger.warning(f"⚠️ Checkpoint ilegible {ruta.name}: {str(e)}")
+            return None
+
+    def lotes_guardados(self, trabajo: str) -> List[int]:
+        carpeta = self.directorio / trabajo
+        if not carpeta.exists():
+            return []
+        return sorted(int(ruta.stem.split('_')[1]) for ruta in carpeta.glob('lote_*.json'))
+
+    def descartar(self, trabajo: str) -> None:
+        """Elimina los checkpoints de un trabajo terminado"""
+        with self._lock:
+            shutil.rmtree(self.directorio / trabajo, ignore_errors=True)
+
+    def purgar_expirados(self) -> int:
+        """Elimina trabajos sin actividad más antiguos que el TTL"""
+        if not self.ttl_segundos:
+            return 0
+        limite = time.time() - self.ttl_segundos
+        eliminados = 0
+        with self._lock:
+            for carpeta in self.directorio.iterdir():
+                if carpeta.is_dir() and carpeta.stat().st_mtime < limite:
+                    shutil.rmtree(carpeta, ignore_errors=True)
+                    eliminados += 1
+        if eliminados:
+            logger.info(f"🧹 {eliminados} trabajos con checkpoints expirados eliminados")
+        return eliminados
@@ -0,0 +1,287 @@
+"""
+Cache de archivos ya parseados, direccionado por el hash de su contenido
+"""
+import os
+import json
+import gzip
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Parquet para el spill a disco (pyarrow en requirements.txt; sin él, JSON comprimido)
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ArchivoParseado:
+    """
+    Resultado de parsear un archivo: metadatos de la lectura + comentarios en columnas
+
+    Las columnas paralelas (textos, indices, nps, notas) ocupan bastante menos
+    que una lista de dicts y se vuelcan directo a Parquet; los dicts que espera
+    ILectorArchivos se construyen al pedirlos.
+    """
+    huella: str
+    columna_comentario: str
+    columnas: List[str]
+    total_filas: int
+    encoding: Optional[str] = None
+    textos: List[str] = field(default_factory=list)
+    indices: List[int] = field(default_factory=list)
+    nps: List[Optional[int]] = field(default_factory=list)
+    notas: List[Optional[float]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.textos)
+
+    def agregar(self, comentarios: List[Dict[str, Any]]) -> None:
+        """Añade comentarios en el formato de ILectorArchivos"""
+        for comentario in comentarios:
+            self.textos.append(comentario['comentario'])
+            self.indices.append(comentario['indice_original'])
+            self.nps.append(comentario.get('nps'))
+            self.notas.append(comentario.get('nota'))
+
+    def comentarios(self, inicio: int = 0, fin: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Comentarios [inicio:fin] como dicts (nps/nota solo si tienen valor)"""
+        fin = len(self.textos) if fin is None else min(fin, len(self.textos))
+        resultado = []
+        for posicion in range(inicio, fin):
+            comentario_data = {
+                'comentario': self.textos[posicion],
+                'indice_original': self.indices[posicion]
+            }
+            if self.nps[posicion] is not None:
+                comentario_data['nps'] = self.nps[posicion]
+            if self.notas[posicion] is not None:
+                comentario_data['nota'] = self.notas[posicion]
+            resultado.append(comentario_data)
+        return resultado
+
+    def bloques(self, tamano_bloque: int) -> Iterator[List[Dict[str, Any]]]:
+        for inicio in range(0, len(self.textos), tamano_bloque):
+            yield self.comentarios(inicio, inicio + tamano_bloque)
+
+    def metadatos(self) -> Dict[str, Any]:
+        return {
+            'huella': self.huella,
+            'columna_comentario': self.columna_comentario,
+            'columnas': self.columnas,
+            'total_filas': self.total_filas,
+            'encoding': self.encoding,
+        }
+
+
+class CacheArchivosParseados:
+    """
+    Un parseo por contenido de archivo, compartido por todos los lectores
+
+    La vista previa de la página, los helpers de components/file_processor y
+    LectorArchivosExcel consultan la misma cache: el archivo subido se parsea
+    (y se le detecta el encoding) una sola vez. Las entradas recientes viven
+    en memoria (LRU); las de archivos grandes además se vuelcan a disco
+    (Parquet, o JSON comprimido sin pyarrow) para que un rerun, otra pestaña o
+    un reinicio del proceso no vuelvan a parsear.
+    """
+
+    def __init__(self, directorio: Optional[str] = None, max_entradas: int = 16,
+                 umbral_spill_comentarios: int = 5000, ttl_segundos: Optional[int] = None):
+        """
+        Args:
+            directorio: Carpeta del spill a disco; None = solo memoria
+            max_entradas: Archivos parseados que se mantienen en memoria
+            umbral_spill_comentarios: Desde cuántos comentarios un archivo se vuelca a disco
+            ttl_segundos: Antigüedad máxima de un archivo en disco; None = sin expiración
+        """
+        self.directorio = Path(directorio) if directorio else None
+        self.max_entradas = max(1, max_entradas)
+        self.umbral_spill_comentarios = umbral_spill_comentarios
+        self.ttl_segundos = ttl_segundos
+        self._memoria: "OrderedDict[str, ArchivoParseado]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.estadisticas = {'aciertos_memoria': 0, 'aciertos_disco': 0, 'fallos': 0}
+
+        if self.directorio:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            if ttl_segundos:
+                self.purgar_expirados()
+
+    @staticmethod
+    def huella(contenido: bytes, *partes: Any) -> str:
+        """Hash del contenido + lo que cambia el resultado del parseo (extensión, versión del lector)"""
+        hash_contenido = hashlib.sha256(contenido)
+        for parte in partes:
+            hash_contenido.update(b'\x1f' + str(parte).encode('utf-8'))
+        return hash_contenido.hexdigest()[:32]
+
+    def obtener(self, huella: str) -> Optional[ArchivoParseado]:
+        with self._lock:
+            parseado = self._memoria.get(huella)
+            if parseado is not None:
+                self._memoria.move_to_end(huella)
+                self.estadisticas['aciertos_memoria'] += 1
+                return parseado
+
+        parseado = self._cargar_disco(huella)
+        with self._lock:
+            if parseado is None:
+                self.estadisticas['fallos'] += 1
+                return None
+            self.estadisticas['aciertos_disco'] += 1
+            self._guardar_memoria(parseado)
+        logger.info(f"📂 Archivo parseado restaurado desde disco ({len(parseado)} comentarios)")
+        return parseado
+
+    def guardar(self, parseado: ArchivoParseado) -> None:
+        with self._lock:
+            self._guardar_memoria(parseado)
+        if self.directorio and len(parseado) >= self.umbral_spill_comentarios:
+            try:
+                self._guardar_disco(parseado)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo volcar el archivo parseado a disco: {str(e)}")
+
+    def _guardar_memoria(self, parseado: ArchivoParseado) -> None:
+        """Inserta en el LRU (con _lock tomado)"""
+        self._memoria[parseado.huella] = parseado
+        self._memoria.move_to_end(parseado.huella)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def _rutas(self, huella: str) -> Dict[str, Path]:
+        return {
+            'metadatos': self.directorio / f"{huella}.json",
+            'parquet': self.directorio / f"{huella}.parquet",
+            'json': self.directorio / f"{huella}.json.gz",
+        }
+
+    @staticmethod
+    def _escribir_atomico(ruta: Path, escribir) -> None:
+        descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix='.tmp_')
+        os.close(descriptor)
+        try:
+            escribir(temporal)
+            os.replace(temporal, ruta)
+        except Exception:
+            Path(temporal).unlink(missing_ok=True)
+            raise
+
+    def _guardar_disco(self, parseado: ArchivoParseado) -> None:
+        """Datos primero, metadatos al final: sin .json no hay entrada (nunca a medias)"""
+        rutas = self._rutas(parseado.huella)
+        if PYARROW_AVAILABLE:
+            import pandas as pd
+            df = pd.DataFrame({
+                'comentario': pd.Series(parseado.textos, dtype='object'),
+                'indice_original': pd.Series(parseado.indices, dtype='int64'),
+                'nps': pd.Series(parseado.nps, dtype='Int64'),
+                'nota': pd.Series(parseado.notas, dtype='Float64'),
+            })
+            self._escribir_atomico(rutas['parquet'], lambda ruta: df.to_parquet(ruta, index=False))
+            formato = 'parquet'
+        else:
+            datos = json.dumps({'textos': parseado.textos, 'indices': parseado.indices,
+                                'nps': parseado.nps, 'notas': parseado.notas}, ensure_ascii=False)
+
+            def escribir_json(ruta):
+                with gzip.open(ruta, 'wt', encoding='utf-8') as archivo:
+                    archivo.write(datos)
+
+            self._escribir_atomico(rutas['json'], escribir_json)
+            formato = 'json'
+
+        metadatos = dict(parseado.metadatos(), formato=formato, guardado_en=time.time())
+        self._escribir_atomico(rutas['metadatos'], lambda ruta: Path(ruta).write_text(
+            json.dumps(metadatos, ensure_ascii=False), encoding='utf-8'))
+        logger.debug(f"💾 Archivo parseado volcado a disco: {parseado.huella[:8]} ({formato})")
+
+    def _cargar_disco(self, huella: str) -> Optional[ArchivoParseado]:
+        if not self.directorio:
+            return None
+        rutas = self._rutas(huella)
+        if not rutas['metadatos'].exists():
+            return None
+        try:
+            metadatos = json.loads(rutas['metadatos'].read_text(encoding='utf-8'))
+            parseado = ArchivoParseado(
+                huella=huella,
+                columna_comentario=metadatos['columna_comentario'],
+                columnas=metadatos['columnas'],
+                total_filas=metadatos['total_filas'],
+                encoding=metadatos.get('encoding'),
+            )
+            if metadatos.get('formato') == 'parquet':
+                import pandas as pd
+                df = pd.read_parquet(rutas['parquet'])
+                parseado.textos = df['comentario'].tolist()
+                parseado.indices = df['indice_original'].tolist()
+                parseado.nps = [None if pd.isna(v) else int(v) for v in df['nps'].tolist()]
+                parseado.notas = [None if pd.isna(v) else float(v) for v in df['nota'].tolist()]
+            else:
+                with gzip.open(rutas['json'], 'rt', encoding='utf-8') as archivo:
+                    datos = json.load(archivo)
+                parseado.textos, parseado.indices = datos['textos'], datos['indices']
+                parseado.nps, parseado.notas = datos['nps'], datos['notas']
+            return parseado
+        except Exception as e:
+            logger.warning(f"⚠️ Archivo parseado ilegible en disco ({huella[:8]}): {str(e)}")
+            return None
+
+    def purgar_expirados(self) -> int:
+        """Elimina del disco los archivos parseados más antiguos que el TTL"""
+        if not self.directorio or not self.ttl_segundos:
+            return 0
+        limite = time.time() - self.ttl_segundos
+        eliminados = 0
+        for ruta in self.directorio.iterdir():
+            if ruta.is_file() and ruta.stat().st_mtime < limite:
+                ruta.unlink(missing_ok=True)
+                eliminados += 1
+        if eliminados:
+            logger.info(f"🧹 {eliminados} archivos parseados expirados eliminados del disco")
+        return eliminados
+
+
+_cache_global: Optional[CacheArchivosParseados] = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache_archivos_parseados(configuracion: Optional[Dict[str, Any]] = None) -> Optional[CacheArchivosParseados]:
+    """
+    Cache única del proceso (None si 'parsed_file_cache_enabled' es False)
+
+    La configuración solo se usa al crearla.
+    """
+    global _cache_global
+    configuracion = configuracion or {}
+    if not configuracion.get('parsed_file_cache_enabled', True):
+        return None
+    if _cache_global is None:
+        with _cache_lock:
+            if _cache_global is None:
+                ttl_horas = configuracion.get('parsed_file_cache_ttl_hours', 24)
+                try:
+                    _cache_global = CacheArchivosParseados(
+                        directorio=configuracion.get('parsed_file_cache_dir', '.cache/archivos_parseados'),
+                        max_entradas=configuracion.get('parsed_file_cache_max_entries', 16),
+                        umbral_spill_comentarios=configuracion.get('parsed_file_cache_spill_comments', 5000),
+                        ttl_segundos=ttl_horas * 3600 if ttl_horas else None
+                    )
+                except OSError as e:
+                    logger.warning(f"⚠️ Spill a disco no disponible, cache de archivos solo en memoria: {str(e)}")
+                    _cache_global = CacheArchivosParseados(
+                        max_entradas=configuracion.get('parsed_file_cache_max_entries', 16)
+                    )
+    return _cache_global
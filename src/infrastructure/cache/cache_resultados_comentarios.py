@@ -0,0 +1,190 @@
+"""
+Cache persistente de resultados por comentario (SQLite, direccionado por contenido)
+"""
+import json
+import sqlite3
+import hashlib
+import threading
+import time
+import unicodedata
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from ...application.dtos.analisis_completo_ia import indexar_por_i
+
+logger = logging.getLogger(__name__)
+
+
+class CacheResultadosComentarios:
+    """
+    Cache en disco del resultado abreviado de cada comentario
+
+    La clave es el hash del texto normalizado + modelo + seed + versión del prompt,
+    de modo que un comentario ya analizado en otra carga (u otro despliegue) no
+    vuelve a enviarse a la API. Solo se guardan los campos del esquema abreviado.
+    """
+
+    CAMPOS_RESULTADO = ('sent', 'conf', 'tema', 'emo', 'urg')
+    _MAX_PARAMETROS_SQL = 500  # Por debajo del límite de variables de SQLite
+
+    def __init__(self, ruta_db: str, ttl_segundos: Optional[int] = None):
+        """
+        Args:
+            ruta_db: Ruta del archivo SQLite (se crea el directorio si no existe)
+            ttl_segundos: Antigüedad máxima de una entrada; None = sin expiración
+        """
+        self.ruta_db = str(ruta_db)
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+
+        if self.ruta_db != ':memory:':
+            Path(self.ruta_db).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conexion = sqlite3.connect(self.ruta_db, check_same_thread=False)
+        self._inicializar_esquema()
+
+        self._aciertos = 0
+        self._fallos = 0
+
+        logger.info(f"💾 Cache persistente de comentarios: {self.ruta_db} (TTL: {ttl_segundos or 'sin expiración'})")
+
+    def _inicializar_esquema(self) -> None:
+        with self._lock:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS resultados_comentarios (
+                    clave TEXT PRIMARY KEY,
+                    resultado TEXT NOT NULL,
+                    creado_en REAL NOT NULL
+                )
+                """
+            )
+            self._conexion.commit()
+
+    @staticmethod
+    def normalizar_texto(texto: str) -> str:
+        """Normalización para la clave: Unicode NFC, minúsculas y espacios colapsados"""
+        texto = unicodedata.normalize('NFC', str(texto))
+        return ' '.join(texto.lower().split())
+
+    def generar_clave(self, texto: str, modelo: str, seed: Any, version_prompt: str) -> str:
+        """Genera la clave de contenido para un comentario y configuración"""
+        base = f"{version_prompt}\x1f{modelo}\x1f{seed}\x1f{self.normalizar_texto(texto)}"
+        return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+    def obtener_lote(self, textos: List[str], modelo: str, seed: Any,
+                     version_prompt: str) -> Dict[int, Dict[str, Any]]:
+        """
+        Busca los resultados cacheados de una lista de comentarios
+
+        Returns:
+            Dict posición -> resultado abreviado, solo para los aciertos
+        """
+        claves = [self.generar_clave(t, modelo, seed, version_prompt) for t in textos]
+        encontrados = {}
+        limite_antiguedad = time.time() - self.ttl_segundos if self.ttl_segundos else None
+
+        with self._lock:
+            for inicio in range(0, len(claves), self._MAX_PARAMETROS_SQL):
+                bloque = list(set(claves[inicio:inicio + self._MAX_PARAMETROS_SQL]))
+                marcadores = ','.join('?' * len(bloque))
+                filas = self._conexion.execute(
+                    f"SELECT clave, resultado, creado_en FROM resultados_comentarios WHERE clave IN ({marcadores})",
+                    bloque
+                ).fetchall()
+                for clave, resultado, creado_en in filas:
+                    if limite_antiguedad is None or creado_en >= limite_antiguedad:
+                        encontrados[clave] = resultado
+
+        aciertos = {}
+        for posicion, clave in enumerate(claves):
+            if clave in encontrados:
+                aciertos[posicion] = json.loads(encontrados[clave])
+
+        self._aciertos += len(aciertos)
+        self._fallos += len(textos) - len(aciertos)
+        logger.info(f"💾 Cache persistente: {len(aciertos)}/{len(textos)} aciertos")
+        return aciertos
+
+    def guardar_lote(self, textos: List[str], resultados: List[Dict[str, Any]],
+                     modelo: str, seed: Any, version_prompt: str) -> int:
+        """
+        Guarda el resultado abreviado de cada comentario
+
+        Args:
+            textos: Comentarios originales
+            resultados: Resultados abreviados; cada uno se asocia al texto de su 'i'
+                (1-based). Los textos sin resultado no se guardan
+
+        Returns:
+            Número de entradas escritas
+        """
+        ahora = time.time()
+        filas = []
+        for posicion, resultado in sorted(indexar_por_i(resultados, len(textos)).items()):
+            if 'sent' not in resultado:
+                continue
+            texto = textos[posicion]
+            abreviado = {campo: resultado[campo] for campo in self.CAMPOS_RESULTADO if campo in resultado}
+            filas.append((
+                self.generar_clave(texto, modelo, seed, version_prompt),
+                json.dumps(abreviado, ensure_ascii=False),
+                ahora
+            ))
+
+        if not filas:
+            return 0
+
+        with self._lock:
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO resultados_comentarios (clave, resultado, creado_en) VALUES (?, ?, ?)",
+                filas
+            )
+            self._conexion.commit()
+
+        logger.debug(f"💾 Cache persistente: {len(filas)} resultados guardados")
+        return len(filas)
+
+    def purgar_expirados(self) -> int:
+        """Elimina entradas más antiguas que el TTL"""
+        if not self.ttl_segundos:
+            return 0
+        with self._lock:
+            cursor = self._conexion.execute(
+                "DELETE FROM resultados_comentarios WHERE creado_en < ?",
+                (time.time() - self.ttl_segundos,)
+            )
+            self._conexion.commit()
+            return cursor.rowcount
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas"""
+        with self._lock:
+            self._conexion.execute("DELETE FROM resultados_comentarios")
+            self._conexion.commit()
+        logger.info("🧹 Cache persistente de comentarios limpiado")
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Estadísticas de uso del cache"""
+        with self._lock:
+            total = self._conexion.execute("SELECT COUNT(*) FROM resultados_comentarios").fetchone()[0]
+        consultas = self._aciertos + self._fallos
+        return {
+            'ruta': self.ruta_db,
+            'entradas': total,
+            'aciertos': self._aciertos,
+            'fallos': self._fallos,
+            'tasa_aciertos': self._aciertos / consultas if consultas else 0.0
+        }
+
+    def cerrar(self) -> None:
+        """Cierra la conexión SQLite"""
+        with self._lock:
+            self._conexion.close()
+
+    def cleanup(self) -> None:
+        """Compatibilidad con ContenedorDependencias.cleanup_singletons"""
+        self.cerrar()
@@ -15,7 +15,13 @@ from ..external_services.analizador_openai import AnalizadorOpenAI
 from ..external_services.analizador_maestro_ia import AnalizadorMaestroIA
 from ..file_handlers.lector_archivos_excel import LectorArchivosExcel
 from ..repositories.repositorio_comentarios_memoria import RepositorioComentariosMemoria
+from ..repositories.repositorio_comentarios_sqlite import RepositorioComentariosSQLite
 from ..text_processing.procesador_texto_basico import ProcesadorTextoBasico
+from ..cache.cache_resultados_comentarios import CacheResultadosComentarios
+from ..cache.almacen_checkpoints import AlmacenCheckpoints
+from ..text_processing.deduplicador_comentarios import DeduplicadorComentarios
+from ..text_processing.analizador_lexico_local import AnalizadorLexicoLocal
+from .registro_recursos_proceso import obtener_registro_recursos, huella_configuracion
 # DetectorTemasHibrido eliminated - Pure IA system
 
 # Type variable for generic singleton typing
@@ -28,6 +34,10 @@ class ContenedorDependencias:
     """
     Contenedor de inyección de dependencias que maneja la creación 
     e inyección de todas las dependencias del sistema
+    
+    Se crea uno por sesión y guarda solo estado del usuario; el analizador
+    (cliente HTTP y cache LRU) y el cache persistente se toman del registro
+    del proceso, compartidos por todas las sesiones con la misma configuración.
     """
     
     def __init__(self, configuracion: Dict[str, Any], ai_configuration=None):
@@ -39,6 +49,7 @@ class ContenedorDependencias:
         self.ai_configuration = ai_configuration
         self._instancias_singleton = {}
         self._servicios_registrados = {}  # Keep for compatibility
+        self._huella: Optional[str] = None  # Clave de los recursos compartidos del proceso
         
         # Registrar servicios por defecto
         self._registrar_servicios_por_defecto()
@@ -47,8 +58,13 @@ class ContenedorDependencias:
     
     def obtener_repositorio_comentarios(self) -> IRepositorioComentarios:
         """
-        Obtiene la implementación del repositorio de comentarios
+        Obtiene la implementación del repositorio de comentarios ('comment_repository_backend')
+        
+        'memory' es por sesión; 'sqlite' es un único archivo compartido por el proceso.
         """
+        if self.configuracion.get('comment_repository_backend', 'memory') == 'sqlite':
+            return self._obtener_compartido('repositorio_comentarios',
+                                            lambda: self._crear_repositorio_sqlite())
         return self._obtener_singleton('repositorio_comentarios', 
                                      lambda: RepositorioComentariosMemoria())
     
@@ -57,7 +73,7 @@ class ContenedorDependencias:
         Obtiene la implementación del lector de archivos
         """
         return self._obtener_singleton('lector_archivos',
-                                     lambda: LectorArchivosExcel())
+                                     lambda: LectorArchivosExcel.desde_configuracion(self.configuracion))
     
     def obtener_procesador_texto(self) -> IProcesadorTexto:
         """
@@ -79,8 +95,36 @@ class ContenedorDependencias:
         """
         Obtiene el analizador maestro IA para análisis completo
         """
-        return self._obtener_singleton('analizador_maestro_ia',
-                                     lambda: self._crear_analizador_maestro_ia())
+        return self._obtener_compartido('analizador_maestro_ia',
+                                        lambda: self._crear_analizador_maestro_ia())
+    
+    def obtener_cache_resultados(self) -> Optional[CacheResultadosComentarios]:
+        """
+        Obtiene el cache persistente de resultados por comentario (None si está deshabilitado)
+        """
+        return self._obtener_compartido('cache_resultados',
+                                        lambda: self._crear_cache_resultados())
+    
+    def obtener_almacen_checkpoints(self) -> Optional[AlmacenCheckpoints]:
+        """
+        Obtiene el almacén de checkpoints por lote (None si está deshabilitado)
+        """
+        return self._obtener_compartido('almacen_checkpoints',
+                                        lambda: self._crear_almacen_checkpoints())
+    
+    def obtener_deduplicador(self) -> Optional[DeduplicadorComentarios]:
+        """
+        Obtiene el agrupador de comentarios duplicados (None si está deshabilitado)
+        """
+        return self._obtener_singleton('deduplicador',
+                                     lambda: self._crear_deduplicador())
+    
+    def obtener_clasificador_local(self) -> Optional[AnalizadorLexicoLocal]:
+        """
+        Obtiene el clasificador local de comentarios triviales (None si está deshabilitado)
+        """
+        return self._obtener_singleton('clasificador_local',
+                                     lambda: self._crear_clasificador_local())
     
     def obtener_caso_uso_maestro(self, progress_callback=None):
         """
@@ -100,7 +144,11 @@ class ContenedorDependencias:
                     max_comments_per_batch=self.configuracion.get('max_comments', 120),  # OPTIMIZED: Increased for performance
                     ai_configuration=self.ai_configuration,
                     progress_callback=progress_callback,
-                    configuracion=self.configuracion
+                    configuracion=self.configuracion,
+                    cache_resultados=self.obtener_cache_resultados(),
+                    deduplicador=self.obtener_deduplicador(),
+                    clasificador_local=self.obtener_clasificador_local(),
+                    almacen_checkpoints=self.obtener_almacen_checkpoints()
                 )
             else:
                 # Use singleton when no callback is needed
@@ -111,7 +159,11 @@ class ContenedorDependencias:
                                                  analizador_maestro=self.obtener_analizador_maestro_ia(),
                                                  max_comments_per_batch=self.configuracion.get('max_comments', 120),  # OPTIMIZED: Increased for performance
                                                  ai_configuration=self.ai_configuration,
-                                                 configuracion=self.configuracion
+                                                 configuracion=self.configuracion,
+                                                 cache_resultados=self.obtener_cache_resultados(),
+                                                 deduplicador=self.obtener_deduplicador(),
+                                                 clasificador_local=self.obtener_clasificador_local(),
+                                                 almacen_checkpoints=self.obtener_almacen_checkpoints()
                                              ))
         except ImportError as e:
             logger.error(f"Error importando caso de uso maestro: {str(e)}")
@@ -132,7 +184,8 @@ class ContenedorDependencias:
                 analizador_openai = AnalizadorOpenAI(
                     api_key=openai_key,
                     modelo=self.configuracion.get('openai_modelo', 'gpt-4o-mini'),
-                    usar_cache=True
+                    usar_cache=True,
+                    configuracion=self.configuracion
                 )
                 
                 if analizador_openai.es_disponible():
@@ -151,11 +204,89 @@ class ContenedorDependencias:
         
         return ServicioAnalisisSentimientos(analizadores)
     
+    def _crear_repositorio_sqlite(self) -> IRepositorioComentarios:
+        """
+        Crea el repositorio SQLite; si el archivo no se puede abrir se usa el repositorio en memoria
+        """
+        try:
+            return RepositorioComentariosSQLite(
+                ruta_db=self.configuracion.get('comment_repository_path', '.cache/comentarios.sqlite3')
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Repositorio SQLite no disponible, usando memoria: {str(e)}")
+            return RepositorioComentariosMemoria()
+    
+    def _crear_cache_resultados(self) -> Optional[CacheResultadosComentarios]:
+        """
+        Crea el cache persistente; cualquier error deja el sistema funcionando sin cache
+        """
+        if not self.configuracion.get('result_cache_enabled', True):
+            logger.info("💾 Cache persistente de comentarios deshabilitado")
+            return None
+        
+        try:
+            ttl_dias = self.configuracion.get('result_cache_ttl_days', 30)
+            return CacheResultadosComentarios(
+                ruta_db=self.configuracion.get('result_cache_path', '.cache/resultados_comentarios.sqlite3'),
+                ttl_segundos=ttl_dias * 86400 if ttl_dias else None
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Cache persistente no disponible: {str(e)}")
+            return None
+    
+    def _crear_almacen_checkpoints(self) -> Optional[AlmacenCheckpoints]:
+        """
+        Crea el almacén de checkpoints; cualquier error deja el sistema funcionando sin reanudación
+        """
+        if not self.configuracion.get('checkpoints_enabled', True):
+            logger.info("♻️ Checkpoints de lotes deshabilitados")
+            return None
+        
+        try:
+            ttl_horas = self.configuracion.get('checkpoint_ttl_hours', 72)
+            return AlmacenCheckpoints(
+                directorio=self.configuracion.get('checkpoint_dir', '.cache/checkpoints'),
+                ttl_segundos=ttl_horas * 3600 if ttl_horas else None
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Checkpoints no disponibles: {str(e)}")
+            return None
+    
+    def _crear_deduplicador(self) -> Optional[DeduplicadorComentarios]:
+        """
+        Crea el agrupador de duplicados reutilizando el procesador de texto del contenedor
+        """
+        if not self.configuracion.get('dedup_enabled', True):
+            logger.info("🔁 Deduplicación de comentarios deshabilitada")
+            return None
+        
+        return DeduplicadorComentarios(
+            procesador_texto=self.obtener_procesador_texto(),
+            usar_casi_duplicados=self.configuracion.get('dedup_near_duplicates', False),
+            umbral_similitud=self.configuracion.get('dedup_similarity_threshold', 0.85)
+        )
+    
+    def _crear_clasificador_local(self) -> Optional[AnalizadorLexicoLocal]:
+        """
+        Crea el clasificador léxico local con el umbral de confianza configurado
+        """
+        if not self.configuracion.get('local_classifier_enabled', True):
+            logger.info("⚡ Clasificador local deshabilitado")
+            return None
+        
+        return AnalizadorLexicoLocal(
+            umbral_confianza=self.configuracion.get('local_classifier_threshold', 0.9),
+            procesador_texto=self.obtener_procesador_texto()
+        )
+    
     def _crear_analizador_maestro_ia(self) -> AnalizadorMaestroIA:
         """
         Crea el analizador maestro IA con configuración optimizada
         """
         openai_key = self.configuracion.get('openai_api_key')
+        if not openai_key and self.configuracion.get('llm_backend') == 'replay':
+            # Reproducción offline desde cassette: no se contacta a OpenAI
+            openai_key = 'replay-sin-clave'
         if not openai_key:
             raise ValueError("OpenAI API key es requerida para análisis IA")
         
@@ -171,13 +302,9 @@ class ContenedorDependencias:
                 configuracion=self.configuracion  # Pass general configuration for production limits
             )
             
-            if analizador.disponible:
-                logger.info("✅ AnalizadorMaestroIA configurado exitosamente")
-                return analizador
-            else:
-                logger.warning("⚠️ AnalizadorMaestroIA no disponible - continuando en modo degradado")
-                logger.info("💡 Verificar OPENAI_API_KEY en variables de entorno o secrets")
-                return analizador  # ← PERMITIR MODO DEGRADADO
+            # La disponibilidad se sondea de forma perezosa (es_disponible / primera llamada)
+            logger.info("✅ AnalizadorMaestroIA configurado exitosamente")
+            return analizador
                 
         except Exception as e:
             logger.error(f"❌ Error configurando AnalizadorMaestroIA: {str(e)}")
@@ -249,6 +376,20 @@ class ContenedorDependencias:
                 
         return self._instancias_singleton[clave]
     
+    def _obtener_compartido(self, clave: str, factory_func: Callable[[], T]) -> T:
+        """
+        Obtiene un recurso del registro del proceso ('shared_resources_enabled')
+        
+        No se guarda en _instancias_singleton: cleanup_singletons de una sesión
+        no debe cerrar lo que usan las demás.
+        """
+        if not self.configuracion.get('shared_resources_enabled', True):
+            return self._obtener_singleton(clave, factory_func)
+        
+        if self._huella is None:
+            self._huella = huella_configuracion(self.configuracion, self.ai_configuration)
+        return obtener_registro_recursos().obtener(clave, self._huella, factory_func)
+    
     def cleanup_singletons(self) -> None:
         """Cleanup method for session end to prevent memory leaks"""
         cleaned_count = 0
@@ -0,0 +1,102 @@
+"""
+Registro de recursos compartidos por todas las sesiones del proceso
+"""
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+logger = logging.getLogger(__name__)
+
+
+def huella_configuracion(configuracion: Optional[Dict[str, Any]], ai_configuration: Any = None) -> str:
+    """
+    Huella estable de la configuración: sesiones con la misma configuración comparten recursos
+
+    Incluye la API key (hasheada junto con el resto), así que claves distintas
+    nunca comparten cliente ni cache.
+    """
+    contenido = json.dumps(configuracion or {}, sort_keys=True, default=str)
+    if ai_configuration is not None:
+        contenido += repr(ai_configuration)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:16]
+
+
+class RegistroRecursosProceso:
+    """
+    Objetos pesados y sin estado de usuario, creados una vez por proceso
+
+    Cada sesión de Streamlit tiene su ContenedorDependencias con el estado del
+    usuario (repositorio, caso de uso con su callback de progreso); el cliente
+    HTTP con su pool keep-alive, el analizador con su cache LRU y el cache
+    persistente viven aquí y se comparten. El planificador de límites y la
+    sonda de disponibilidad ya son globales en sus propios módulos.
+
+    La creación se serializa por clave (no globalmente) para que un recurso
+    lento no bloquee a los demás.
+    """
+
+    def __init__(self):
+        self._recursos: Dict[Tuple[str, str], Any] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, nombre: str, huella: str, factory_func: Callable[[], T]) -> T:
+        """Devuelve el recurso (nombre, huella), creándolo con factory_func la primera vez"""
+        clave = (nombre, huella)
+        with self._lock:
+            if clave in self._recursos:
+                return self._recursos[clave]
+            lock_clave = self._locks.setdefault(clave, threading.Lock())
+
+        with lock_clave:
+            with self._lock:
+                if clave in self._recursos:
+                    return self._recursos[clave]
+            instancia = factory_func()
+            with self._lock:
+                self._recursos[clave] = instancia
+            logger.info(f"🌐 Recurso de proceso creado: {nombre} ({huella})")
+            return instancia
+
+    def liberar(self, nombre: Optional[str] = None) -> int:
+        """
+        Cierra y olvida recursos (todos o solo 'nombre'); para tests y apagado del proceso
+
+        Returns:
+            Cantidad de recursos liberados
+        """
+        with self._lock:
+            claves = [clave for clave in self._recursos if nombre is None or clave[0] == nombre]
+            instancias = [(clave, self._recursos.pop(clave)) for clave in claves]
+            for clave in claves:
+                self._locks.pop(clave, None)
+        for clave, instancia in instancias:
+            if hasattr(instancia, 'cleanup'):
+                try:
+                    instancia.cleanup()
+                except Exception as e:
+                    logger.warning(f"⚠️ Error liberando recurso {clave[0]}: {str(e)}")
+        return len(instancias)
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            nombres = [nombre for nombre, _ in self._recursos]
+        return {'recursos': len(nombres), 'nombres': sorted(set(nombres))}
+
+
+_registro_global: Optional[RegistroRecursosProceso] = None
+_registro_lock = threading.Lock()
+
+
+def obtener_registro_recursos() -> RegistroRecursosProceso:
+    """Registro único del proceso (todas las sesiones de Streamlit comparten el módulo)"""
+    global _registro_global
+    if _registro_global is None:
+        with _registro_lock:
+            if _registro_global is None:
+                _registro_global = RegistroRecursosProceso()
+    return _registro_global
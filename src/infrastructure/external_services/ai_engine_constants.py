@@ -15,11 +15,19 @@ class AIEngineConstants:
     TOKEN_BUFFER_PERCENTAGE = 1.10         # 10% buffer for variability
     SAFETY_COMMENT_LIMIT = 120             # OPTIMIZED: Increased to match new batch size (120 comments/batch)
     
+    # Token Estimation Constants (token-aware batch packing)
+    PROMPT_OVERHEAD_TOKENS = 450           # System message + master prompt template without comments
+    PROMPT_TOKENS_PER_COMMENT_OVERHEAD = 4 # Numbering and line break per comment in the prompt
+    CHARS_PER_TOKEN_ESTIMATE = 3.5         # Spanish text estimate when tiktoken is not installed
+    
     # Cache Management Constants  
     DEFAULT_CACHE_SIZE = 50                # Maximum cache entries
     DEFAULT_CACHE_TTL = 3600               # Cache TTL in seconds (1 hour)
     CACHE_CLEANUP_THRESHOLD_RATIO = 1.5    # Cleanup when timestamps > cache * ratio
     
+    # Persistent Result Cache Constants
+    PROMPT_VERSION = "maestro-abreviado-v1"  # Bump when the prompt or abbreviated schema changes
+    
     # AI Determinism Constants
     FIXED_SEED = 12345                     # Fixed seed for reproducible results
     DEFAULT_TEMPERATURE = 0.0              # Temperature for deterministic outputs
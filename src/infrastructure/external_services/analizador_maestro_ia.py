@@ -5,12 +5,20 @@ import openai
 import json
 import time
 import asyncio
-from typing import List, Dict, Any
+import threading
+from contextlib import nullcontext, contextmanager, asynccontextmanager, ExitStack, AsyncExitStack
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Callable
 from datetime import datetime
 import logging
 
 from ...application.dtos.analisis_completo_ia import AnalisisCompletoIA
 from ...shared.exceptions.ia_exception import IAException
+from .parser_json_incremental import ParserComentariosIncremental
+from .empaquetador_lotes import EmpaquetadorLotesTokens, EstimadorTokens
+from .sonda_disponibilidad_api import obtener_sonda_disponibilidad
+from .backend_grabacion_llm import crear_backend_llm
+from .planificador_limites_api import obtener_planificador_limites
+from .coalescedor_peticiones import obtener_coalescedor_peticiones
 
 # HIGH-004 FIX: Import retry strategy for error recovery
 try:
@@ -53,8 +61,16 @@ class AnalizadorMaestroIA:
                  temperatura: float = 0.0, cache_ttl: int = 3600, max_tokens: int = 8000,
                  ai_configuration=None, configuracion=None):
         self.api_key = api_key  # CRITICAL FIX: Store API key for AsyncClient
-        self.client = openai.OpenAI(api_key=api_key)
+        # Endpoint alternativo (p. ej. servidor simulado local); None usa OPENAI_BASE_URL o la API pública
+        self.base_url = (configuracion or {}).get('openai_base_url') or None
         self.modelo = modelo
+        
+        # Presupuesto RPM/TPM compartido por todas las sesiones del proceso (None = sin planificar)
+        self._planificador = self._crear_planificador_limites(api_key, modelo, configuracion)
+        http_client = None
+        if self._planificador:
+            http_client = openai.DefaultHttpxClient(event_hooks={'response': [self._planificador.hook_httpx]})
+        self.client = openai.OpenAI(api_key=api_key, base_url=self.base_url, http_client=http_client)
         self.usar_cache = usar_cache
         self.max_tokens_limit = max_tokens
         
@@ -64,6 +80,11 @@ class AnalizadorMaestroIA:
         # Store general configuration for production limits
         self.configuracion = configuracion
         
+        # Backend enchufable: grabación/reproducción de respuestas para benchmarks offline
+        self._backend_llm = crear_backend_llm(configuracion)
+        if self._backend_llm:
+            self.client = self._backend_llm.cliente_sync(self.client)
+        
         # FUNCTIONAL FIX: Initialize _cache_ttl_seconds for all cases (logging needs it)
         if ai_configuration:
             self._cache_ttl_seconds = ai_configuration.cache_ttl_seconds
@@ -88,8 +109,11 @@ class AnalizadorMaestroIA:
             self._cache_timestamps = {}  # Track cuando se creó cada entry
         else:
             self._cache = None
+        # El analizador se comparte entre sesiones e hilos (registro del proceso)
+        self._cache_lock = threading.RLock()
             
-        self.disponible = self._verificar_disponibilidad()
+        # Disponibilidad perezosa: se sondea (models.retrieve, cacheado por proceso) al consultarla
+        self._disponible_forzado: Optional[bool] = None
         
         # PHASE 2: Use centralized configuration for deterministic settings
         if ai_configuration:
@@ -116,7 +140,7 @@ class AnalizadorMaestroIA:
         
         logger.info(f"🤖 AnalizadorMaestroIA inicializado - Modelo: {modelo}, Cache: {self._cache_max_size if usar_cache else 'disabled'}, TTL: {self._cache_ttl_seconds}s, Retry: {retry_info}, Determinista: {self._is_deterministic}")
     
-    def _calcular_tokens_dinamicos(self, num_comentarios: int) -> int:
+    def _calcular_tokens_dinamicos(self, num_comentarios: int, tokens_entrada: int = 0) -> int:
         """
         Calcula max_tokens dinámicamente basado en número de comentarios
         
@@ -125,6 +149,7 @@ class AnalizadorMaestroIA:
         - Por comentario: 80 tokens promedio  
         - Buffer: 10% extra para variabilidad
         - Límite por modelo: gpt-4o-mini=16384, gpt-4=128000
+        - Si se conocen los tokens del prompt, la salida no excede el contexto restante
         """
         
         # POLISH-002 FIX: Use constants for safety limits and calculations
@@ -183,6 +208,13 @@ class AnalizadorMaestroIA:
             logger.error(f"🚨 PRODUCTION SAFETY: Forzando tokens de {tokens_finales:,} a límite producción {production_limit:,}")
             tokens_finales = production_limit
         
+        # Safety check 4: Prompt + salida dentro del contexto del modelo
+        if tokens_entrada:
+            contexto_restante = limite_modelo - tokens_entrada
+            if 0 < contexto_restante < tokens_finales:
+                logger.warning(f"⚠️ CONTEXT SAFETY: Prompt de {tokens_entrada:,} tokens, salida limitada a {contexto_restante:,}")
+                tokens_finales = contexto_restante
+        
         logger.info(f"📊 Tokens finales: {num_comentarios} comentarios → {tokens_finales:,} tokens (modelo: {self.modelo}, límites: modelo={limite_modelo:,}, config={self.max_tokens_limit:,})")
         
         # Warning si llegamos al límite
@@ -222,17 +254,23 @@ class AnalizadorMaestroIA:
         """
         return getattr(self, '_is_deterministic', False)
     
-    def analizar_excel_completo(self, comentarios_raw: List[str]) -> AnalisisCompletoIA:
+    def analizar_excel_completo(self, comentarios_raw: List[str],
+                                on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                temperatura: Optional[float] = None) -> AnalisisCompletoIA:
         """
         Análisis maestro: UNA sola llamada que reemplaza todo el pipeline fragmentado
         
         Args:
             comentarios_raw: Lista de comentarios como strings
+            on_comentario: Callback invocado con cada comentario analizado en cuanto
+                llega del stream (se ejecuta en el hilo que hace la llamada)
+            temperatura: Temperatura solo para esta llamada (reintentos); no modifica
+                self.temperatura, compartida por todas las sesiones del proceso
             
         Returns:
             AnalisisCompletoIA con el resultado completo
         """
-        if not self.disponible:
+        if not self._disponible_para_llamada():
             raise IAException("El analizador maestro IA no está disponible")
         
         if not comentarios_raw:
@@ -242,6 +280,327 @@ class AnalizadorMaestroIA:
         if self.usar_cache:
             self._cleanup_expired_cache()
         
+        comentarios_raw = self._limitar_comentarios(comentarios_raw)
+        
+        inicio_tiempo = time.time()
+        
+        # PROGRESS TRACKING: Initialize real-time progress tracker
+        if PROGRESS_TRACKING_AVAILABLE:
+            tracker = create_progress_tracker(len(comentarios_raw))
+        
+        logger.info(f"🔍 Iniciando análisis maestro de {len(comentarios_raw)} comentarios (limitado para {self.modelo})")
+        
+        try:
+            # STEP 1: Cache operations (3% of total time)
+            with track_step('cache_check'):
+                cache_key = self._generar_cache_key(comentarios_raw, temperatura)
+                
+                # Verificar cache (con TTL y LRU)
+                en_cache = self._obtener_de_cache(cache_key)
+                if en_cache is not None:
+                    logger.info("💾 Resultado obtenido desde cache")
+                    return en_cache
+            
+            calcular = lambda: self._analizar_lote_api(comentarios_raw, cache_key, inicio_tiempo, on_comentario,
+                                                       temperatura)
+            if not self._coalescencia_habilitada():
+                return calcular()
+            # Otra sesión puede estar analizando exactamente este lote: esperar su resultado
+            return obtener_coalescedor_peticiones().ejecutar(cache_key, comentarios_raw, calcular)
+            
+        except Exception as e:
+            logger.error(f"❌ Error en análisis maestro: {str(e)}")
+            raise IAException(f"Error en análisis maestro: {str(e)}")
+    
+    def _analizar_lote_api(self, comentarios_raw: List[str], cache_key: str, inicio_tiempo: float,
+                           on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                           temperatura: Optional[float] = None) -> AnalisisCompletoIA:
+        """Pasos 2-4 del análisis maestro (prompt, llamada, recuperación y procesamiento) tras fallar la cache"""
+        # STEP 2: Prompt generation (10% of total time)
+        with track_step('prompt_generation'):
+            prompt_completo = self._generar_prompt_maestro(comentarios_raw)
+        
+        # STEP 3: OpenAI API call (75% of total time - LONGEST STEP)
+        with track_step('openai_api_call'):
+            respuesta_raw = self._hacer_llamada_api_maestra(prompt_completo, len(comentarios_raw), on_comentario,
+                                                            temperatura)
+        
+        # STEP 3b: Recover comments missing from the response (only the gaps)
+        respuesta_raw = self._recuperar_comentarios_faltantes(respuesta_raw, comentarios_raw, on_comentario,
+                                                              temperatura)
+        
+        # STEP 4: Response processing and emotion extraction (10% of total time)  
+        with track_step('response_processing'):
+            tiempo_transcurrido = time.time() - inicio_tiempo
+            analisis_completo = self._procesar_respuesta_maestra(
+                respuesta_raw, comentarios_raw, tiempo_transcurrido
+            )
+        
+        # Guardar en cache con límites
+        if self.usar_cache:
+            self._guardar_en_cache(cache_key, analisis_completo)
+        
+        logger.info(f"✅ Análisis maestro completado en {tiempo_transcurrido:.2f}s")
+        return analisis_completo
+    
+    async def analizar_excel_completo_async(self, comentarios_raw: List[str],
+                                            cliente_async=None,
+                                            on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                            temperatura: Optional[float] = None) -> AnalisisCompletoIA:
+        """
+        Versión asíncrona de analizar_excel_completo sobre AsyncOpenAI
+        
+        Args:
+            comentarios_raw: Lista de comentarios como strings
+            cliente_async: Cliente AsyncOpenAI compartido (pool keep-alive). Si no se
+                indica se crea uno temporal para esta llamada.
+            on_comentario: Callback por comentario recibido en streaming (en el event loop)
+            temperatura: Temperatura solo para esta llamada (reintentos); no modifica
+                self.temperatura, compartida por todas las sesiones del proceso
+            
+        Returns:
+            AnalisisCompletoIA con el resultado completo
+        """
+        if not self._disponible_para_llamada():
+            raise IAException("El analizador maestro IA no está disponible")
+        
+        if not comentarios_raw:
+            raise IAException("No hay comentarios para analizar")
+        
+        if self.usar_cache:
+            self._cleanup_expired_cache()
+        
+        comentarios_raw = self._limitar_comentarios(comentarios_raw)
+        inicio_tiempo = time.time()
+        
+        cliente_propio = cliente_async is None
+        if cliente_propio:
+            cliente_async = self._crear_cliente_async(1)
+        
+        try:
+            cache_key = self._generar_cache_key(comentarios_raw, temperatura)
+            en_cache = self._obtener_de_cache(cache_key)
+            if en_cache is not None:
+                logger.info("💾 Resultado obtenido desde cache")
+                return en_cache
+            
+            calcular = lambda: self._analizar_lote_api_async(
+                cliente_async, comentarios_raw, cache_key, inicio_tiempo, on_comentario, temperatura
+            )
+            if not self._coalescencia_habilitada():
+                return await calcular()
+            return await obtener_coalescedor_peticiones().ejecutar_async(cache_key, comentarios_raw, calcular)
+            
+        except Exception as e:
+            logger.error(f"❌ Error en análisis maestro async: {str(e)}")
+            raise IAException(f"Error en análisis maestro: {str(e)}")
+        finally:
+            if cliente_propio:
+                await cliente_async.close()
+    
+    async def _analizar_lote_api_async(self, cliente_async, comentarios_raw: List[str], cache_key: str,
+                                       inicio_tiempo: float,
+                                       on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                       temperatura: Optional[float] = None) -> AnalisisCompletoIA:
+        """Equivalente asíncrono de _analizar_lote_api"""
+        prompt_completo = self._generar_prompt_maestro(comentarios_raw)
+        respuesta_raw = await self._hacer_llamada_api_maestra_async(
+            cliente_async, prompt_completo, len(comentarios_raw), on_comentario, temperatura
+        )
+        respuesta_raw = await self._recuperar_comentarios_faltantes_async(
+            cliente_async, respuesta_raw, comentarios_raw, on_comentario, temperatura
+        )
+        
+        tiempo_transcurrido = time.time() - inicio_tiempo
+        analisis_completo = self._procesar_respuesta_maestra(
+            respuesta_raw, comentarios_raw, tiempo_transcurrido
+        )
+        
+        if self.usar_cache:
+            self._guardar_en_cache(cache_key, analisis_completo)
+        
+        logger.info(f"✅ Análisis maestro async completado en {tiempo_transcurrido:.2f}s")
+        return analisis_completo
+    
+    async def procesar_lotes_async(self, lotes: List[List[str]],
+                                   max_concurrencia: Optional[int] = None,
+                                   on_comentario: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                                   temperatura: Optional[float] = None
+                                   ) -> AsyncIterator[Tuple[int, Optional[AnalisisCompletoIA], Optional[Exception]]]:
+        """
+        Procesa varios lotes concurrentemente y entrega cada uno al completarse
+        
+        Todas las llamadas comparten un único cliente AsyncOpenAI (un pool de
+        conexiones keep-alive) y un semáforo que limita los lotes en vuelo.
+        
+        Args:
+            lotes: Lotes de comentarios a analizar
+            max_concurrencia: Lotes simultáneos; por defecto 'max_concurrent_batches'
+            on_comentario: Callback (numero_lote, comentario) por comentario recibido
+            temperatura: Temperatura para todos los lotes de esta llamada (None = self.temperatura)
+            
+        Yields:
+            Tuplas (numero_lote, resultado, error) en orden de finalización;
+            numero_lote empieza en 1
+        """
+        limite = max_concurrencia or self._obtener_max_concurrencia()
+        limite = max(1, min(limite, len(lotes)))
+        semaforo = asyncio.Semaphore(limite)
+        cliente_async = self._crear_cliente_async(limite)
+        
+        logger.info(f"🚀 Motor async: {len(lotes)} lotes, concurrencia máxima {limite}")
+        kwargs_llamada = {} if temperatura is None else {'temperatura': temperatura}
+        
+        async def _procesar(numero_lote: int, lote: List[str]):
+            async with semaforo:
+                callback_lote = (lambda c: on_comentario(numero_lote, c)) if on_comentario else None
+                try:
+                    resultado = await self.analizar_excel_completo_async(lote, cliente_async, callback_lote,
+                                                                         **kwargs_llamada)
+                    return numero_lote, resultado, None
+                except Exception as e:
+                    logger.error(f"❌ Lote async {numero_lote}: {str(e)}")
+                    return numero_lote, None, e
+        
+        tareas = [asyncio.ensure_future(_procesar(i + 1, lote)) for i, lote in enumerate(lotes)]
+        try:
+            for siguiente in asyncio.as_completed(tareas):
+                yield await siguiente
+        finally:
+            for tarea in tareas:
+                if not tarea.done():
+                    tarea.cancel()
+            await cliente_async.close()
+    
+    def _coalescencia_habilitada(self) -> bool:
+        """Indica si los lotes idénticos en vuelo se comparten entre sesiones ('request_coalescing_enabled')"""
+        if self.configuracion:
+            return bool(self.configuracion.get('request_coalescing_enabled', True))
+        return True
+    
+    def _obtener_max_concurrencia(self) -> int:
+        """Lotes simultáneos permitidos según configuración"""
+        if self.configuracion:
+            return int(self.configuracion.get('max_concurrent_batches', 8))
+        return 8
+    
+    def _crear_cliente_async(self, max_conexiones: int):
+        """
+        Crea un cliente AsyncOpenAI con un pool httpx dimensionado a la concurrencia
+        
+        El cliente queda ligado al event loop activo, por eso se crea por ejecución
+        y se cierra al terminar en lugar de guardarse en la instancia.
+        """
+        if self._backend_llm and self._backend_llm.modo == 'replay':
+            return self._backend_llm.cliente_async()
+        
+        import httpx
+        
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_conexiones,
+                max_keepalive_connections=max_conexiones
+            ),
+            event_hooks={'response': [self._planificador.hook_httpx_async]} if self._planificador else None
+        )
+        cliente = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
+        if self._backend_llm:
+            return self._backend_llm.cliente_async(cliente)
+        return cliente
+    
+    @staticmethod
+    def _crear_planificador_limites(api_key: str, modelo: str, configuracion: Optional[Dict[str, Any]]):
+        """Planificador RPM/TPM del proceso, salvo que esté deshabilitado o se reproduzca un cassette"""
+        configuracion = configuracion or {}
+        if not configuracion.get('rate_limit_scheduler_enabled', True):
+            return None
+        if str(configuracion.get('llm_backend', 'openai')).lower() == 'replay':
+            return None
+        return obtener_planificador_limites(api_key, modelo, configuracion)
+    
+    def _tokens_a_reservar(self, parametros: Dict[str, Any]) -> int:
+        """Tokens que la API descuenta del TPM al admitir la llamada: prompt + max_tokens"""
+        estimador = self._obtener_estimador_tokens()
+        return sum(estimador.contar(m['content']) for m in parametros['messages']) + parametros['max_tokens']
+    
+    def _reservar_presupuesto(self, parametros: Dict[str, Any]):
+        """Context manager que espera presupuesto RPM/TPM antes de llamar a la API"""
+        if not self._planificador:
+            return nullcontext()
+        return self._planificador.reservar(self._tokens_a_reservar(parametros))
+    
+    def _reservar_presupuesto_async(self, parametros: Dict[str, Any]):
+        """Equivalente asíncrono de _reservar_presupuesto"""
+        if not self._planificador:
+            return nullcontext()
+        return self._planificador.reservar_async(self._tokens_a_reservar(parametros))
+    
+    @contextmanager
+    def _llamada_con_presupuesto(self, parametros: Dict[str, Any]):
+        """
+        Llama a chat completions (con reintentos) reservando presupuesto en CADA intento
+        
+        Un intento fallido libera su hueco antes del backoff del retry wrapper y el
+        siguiente vuelve a pasar por la admisión RPM/TPM (y por la pausa de un 429).
+        El hueco del intento exitoso se mantiene mientras se consume la respuesta o el stream.
+        """
+        with ExitStack() as reserva_exitosa:
+            def intento():
+                with ExitStack() as reserva:
+                    reserva.enter_context(self._reservar_presupuesto(parametros))
+                    respuesta = self.client.chat.completions.create(**parametros)
+                    reserva_exitosa.push(reserva.pop_all())
+                    return respuesta
+            
+            if self.retry_wrapper:
+                yield self.retry_wrapper.wrap_api_call(intento)
+            else:
+                # Fallback to direct API call without retry (maintains existing behavior)
+                yield intento()
+    
+    @asynccontextmanager
+    async def _llamada_con_presupuesto_async(self, cliente_async, parametros: Dict[str, Any]):
+        """Equivalente asíncrono de _llamada_con_presupuesto"""
+        async with AsyncExitStack() as reserva_exitosa:
+            async def intento():
+                async with AsyncExitStack() as reserva:
+                    await reserva.enter_async_context(self._reservar_presupuesto_async(parametros))
+                    respuesta = await cliente_async.chat.completions.create(**parametros)
+                    reserva_exitosa.push_async_exit(reserva.pop_all())
+                    return respuesta
+            
+            if self.retry_wrapper:
+                yield await self.retry_wrapper.wrap_api_call_async(intento)
+            else:
+                yield await intento()
+    
+    def _limitar_comentarios(self, comentarios_raw: List[str]) -> List[str]:
+        """
+        Aplica los límites de seguridad por modelo y configuración al lote recibido
+        
+        Compartido por el camino síncrono y el asíncrono para que ambos envíen
+        exactamente los mismos lotes a la API.
+        """
+        ADAPTIVE_MAX_COMMENTS, max_comentarios_teorico, tokens_disponibles = self._calcular_limites_comentarios()
+            
+        if len(comentarios_raw) > ADAPTIVE_MAX_COMMENTS:
+            logger.warning(f"🚨 ADAPTIVE SAFETY: {len(comentarios_raw)} comentarios > {ADAPTIVE_MAX_COMMENTS} (tokens={tokens_disponibles:,}), limitando")
+            comentarios_raw = comentarios_raw[:ADAPTIVE_MAX_COMMENTS]
+            
+        # SAFETY NET 2: Model-specific limits (unchanged but more permissive due to FASE 3)
+        if len(comentarios_raw) > max_comentarios_teorico:
+            logger.warning(f"🚨 MODEL LIMIT: {len(comentarios_raw)} comentarios > {max_comentarios_teorico}, limitando para {self.modelo}")
+            comentarios_raw = comentarios_raw[:max_comentarios_teorico]
+        
+        return comentarios_raw
+    
+    def _calcular_limites_comentarios(self) -> Tuple[int, int, int]:
+        """
+        Máximo de comentarios por llamada según modelo y configuración
+        
+        Returns:
+            (máximo adaptativo, máximo teórico por tokens, tokens disponibles)
+        """
         # LÍMITE DE SEGURIDAD: Calcular máximo de comentarios basado en modelo
         limite_modelo = AIEngineConstants.get_model_token_limit(self.modelo)
         
@@ -278,61 +637,36 @@ class AnalizadorMaestroIA:
             ADAPTIVE_MAX_COMMENTS = min(max_low, max_comentarios_teorico)
         else:  # Limited tokens
             ADAPTIVE_MAX_COMMENTS = min(max_minimal, max_comentarios_teorico)
-            
-        if len(comentarios_raw) > ADAPTIVE_MAX_COMMENTS:
-            logger.warning(f"🚨 ADAPTIVE SAFETY: {len(comentarios_raw)} comentarios > {ADAPTIVE_MAX_COMMENTS} (tokens={tokens_disponibles:,}), limitando")
-            comentarios_raw = comentarios_raw[:ADAPTIVE_MAX_COMMENTS]
-            
-        # SAFETY NET 2: Model-specific limits (unchanged but more permissive due to FASE 3)
-        if len(comentarios_raw) > max_comentarios_teorico:
-            logger.warning(f"🚨 MODEL LIMIT: {len(comentarios_raw)} comentarios > {max_comentarios_teorico}, limitando para {self.modelo}")
-            comentarios_raw = comentarios_raw[:max_comentarios_teorico]
-        
-        inicio_tiempo = time.time()
-        
-        # PROGRESS TRACKING: Initialize real-time progress tracker
-        if PROGRESS_TRACKING_AVAILABLE:
-            tracker = create_progress_tracker(len(comentarios_raw))
         
-        logger.info(f"🔍 Iniciando análisis maestro de {len(comentarios_raw)} comentarios (limitado para {self.modelo})")
+        return ADAPTIVE_MAX_COMMENTS, max_comentarios_teorico, tokens_disponibles
+    
+    def capacidad_comentarios_por_llamada(self) -> int:
+        """Comentarios que acepta una llamada sin que _limitar_comentarios los recorte"""
+        adaptativo, teorico, _ = self._calcular_limites_comentarios()
+        return max(1, min(adaptativo, teorico))
+    
+    def crear_empaquetador_lotes(self, max_comentarios_lote: int) -> EmpaquetadorLotesTokens:
+        """
+        Empaquetador de lotes ajustado a los límites de este analizador
         
-        try:
-            # STEP 1: Cache operations (3% of total time)
-            with track_step('cache_check'):
-                cache_key = self._generar_cache_key(comentarios_raw)
-                
-                # Verificar cache (con TTL y LRU)
-                if self.usar_cache and self._verificar_cache_valido(cache_key):
-                    logger.info("💾 Resultado obtenido desde cache")
-                    # Move to end (LRU)
-                    self._cache.move_to_end(cache_key)
-                    return self._cache[cache_key]
-            
-            # STEP 2: Prompt generation (10% of total time)
-            with track_step('prompt_generation'):
-                prompt_completo = self._generar_prompt_maestro(comentarios_raw)
-            
-            # STEP 3: OpenAI API call (75% of total time - LONGEST STEP)
-            with track_step('openai_api_call'):
-                respuesta_raw = self._hacer_llamada_api_maestra(prompt_completo, len(comentarios_raw))
-            
-            # STEP 4: Response processing and emotion extraction (10% of total time)  
-            with track_step('response_processing'):
-                tiempo_transcurrido = time.time() - inicio_tiempo
-                analisis_completo = self._procesar_respuesta_maestra(
-                    respuesta_raw, comentarios_raw, tiempo_transcurrido
-                )
-            
-            # Guardar en cache con límites
-            if self.usar_cache:
-                self._guardar_en_cache(cache_key, analisis_completo)
-            
-            logger.info(f"✅ Análisis maestro completado en {tiempo_transcurrido:.2f}s")
-            return analisis_completo
-            
-        except Exception as e:
-            logger.error(f"❌ Error en análisis maestro: {str(e)}")
-            raise IAException(f"Error en análisis maestro: {str(e)}")
+        Args:
+            max_comentarios_lote: Tope de comentarios por lote del caso de uso
+        """
+        production_limit = self.configuracion.get('production_token_limit', 14000) if self.configuracion else 14000
+        limite_modelo = AIEngineConstants.get_model_token_limit(self.modelo)
+        return EmpaquetadorLotesTokens(
+            modelo=self.modelo,
+            max_comentarios_lote=min(max_comentarios_lote, self.capacidad_comentarios_por_llamada()),
+            limite_salida=min(self.max_tokens_limit, limite_modelo, production_limit),
+            limite_contexto=limite_modelo,
+            estimador=self._obtener_estimador_tokens()
+        )
+    
+    def _obtener_estimador_tokens(self) -> EstimadorTokens:
+        """Estimador de tokens para el modelo actual (se crea una vez por instancia)"""
+        if getattr(self, '_estimador_tokens', None) is None:
+            self._estimador_tokens = EstimadorTokens(self.modelo)
+        return self._estimador_tokens
     
     def _generar_prompt_maestro(self, comentarios: List[str]) -> str:
         """
@@ -373,78 +707,395 @@ REGLAS: JSON válido, campos abreviados, analizar EXACTAMENTE {len(comentarios)}
 NO agregar comentarios extra. RETORNAR exactamente {len(comentarios)} items en array "comentarios".
 """
     
-    def _hacer_llamada_api_maestra(self, prompt: str, num_comentarios: int) -> Dict[str, Any]:
+    def _construir_parametros_llamada(self, prompt: str, num_comentarios: int,
+                                      stream: bool = False, temperatura: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Construye los parámetros de chat completion comunes a los clientes sync y async
+        
+        temperatura reemplaza a self.temperatura solo en esta llamada.
+        """
+        messages = [
+            {
+                "role": "system", 
+                "content": "Eres un experto analista de experiencia del cliente especializado en telecomunicaciones. Responde SOLO con JSON válido, sin texto adicional."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        estimador = self._obtener_estimador_tokens()
+        tokens_entrada = sum(estimador.contar(m["content"]) for m in messages)
+        
+        parametros = {
+            'model': self.modelo,
+            'messages': messages,
+            'temperature': self.temperatura if temperatura is None else temperatura,  # ← DETERMINISTA
+            'seed': self.seed,                # ← REPRODUCIBLE
+            'max_tokens': self._calcular_tokens_dinamicos(num_comentarios, tokens_entrada),
+            'response_format': {"type": "json_object"}  # ← Forzar JSON válido
+        }
+        if stream:
+            parametros['stream'] = True
+            parametros['stream_options'] = {"include_usage": True}  # Uso en el último chunk
+        return parametros
+    
+    def _parsear_respuesta_api(self, response: Any, content: str) -> Dict[str, Any]:
+        """
+        Convierte el contenido de la respuesta en el dict maestro con metadatos de uso
+        """
+        tokens_utilizados = response.usage.total_tokens if response.usage else 0
+        
+        logger.debug(f"📊 Tokens utilizados: {tokens_utilizados}")
+        
+        # Parsear JSON de respuesta
+        resultado = json.loads(content)
+        resultado['_tokens_utilizados'] = tokens_utilizados
+        resultado['_modelo_utilizado'] = self.modelo
+        
+        return resultado
+    
+    def _hacer_llamada_api_maestra(self, prompt: str, num_comentarios: int,
+                                   on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                   temperatura: Optional[float] = None) -> Dict[str, Any]:
         """
         Hace la llamada única y comprensiva a OpenAI con configuración determinista
         
         Args:
             prompt: El prompt maestro generado
             num_comentarios: Número de comentarios para calcular tokens dinámicamente
+            on_comentario: Callback por comentario cuando se usa streaming
+            temperatura: Temperatura solo para esta llamada (None = self.temperatura)
         """
+        if self._usar_streaming():
+            return self._hacer_llamada_api_maestra_streaming(prompt, num_comentarios, on_comentario, temperatura)
+        
+        content = ""
         try:
-            logger.debug(f"🚀 Enviando prompt maestro (temp={self.temperatura}, seed={self.seed})")
-            
             # HIGH-004 FIX: Use retry wrapper for robust API calls  
-            if self.retry_wrapper:
-                response = self.retry_wrapper.wrap_chat_completion(
-                    client=self.client,
-                    model=self.modelo,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "Eres un experto analista de experiencia del cliente especializado en telecomunicaciones. Responde SOLO con JSON válido, sin texto adicional."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=self.temperatura,  # ← DETERMINISTA
-                    seed=self.seed,                # ← REPRODUCIBLE
-                    max_tokens=self._calcular_tokens_dinamicos(num_comentarios),
-                    response_format={"type": "json_object"}  # ← Forzar JSON válido
-                )
-            else:
-                # Fallback to direct API call without retry (maintains existing behavior)
-                response = self.client.chat.completions.create(
-                    model=self.modelo,
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "Eres un experto analista de experiencia del cliente especializado en telecomunicaciones. Responde SOLO con JSON válido, sin texto adicional."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=self.temperatura,  # ← DETERMINISTA
-                    seed=self.seed,                # ← REPRODUCIBLE
-                    max_tokens=self._calcular_tokens_dinamicos(num_comentarios),
-                    response_format={"type": "json_object"}  # ← Forzar JSON válido
-                )
+            parametros = self._construir_parametros_llamada(prompt, num_comentarios, temperatura=temperatura)
+            logger.debug(f"🚀 Enviando prompt maestro (temp={parametros['temperature']}, seed={self.seed})")
+            with self._llamada_con_presupuesto(parametros) as response:
+                self._registrar_resultado_api()
+                
+                content = response.choices[0].message.content
+                return self._parsear_respuesta_api(response, content)
             
-            content = response.choices[0].message.content
-            tokens_utilizados = response.usage.total_tokens if response.usage else 0
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Error parseando JSON: {str(e)}")
+            logger.error(f"Contenido recibido: {content[:500]}...")
+            raise IAException(f"Respuesta JSON inválida de OpenAI: {str(e)}")
             
-            logger.debug(f"📊 Tokens utilizados: {tokens_utilizados}")
+        except Exception as e:
+            self._registrar_resultado_api(e)
+            logger.error(f"❌ Error en llamada API: {str(e)}")
+            raise IAException(f"Error comunicándose con OpenAI: {str(e)}")
+    
+    async def _hacer_llamada_api_maestra_async(self, cliente_async, prompt: str, num_comentarios: int,
+                                               on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                               temperatura: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Equivalente asíncrono de _hacer_llamada_api_maestra
+        
+        Args:
+            cliente_async: Cliente AsyncOpenAI compartido
+            prompt: El prompt maestro generado
+            num_comentarios: Número de comentarios para calcular tokens dinámicamente
+            on_comentario: Callback por comentario cuando se usa streaming
+            temperatura: Temperatura solo para esta llamada (None = self.temperatura)
+        """
+        if self._usar_streaming():
+            return await self._hacer_llamada_api_maestra_streaming_async(
+                cliente_async, prompt, num_comentarios, on_comentario, temperatura
+            )
+        
+        content = ""
+        try:
+            parametros = self._construir_parametros_llamada(prompt, num_comentarios, temperatura=temperatura)
+            async with self._llamada_con_presupuesto_async(cliente_async, parametros) as response:
+                self._registrar_resultado_api()
+                
+                content = response.choices[0].message.content
+                return self._parsear_respuesta_api(response, content)
             
-            # Parsear JSON de respuesta
-            resultado = json.loads(content)
-            resultado['_tokens_utilizados'] = tokens_utilizados
-            resultado['_modelo_utilizado'] = self.modelo
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Error parseando JSON: {str(e)}")
+            logger.error(f"Contenido recibido: {content[:500]}...")
+            raise IAException(f"Respuesta JSON inválida de OpenAI: {str(e)}")
+            
+        except Exception as e:
+            self._registrar_resultado_api(e)
+            logger.error(f"❌ Error en llamada API async: {str(e)}")
+            raise IAException(f"Error comunicándose con OpenAI: {str(e)}")
+    
+    def _usar_streaming(self) -> bool:
+        """Indica si las respuestas se consumen en streaming ('use_streaming_responses')"""
+        if self.configuracion:
+            return bool(self.configuracion.get('use_streaming_responses', True))
+        return True
+    
+    def _hacer_llamada_api_maestra_streaming(self, prompt: str, num_comentarios: int,
+                                             on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                             temperatura: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Llamada maestra en streaming: cada comentario se entrega en cuanto su objeto
+        JSON se completa, y una respuesta truncada conserva lo ya parseado
+        """
+        parser = ParserComentariosIncremental()
+        estado = {}
+        try:
+            parametros = self._construir_parametros_llamada(prompt, num_comentarios, stream=True,
+                                                            temperatura=temperatura)
+            logger.debug(f"🚀 Enviando prompt maestro en streaming (temp={parametros['temperature']}, seed={self.seed})")
+            with self._llamada_con_presupuesto(parametros) as stream:
+                self._registrar_resultado_api()
+                
+                for chunk in stream:
+                    self._consumir_chunk_stream(chunk, parser, estado, on_comentario)
             
-            return resultado
+            return self._cerrar_respuesta_stream(parser, estado)
             
         except json.JSONDecodeError as e:
             logger.error(f"❌ Error parseando JSON: {str(e)}")
-            logger.error(f"Contenido recibido: {content[:500]}...")
+            logger.error(f"Contenido recibido: {parser.texto[:500]}...")
             raise IAException(f"Respuesta JSON inválida de OpenAI: {str(e)}")
             
         except Exception as e:
-            logger.error(f"❌ Error en llamada API: {str(e)}")
+            self._registrar_resultado_api(e)
+            logger.error(f"❌ Error en llamada API streaming: {str(e)}")
+            raise IAException(f"Error comunicándose con OpenAI: {str(e)}")
+    
+    async def _hacer_llamada_api_maestra_streaming_async(self, cliente_async, prompt: str, num_comentarios: int,
+                                                         on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                                         temperatura: Optional[float] = None) -> Dict[str, Any]:
+        """Equivalente asíncrono de _hacer_llamada_api_maestra_streaming"""
+        parser = ParserComentariosIncremental()
+        estado = {}
+        try:
+            parametros = self._construir_parametros_llamada(prompt, num_comentarios, stream=True,
+                                                            temperatura=temperatura)
+            async with self._llamada_con_presupuesto_async(cliente_async, parametros) as stream:
+                self._registrar_resultado_api()
+                
+                async for chunk in stream:
+                    self._consumir_chunk_stream(chunk, parser, estado, on_comentario)
+            
+            return self._cerrar_respuesta_stream(parser, estado)
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Error parseando JSON: {str(e)}")
+            logger.error(f"Contenido recibido: {parser.texto[:500]}...")
+            raise IAException(f"Respuesta JSON inválida de OpenAI: {str(e)}")
+            
+        except Exception as e:
+            self._registrar_resultado_api(e)
+            logger.error(f"❌ Error en llamada API streaming async: {str(e)}")
             raise IAException(f"Error comunicándose con OpenAI: {str(e)}")
     
+    def _consumir_chunk_stream(self, chunk: Any, parser: ParserComentariosIncremental,
+                               estado: Dict[str, Any],
+                               on_comentario: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+        """Alimenta el parser con un chunk del stream y notifica los comentarios completos"""
+        usage = getattr(chunk, 'usage', None)
+        if usage:
+            estado['tokens'] = usage.total_tokens
+        
+        for choice in chunk.choices or []:
+            if choice.finish_reason:
+                estado['finish_reason'] = choice.finish_reason
+            fragmento = getattr(choice.delta, 'content', None)
+            if not fragmento:
+                continue
+            for comentario in parser.alimentar(fragmento):
+                if on_comentario:
+                    try:
+                        on_comentario(comentario)
+                    except Exception as callback_error:
+                        logger.debug(f"Error en callback de streaming: {callback_error}")
+    
+    def _cerrar_respuesta_stream(self, parser: ParserComentariosIncremental,
+                                 estado: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Construye el dict maestro al terminar el stream
+        
+        Si la respuesta se truncó (finish_reason 'length' o JSON incompleto) se
+        devuelven los comentarios ya parseados con estadísticas recalculadas.
+        """
+        truncado = estado.get('finish_reason') == 'length'
+        try:
+            resultado = parser.finalizar()
+        except json.JSONDecodeError:
+            if not parser.comentarios:
+                raise
+            truncado = True
+            resultado = self._construir_respuesta_parcial(parser.comentarios)
+        
+        if truncado:
+            logger.warning(f"⚠️ Respuesta truncada: {len(parser.comentarios)} comentarios recuperados del stream")
+            resultado['_truncado'] = True
+        
+        tokens_utilizados = estado.get('tokens', 0)
+        logger.debug(f"📊 Tokens utilizados: {tokens_utilizados}")
+        resultado['_tokens_utilizados'] = tokens_utilizados
+        resultado['_modelo_utilizado'] = self.modelo
+        return resultado
+    
+    def _construir_respuesta_parcial(self, comentarios: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Respuesta maestra mínima a partir de los comentarios recuperados de un stream truncado"""
+        conteo = {'pos': 0, 'neu': 0, 'neg': 0}
+        for comentario in comentarios:
+            sentimiento = comentario.get('sent', 'neu')
+            if sentimiento in conteo:
+                conteo[sentimiento] += 1
+        
+        dominante = max(conteo, key=conteo.get)
+        tendencia = {'pos': 'positiva', 'neu': 'neutral', 'neg': 'negativa'}[dominante]
+        return {
+            'general': {
+                'tendencia': tendencia,
+                'resumen': f"Respuesta truncada: {len(comentarios)} comentarios recuperados"
+            },
+            'comentarios': list(comentarios),
+            'stats': conteo
+        }
+    
+    def _recuperar_comentarios_faltantes(self, respuesta: Dict[str, Any], comentarios_originales: List[str],
+                                         on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                         temperatura: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Completa una respuesta parcial pidiendo a la IA solo los comentarios faltantes
+        
+        Los índices 'i' ausentes se reenvían en un lote de seguimiento (renumerado
+        1..k) y sus resultados se reinsertan en su índice original, en lugar de
+        reintentar el lote completo.
+        """
+        por_indice, faltantes = self._indexar_respuesta(respuesta, len(comentarios_originales))
+        tokens_extra = 0
+        
+        for ronda in range(self._obtener_rondas_recuperacion()):
+            if not faltantes or not por_indice:
+                break
+            subconjunto = [comentarios_originales[i - 1] for i in faltantes]
+            logger.info(f"🩹 Recuperando {len(faltantes)}/{len(comentarios_originales)} comentarios faltantes (ronda {ronda + 1})")
+            try:
+                parcial = self._hacer_llamada_api_maestra(
+                    self._generar_prompt_maestro(subconjunto), len(subconjunto), on_comentario, temperatura
+                )
+            except IAException as e:
+                logger.warning(f"⚠️ Recuperación de faltantes falló: {str(e)}")
+                break
+            tokens_extra += parcial.get('_tokens_utilizados', 0)
+            faltantes = self._integrar_recuperados(por_indice, faltantes, parcial)
+        
+        return self._combinar_respuesta_recuperada(
+            respuesta, por_indice, faltantes, tokens_extra, len(comentarios_originales)
+        )
+    
+    async def _recuperar_comentarios_faltantes_async(self, cliente_async, respuesta: Dict[str, Any],
+                                                     comentarios_originales: List[str],
+                                                     on_comentario: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                                     temperatura: Optional[float] = None) -> Dict[str, Any]:
+        """Equivalente asíncrono de _recuperar_comentarios_faltantes"""
+        por_indice, faltantes = self._indexar_respuesta(respuesta, len(comentarios_originales))
+        tokens_extra = 0
+        
+        for ronda in range(self._obtener_rondas_recuperacion()):
+            if not faltantes or not por_indice:
+                break
+            subconjunto = [comentarios_originales[i - 1] for i in faltantes]
+            logger.info(f"🩹 Recuperando {len(faltantes)}/{len(comentarios_originales)} comentarios faltantes (ronda {ronda + 1})")
+            try:
+                parcial = await self._hacer_llamada_api_maestra_async(
+                    cliente_async, self._generar_prompt_maestro(subconjunto), len(subconjunto), on_comentario,
+                    temperatura
+                )
+            except IAException as e:
+                logger.warning(f"⚠️ Recuperación de faltantes falló: {str(e)}")
+                break
+            tokens_extra += parcial.get('_tokens_utilizados', 0)
+            faltantes = self._integrar_recuperados(por_indice, faltantes, parcial)
+        
+        return self._combinar_respuesta_recuperada(
+            respuesta, por_indice, faltantes, tokens_extra, len(comentarios_originales)
+        )
+    
+    def _obtener_rondas_recuperacion(self) -> int:
+        """Rondas de recuperación de faltantes ('gap_recovery_rounds'; 0 la desactiva)"""
+        if self.configuracion:
+            return max(0, int(self.configuracion.get('gap_recovery_rounds', 1)))
+        return 1
+    
+    @staticmethod
+    def _indice_valido(comentario: Any, total: int) -> Optional[int]:
+        if not isinstance(comentario, dict):
+            return None
+        try:
+            indice = int(comentario.get('i'))
+        except (TypeError, ValueError):
+            return None
+        return indice if 1 <= indice <= total else None
+    
+    def _indexar_comentarios(self, comentarios: List[Any], total: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Indexa los comentarios por 'i' (1..total), descartando duplicados y fuera de rango
+        
+        Si ningún elemento trae un 'i' válido se asume el orden posicional.
+        """
+        por_indice = {}
+        con_indice = [c for c in comentarios if self._indice_valido(c, total) is not None]
+        if not con_indice:
+            for posicion, comentario in enumerate(comentarios[:total]):
+                if isinstance(comentario, dict):
+                    por_indice[posicion + 1] = dict(comentario, i=posicion + 1)
+            return por_indice
+        
+        for comentario in con_indice:
+            indice = self._indice_valido(comentario, total)
+            if indice not in por_indice:
+                por_indice[indice] = comentario
+        return por_indice
+    
+    def _indexar_respuesta(self, respuesta: Dict[str, Any], total: int) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        por_indice = self._indexar_comentarios(respuesta.get('comentarios', []), total)
+        faltantes = [i for i in range(1, total + 1) if i not in por_indice]
+        return por_indice, faltantes
+    
+    def _integrar_recuperados(self, por_indice: Dict[int, Dict[str, Any]], faltantes: List[int],
+                              parcial: Dict[str, Any]) -> List[int]:
+        """Reinserta los resultados del lote de seguimiento en su índice original"""
+        recuperados = self._indexar_comentarios(parcial.get('comentarios', []), len(faltantes))
+        for indice_local, comentario in recuperados.items():
+            indice_original = faltantes[indice_local - 1]
+            por_indice[indice_original] = dict(comentario, i=indice_original)
+        
+        restantes = [i for i in faltantes if i not in por_indice]
+        logger.info(f"🩹 Recuperados {len(faltantes) - len(restantes)}/{len(faltantes)} comentarios")
+        return restantes
+    
+    def _combinar_respuesta_recuperada(self, respuesta: Dict[str, Any], por_indice: Dict[int, Dict[str, Any]],
+                                       faltantes: List[int], tokens_extra: int, total: int) -> Dict[str, Any]:
+        """Respuesta maestra ordenada por 'i' con estadísticas coherentes con los comentarios"""
+        comentarios_originales = respuesta.get('comentarios', [])
+        comentarios = [por_indice[i] for i in sorted(por_indice)]
+        if comentarios == comentarios_originales:
+            return respuesta
+        
+        combinada = dict(respuesta)
+        combinada['comentarios'] = comentarios
+        combinada['general'] = dict(combinada.get('general', {}), total=total)
+        
+        stats = dict(combinada.get('stats', {}))
+        for clave in ('pos', 'neu', 'neg'):
+            stats[clave] = sum(1 for c in comentarios if c.get('sent') == clave)
+        combinada['stats'] = stats
+        
+        combinada['_tokens_utilizados'] = respuesta.get('_tokens_utilizados', 0) + tokens_extra
+        if faltantes:
+            logger.warning(f"⚠️ {len(faltantes)} comentarios siguen sin analizar tras la recuperación")
+        else:
+            combinada.pop('_truncado', None)
+        return combinada
+    
     def _procesar_respuesta_maestra(self, respuesta: Dict[str, Any], 
                                    comentarios_originales: List[str], 
                                    tiempo_analisis: float) -> AnalisisCompletoIA:
@@ -520,32 +1171,120 @@ NO agregar comentarios extra. RETORNAR exactamente {len(comentarios)} items en a
             logger.error(f"❌ Error procesando respuesta: {str(e)}")
             raise IAException(f"Error procesando respuesta de IA: {str(e)}")
     
-    def _generar_cache_key(self, comentarios: List[str]) -> str:
-        """Genera clave de cache determinista basada en el contenido"""
+    def consolidar_resultados(self, comentarios_analizados: List[Dict[str, Any]],
+                              tiempo_analisis: float = 0.0, tokens_utilizados: int = 0,
+                              resumen: Optional[str] = None) -> AnalisisCompletoIA:
+        """
+        Construye un AnalisisCompletoIA desde resultados abreviados por comentario
+        
+        Las estadísticas se recalculan a partir de los comentarios (no del bloque
+        'stats' de la IA) para poder combinar resultados de cache, de varios lotes
+        o de otras fuentes en un único análisis coherente.
+        """
+        total = len(comentarios_analizados)
+        conteo_sentimientos = {'pos': 0, 'neu': 0, 'neg': 0}
+        conteo_temas = {}
+        
+        for comentario in comentarios_analizados:
+            sentimiento = comentario.get('sent', 'neu')
+            if sentimiento in conteo_sentimientos:
+                conteo_sentimientos[sentimiento] += 1
+            tema = comentario.get('tema')
+            if tema:
+                conteo_temas[tema] = conteo_temas.get(tema, 0) + 1
+        
+        confianzas = [c.get('conf', 0.5) for c in comentarios_analizados]
+        confianza_general = sum(confianzas) / len(confianzas) if confianzas else 0.5
+        
+        maximo = max(conteo_sentimientos.values())
+        if maximo == conteo_sentimientos['pos']:
+            tendencia = 'positiva'
+        elif maximo == conteo_sentimientos['neg']:
+            tendencia = 'negativa'
+        else:
+            tendencia = 'neutral'
+        
+        return AnalisisCompletoIA(
+            total_comentarios=total,
+            tendencia_general=tendencia,
+            resumen_ejecutivo=resumen or f"Análisis de {total} comentarios. Tendencia general: {tendencia}.",
+            recomendaciones_principales=["Optimizar según tendencia detectada", "Revisar comentarios urgentes"],
+            comentarios_analizados=comentarios_analizados,
+            confianza_general=confianza_general,
+            tiempo_analisis=tiempo_analisis,
+            tokens_utilizados=tokens_utilizados,
+            modelo_utilizado=self.modelo,
+            fecha_analisis=datetime.now(),
+            distribucion_sentimientos={
+                'positivo': conteo_sentimientos['pos'],
+                'neutral': conteo_sentimientos['neu'],
+                'negativo': conteo_sentimientos['neg'],
+                'pos': conteo_sentimientos['pos'],
+                'neu': conteo_sentimientos['neu'],
+                'neg': conteo_sentimientos['neg']
+            },
+            temas_mas_relevantes={
+                tema: round(cantidad / total, 2) for tema, cantidad in conteo_temas.items()
+            } if total else {},
+            dolores_mas_severos={},
+            emociones_predominantes=self._extract_emotions_from_comments(comentarios_analizados)
+        )
+    
+    def _generar_cache_key(self, comentarios: List[str], temperatura: Optional[float] = None) -> str:
+        """Genera clave de cache determinista basada en el contenido (y la temperatura de la llamada)"""
         import hashlib
         
-        # Crear hash de todos los comentarios concatenados
-        contenido_completo = "|".join(sorted(comentarios))  # Sort para determinismo
+        # Hash de los comentarios EN ORDEN: el resultado cacheado es posicional por 'i',
+        # así que el mismo lote en otro orden es otra clave
+        contenido_completo = "\x1f".join(comentarios)
         hash_contenido = hashlib.md5(contenido_completo.encode()).hexdigest()
         
         # Incluir configuración en la clave
-        config_key = f"{self.modelo}_{self.temperatura}_{self.seed}"
+        config_key = f"{self.modelo}_{self.temperatura if temperatura is None else temperatura}_{self.seed}"
         return f"{config_key}_{hash_contenido}"
     
+    @property
+    def disponible(self) -> bool:
+        """Disponibilidad de la API (forzada, o sondeada y cacheada por proceso)"""
+        if self._disponible_forzado is not None:
+            return self._disponible_forzado
+        return self._verificar_disponibilidad()
+    
+    @disponible.setter
+    def disponible(self, valor: Optional[bool]) -> None:
+        # Modo degradado / tests: fija el valor sin sondear; None vuelve al sondeo
+        self._disponible_forzado = valor
+    
     def _verificar_disponibilidad(self) -> bool:
-        """Verifica la disponibilidad de la API"""
-        try:
-            response = self.client.chat.completions.create(
-                model=self.modelo,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5,
-                temperature=0.0
-            )
-            logger.info("✅ API OpenAI disponible")
-            return True
-        except Exception as e:
-            logger.warning(f"⚠️ OpenAI no disponible: {str(e)}")
-            return False
+        """Verifica la disponibilidad de la API con la sonda compartida (models.retrieve)"""
+        return obtener_sonda_disponibilidad().verificar(
+            self.client, self.api_key, self.modelo, self._ttl_sonda_disponibilidad()
+        )
+    
+    def _ttl_sonda_disponibilidad(self) -> int:
+        return self.configuracion.get('api_health_ttl_seconds', 300) if self.configuracion else 300
+    
+    def _disponible_para_llamada(self) -> bool:
+        """
+        Comprobación previa a un análisis sin coste de red
+        
+        Solo bloquea si ya se sabe que la API no está disponible; si no hay
+        información, la propia llamada real determina el estado.
+        """
+        if self._disponible_forzado is not None:
+            return self._disponible_forzado
+        estado = obtener_sonda_disponibilidad().estado_conocido(
+            self.api_key, self.modelo, self._ttl_sonda_disponibilidad()
+        )
+        return estado is not False
+    
+    def _registrar_resultado_api(self, error: Optional[BaseException] = None) -> None:
+        """Las llamadas reales alimentan la sonda: evita sondear tras un éxito"""
+        sonda = obtener_sonda_disponibilidad()
+        if error is None:
+            sonda.registrar_resultado(self.api_key, self.modelo, True)
+        else:
+            sonda.registrar_error(self.api_key, self.modelo, error)
     
     def es_disponible(self) -> bool:
         """Verifica si el analizador está disponible"""
@@ -553,16 +1292,32 @@ NO agregar comentarios extra. RETORNAR exactamente {len(comentarios)} items en a
     
     def limpiar_cache(self) -> None:
         """Limpia el cache de análisis"""
-        if self._cache:
-            self._cache.clear()
-            self._cache_timestamps.clear()  # ✅ FIXED: Clear timestamps too
-            logger.info("🧹 Cache de analizador maestro limpiado")
+        with self._cache_lock:
+            if self._cache:
+                self._cache.clear()
+                self._cache_timestamps.clear()  # ✅ FIXED: Clear timestamps too
+                logger.info("🧹 Cache de analizador maestro limpiado")
+    
+    def _obtener_de_cache(self, cache_key: str) -> Optional[AnalisisCompletoIA]:
+        """Resultado vigente del cache (marcándolo como reciente para el LRU) o None"""
+        if not self.usar_cache:
+            return None
+        with self._cache_lock:
+            if not self._verificar_cache_valido(cache_key):
+                return None
+            self._cache.move_to_end(cache_key)
+            return self._cache[cache_key]
     
     def _cleanup_expired_cache(self) -> None:
         """
         CRITICAL FIX: Background cleanup of expired cache entries to prevent memory leak
         Addresses CRITICAL-001: Memory leak in cache timestamps dictionary
         """
+        with self._cache_lock:
+            self._cleanup_expired_cache_sin_lock()
+    
+    def _cleanup_expired_cache_sin_lock(self) -> None:
+        """Cuerpo de _cleanup_expired_cache (llamar con _cache_lock tomado)"""
         if not self._cache or not self.usar_cache:
             return
         
@@ -616,23 +1371,25 @@ NO agregar comentarios extra. RETORNAR exactamente {len(comentarios)} items en a
     
     def _guardar_en_cache(self, cache_key: str, analisis: AnalisisCompletoIA) -> None:
         """Guarda en cache con implementación LRU y size limits"""
-        if not self._cache:
+        if self._cache is None:  # Un OrderedDict vacío también es falsy
             return
             
         import time
         
-        # Verificar límite de tamaño
-        if len(self._cache) >= self._cache_max_size:
-            # Remover el más antiguo (LRU)
-            oldest_key, _ = self._cache.popitem(last=False)
-            if oldest_key in self._cache_timestamps:
-                del self._cache_timestamps[oldest_key]
-            logger.debug(f"🗑️ Cache LRU: removida entrada antigua")
-        
-        # Guardar nueva entrada
-        self._cache[cache_key] = analisis
-        self._cache_timestamps[cache_key] = time.time()
-        logger.debug(f"💾 Cache: guardada nueva entrada ({len(self._cache)}/{self._cache_max_size})")
+        with self._cache_lock:
+            # Verificar límite de tamaño
+            if cache_key not in self._cache and len(self._cache) >= self._cache_max_size:
+                # Remover el más antiguo (LRU)
+                oldest_key, _ = self._cache.popitem(last=False)
+                if oldest_key in self._cache_timestamps:
+                    del self._cache_timestamps[oldest_key]
+                logger.debug(f"🗑️ Cache LRU: removida entrada antigua")
+            
+            # Guardar nueva entrada
+            self._cache[cache_key] = analisis
+            self._cache.move_to_end(cache_key)
+            self._cache_timestamps[cache_key] = time.time()
+            logger.debug(f"💾 Cache: guardada nueva entrada ({len(self._cache)}/{self._cache_max_size})")
     
     def _extract_emotions_from_comments(self, comentarios_analizados: List[Dict]) -> Dict[str, float]:
         """Extract and aggregate emotions from individual comment analysis"""
@@ -679,5 +1436,3 @@ NO agregar comentarios extra. RETORNAR exactamente {len(comentarios)} items en a
             "seed": self.seed,
             "modelo": self.modelo
         }
-    
-    # PURGED: All AsyncIO code eliminated (100+ lines of unused complexity removed)
\ No newline at end of file
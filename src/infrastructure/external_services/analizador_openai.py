@@ -4,12 +4,14 @@ Implementación del analizador de sentimientos usando OpenAI
 import openai
 import json
 import time
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import logging
 
 from ...domain.services.analizador_sentimientos import IAnalizadorSentimientos
 from ...domain.value_objects.sentimiento import Sentimiento
 from ...shared.exceptions.ia_exception import IAException
+from .sonda_disponibilidad_api import obtener_sonda_disponibilidad
+from .planificador_limites_api import obtener_planificador_limites
 
 
 logger = logging.getLogger(__name__)
@@ -20,12 +22,35 @@ class AnalizadorOpenAI(IAnalizadorSentimientos):
     Implementación del analizador de sentimientos usando la API de OpenAI
     """
     
-    def __init__(self, api_key: str, modelo: str = "gpt-4", usar_cache: bool = True):
-        self.client = openai.OpenAI(api_key=api_key)
+    MAX_TOKENS_RESPUESTA = 2000
+    
+    def __init__(self, api_key: str, modelo: str = "gpt-4", usar_cache: bool = True,
+                 configuracion: Optional[Dict[str, Any]] = None):
+        self.api_key = api_key
+        # Endpoint alternativo (p. ej. servidor simulado local); None usa OPENAI_BASE_URL o la API pública
+        self.base_url = (configuracion or {}).get('openai_base_url') or None
+        # Comparte el presupuesto RPM/TPM del proceso con el analizador maestro
+        self._planificador = None
+        http_client = None
+        if (configuracion or {}).get('rate_limit_scheduler_enabled', True):
+            self._planificador = obtener_planificador_limites(api_key, modelo, configuracion)
+            http_client = openai.DefaultHttpxClient(event_hooks={'response': [self._planificador.hook_httpx]})
+        self.client = openai.OpenAI(api_key=api_key, base_url=self.base_url, http_client=http_client)
         self.modelo = modelo
         self.usar_cache = usar_cache
         self._cache = {} if usar_cache else None
-        self.disponible = self._verificar_disponibilidad()
+        self._disponible_forzado: Optional[bool] = None
+    
+    @property
+    def disponible(self) -> bool:
+        """Disponibilidad perezosa: sonda compartida por proceso con TTL"""
+        if self._disponible_forzado is not None:
+            return self._disponible_forzado
+        return self._verificar_disponibilidad()
+    
+    @disponible.setter
+    def disponible(self, valor: Optional[bool]) -> None:
+        self._disponible_forzado = valor
     
     def analizar_sentimiento(self, texto: str) -> Sentimiento:
         """
@@ -111,19 +136,9 @@ class AnalizadorOpenAI(IAnalizadorSentimientos):
     
     def _verificar_disponibilidad(self) -> bool:
         """
-        Verifica la disponibilidad de la API
+        Verifica la disponibilidad de la API (models.retrieve, cacheado por proceso)
         """
-        try:
-            # Hacer una llamada de prueba simple
-            response = self.client.chat.completions.create(
-                model=self.modelo,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5
-            )
-            return True
-        except Exception as e:
-            logger.warning(f"OpenAI no disponible: {str(e)}")
-            return False
+        return obtener_sonda_disponibilidad().verificar(self.client, self.api_key, self.modelo)
     
     def _hacer_llamada_api(self, textos: List[str]) -> List[dict]:
         """
@@ -132,15 +147,17 @@ class AnalizadorOpenAI(IAnalizadorSentimientos):
         prompt = self._generar_prompt(textos)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.modelo,
-                messages=[
-                    {"role": "system", "content": "Eres un experto analizador de sentimientos para comentarios de clientes de telecomunicaciones en español."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.3
-            )
+            try:
+                if self._planificador:
+                    # Estimación por caracteres: prompt (~4 chars/token) + respuesta máxima
+                    with self._planificador.reservar(len(prompt) // 4 + self.MAX_TOKENS_RESPUESTA):
+                        response = self._crear_chat_completion(prompt)
+                else:
+                    response = self._crear_chat_completion(prompt)
+            except Exception as e:
+                self._registrar_resultado_api(e)
+                raise
+            self._registrar_resultado_api()
             
             content = response.choices[0].message.content
             return self._parsear_respuesta_api(content)
@@ -149,6 +166,26 @@ class AnalizadorOpenAI(IAnalizadorSentimientos):
             logger.error(f"Error en llamada API: {str(e)}")
             raise IAException(f"Error comunicándose con OpenAI: {str(e)}")
     
+    def _registrar_resultado_api(self, error: Optional[BaseException] = None) -> None:
+        """Las llamadas reales alimentan la sonda: evita sondear tras un éxito"""
+        sonda = obtener_sonda_disponibilidad()
+        if error is None:
+            sonda.registrar_resultado(self.api_key, self.modelo, True)
+        else:
+            sonda.registrar_error(self.api_key, self.modelo, error)
+    
+    def _crear_chat_completion(self, prompt: str):
+        """Llamada chat.completions con el prompt de sentimientos"""
+        return self.client.chat.completions.create(
+            model=self.modelo,
+            messages=[
+                {"role": "system", "content": "Eres un experto analizador de sentimientos para comentarios de clientes de telecomunicaciones en español."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=self.MAX_TOKENS_RESPUESTA,
+            temperature=0.3
+        )
+    
     def _hacer_llamada_api_lote(self, textos: List[str]) -> List[dict]:
         """
         Procesa múltiples textos en lotes para optimizar llamadas API
@@ -0,0 +1,356 @@
+"""
+Backend de grabación/reproducción de llamadas al LLM para benchmarks offline
+"""
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CassetteSinRespuestaError(LookupError):
+    """La petición no está grabada en el cassette (modo replay)"""
+
+
+class CassetteLLM:
+    """
+    Archivo JSONL de pares petición/respuesta grabados
+
+    Cada línea guarda la clave de la petición, la respuesta (contenido,
+    finish_reason y uso de tokens) y la latencia observada. Peticiones
+    repetidas se reproducen en el orden en que se grabaron.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = Path(ruta)
+        self._entradas: Dict[str, List[Dict[str, Any]]] = {}
+        self._siguiente: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._cargar()
+
+    @staticmethod
+    def clave_peticion(parametros: Dict[str, Any]) -> str:
+        """
+        Clave estable de una petición
+
+        Excluye max_tokens y las opciones de streaming para que la misma
+        petición sea reproducible aunque cambie el presupuesto o el modo.
+        """
+        relevante = {
+            'model': parametros.get('model'),
+            'messages': parametros.get('messages'),
+            'temperature': parametros.get('temperature'),
+            'seed': parametros.get('seed'),
+            'response_format': parametros.get('response_format'),
+        }
+        serializado = json.dumps(relevante, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+
+    def _cargar(self) -> None:
+        if not self.ruta.exists():
+            return
+        with open(self.ruta, 'r', encoding='utf-8') as archivo:
+            for numero, linea in enumerate(archivo, 1):
+                if not linea.strip():
+                    continue
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    logger.warning(f"⚠️ Cassette {self.ruta}: línea {numero} inválida, se ignora")
+                    continue
+                self._entradas.setdefault(entrada['clave'], []).append(entrada)
+        logger.info(f"📼 Cassette cargado: {self.ruta} ({len(self)} respuestas)")
+
+    def __len__(self) -> int:
+        return sum(len(entradas) for entradas in self._entradas.values())
+
+    @property
+    def latencias(self) -> List[float]:
+        return [e['latencia'] for entradas in self._entradas.values() for e in entradas]
+
+    def buscar(self, clave: str) -> Dict[str, Any]:
+        """Respuesta grabada para la clave (rotando entre grabaciones repetidas)"""
+        with self._lock:
+            entradas = self._entradas.get(clave)
+            if not entradas:
+                raise CassetteSinRespuestaError(f"Petición {clave[:12]} no grabada en {self.ruta}")
+            posicion = self._siguiente.get(clave, 0)
+            self._siguiente[clave] = posicion + 1
+            return entradas[posicion % len(entradas)]
+
+    def grabar(self, clave: str, parametros: Dict[str, Any], respuesta: Dict[str, Any], latencia: float) -> None:
+        """Agrega una respuesta al cassette (en memoria y en disco)"""
+        entrada = {
+            'clave': clave,
+            'modelo': parametros.get('model'),
+            'respuesta': respuesta,
+            'latencia': round(latencia, 4),
+            'fecha': time.time(),
+        }
+        with self._lock:
+            self._entradas.setdefault(clave, []).append(entrada)
+            self.ruta.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.ruta, 'a', encoding='utf-8') as archivo:
+                archivo.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+
+
+class ModeloLatencia:
+    """
+    Latencia lognormal ajustada a p50/p95
+
+    mu = ln(p50) y sigma = (ln(p95) - ln(p50)) / 1.645, de modo que los
+    percentiles de las muestras coinciden con los indicados. La semilla
+    hace que dos corridas del benchmark vean la misma secuencia.
+    """
+
+    Z_P95 = 1.6449
+
+    def __init__(self, p50: float, p95: float, escala: float = 1.0, semilla: int = 12345):
+        self.p50 = max(p50, 1e-6)
+        self.p95 = max(p95, self.p50)
+        self.escala = escala
+        self._mu = math.log(self.p50)
+        self._sigma = (math.log(self.p95) - self._mu) / self.Z_P95
+        self._aleatorio = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_muestras(cls, latencias: List[float], escala: float = 1.0, semilla: int = 12345,
+                       p50: Optional[float] = None, p95: Optional[float] = None) -> 'ModeloLatencia':
+        """Ajusta el modelo a latencias grabadas; p50/p95 explícitos tienen prioridad"""
+        ordenadas = sorted(l for l in latencias if l > 0)
+        if ordenadas:
+            p50 = p50 or ordenadas[int(0.50 * (len(ordenadas) - 1))]
+            p95 = p95 or ordenadas[int(0.95 * (len(ordenadas) - 1))]
+        return cls(p50 or 1.0, p95 or p50 or 1.0, escala, semilla)
+
+    def muestrear(self) -> float:
+        """Segundos a esperar para la próxima respuesta"""
+        if self.escala <= 0:
+            return 0.0
+        with self._lock:
+            return self._aleatorio.lognormvariate(self._mu, self._sigma) * self.escala
+
+
+def _respuesta_a_dict(response: Any) -> Dict[str, Any]:
+    choice = response.choices[0]
+    return {
+        'content': choice.message.content,
+        'finish_reason': getattr(choice, 'finish_reason', 'stop'),
+        'usage': _uso_a_dict(getattr(response, 'usage', None)),
+    }
+
+
+def _uso_a_dict(usage: Any) -> Optional[Dict[str, int]]:
+    if usage is None:
+        return None
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', 0),
+        'completion_tokens': getattr(usage, 'completion_tokens', 0),
+        'total_tokens': getattr(usage, 'total_tokens', 0),
+    }
+
+
+def _uso_a_objeto(usage: Optional[Dict[str, int]]) -> Any:
+    return SimpleNamespace(**usage) if usage else None
+
+
+class _AcumuladorStream:
+    """Reconstruye la respuesta completa a partir de los chunks de un stream real"""
+
+    def __init__(self):
+        self.partes: List[str] = []
+        self.finish_reason = None
+        self.usage = None
+
+    def agregar(self, chunk: Any) -> None:
+        if getattr(chunk, 'usage', None):
+            self.usage = _uso_a_dict(chunk.usage)
+        for choice in chunk.choices or []:
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+            contenido = getattr(choice.delta, 'content', None)
+            if contenido:
+                self.partes.append(contenido)
+
+    def respuesta(self) -> Dict[str, Any]:
+        return {'content': ''.join(self.partes), 'finish_reason': self.finish_reason or 'stop', 'usage': self.usage}
+
+
+class BackendGrabacionLLM:
+    """
+    Backend enchufable para AnalizadorMaestroIA con dos modos
+
+    - record: delega en el cliente OpenAI real y graba cada respuesta con su latencia.
+    - replay: sirve las respuestas grabadas, sin red, esperando una latencia
+      muestreada del ModeloLatencia (lognormal alrededor del p50/p95 grabado).
+
+    Los clientes que devuelve imitan la superficie usada por el analizador:
+    chat.completions.create (con y sin stream) y models.retrieve.
+    """
+
+    MODOS = ('record', 'replay')
+    CARACTERES_POR_CHUNK = 64
+
+    def __init__(self, modo: str, cassette: CassetteLLM, latencia: Optional[ModeloLatencia] = None):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de backend LLM no soportado: {modo}")
+        self.modo = modo
+        self.cassette = cassette
+        self.latencia = latencia or ModeloLatencia.desde_muestras(cassette.latencias)
+
+    def cliente_sync(self, cliente_real: Any = None) -> Any:
+        if self.modo == 'record' and cliente_real is None:
+            raise ValueError("El modo record necesita el cliente OpenAI real")
+        return _ClienteGrabacion(self, cliente_real)
+
+    def cliente_async(self, cliente_real: Any = None) -> Any:
+        if self.modo == 'record' and cliente_real is None:
+            raise ValueError("El modo record necesita el cliente AsyncOpenAI real")
+        return _ClienteGrabacionAsync(self, cliente_real)
+
+    def respuesta_a_objeto(self, respuesta: Dict[str, Any]) -> Any:
+        return SimpleNamespace(
+            choices=[SimpleNamespace(
+                message=SimpleNamespace(content=respuesta['content']),
+                finish_reason=respuesta.get('finish_reason', 'stop')
+            )],
+            usage=_uso_a_objeto(respuesta.get('usage'))
+        )
+
+    def respuesta_a_chunks(self, respuesta: Dict[str, Any]) -> List[Any]:
+        contenido = respuesta.get('content') or ''
+        chunks = [
+            SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=contenido[i:i + self.CARACTERES_POR_CHUNK]),
+                                         finish_reason=None)],
+                usage=None
+            )
+            for i in range(0, len(contenido), self.CARACTERES_POR_CHUNK)
+        ]
+        chunks.append(SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=None),
+                                     finish_reason=respuesta.get('finish_reason', 'stop'))],
+            usage=None
+        ))
+        chunks.append(SimpleNamespace(choices=[], usage=_uso_a_objeto(respuesta.get('usage'))))
+        return chunks
+
+
+class _ClienteGrabacion:
+    """Cliente sync compatible con openai.OpenAI para record/replay"""
+
+    def __init__(self, backend: BackendGrabacionLLM, cliente_real: Any):
+        self._backend = backend
+        self._real = cliente_real
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.models = SimpleNamespace(retrieve=self._retrieve)
+
+    def _retrieve(self, modelo: str):
+        if self._backend.modo == 'record':
+            return self._real.models.retrieve(modelo)
+        return SimpleNamespace(id=modelo)
+
+    def _create(self, **parametros):
+        clave = CassetteLLM.clave_peticion(parametros)
+        stream = parametros.get('stream', False)
+
+        if self._backend.modo == 'replay':
+            respuesta = self._backend.cassette.buscar(clave)['respuesta']
+            if stream:
+                return self._reproducir_stream(respuesta)
+            time.sleep(self._backend.latencia.muestrear())
+            return self._backend.respuesta_a_objeto(respuesta)
+
+        inicio = time.perf_counter()
+        resultado = self._real.chat.completions.create(**parametros)
+        if stream:
+            return self._grabar_stream(resultado, clave, parametros, inicio)
+        self._backend.cassette.grabar(clave, parametros, _respuesta_a_dict(resultado), time.perf_counter() - inicio)
+        return resultado
+
+    def _reproducir_stream(self, respuesta: Dict[str, Any]):
+        chunks = self._backend.respuesta_a_chunks(respuesta)
+        espera = self._backend.latencia.muestrear() / len(chunks)
+        for chunk in chunks:
+            time.sleep(espera)
+            yield chunk
+
+    def _grabar_stream(self, stream, clave: str, parametros: Dict[str, Any], inicio: float):
+        acumulador = _AcumuladorStream()
+        for chunk in stream:
+            acumulador.agregar(chunk)
+            yield chunk
+        self._backend.cassette.grabar(clave, parametros, acumulador.respuesta(), time.perf_counter() - inicio)
+
+
+class _ClienteGrabacionAsync:
+    """Cliente async compatible con openai.AsyncOpenAI para record/replay"""
+
+    def __init__(self, backend: BackendGrabacionLLM, cliente_real: Any):
+        self._backend = backend
+        self._real = cliente_real
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **parametros):
+        clave = CassetteLLM.clave_peticion(parametros)
+        stream = parametros.get('stream', False)
+
+        if self._backend.modo == 'replay':
+            respuesta = self._backend.cassette.buscar(clave)['respuesta']
+            if stream:
+                return self._reproducir_stream(respuesta)
+            await asyncio.sleep(self._backend.latencia.muestrear())
+            return self._backend.respuesta_a_objeto(respuesta)
+
+        inicio = time.perf_counter()
+        resultado = await self._real.chat.completions.create(**parametros)
+        if stream:
+            return self._grabar_stream(resultado, clave, parametros, inicio)
+        self._backend.cassette.grabar(clave, parametros, _respuesta_a_dict(resultado), time.perf_counter() - inicio)
+        return resultado
+
+    async def _reproducir_stream(self, respuesta: Dict[str, Any]):
+        chunks = self._backend.respuesta_a_chunks(respuesta)
+        espera = self._backend.latencia.muestrear() / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(espera)
+            yield chunk
+
+    async def _grabar_stream(self, stream, clave: str, parametros: Dict[str, Any], inicio: float):
+        acumulador = _AcumuladorStream()
+        async for chunk in stream:
+            acumulador.agregar(chunk)
+            yield chunk
+        self._backend.cassette.grabar(clave, parametros, acumulador.respuesta(), time.perf_counter() - inicio)
+
+    async def close(self) -> None:
+        if self._real is not None:
+            await self._real.close()
+
+
+def crear_backend_llm(configuracion: Optional[Dict[str, Any]]) -> Optional[BackendGrabacionLLM]:
+    """
+    Backend según 'llm_backend' ('openai' | 'record' | 'replay'); None para la API directa
+    """
+    modo = (configuracion or {}).get('llm_backend', 'openai')
+    if not modo or modo == 'openai':
+        return None
+
+    cassette = CassetteLLM(configuracion.get('llm_cassette_path', '.cache/cassettes/llm.jsonl'))
+    latencia = ModeloLatencia.desde_muestras(
+        cassette.latencias,
+        escala=configuracion.get('llm_replay_latency_scale', 1.0),
+        p50=configuracion.get('llm_replay_latency_p50') or None,
+        p95=configuracion.get('llm_replay_latency_p95') or None,
+    )
+    logger.info(f"📼 Backend LLM en modo {modo}: {cassette.ruta}")
+    return BackendGrabacionLLM(modo, cassette, latencia)
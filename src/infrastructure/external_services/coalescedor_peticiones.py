@@ -0,0 +1,115 @@
+"""
+Coalescencia de lotes idénticos en vuelo (single-flight) compartida por el proceso
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescedorPeticiones:
+    """
+    Una sola llamada a la API por lote idéntico en vuelo
+
+    El primer llamador de una clave (líder) ejecuta el análisis; los que llegan
+    mientras sigue en vuelo (otras sesiones, hilos o event loops) esperan su
+    Future en lugar de enviar la misma petición. Al terminar la entrada se
+    elimina: los lotes posteriores los resuelve la cache del analizador.
+
+    La clave de cache ordena los comentarios, pero el resultado depende del
+    orden, así que además se compara una huella del lote ordenado; si no
+    coincide, el segundo llamador analiza por su cuenta.
+    """
+
+    def __init__(self):
+        self._en_vuelo: Dict[str, Tuple[Future, str]] = {}
+        self._lock = threading.Lock()
+        self.estadisticas = {'lideres': 0, 'coalescidas': 0}
+
+    @staticmethod
+    def _huella(comentarios: List[str]) -> str:
+        return hashlib.sha256('\x1f'.join(comentarios).encode('utf-8')).hexdigest()
+
+    def _unirse(self, clave: str, comentarios: List[str]) -> Tuple[Optional[Future], bool]:
+        """
+        Returns:
+            (future, es_lider). future None = misma clave con otro orden, analizar sin coalescer
+        """
+        huella = self._huella(comentarios)
+        with self._lock:
+            existente = self._en_vuelo.get(clave)
+            if existente is None:
+                futuro: Future = Future()
+                self._en_vuelo[clave] = (futuro, huella)
+                self.estadisticas['lideres'] += 1
+                return futuro, True
+            futuro, huella_lider = existente
+            if huella_lider != huella:
+                return None, True
+            self.estadisticas['coalescidas'] += 1
+            return futuro, False
+
+    def _resolver(self, clave: str, futuro: Future, resultado: Any = None,
+                  error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._en_vuelo.get(clave, (None,))[0] is futuro:
+                del self._en_vuelo[clave]
+        if error is not None:
+            futuro.set_exception(error)
+        else:
+            futuro.set_result(resultado)
+
+    def ejecutar(self, clave: str, comentarios: List[str], calcular: Callable[[], Any]) -> Any:
+        """Ejecuta calcular() una sola vez por lote en vuelo; el resto espera (bloqueando el hilo)"""
+        futuro, es_lider = self._unirse(clave, comentarios)
+        if futuro is None:
+            return calcular()
+        if not es_lider:
+            logger.info("🔗 Lote idéntico ya en vuelo: esperando su resultado en lugar de llamar a la API")
+            return futuro.result()
+        try:
+            resultado = calcular()
+        except BaseException as error:
+            self._resolver(clave, futuro, error=error)
+            raise
+        self._resolver(clave, futuro, resultado)
+        return resultado
+
+    async def ejecutar_async(self, clave: str, comentarios: List[str],
+                             calcular: Callable[[], Awaitable[Any]]) -> Any:
+        """Equivalente asíncrono: el seguidor espera sin bloquear su event loop"""
+        futuro, es_lider = self._unirse(clave, comentarios)
+        if futuro is None:
+            return await calcular()
+        if not es_lider:
+            logger.info("🔗 Lote idéntico ya en vuelo: esperando su resultado en lugar de llamar a la API")
+            return await asyncio.wrap_future(futuro)
+        try:
+            resultado = await calcular()
+        except BaseException as error:
+            self._resolver(clave, futuro, error=error)
+            raise
+        self._resolver(clave, futuro, resultado)
+        return resultado
+
+    def en_vuelo(self) -> int:
+        with self._lock:
+            return len(self._en_vuelo)
+
+
+_coalescedor_global: Optional[CoalescedorPeticiones] = None
+_coalescedor_lock = threading.Lock()
+
+
+def obtener_coalescedor_peticiones() -> CoalescedorPeticiones:
+    """Coalescedor único del proceso (todas las sesiones de Streamlit comparten el módulo)"""
+    global _coalescedor_global
+    if _coalescedor_global is None:
+        with _coalescedor_lock:
+            if _coalescedor_global is None:
+                _coalescedor_global = CoalescedorPeticiones()
+    return _coalescedor_global
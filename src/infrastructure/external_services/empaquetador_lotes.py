@@ -0,0 +1,125 @@
+"""
+Empaquetador de lotes por presupuesto de tokens
+"""
+import math
+import logging
+from typing import List, Optional
+
+from .ai_engine_constants import AIEngineConstants
+
+# Tokenizer local opcional: sin tiktoken se usa una estimación por caracteres
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class EstimadorTokens:
+    """
+    Estima tokens de texto para un modelo
+
+    Usa tiktoken cuando está instalado; si no, una aproximación por caracteres
+    calibrada para español (conservadora: tiende a sobreestimar).
+    """
+
+    def __init__(self, modelo: str):
+        self.modelo = modelo
+        self._codificador = None
+        if TIKTOKEN_AVAILABLE:
+            try:
+                self._codificador = tiktoken.encoding_for_model(modelo)
+            except KeyError:
+                self._codificador = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.debug(f"⚠️ tiktoken no disponible para {modelo}: {e}")
+
+    @property
+    def usa_tokenizer(self) -> bool:
+        return self._codificador is not None
+
+    def contar(self, texto: str) -> int:
+        """Tokens estimados de un texto"""
+        if not texto:
+            return 0
+        if self._codificador is not None:
+            return len(self._codificador.encode(texto, disallowed_special=()))
+        return math.ceil(len(texto) / AIEngineConstants.CHARS_PER_TOKEN_ESTIMATE)
+
+
+class EmpaquetadorLotesTokens:
+    """
+    Agrupa comentarios en lotes que llenan cada petición sin exceder sus límites
+
+    Un lote se cierra cuando el siguiente comentario haría superar:
+    - el máximo de comentarios por llamada del analizador,
+    - el presupuesto de salida (production_token_limit, max_tokens y límite del modelo),
+    - o el contexto del modelo (prompt + comentarios + salida esperada).
+
+    Se conserva el orden original: concatenar los lotes devuelve la lista de entrada.
+    """
+
+    def __init__(self, modelo: str, max_comentarios_lote: int, limite_salida: int,
+                 limite_contexto: Optional[int] = None, estimador: Optional[EstimadorTokens] = None):
+        """
+        Args:
+            modelo: Modelo de OpenAI (para tokenizer y límite de contexto)
+            max_comentarios_lote: Máximo de comentarios que acepta una llamada
+            limite_salida: Tokens de salida máximos por llamada
+            limite_contexto: Contexto total del modelo; por defecto MODEL_TOKEN_LIMITS
+        """
+        self.modelo = modelo
+        self.max_comentarios_lote = max(1, max_comentarios_lote)
+        self.limite_salida = limite_salida
+        self.limite_contexto = limite_contexto or AIEngineConstants.get_model_token_limit(modelo)
+        self.estimador = estimador or EstimadorTokens(modelo)
+
+    def tokens_entrada_comentario(self, comentario: str) -> int:
+        """Tokens que aporta un comentario al prompt (truncado como en el prompt maestro)"""
+        texto = comentario[:AIEngineConstants.MAX_COMMENT_LENGTH]
+        return self.estimador.contar(texto) + AIEngineConstants.PROMPT_TOKENS_PER_COMMENT_OVERHEAD
+
+    def tokens_salida(self, num_comentarios: int) -> int:
+        """Salida esperada para n comentarios (misma fórmula que max_tokens del analizador)"""
+        base = AIEngineConstants.BASE_TOKENS_JSON_STRUCTURE + num_comentarios * AIEngineConstants.TOKENS_PER_COMMENT
+        return int(base * AIEngineConstants.TOKEN_BUFFER_PERCENTAGE)
+
+    def empaquetar(self, comentarios: List[str]) -> List[List[str]]:
+        """
+        Divide los comentarios en lotes respetando los presupuestos de tokens
+
+        Returns:
+            Lista de lotes en el orden original
+        """
+        lotes: List[List[str]] = []
+        lote_actual: List[str] = []
+        entrada_actual = AIEngineConstants.PROMPT_OVERHEAD_TOKENS
+
+        for comentario in comentarios:
+            tokens_comentario = self.tokens_entrada_comentario(comentario)
+            n = len(lote_actual) + 1
+
+            cabe = (
+                n <= self.max_comentarios_lote
+                and self.tokens_salida(n) <= self.limite_salida
+                and entrada_actual + tokens_comentario + self.tokens_salida(n) <= self.limite_contexto
+            )
+
+            if lote_actual and not cabe:
+                lotes.append(lote_actual)
+                lote_actual = []
+                entrada_actual = AIEngineConstants.PROMPT_OVERHEAD_TOKENS
+
+            lote_actual.append(comentario)
+            entrada_actual += tokens_comentario
+
+        if lote_actual:
+            lotes.append(lote_actual)
+
+        if lotes:
+            tamanos = [len(lote) for lote in lotes]
+            logger.info(f"📦 Empaquetado por tokens: {len(comentarios)} comentarios → {len(lotes)} lotes "
+                        f"(min={min(tamanos)}, max={max(tamanos)}, tokenizer={'tiktoken' if self.estimador.usa_tokenizer else 'estimado'})")
+        return lotes
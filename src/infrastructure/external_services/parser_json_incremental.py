@@ -0,0 +1,117 @@
+"""
+Parser JSON incremental para respuestas maestras en streaming
+"""
+import json
+import logging
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ParserComentariosIncremental:
+    """
+    Extrae los objetos del array "comentarios" a medida que llegan los fragmentos
+
+    Recorre el texto una sola vez llevando la profundidad de anidamiento y el estado
+    de strings/escapes, de modo que cada objeto del array se decodifica en cuanto se
+    cierra su llave, sin esperar al final de la respuesta. El texto completo se
+    conserva para el json.loads final y para recuperar lo ya parseado si la
+    respuesta llega truncada.
+    """
+
+    def __init__(self, clave_array: str = 'comentarios'):
+        self.clave_array = clave_array
+        self.comentarios: List[Dict[str, Any]] = []
+
+        self._texto = ''
+        self._pos = 0
+
+        self._profundidad = 0
+        self._en_string = False
+        self._escape = False
+        self._inicio_string = -1
+        self._ultimo_string: Optional[str] = None
+
+        self._profundidad_array: Optional[int] = None  # Profundidad del array objetivo mientras está abierto
+        self._array_cerrado = False
+        self._inicio_objeto = -1
+
+    def alimentar(self, fragmento: str) -> List[Dict[str, Any]]:
+        """
+        Procesa un fragmento del stream
+
+        Returns:
+            Objetos del array completados en este fragmento (en orden)
+        """
+        if not fragmento:
+            return []
+
+        self._texto += fragmento
+        nuevos = []
+        texto = self._texto
+
+        for pos in range(self._pos, len(texto)):
+            caracter = texto[pos]
+
+            if self._en_string:
+                if self._escape:
+                    self._escape = False
+                elif caracter == '\\':
+                    self._escape = True
+                elif caracter == '"':
+                    self._en_string = False
+                    if self._profundidad == 1:
+                        self._ultimo_string = texto[self._inicio_string + 1:pos]
+                continue
+
+            if caracter == '"':
+                self._en_string = True
+                self._inicio_string = pos
+            elif caracter in '{[':
+                self._profundidad += 1
+                if (caracter == '[' and self._profundidad == 2 and self._profundidad_array is None
+                        and not self._array_cerrado and self._ultimo_string == self.clave_array):
+                    self._profundidad_array = self._profundidad
+                elif caracter == '{' and self._profundidad_array is not None and self._profundidad == self._profundidad_array + 1:
+                    self._inicio_objeto = pos
+            elif caracter in '}]':
+                if (caracter == '}' and self._profundidad_array is not None
+                        and self._profundidad == self._profundidad_array + 1 and self._inicio_objeto >= 0):
+                    objeto = self._decodificar(texto[self._inicio_objeto:pos + 1])
+                    if objeto is not None:
+                        self.comentarios.append(objeto)
+                        nuevos.append(objeto)
+                    self._inicio_objeto = -1
+                elif caracter == ']' and self._profundidad == self._profundidad_array:
+                    self._profundidad_array = None
+                    self._array_cerrado = True
+                self._profundidad -= 1
+
+        self._pos = len(texto)
+        return nuevos
+
+    def _decodificar(self, fragmento_objeto: str) -> Optional[Dict[str, Any]]:
+        try:
+            objeto = json.loads(fragmento_objeto)
+            return objeto if isinstance(objeto, dict) else None
+        except json.JSONDecodeError as e:
+            logger.debug(f"⚠️ Objeto de streaming no decodificable: {e}")
+            return None
+
+    @property
+    def texto(self) -> str:
+        """Texto completo recibido hasta el momento"""
+        return self._texto
+
+    def esta_completo(self) -> bool:
+        """True si el documento JSON raíz se cerró"""
+        return self._pos > 0 and self._profundidad == 0 and not self._en_string
+
+    def finalizar(self) -> Dict[str, Any]:
+        """
+        Decodifica el documento completo
+
+        Raises:
+            json.JSONDecodeError: Si la respuesta está truncada o no es JSON válido
+        """
+        return json.loads(self._texto)
@@ -0,0 +1,240 @@
+"""
+Planificador de peticiones a OpenAI por presupuesto de RPM/TPM compartido por el proceso
+"""
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parsear_duracion(valor: Optional[str]) -> Optional[float]:
+    """Convierte '20ms', '1.5s', '6m0s' o '1h2m3s' (headers x-ratelimit-reset-*) a segundos"""
+    if not valor:
+        return None
+    valor = valor.strip()
+    try:
+        return float(valor)
+    except ValueError:
+        pass
+    total = 0.0
+    encontrado = False
+    for cantidad, unidad in re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', valor):
+        encontrado = True
+        total += float(cantidad) * {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}[unidad]
+    return total if encontrado else None
+
+
+class CubetaTokens:
+    """Cubeta que se rellena de forma continua hasta 'capacidad' por minuto"""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self.disponible = float(capacidad)
+        self._ultimo = time.monotonic()
+
+    def _rellenar(self) -> None:
+        ahora = time.monotonic()
+        self.disponible = min(self.capacidad, self.disponible + (ahora - self._ultimo) * self.capacidad / 60.0)
+        self._ultimo = ahora
+
+    def espera_para(self, cantidad: float) -> float:
+        """Segundos hasta poder consumir 'cantidad' (0 si ya se puede)"""
+        self._rellenar()
+        faltante = min(cantidad, self.capacidad) - self.disponible
+        return max(0.0, faltante * 60.0 / self.capacidad)
+
+    def consumir(self, cantidad: float) -> None:
+        self.disponible -= min(cantidad, self.capacidad)
+
+    def sincronizar(self, limite: Optional[int], restante: Optional[int]) -> None:
+        """Ajusta a lo informado por la API (nunca más optimista que la vista local)"""
+        self._rellenar()
+        if limite and limite != self.capacidad:
+            self.capacidad = limite
+            self.disponible = min(self.disponible, limite)
+        if restante is not None:
+            self.disponible = min(self.disponible, float(restante))
+
+
+class PlanificadorLimitesAPI:
+    """
+    Admite llamadas solo cuando hay presupuesto de peticiones y tokens por minuto
+
+    - Dos cubetas (RPM y TPM) que se rellenan de forma continua; cada llamada
+      consume 1 petición y sus tokens estimados (prompt + max_tokens), igual que
+      la API, que descuenta max_tokens al admitir y no lo devuelve.
+    - Los headers x-ratelimit-* de cada respuesta ajustan límites y restantes;
+      un 429 detiene las admisiones hasta retry-after.
+    - La concurrencia se adapta (AIMD): se reduce a la mitad ante un 429 o con
+      presupuesto casi agotado y crece de a uno mientras sobra presupuesto.
+
+    Las esperas son bloqueantes con Condition (hilos) o asyncio.sleep (event loop),
+    nunca reintentos: así los workers no generan tormentas de 429.
+    """
+
+    UMBRAL_HOLGURA = 0.5    # Fracción restante por encima de la cual se crece
+    UMBRAL_ESCASEZ = 0.1    # Fracción restante por debajo de la cual se reduce
+    ESPERA_MAXIMA_SONDEO = 1.0
+
+    def __init__(self, rpm: int = 500, tpm: int = 200000, max_concurrencia: int = 8):
+        self.peticiones = CubetaTokens(rpm)
+        self.tokens = CubetaTokens(tpm)
+        self.max_concurrencia = max(1, max_concurrencia)
+        self.limite_concurrencia = self.max_concurrencia
+        self.en_vuelo = 0
+        self._pausa_hasta = 0.0
+        self._condicion = threading.Condition()
+        self.estadisticas = {'admitidas': 0, 'esperas': 0, 'rechazos_429': 0, 'segundos_espera': 0.0}
+
+    # ---- admisión ------------------------------------------------------
+
+    def _intentar_admitir(self, tokens: int) -> Tuple[bool, Optional[float]]:
+        """
+        Admite si hay cupo (llamar con la condición tomada)
+
+        Returns:
+            (admitida, segundos de espera sugeridos; None = esperar a que se libere un hueco)
+        """
+        if self.en_vuelo >= self.limite_concurrencia:
+            return False, None
+        espera = max(
+            self._pausa_hasta - time.monotonic(),
+            self.peticiones.espera_para(1),
+            self.tokens.espera_para(tokens),
+        )
+        if espera > 0:
+            return False, espera
+        self.peticiones.consumir(1)
+        self.tokens.consumir(tokens)
+        self.en_vuelo += 1
+        self.estadisticas['admitidas'] += 1
+        return True, 0.0
+
+    def adquirir(self, tokens: int) -> None:
+        """Bloquea el hilo hasta que haya presupuesto y hueco de concurrencia"""
+        inicio = time.monotonic()
+        with self._condicion:
+            while True:
+                admitida, espera = self._intentar_admitir(tokens)
+                if admitida:
+                    break
+                self.estadisticas['esperas'] += 1
+                self._condicion.wait(espera)
+            self.estadisticas['segundos_espera'] += time.monotonic() - inicio
+
+    async def adquirir_async(self, tokens: int) -> None:
+        """Equivalente asíncrono de adquirir: espera sin bloquear el event loop"""
+        inicio = time.monotonic()
+        while True:
+            with self._condicion:
+                admitida, espera = self._intentar_admitir(tokens)
+                if admitida:
+                    self.estadisticas['segundos_espera'] += time.monotonic() - inicio
+                    return
+                self.estadisticas['esperas'] += 1
+            await asyncio.sleep(min(espera or 0.05, self.ESPERA_MAXIMA_SONDEO))
+
+    def liberar(self) -> None:
+        with self._condicion:
+            self.en_vuelo = max(0, self.en_vuelo - 1)
+            self._condicion.notify_all()
+
+    @contextmanager
+    def reservar(self, tokens: int):
+        """Ocupa un hueco de concurrencia mientras dura la llamada (incluido el stream)"""
+        self.adquirir(tokens)
+        try:
+            yield
+        finally:
+            self.liberar()
+
+    @asynccontextmanager
+    async def reservar_async(self, tokens: int):
+        await self.adquirir_async(tokens)
+        try:
+            yield
+        finally:
+            self.liberar()
+
+    # ---- retroalimentación de la API -----------------------------------
+
+    def registrar_respuesta(self, status: int, headers: Any) -> None:
+        """Actualiza presupuesto y concurrencia con los headers de una respuesta HTTP"""
+        obtener = headers.get if hasattr(headers, 'get') else (lambda _k: None)
+
+        def entero(nombre: str) -> Optional[int]:
+            valor = obtener(nombre)
+            try:
+                return int(valor) if valor is not None else None
+            except ValueError:
+                return None
+
+        limite_req, restante_req = entero('x-ratelimit-limit-requests'), entero('x-ratelimit-remaining-requests')
+        limite_tok, restante_tok = entero('x-ratelimit-limit-tokens'), entero('x-ratelimit-remaining-tokens')
+
+        with self._condicion:
+            self.peticiones.sincronizar(limite_req, restante_req)
+            self.tokens.sincronizar(limite_tok, restante_tok)
+
+            if status == 429:
+                espera = (parsear_duracion(obtener('retry-after-ms')) or 0) / 1000 or \
+                    parsear_duracion(obtener('retry-after')) or \
+                    max(parsear_duracion(obtener('x-ratelimit-reset-requests')) or 0,
+                        parsear_duracion(obtener('x-ratelimit-reset-tokens')) or 0) or 1.0
+                self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + espera)
+                self.estadisticas['rechazos_429'] += 1
+                self._reducir_concurrencia(f"429, pausa {espera:.2f}s")
+            else:
+                fracciones = [
+                    restante / limite for restante, limite in ((restante_req, limite_req), (restante_tok, limite_tok))
+                    if restante is not None and limite
+                ]
+                if fracciones and min(fracciones) < self.UMBRAL_ESCASEZ:
+                    self._reducir_concurrencia(f"presupuesto restante {min(fracciones):.0%}")
+                elif fracciones and min(fracciones) > self.UMBRAL_HOLGURA:
+                    self.limite_concurrencia = min(self.max_concurrencia, self.limite_concurrencia + 1)
+            self._condicion.notify_all()
+
+    def _reducir_concurrencia(self, motivo: str) -> None:
+        nuevo = max(1, self.limite_concurrencia // 2)
+        if nuevo != self.limite_concurrencia:
+            logger.info(f"🚦 Concurrencia API {self.limite_concurrencia} → {nuevo} ({motivo})")
+        self.limite_concurrencia = nuevo
+
+    def hook_httpx(self, response: Any) -> None:
+        """Event hook 'response' para httpx.Client"""
+        self.registrar_respuesta(response.status_code, response.headers)
+
+    async def hook_httpx_async(self, response: Any) -> None:
+        """Event hook 'response' para httpx.AsyncClient"""
+        self.registrar_respuesta(response.status_code, response.headers)
+
+
+_planificadores: Dict[Tuple[str, str], PlanificadorLimitesAPI] = {}
+_planificadores_lock = threading.Lock()
+
+
+def obtener_planificador_limites(api_key: str, modelo: str,
+                                 configuracion: Optional[Dict[str, Any]] = None) -> PlanificadorLimitesAPI:
+    """
+    Planificador único del proceso por clave+modelo (los límites de OpenAI son por organización y modelo)
+
+    La configuración solo se usa al crearlo; los headers de la API corrigen los límites después.
+    """
+    huella = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]
+    clave = (huella, modelo)
+    with _planificadores_lock:
+        if clave not in _planificadores:
+            configuracion = configuracion or {}
+            _planificadores[clave] = PlanificadorLimitesAPI(
+                rpm=int(configuracion.get('rate_limit_rpm', 500)),
+                tpm=int(configuracion.get('rate_limit_tpm', 200000)),
+                max_concurrencia=int(configuracion.get('max_concurrent_batches', 8)),
+            )
+        return _planificadores[clave]
@@ -4,8 +4,9 @@ HIGH-004 FIX: Intelligent retry logic with exponential backoff for OpenAI API
 """
 import time
 import random
+import asyncio
 import logging
-from typing import Optional, Callable, TypeVar, Any
+from typing import Optional, Callable, TypeVar, Any, Awaitable
 from functools import wraps
 import openai
 
@@ -57,64 +58,108 @@ class RetryStrategy:
                     # Call the original function
                     return func(*args, **kwargs)
                     
-                except openai.RateLimitError as e:
-                    last_exception = e
-                    if attempt == self.max_retries:
-                        break
-                    
-                    # Rate limit errors should always be retried with exponential backoff
-                    delay = self._calculate_delay(attempt)
-                    logger.warning(f"⏳ Rate limit hit, retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries + 1})")
-                    time.sleep(delay)
-                    
-                except openai.APIConnectionError as e:
-                    last_exception = e
-                    if attempt == self.max_retries:
-                        break
-                    
-                    # Connection errors might be transient, retry with shorter delay
-                    delay = self._calculate_delay(attempt, factor=0.5)
-                    logger.warning(f"🌐 Connection error, retrying in {delay:.2f}s: {str(e)}")
-                    time.sleep(delay)
-                    
-                except openai.InternalServerError as e:
+                except Exception as e:
                     last_exception = e
-                    if attempt == self.max_retries:
+                    delay = self._get_retry_delay(e, attempt)
+                    if delay is None:
                         break
-                    
-                    # Server errors might be transient
-                    delay = self._calculate_delay(attempt)
-                    logger.warning(f"🔧 Server error, retrying in {delay:.2f}s: {str(e)}")
                     time.sleep(delay)
-                    
-                except openai.AuthenticationError as e:
-                    # Authentication errors should not be retried
-                    logger.error(f"🔐 Authentication error - not retrying: {str(e)}")
-                    raise IAException("Authentication failed - check API key", "OpenAI", str(e))
-                    
-                except openai.BadRequestError as e:
-                    # Bad request errors should not be retried
-                    logger.error(f"❌ Bad request error - not retrying: {str(e)}")
-                    raise IAException("Bad request to OpenAI API", "OpenAI", str(e))
-                    
-                except Exception as e:
-                    # Unknown errors - try once more then fail
-                    if attempt < self.max_retries:
-                        last_exception = e
-                        delay = self.base_delay
-                        logger.warning(f"❓ Unknown error, retrying once in {delay}s: {str(e)}")
-                        time.sleep(delay)
-                    else:
-                        raise
             
             # All retries exhausted
-            error_msg = f"Max retries ({self.max_retries}) exhausted"
-            if last_exception:
-                error_msg += f": {str(last_exception)}"
-            raise IAException(error_msg, "OpenAI", str(last_exception))
+            raise self._exhausted_error(last_exception)
         
         return wrapper
     
+    async def retry_async(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """
+        Apply the same retry policy to a coroutine function without blocking the event loop
+        
+        Args:
+            func: Coroutine function to call with retry
+            *args: Function arguments
+            **kwargs: Function keyword arguments
+            
+        Returns:
+            Awaited function result
+        """
+        last_exception = None
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await func(*args, **kwargs)
+                
+            except Exception as e:
+                last_exception = e
+                delay = self._get_retry_delay(e, attempt)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        
+        raise self._exhausted_error(last_exception)
+    
+    def _get_retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Classify a failed attempt and compute the backoff before the next one
+        
+        Args:
+            error: Exception raised by the attempt
+            attempt: Current attempt number (0-based)
+            
+        Returns:
+            Delay in seconds, or None when retries are exhausted for a retryable error.
+            Non-retryable errors are raised directly.
+        """
+        if isinstance(error, openai.RateLimitError):
+            if attempt == self.max_retries:
+                return None
+            
+            # Rate limit errors should always be retried with exponential backoff
+            delay = self._calculate_delay(attempt)
+            logger.warning(f"⏳ Rate limit hit, retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries + 1})")
+            return delay
+            
+        if isinstance(error, openai.APIConnectionError):
+            if attempt == self.max_retries:
+                return None
+            
+            # Connection errors might be transient, retry with shorter delay
+            delay = self._calculate_delay(attempt, factor=0.5)
+            logger.warning(f"🌐 Connection error, retrying in {delay:.2f}s: {str(error)}")
+            return delay
+            
+        if isinstance(error, openai.InternalServerError):
+            if attempt == self.max_retries:
+                return None
+            
+            # Server errors might be transient
+            delay = self._calculate_delay(attempt)
+            logger.warning(f"🔧 Server error, retrying in {delay:.2f}s: {str(error)}")
+            return delay
+            
+        if isinstance(error, openai.AuthenticationError):
+            # Authentication errors should not be retried
+            logger.error(f"🔐 Authentication error - not retrying: {str(error)}")
+            raise IAException("Authentication failed - check API key", "OpenAI", str(error))
+            
+        if isinstance(error, openai.BadRequestError):
+            # Bad request errors should not be retried
+            logger.error(f"❌ Bad request error - not retrying: {str(error)}")
+            raise IAException("Bad request to OpenAI API", "OpenAI", str(error))
+        
+        # Unknown errors - try once more then fail
+        if attempt < self.max_retries:
+            delay = self.base_delay
+            logger.warning(f"❓ Unknown error, retrying once in {delay}s: {str(error)}")
+            return delay
+        raise error
+    
+    def _exhausted_error(self, last_exception: Optional[Exception]) -> IAException:
+        """Build the error raised once every retry has been used"""
+        error_msg = f"Max retries ({self.max_retries}) exhausted"
+        if last_exception:
+            error_msg += f": {str(last_exception)}"
+        return IAException(error_msg, "OpenAI", str(last_exception))
+    
     def _calculate_delay(self, attempt: int, factor: float = 1.0) -> float:
         """
         Calculate delay for exponential backoff with optional jitter
@@ -188,6 +233,19 @@ class OpenAIRetryWrapper:
         
         return _make_completion()
     
+    async def wrap_chat_completion_async(self, client: openai.AsyncOpenAI, **kwargs) -> Any:
+        """
+        Async counterpart of wrap_chat_completion for AsyncOpenAI clients
+        
+        Args:
+            client: AsyncOpenAI client instance
+            **kwargs: Arguments for chat completion
+            
+        Returns:
+            Chat completion response
+        """
+        return await self.retry_strategy.retry_async(client.chat.completions.create, **kwargs)
+    
     def wrap_api_call(self, api_func: Callable, *args, **kwargs) -> Any:
         """
         Generic wrapper for any OpenAI API call
@@ -205,6 +263,20 @@ class OpenAIRetryWrapper:
             return api_func(*args, **kwargs)
         
         return _make_api_call()
+    
+    async def wrap_api_call_async(self, api_func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Async counterpart of wrap_api_call for coroutine functions
+        
+        Args:
+            api_func: Coroutine function to call
+            *args: Function arguments
+            **kwargs: Function keyword arguments
+            
+        Returns:
+            API response
+        """
+        return await self.retry_strategy.retry_async(api_func, *args, **kwargs)
 
 
 # Default retry configurations for different scenarios
@@ -0,0 +1,140 @@
+"""
+Sonda de disponibilidad de la API de OpenAI compartida por el proceso
+"""
+import time
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, Tuple, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+
+class SondaDisponibilidadAPI:
+    """
+    Verificación perezosa y cacheada de la disponibilidad de la API
+
+    En lugar de una chat completion de prueba (con coste) al construir cada
+    analizador, se consulta models.retrieve(modelo) solo cuando alguien pregunta
+    por la disponibilidad y el resultado se comparte por clave+modelo con TTL.
+    Las llamadas reales también actualizan el estado: un éxito confirma la
+    disponibilidad sin sonda y un error de autenticación la invalida.
+    """
+
+    TTL_POSITIVO_DEFECTO = 300   # Segundos que se confía en un resultado disponible
+    TTL_NEGATIVO_MAXIMO = 30     # Los fallos se reintentan antes (red intermitente)
+
+    def __init__(self):
+        self._estados: Dict[Tuple[str, str], Tuple[bool, float]] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.sondeos_realizados = 0
+
+    @staticmethod
+    def _clave(api_key: str, modelo: str) -> Tuple[str, str]:
+        # Nunca guardar la API key en claro
+        huella = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]
+        return huella, modelo
+
+    def _lock_para(self, clave: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            if clave not in self._locks:
+                self._locks[clave] = threading.Lock()
+            return self._locks[clave]
+
+    def _estado_vigente(self, clave: Tuple[str, str], ttl: float) -> Optional[bool]:
+        estado = self._estados.get(clave)
+        if estado is None:
+            return None
+        disponible, momento = estado
+        vigencia = ttl if disponible else min(ttl, self.TTL_NEGATIVO_MAXIMO)
+        if time.time() - momento > vigencia:
+            return None
+        return disponible
+
+    def estado_conocido(self, api_key: str, modelo: str, ttl: Optional[float] = None) -> Optional[bool]:
+        """Estado cacheado sin sondear; None si no hay información vigente"""
+        ttl = self.TTL_POSITIVO_DEFECTO if ttl is None else ttl
+        return self._estado_vigente(self._clave(api_key, modelo), ttl)
+
+    def verificar(self, cliente: Any, api_key: str, modelo: str, ttl: Optional[float] = None) -> bool:
+        """
+        Devuelve la disponibilidad cacheada o sondea una vez (por clave+modelo)
+
+        Args:
+            cliente: Cliente openai.OpenAI con el que sondear
+            api_key: Clave usada por el cliente (solo para la clave del cache)
+            modelo: Modelo que se va a usar
+            ttl: Vigencia de un resultado positivo en segundos
+        """
+        ttl = self.TTL_POSITIVO_DEFECTO if ttl is None else ttl
+        clave = self._clave(api_key, modelo)
+
+        estado = self._estado_vigente(clave, ttl)
+        if estado is not None:
+            return estado
+
+        # Un solo sondeo concurrente por clave; el resto espera y reutiliza el resultado
+        with self._lock_para(clave):
+            estado = self._estado_vigente(clave, ttl)
+            if estado is not None:
+                return estado
+
+            disponible = self._sondear(cliente, modelo)
+            self._estados[clave] = (disponible, time.time())
+            return disponible
+
+    def _sondear(self, cliente: Any, modelo: str) -> bool:
+        self.sondeos_realizados += 1
+        try:
+            cliente.models.retrieve(modelo)
+            logger.info(f"✅ API OpenAI disponible (modelo {modelo})")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ OpenAI no disponible: {str(e)}")
+            return False
+
+    def registrar_resultado(self, api_key: str, modelo: str, disponible: bool) -> None:
+        """Actualiza el estado a partir de una llamada real (sin sondear)"""
+        self._estados[self._clave(api_key, modelo)] = (disponible, time.time())
+
+    def registrar_error(self, api_key: str, modelo: str, error: BaseException) -> None:
+        """Marca no disponible solo ante errores de credenciales o de modelo inexistente"""
+        if es_error_permanente(error):
+            logger.warning(f"⚠️ API marcada como no disponible por error de credenciales/modelo: {error}")
+            self.registrar_resultado(api_key, modelo, False)
+
+    def invalidar(self, api_key: Optional[str] = None, modelo: Optional[str] = None) -> None:
+        """Descarta el estado cacheado (todo, o solo una clave+modelo)"""
+        if api_key is None or modelo is None:
+            self._estados.clear()
+        else:
+            self._estados.pop(self._clave(api_key, modelo), None)
+
+
+def es_error_permanente(error: Optional[BaseException]) -> bool:
+    """True si el error (o su causa encadenada) es de autenticación, permisos o modelo"""
+    tipos = (openai.AuthenticationError, openai.PermissionDeniedError, openai.NotFoundError)
+    visto = set()
+    while error is not None and id(error) not in visto:
+        if isinstance(error, tipos):
+            return True
+        visto.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+_sonda_global: Optional[SondaDisponibilidadAPI] = None
+_sonda_lock = threading.Lock()
+
+
+def obtener_sonda_disponibilidad() -> SondaDisponibilidadAPI:
+    """Sonda única del proceso (compartida entre sesiones y contenedores)"""
+    global _sonda_global
+    if _sonda_global is None:
+        with _sonda_lock:
+            if _sonda_global is None:
+                _sonda_global = SondaDisponibilidadAPI()
+    return _sonda_global
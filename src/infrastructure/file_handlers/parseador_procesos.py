@@ -0,0 +1,230 @@
+"""
+Parseo de archivos subidos en procesos worker, fuera del GIL del proceso de Streamlit
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+from ..cache.cache_archivos_parseados import ArchivoParseado
+from ...shared.exceptions.archivo_exception import ArchivoException
+
+# Columnas devueltas como un stream IPC de Arrow (un solo buffer) si pyarrow está disponible
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def empaquetar_parseado(parseado: ArchivoParseado) -> Dict[str, Any]:
+    """
+    Metadatos + columnas de comentarios listos para cruzar de proceso
+
+    Con pyarrow las cuatro columnas viajan como un único buffer IPC (los
+    textos contiguos, sin un objeto Python por comentario en el pickle).
+    """
+    paquete = {
+        'columna_comentario': parseado.columna_comentario,
+        'columnas': parseado.columnas,
+        'total_filas': parseado.total_filas,
+        'encoding': parseado.encoding,
+    }
+    if not PYARROW_AVAILABLE:
+        paquete['columnas_datos'] = (parseado.textos, parseado.indices, parseado.nps, parseado.notas)
+        return paquete
+
+    tabla = pa.table({
+        'comentario': pa.array(parseado.textos, type=pa.string()),
+        'indice_original': pa.array(parseado.indices, type=pa.int64()),
+        'nps': pa.array(parseado.nps, type=pa.int64()),
+        'nota': pa.array(parseado.notas, type=pa.float64()),
+    })
+    destino = pa.BufferOutputStream()
+    with pa.ipc.new_stream(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    paquete['arrow'] = destino.getvalue().to_pybytes()
+    return paquete
+
+
+def desempaquetar_parseado(paquete: Dict[str, Any], huella: str = '', desplazamiento: int = 0) -> ArchivoParseado:
+    """ArchivoParseado desde un paquete del worker; desplazamiento se suma a indice_original"""
+    parseado = ArchivoParseado(
+        huella=huella,
+        columna_comentario=paquete['columna_comentario'],
+        columnas=paquete['columnas'],
+        total_filas=paquete['total_filas'],
+        encoding=paquete['encoding'],
+    )
+    if 'arrow' in paquete:
+        tabla = pa.ipc.open_stream(paquete['arrow']).read_all()
+        parseado.textos = tabla.column('comentario').to_pylist()
+        parseado.indices = tabla.column('indice_original').to_pylist()
+        parseado.nps = tabla.column('nps').to_pylist()
+        parseado.notas = tabla.column('nota').to_pylist()
+    else:
+        parseado.textos, parseado.indices, parseado.nps, parseado.notas = (
+            list(columna) for columna in paquete['columnas_datos'])
+    if desplazamiento:
+        parseado.indices = [indice + desplazamiento for indice in parseado.indices]
+    return parseado
+
+
+def parsear_en_worker(contenido: bytes, nombre: str, hoja: Optional[int]) -> Dict[str, Any]:
+    """
+    Punto de entrada del proceso worker: parsea un CSV (hoja=None) o una hoja de un libro
+
+    Recibe bytes y devuelve el paquete compacto; nunca un DataFrame.
+    """
+    from .lector_archivos_excel import LectorArchivosExcel
+
+    archivo = BytesIO(contenido)
+    archivo.name = nombre
+    parseado = ArchivoParseado(huella='', columna_comentario='', columnas=[], total_filas=0)
+    lector = LectorArchivosExcel()
+    if hoja is None:
+        bloques = lector._parsear_por_bloques(archivo, 5000, parseado)
+    else:
+        bloques = lector._leer_excel_por_bloques(archivo, 5000, parseado, hoja=hoja)
+    for bloque in bloques:
+        parseado.agregar(bloque)
+    return empaquetar_parseado(parseado)
+
+
+def contar_hojas(contenido: bytes) -> int:
+    """Hojas del libro (solo lee workbook.xml, no las hojas)"""
+    from openpyxl import load_workbook
+
+    libro = load_workbook(BytesIO(contenido), read_only=True)
+    try:
+        return len(libro.worksheets)
+    finally:
+        libro.close()
+
+
+class ParseadorProcesos:
+    """
+    Pool de procesos para parsear archivos grandes sin bloquear el proceso web
+
+    openpyxl es Python puro y retiene el GIL durante segundos con un XLSX
+    grande: todas las sesiones servidas por el mismo proceso se congelan.
+    El hilo que pide el parseo solo espera el resultado (liberando el GIL)
+    y recibe de vuelta las columnas extraídas, no el DataFrame. Con
+    varias hojas, cada hoja es una tarea del pool y se parsean en paralelo.
+
+    Los workers se crean con 'spawn': el proceso de Streamlit tiene hilos
+    y un fork podría heredar locks tomados.
+    """
+
+    def __init__(self, max_workers: int = 2, umbral_bytes: int = 1024 * 1024):
+        """
+        Args:
+            max_workers: Procesos worker
+            umbral_bytes: Tamaño desde el cual conviene pagar el envío al worker
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.umbral_bytes = umbral_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _obtener_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def aplica(self, tamano_bytes: int) -> bool:
+        return tamano_bytes >= self.umbral_bytes
+
+    def parsear(self, contenido: bytes, nombre: str, todas_las_hojas: bool = False,
+                huella: str = '') -> ArchivoParseado:
+        """
+        Parsea el archivo en el pool, con el mismo resultado que LectorArchivosExcel en el proceso
+
+        Con todas_las_hojas cada hoja va a un worker; las hojas sin columna de
+        comentarios se omiten y los índices siguen la concatenación de las leídas.
+        """
+        if nombre.lower().endswith('.csv'):
+            hojas: List[Optional[int]] = [None]
+        elif todas_las_hojas:
+            hojas = list(range(contar_hojas(contenido)))
+        else:
+            hojas = [0]
+
+        try:
+            executor = self._obtener_executor()
+            futuros = [executor.submit(parsear_en_worker, contenido, nombre, hoja) for hoja in hojas]
+            paquetes = []
+            for futuro in futuros:
+                try:
+                    paquetes.append(futuro.result())
+                except ArchivoException as e:
+                    if len(hojas) == 1:
+                        raise
+                    paquetes.append(e)
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            raise
+
+        return self._combinar(paquetes, huella)
+
+    @staticmethod
+    def _combinar(paquetes: List[Any], huella: str) -> ArchivoParseado:
+        """Une las hojas en orden; falla solo si ninguna tenía comentarios"""
+        resultado: Optional[ArchivoParseado] = None
+        for paquete in paquetes:
+            if isinstance(paquete, ArchivoException):
+                logger.info(f"📄 Hoja omitida: {str(paquete)}")
+                continue
+            desplazamiento = resultado.total_filas if resultado else 0
+            parte = desempaquetar_parseado(paquete, huella, desplazamiento)
+            if resultado is None:
+                resultado = parte
+                continue
+            resultado.textos.extend(parte.textos)
+            resultado.indices.extend(parte.indices)
+            resultado.nps.extend(parte.nps)
+            resultado.notas.extend(parte.notas)
+            resultado.total_filas += parte.total_filas
+        if resultado is None:
+            raise next(p for p in paquetes if isinstance(p, ArchivoException))
+        return resultado
+
+    def cerrar(self, esperar: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=esperar)
+                self._executor = None
+
+
+_parseador_global: Optional[ParseadorProcesos] = None
+_parseador_lock = threading.Lock()
+
+
+def obtener_parseador_procesos(configuracion: Optional[Dict[str, Any]] = None) -> Optional[ParseadorProcesos]:
+    """
+    Pool único del proceso (None si 'parse_process_workers' es 0)
+
+    Los workers se lanzan recién con el primer archivo que supera el umbral.
+    La configuración solo se usa al crearlo.
+    """
+    global _parseador_global
+    configuracion = configuracion or {}
+    workers = configuracion.get('parse_process_workers', 2)
+    if not workers:
+        return None
+    if _parseador_global is None:
+        with _parseador_lock:
+            if _parseador_global is None:
+                _parseador_global = ParseadorProcesos(
+                    max_workers=workers,
+                    umbral_bytes=int(configuracion.get('parse_process_min_mb', 1) * 1024 * 1024)
+                )
+    return _parseador_global
@@ -0,0 +1,253 @@
+"""
+Trabajos de análisis en segundo plano, con un pool acotado compartido por todas las sesiones
+"""
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EstadoTrabajo(Enum):
+    EN_COLA = 'en_cola'
+    EJECUTANDO = 'ejecutando'
+    COMPLETADO = 'completado'
+    FALLIDO = 'fallido'
+    CANCELADO = 'cancelado'
+
+    @property
+    def terminado(self) -> bool:
+        return self in (EstadoTrabajo.COMPLETADO, EstadoTrabajo.FALLIDO, EstadoTrabajo.CANCELADO)
+
+
+@dataclass
+class TrabajoAnalisis:
+    """Estado de un trabajo; lo escribe el hilo worker y lo lee el script de Streamlit"""
+    id: str
+    propietario: str
+    nombre: str
+    funcion: Callable[[Callable[[Dict[str, Any]], None]], Any]
+    estado: EstadoTrabajo = EstadoTrabajo.EN_COLA
+    creado: float = field(default_factory=time.time)
+    iniciado: Optional[float] = None
+    finalizado: Optional[float] = None
+    progreso: Dict[str, Any] = field(default_factory=dict)
+    resultado: Any = None
+    error: Optional[str] = None
+
+    def instantanea(self) -> Dict[str, Any]:
+        """Copia consistente para mostrar en la UI (sin la función ni referencias compartidas)"""
+        return {
+            'id': self.id,
+            'nombre': self.nombre,
+            'estado': self.estado.value,
+            'terminado': self.estado.terminado,
+            'creado': self.creado,
+            'iniciado': self.iniciado,
+            'finalizado': self.finalizado,
+            'progreso': dict(self.progreso),
+            'error': self.error,
+        }
+
+
+class GestorTrabajosAnalisis:
+    """
+    Cola de trabajos de análisis ejecutados fuera del hilo del script de Streamlit
+
+    enviar() devuelve el id al instante; el fragmento de progreso consulta
+    estado() en cada refresco. Los trabajos viven en el proceso, no en la
+    sesión, así que sobreviven a los reruns de la página.
+
+    El pool (max_workers) limita cuántos análisis corren a la vez en la máquina.
+    Los trabajos de un mismo propietario se ejecutan de a uno y en orden de
+    envío: comparten su repositorio de sesión y no deben pisarse, y así un
+    usuario con varios archivos en cola no acapara el pool.
+    """
+
+    def __init__(self, max_workers: int = 2, retencion_segundos: Optional[float] = 3600):
+        """
+        Args:
+            max_workers: Trabajos ejecutándose simultáneamente en todo el proceso
+            retencion_segundos: Tiempo que se conserva un trabajo terminado; None = hasta consultarlo
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.retencion_segundos = retencion_segundos
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="trabajo_analisis")
+        self._trabajos: Dict[str, TrabajoAnalisis] = {}
+        self._pendientes: Dict[str, Deque[str]] = {}
+        self._activos: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, propietario: str, nombre: str,
+               funcion: Callable[[Callable[[Dict[str, Any]], None]], Any]) -> str:
+        """
+        Encola un trabajo y devuelve su id sin esperar
+
+        Args:
+            propietario: Identificador de la sesión dueña del trabajo
+            nombre: Descripción para la UI (p. ej. el nombre del archivo)
+            funcion: Recibe un callback de progreso y devuelve el resultado del trabajo
+        """
+        trabajo = TrabajoAnalisis(id=uuid.uuid4().hex[:12], propietario=propietario,
+                                  nombre=nombre, funcion=funcion)
+        with self._lock:
+            self._purgar_terminados()
+            self._trabajos[trabajo.id] = trabajo
+            self._pendientes.setdefault(propietario, deque()).append(trabajo.id)
+            self._despachar(propietario)
+        logger.info(f"📥 Trabajo {trabajo.id} encolado: {nombre}")
+        return trabajo.id
+
+    def _despachar(self, propietario: str) -> None:
+        """Lanza el siguiente trabajo del propietario si no tiene uno en curso (con _lock tomado)"""
+        if propietario in self._activos:
+            return
+        pendientes = self._pendientes.get(propietario)
+        while pendientes:
+            trabajo = self._trabajos.get(pendientes.popleft())
+            if trabajo is None or trabajo.estado is not EstadoTrabajo.EN_COLA:
+                continue
+            self._activos[propietario] = trabajo.id
+            self._executor.submit(self._ejecutar, trabajo)
+            return
+        self._pendientes.pop(propietario, None)
+
+    def _ejecutar(self, trabajo: TrabajoAnalisis) -> None:
+        with self._lock:
+            if trabajo.estado is not EstadoTrabajo.EN_COLA:
+                # Cancelado entre el despacho y el arranque del worker
+                self._activos.pop(trabajo.propietario, None)
+                self._despachar(trabajo.propietario)
+                return
+            trabajo.estado = EstadoTrabajo.EJECUTANDO
+            trabajo.iniciado = time.time()
+
+        def reportar_progreso(datos: Dict[str, Any]) -> None:
+            with self._lock:
+                trabajo.progreso = dict(datos)
+
+        try:
+            resultado = trabajo.funcion(reportar_progreso)
+            with self._lock:
+                trabajo.resultado = resultado
+                trabajo.estado = EstadoTrabajo.COMPLETADO
+        except Exception as e:
+            logger.error(f"💥 Trabajo {trabajo.id} falló: {str(e)}")
+            with self._lock:
+                trabajo.error = str(e)
+                trabajo.estado = EstadoTrabajo.FALLIDO
+        finally:
+            with self._lock:
+                trabajo.finalizado = time.time()
+                trabajo.funcion = None
+                self._activos.pop(trabajo.propietario, None)
+                self._despachar(trabajo.propietario)
+            logger.info(f"🏁 Trabajo {trabajo.id} {trabajo.estado.value} en "
+                        f"{trabajo.finalizado - trabajo.iniciado:.1f}s")
+
+    def estado(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        """Instantánea del trabajo (None si no existe o ya fue purgado)"""
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None:
+                return None
+            instantanea = trabajo.instantanea()
+            if trabajo.estado is EstadoTrabajo.EN_COLA:
+                cola = self._pendientes.get(trabajo.propietario, ())
+                instantanea['posicion_cola'] = list(cola).index(trabajo_id) + 1 if trabajo_id in cola else None
+            return instantanea
+
+    def listar(self, propietario: str) -> List[Dict[str, Any]]:
+        """Trabajos del propietario, del más antiguo al más reciente"""
+        with self._lock:
+            ids = [t.id for t in sorted(self._trabajos.values(), key=lambda t: t.creado)
+                   if t.propietario == propietario]
+        return [instantanea for instantanea in map(self.estado, ids) if instantanea]
+
+    def obtener_resultado(self, trabajo_id: str, retirar: bool = True) -> Any:
+        """
+        Resultado de un trabajo completado (None si no terminó con éxito)
+
+        Con retirar=True el trabajo se olvida: el resultado pasa a la sesión y
+        no queda duplicado en memoria del proceso.
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None or trabajo.estado is not EstadoTrabajo.COMPLETADO:
+                return None
+            if retirar:
+                del self._trabajos[trabajo_id]
+            return trabajo.resultado
+
+    def cancelar(self, trabajo_id: str) -> bool:
+        """Cancela un trabajo que todavía está en cola; los que ya corren terminan normalmente"""
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None or trabajo.estado is not EstadoTrabajo.EN_COLA:
+                return False
+            trabajo.estado = EstadoTrabajo.CANCELADO
+            trabajo.finalizado = time.time()
+            trabajo.funcion = None
+        logger.info(f"🚫 Trabajo {trabajo_id} cancelado")
+        return True
+
+    def olvidar(self, trabajo_id: str) -> bool:
+        """Elimina un trabajo terminado (la UI ya mostró su error o lo descartó)"""
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None or not trabajo.estado.terminado:
+                return False
+            del self._trabajos[trabajo_id]
+            return True
+
+    def _purgar_terminados(self) -> None:
+        """Olvida trabajos terminados más antiguos que la retención (con _lock tomado)"""
+        if not self.retencion_segundos:
+            return
+        limite = time.time() - self.retencion_segundos
+        for trabajo_id in [t.id for t in self._trabajos.values()
+                           if t.estado.terminado and t.finalizado and t.finalizado < limite]:
+            del self._trabajos[trabajo_id]
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            por_estado: Dict[str, int] = {}
+            for trabajo in self._trabajos.values():
+                por_estado[trabajo.estado.value] = por_estado.get(trabajo.estado.value, 0) + 1
+            return {'max_workers': self.max_workers, 'trabajos': len(self._trabajos),
+                    'por_estado': por_estado}
+
+    def cerrar(self, esperar: bool = True) -> None:
+        """Detiene el pool; los trabajos en cola que no llegaron a ejecutarse se cancelan"""
+        with self._lock:
+            for trabajo in self._trabajos.values():
+                if trabajo.estado is EstadoTrabajo.EN_COLA:
+                    trabajo.estado = EstadoTrabajo.CANCELADO
+                    trabajo.finalizado = time.time()
+        self._executor.shutdown(wait=esperar)
+
+
+_gestor_global: Optional[GestorTrabajosAnalisis] = None
+_gestor_lock = threading.Lock()
+
+
+def obtener_gestor_trabajos(configuracion: Optional[Dict[str, Any]] = None) -> GestorTrabajosAnalisis:
+    """Gestor único del proceso; la configuración solo se usa al crearlo"""
+    global _gestor_global
+    if _gestor_global is None:
+        with _gestor_lock:
+            if _gestor_global is None:
+                configuracion = configuracion or {}
+                retencion = configuracion.get('analysis_job_retention_minutes', 60)
+                _gestor_global = GestorTrabajosAnalisis(
+                    max_workers=configuracion.get('analysis_job_workers', 2),
+                    retencion_segundos=retencion * 60 if retencion else None
+                )
+    return _gestor_global
@@ -1,8 +1,10 @@
 """
 Implementación en memoria del repositorio de comentarios
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+from bisect import bisect_left, insort
 from collections import OrderedDict
+from itertools import count
 import sys
 import logging
 
@@ -13,10 +15,65 @@ from ...domain.repositories.repositorio_comentarios import IRepositorioComentari
 logger = logging.getLogger(__name__)
 
 
+def convertir_analisis_a_comentario(analisis_comentario) -> Comentario:
+    """
+    Convierte AnalisisComentario a Comentario (compartido por las implementaciones del repositorio)
+    """
+    from ...domain.value_objects.calidad_comentario import CalidadComentario
+    from ...domain.value_objects.nivel_urgencia import NivelUrgencia
+    
+    # Extract basic data
+    id_comentario = analisis_comentario.id
+    texto = analisis_comentario.texto_original
+    texto_limpio = texto.lower().strip()  # Basic cleaning
+    
+    # Convert IA analysis to legacy format
+    comentario = Comentario(
+        id=id_comentario,
+        texto=texto,
+        texto_limpio=texto_limpio,
+        frecuencia=1,
+        fecha_analisis=analisis_comentario.fecha_analisis
+    )
+    
+    # Map sentimiento (same structure)
+    comentario.sentimiento = analisis_comentario.sentimiento
+    
+    # Map calidad from IA analysis richness
+    num_temas = len(analisis_comentario.temas)
+    comentario.calidad = CalidadComentario.evaluar_desde_texto(texto, num_temas)
+    
+    # Map urgencia from puntos_dolor severity
+    puntos_dolor_texto = [p.contexto_especifico for p in analisis_comentario.puntos_dolor if hasattr(p, 'contexto_especifico')]
+    es_negativo = analisis_comentario.sentimiento.es_negativo() if analisis_comentario.sentimiento else False
+    confianza_sentimiento = analisis_comentario.sentimiento.confianza if analisis_comentario.sentimiento else 0.5
+    
+    comentario.urgencia = NivelUrgencia.evaluar_urgencia(
+        puntos_dolor_texto, 
+        es_negativo, 
+        confianza_sentimiento
+    )
+    
+    # Add temas as simple list
+    comentario.temas = [t.categoria.value for t in analisis_comentario.temas]
+    comentario.puntos_dolor = puntos_dolor_texto
+    comentario.emociones = [e.tipo.value for e in analisis_comentario.emociones]
+    
+    # Add original ratings if available
+    comentario.calificacion_nps = getattr(analisis_comentario, 'calificacion_nps', None)
+    comentario.calificacion_nota = getattr(analisis_comentario, 'calificacion_nota', None)
+    
+    return comentario
+
+
 class RepositorioComentariosMemoria(IRepositorioComentarios):
     """
     Implementación en memoria del repositorio de comentarios
     CRITICAL FIX: Added memory limits and LRU eviction to prevent memory exhaustion
+
+    Las consultas del dashboard no recorren el repositorio: cada guardar y
+    cada desalojo LRU actualizan índices secundarios (ids por categoría de
+    sentimiento, críticos ordenados por prioridad y contadores).
     """
     
     def __init__(self, max_comentarios: int = 10000, max_memory_mb: int = 100):
@@ -35,6 +92,16 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
         self._max_memory_bytes = max_memory_mb * 1024 * 1024
         self._current_memory_estimate = 0
         
+        # Índices secundarios (dict como conjunto ordenado: conserva el orden de inserción)
+        self._por_sentimiento: Dict[str, Dict[str, None]] = {}
+        # Críticos ordenados por (prioridad, -puntuación, secuencia de inserción, id)
+        self._criticos: List[Tuple[str, float, int, str]] = []
+        # Por id, lo indexado al guardarlo: desindexar no depende del estado actual del objeto
+        self._entradas_indice: Dict[str, Tuple[Optional[str], bool, Optional[Tuple[str, float, int, str]]]] = {}
+        self._con_sentimiento = 0
+        self._alta_calidad = 0
+        self._secuencia = count()
+        
         logger.info(f"📝 Memory-limited repository initialized - Max: {max_comentarios} comments, {max_memory_mb}MB")
     
     def _estimate_memory_usage(self, comentario: Comentario) -> int:
@@ -61,6 +128,50 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
             # Conservative fallback if estimation fails
             return 1000
     
+    def _indexar(self, comentario: Comentario) -> None:
+        """Agrega el comentario (ya almacenado) a los índices secundarios"""
+        categoria = comentario.sentimiento.categoria.value if comentario.sentimiento else None
+        if categoria is not None:
+            self._por_sentimiento.setdefault(categoria, {})[comentario.id] = None
+            self._con_sentimiento += 1
+        
+        alta_calidad = bool(comentario.calidad and comentario.calidad.es_alta_calidad())
+        if alta_calidad:
+            self._alta_calidad += 1
+        
+        clave_critico = None
+        if comentario.es_critico():
+            # Misma clave que el ordenamiento original; la secuencia desempata por orden de inserción
+            clave_critico = (
+                comentario.urgencia.prioridad.value if comentario.urgencia else "P3",
+                -comentario.urgencia.puntuacion if comentario.urgencia else 0,
+                next(self._secuencia),
+                comentario.id
+            )
+            insort(self._criticos, clave_critico)
+        
+        self._entradas_indice[comentario.id] = (categoria, alta_calidad, clave_critico)
+    
+    def _desindexar(self, id_comentario: str) -> None:
+        """Quita un comentario de los índices secundarios"""
+        entrada = self._entradas_indice.pop(id_comentario, None)
+        if entrada is None:
+            return
+        categoria, alta_calidad, clave_critico = entrada
+        
+        if categoria is not None:
+            ids = self._por_sentimiento[categoria]
+            del ids[id_comentario]
+            if not ids:
+                del self._por_sentimiento[categoria]
+            self._con_sentimiento -= 1
+        
+        if alta_calidad:
+            self._alta_calidad -= 1
+        
+        if clave_critico is not None:
+            del self._criticos[bisect_left(self._criticos, clave_critico)]
+    
     def _enforce_limits(self) -> None:
         """
         CRITICAL-003 FIX: Enforce memory and count limits using LRU eviction
@@ -71,6 +182,7 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
         while len(self._comentarios) > self._max_comentarios:
             oldest_key, oldest_comment = self._comentarios.popitem(last=False)
             self._current_memory_estimate -= self._estimate_memory_usage(oldest_comment)
+            self._desindexar(oldest_key)
             removed_count += 1
         
         # Enforce memory limit (remove oldest entries)
@@ -78,6 +190,7 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
                len(self._comentarios) > 0):
             oldest_key, oldest_comment = self._comentarios.popitem(last=False)
             self._current_memory_estimate -= self._estimate_memory_usage(oldest_comment)
+            self._desindexar(oldest_key)
             removed_count += 1
         
         if removed_count > 0:
@@ -96,6 +209,7 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
             old_comment = self._comentarios[comentario.id]
             self._current_memory_estimate -= self._estimate_memory_usage(old_comment)
             del self._comentarios[comentario.id]
+            self._desindexar(comentario.id)
         
         # Calculate memory usage for new comment
         memory_usage = self._estimate_memory_usage(comentario)
@@ -103,6 +217,7 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
         
         # Store comment (OrderedDict maintains insertion order for LRU)
         self._comentarios[comentario.id] = comentario
+        self._indexar(comentario)
         
         # Enforce limits after insertion
         self._enforce_limits()
@@ -148,36 +263,18 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
     
     def buscar_por_sentimiento(self, tipo_sentimiento: str) -> List[Comentario]:
         """
-        Busca comentarios por tipo de sentimiento
+        Busca comentarios por tipo de sentimiento (desde el índice, en orden de inserción)
         """
-        comentarios_encontrados = []
-        
-        for comentario in self._comentarios.values():
-            if (comentario.sentimiento and 
-                comentario.sentimiento.categoria.value == tipo_sentimiento):
-                comentarios_encontrados.append(comentario)
-        
-        return comentarios_encontrados
+        ids = self._por_sentimiento.get(tipo_sentimiento, {})
+        return [self._comentarios[id_comentario] for id_comentario in ids]
     
     def buscar_criticos(self) -> List[Comentario]:
         """
-        Busca comentarios que requieren atención crítica
-        """
-        comentarios_criticos = []
-        
-        for comentario in self._comentarios.values():
-            if comentario.es_critico():
-                comentarios_criticos.append(comentario)
-        
-        # Ordenar por urgencia (P0 primero)
-        comentarios_criticos.sort(
-            key=lambda c: (
-                c.urgencia.prioridad.value if c.urgencia else "P3",
-                -c.urgencia.puntuacion if c.urgencia else 0
-            )
-        )
+        Busca comentarios que requieren atención crítica, por urgencia (P0 primero)
         
-        return comentarios_criticos
+        El índice ya está ordenado: no se filtra ni se ordena en cada llamada.
+        """
+        return [self._comentarios[clave[3]] for clave in self._criticos]
     
     def limpiar(self) -> None:
         """
@@ -187,6 +284,11 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
         cantidad_anterior = len(self._comentarios)
         self._comentarios.clear()
         self._current_memory_estimate = 0  # Reset memory tracking
+        self._por_sentimiento.clear()
+        self._criticos.clear()
+        self._entradas_indice.clear()
+        self._con_sentimiento = 0
+        self._alta_calidad = 0
         logger.info(f"🧹 Repositorio limpiado: {cantidad_anterior} comentarios removidos, memoria liberada")
     
     def get_memory_stats(self) -> Dict[str, Any]:
@@ -210,77 +312,17 @@ class RepositorioComentariosMemoria(IRepositorioComentarios):
     
     def obtener_estadisticas(self) -> Dict[str, int]:
         """
-        Obtiene estadísticas del repositorio
+        Obtiene estadísticas del repositorio (contadores mantenidos al guardar/desalojar)
         """
-        total = len(self._comentarios)
-        
-        if total == 0:
-            return {
-                'total': 0,
-                'con_sentimiento': 0,
-                'criticos': 0,
-                'alta_calidad': 0
-            }
-        
-        con_sentimiento = sum(1 for c in self._comentarios.values() if c.sentimiento)
-        criticos = len(self.buscar_criticos())
-        alta_calidad = sum(1 for c in self._comentarios.values() 
-                          if c.calidad and c.calidad.es_alta_calidad())
-        
         return {
-            'total': total,
-            'con_sentimiento': con_sentimiento,
-            'criticos': criticos,
-            'alta_calidad': alta_calidad
+            'total': len(self._comentarios),
+            'con_sentimiento': self._con_sentimiento,
+            'criticos': len(self._criticos),
+            'alta_calidad': self._alta_calidad
         }
     
     def _convertir_analisis_a_comentario(self, analisis_comentario) -> Comentario:
         """
         Convierte AnalisisComentario a Comentario para compatibility con Repository
         """
-        from ...domain.entities.comentario import Comentario
-        from ...domain.value_objects.calidad_comentario import CalidadComentario
-        from ...domain.value_objects.nivel_urgencia import NivelUrgencia
-        
-        # Extract basic data
-        id_comentario = analisis_comentario.id
-        texto = analisis_comentario.texto_original
-        texto_limpio = texto.lower().strip()  # Basic cleaning
-        
-        # Convert IA analysis to legacy format
-        comentario = Comentario(
-            id=id_comentario,
-            texto=texto,
-            texto_limpio=texto_limpio,
-            frecuencia=1,
-            fecha_analisis=analisis_comentario.fecha_analisis
-        )
-        
-        # Map sentimiento (same structure)
-        comentario.sentimiento = analisis_comentario.sentimiento
-        
-        # Map calidad from IA analysis richness
-        num_temas = len(analisis_comentario.temas)
-        comentario.calidad = CalidadComentario.evaluar_desde_texto(texto, num_temas)
-        
-        # Map urgencia from puntos_dolor severity
-        puntos_dolor_texto = [p.contexto_especifico for p in analisis_comentario.puntos_dolor if hasattr(p, 'contexto_especifico')]
-        es_negativo = analisis_comentario.sentimiento.es_negativo() if analisis_comentario.sentimiento else False
-        confianza_sentimiento = analisis_comentario.sentimiento.confianza if analisis_comentario.sentimiento else 0.5
-        
-        comentario.urgencia = NivelUrgencia.evaluar_urgencia(
-            puntos_dolor_texto, 
-            es_negativo, 
-            confianza_sentimiento
-        )
-        
-        # Add temas as simple list
-        comentario.temas = [t.categoria.value for t in analisis_comentario.temas]
-        comentario.puntos_dolor = puntos_dolor_texto
-        comentario.emociones = [e.tipo.value for e in analisis_comentario.emociones]
-        
-        # Add original ratings if available
-        comentario.calificacion_nps = getattr(analisis_comentario, 'calificacion_nps', None)
-        comentario.calificacion_nota = getattr(analisis_comentario, 'calificacion_nota', None)
-        
-        return comentario
\ No newline at end of file
+        return convertir_analisis_a_comentario(analisis_comentario)
@@ -0,0 +1,308 @@
+"""
+Implementación SQLite del repositorio de comentarios
+"""
+import json
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Tuple
+
+from ...domain.entities.comentario import Comentario
+from ...domain.repositories.repositorio_comentarios import IRepositorioComentarios
+from ...domain.value_objects.sentimiento import Sentimiento, SentimientoCategoria
+from ...domain.value_objects.calidad_comentario import CalidadComentario, NivelCalidad
+from ...domain.value_objects.nivel_urgencia import NivelUrgencia, PrioridadUrgencia
+from .repositorio_comentarios_memoria import convertir_analisis_a_comentario
+
+logger = logging.getLogger(__name__)
+
+
+class RepositorioComentariosSQLite(IRepositorioComentarios):
+    """
+    Repositorio de comentarios persistente en SQLite
+
+    A diferencia del repositorio en memoria no hay límite de cantidad ni
+    desalojo LRU: los comentarios sobreviven reinicios y las consultas
+    no cargan todo el histórico. Las búsquedas usan índices sobre la
+    categoría de sentimiento, la urgencia (parcial, solo críticos) y la
+    fecha de análisis. Los resultados salen en orden de inserción, como en
+    la implementación en memoria (guardar un id existente lo mueve al final).
+    """
+
+    COLUMNAS = (
+        'id', 'texto', 'texto_limpio', 'frecuencia', 'fecha_analisis',
+        'sentimiento_categoria', 'sentimiento_confianza', 'sentimiento_fuente',
+        'calidad_nivel', 'calidad_informativo', 'calidad_detalle', 'calidad_longitud',
+        'urgencia_prioridad', 'urgencia_puntuacion', 'urgencia_indicadores',
+        'es_critico', 'alta_calidad',
+        'temas', 'puntos_dolor', 'emociones', 'competidores',
+        'calificacion_nps', 'calificacion_nota'
+    )
+
+    def __init__(self, ruta_db: str):
+        """
+        Args:
+            ruta_db: Ruta del archivo SQLite (se crea el directorio si no existe)
+        """
+        self.ruta_db = str(ruta_db)
+        self._lock = threading.Lock()
+
+        if self.ruta_db != ':memory:':
+            Path(self.ruta_db).parent.mkdir(parents=True, exist_ok=True)
+
+        self._conexion = sqlite3.connect(self.ruta_db, check_same_thread=False)
+        self._inicializar_esquema()
+
+        columnas = ', '.join(self.COLUMNAS)
+        marcadores = ', '.join('?' * len(self.COLUMNAS))
+        self._sql_insertar = f"INSERT OR REPLACE INTO comentarios ({columnas}) VALUES ({marcadores})"
+        self._sql_seleccionar = f"SELECT {columnas} FROM comentarios"
+
+        logger.info(f"🗄️ Repositorio SQLite de comentarios: {self.ruta_db}")
+
+    def _inicializar_esquema(self) -> None:
+        with self._lock:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS comentarios (
+                    id TEXT PRIMARY KEY,
+                    texto TEXT NOT NULL,
+                    texto_limpio TEXT NOT NULL,
+                    frecuencia INTEGER NOT NULL,
+                    fecha_analisis TEXT,
+                    sentimiento_categoria TEXT,
+                    sentimiento_confianza REAL,
+                    sentimiento_fuente TEXT,
+                    calidad_nivel TEXT,
+                    calidad_informativo INTEGER,
+                    calidad_detalle TEXT,
+                    calidad_longitud INTEGER,
+                    urgencia_prioridad TEXT,
+                    urgencia_puntuacion REAL,
+                    urgencia_indicadores TEXT,
+                    es_critico INTEGER NOT NULL,
+                    alta_calidad INTEGER NOT NULL,
+                    temas TEXT NOT NULL,
+                    puntos_dolor TEXT NOT NULL,
+                    emociones TEXT NOT NULL,
+                    competidores TEXT NOT NULL,
+                    calificacion_nps INTEGER,
+                    calificacion_nota REAL
+                )
+                """
+            )
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_comentarios_sentimiento ON comentarios (sentimiento_categoria)"
+            )
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_comentarios_urgencia "
+                "ON comentarios (urgencia_prioridad, urgencia_puntuacion DESC) WHERE es_critico = 1"
+            )
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_comentarios_fecha ON comentarios (fecha_analisis)"
+            )
+            self._conexion.commit()
+
+    @staticmethod
+    def _a_fila(comentario: Comentario) -> Tuple:
+        """Comentario -> valores en el orden de COLUMNAS"""
+        sentimiento = comentario.sentimiento
+        calidad = comentario.calidad
+        urgencia = comentario.urgencia
+        return (
+            comentario.id,
+            comentario.texto,
+            comentario.texto_limpio,
+            comentario.frecuencia,
+            comentario.fecha_analisis.isoformat() if comentario.fecha_analisis else None,
+            sentimiento.categoria.value if sentimiento else None,
+            sentimiento.confianza if sentimiento else None,
+            sentimiento.fuente if sentimiento else None,
+            calidad.nivel.value if calidad else None,
+            int(calidad.es_informativo) if calidad else None,
+            calidad.nivel_detalle if calidad else None,
+            calidad.longitud_caracteres if calidad else None,
+            urgencia.prioridad.value if urgencia else None,
+            urgencia.puntuacion if urgencia else None,
+            json.dumps(list(urgencia.indicadores), ensure_ascii=False) if urgencia else None,
+            int(bool(comentario.es_critico())),
+            int(bool(calidad and calidad.es_alta_calidad())),
+            json.dumps(comentario.temas or [], ensure_ascii=False),
+            json.dumps(comentario.puntos_dolor or [], ensure_ascii=False),
+            json.dumps(comentario.emociones or [], ensure_ascii=False),
+            json.dumps(comentario.competidores or [], ensure_ascii=False),
+            comentario.calificacion_nps,
+            comentario.calificacion_nota
+        )
+
+    @staticmethod
+    def _desde_fila(fila: Tuple) -> Comentario:
+        """Fila de SQLite (orden de COLUMNAS) -> Comentario"""
+        (id_comentario, texto, texto_limpio, frecuencia, fecha_analisis,
+         sentimiento_categoria, sentimiento_confianza, sentimiento_fuente,
+         calidad_nivel, calidad_informativo, calidad_detalle, calidad_longitud,
+         urgencia_prioridad, urgencia_puntuacion, urgencia_indicadores,
+         _es_critico, _alta_calidad,
+         temas, puntos_dolor, emociones, competidores,
+         calificacion_nps, calificacion_nota) = fila
+
+        comentario = Comentario(
+            id=id_comentario,
+            texto=texto,
+            texto_limpio=texto_limpio,
+            frecuencia=frecuencia,
+            fecha_analisis=datetime.fromisoformat(fecha_analisis) if fecha_analisis else None,
+            temas=json.loads(temas),
+            puntos_dolor=json.loads(puntos_dolor),
+            emociones=json.loads(emociones),
+            competidores=json.loads(competidores),
+            calificacion_nps=calificacion_nps,
+            calificacion_nota=calificacion_nota
+        )
+        if sentimiento_categoria is not None:
+            comentario.sentimiento = Sentimiento(
+                SentimientoCategoria(sentimiento_categoria), sentimiento_confianza, sentimiento_fuente
+            )
+        if calidad_nivel is not None:
+            comentario.calidad = CalidadComentario(
+                NivelCalidad(calidad_nivel), bool(calidad_informativo), calidad_detalle, calidad_longitud
+            )
+        if urgencia_prioridad is not None:
+            comentario.urgencia = NivelUrgencia(
+                PrioridadUrgencia(urgencia_prioridad), json.loads(urgencia_indicadores), urgencia_puntuacion
+            )
+        return comentario
+
+    def _consultar(self, condicion: str = '', parametros: Tuple = (),
+                   orden: str = 'rowid') -> List[Comentario]:
+        sql = self._sql_seleccionar + (f" WHERE {condicion}" if condicion else '') + f" ORDER BY {orden}"
+        with self._lock:
+            filas = self._conexion.execute(sql, parametros).fetchall()
+        return [self._desde_fila(fila) for fila in filas]
+
+    def guardar(self, comentario: Comentario) -> None:
+        """
+        Guarda (o reemplaza) un comentario
+        """
+        if not comentario.es_valido():
+            raise ValueError(f"Comentario inválido: {comentario.id}")
+
+        with self._lock:
+            self._conexion.execute(self._sql_insertar, self._a_fila(comentario))
+            self._conexion.commit()
+
+        logger.debug(f"💾 Comment saved: {comentario.id}")
+
+    def guardar_lote(self, comentarios) -> None:
+        """
+        Guarda múltiples comentarios (soporta Comentario y AnalisisComentario)
+
+        Todo el lote se escribe con un solo executemany en una transacción.
+        """
+        filas = []
+        comentarios_invalidos = 0
+
+        for comentario in comentarios:
+            try:
+                # Handle both Comentario and AnalisisComentario types
+                if hasattr(comentario, 'texto_original'):
+                    comentario = convertir_analisis_a_comentario(comentario)
+                if not comentario.es_valido():
+                    raise ValueError(f"Comentario inválido: {comentario.id}")
+                filas.append(self._a_fila(comentario))
+            except Exception as e:
+                comentarios_invalidos += 1
+                logger.warning(f"⚠️ Comentario inválido omitido: {getattr(comentario, 'id', 'unknown')}: {str(e)}")
+
+        if filas:
+            with self._lock:
+                with self._conexion:
+                    self._conexion.executemany(self._sql_insertar, filas)
+
+        logger.info(f"📦 Lote guardado: {len(filas)} válidos, {comentarios_invalidos} omitidos")
+
+    def obtener_por_id(self, id_comentario: str) -> Optional[Comentario]:
+        """
+        Obtiene un comentario por su ID
+        """
+        with self._lock:
+            fila = self._conexion.execute(
+                self._sql_seleccionar + " WHERE id = ?", (id_comentario,)
+            ).fetchone()
+        return self._desde_fila(fila) if fila else None
+
+    def obtener_todos(self) -> List[Comentario]:
+        """
+        Obtiene todos los comentarios
+        """
+        return self._consultar()
+
+    def buscar_por_sentimiento(self, tipo_sentimiento: str) -> List[Comentario]:
+        """
+        Busca comentarios por tipo de sentimiento
+        """
+        return self._consultar("sentimiento_categoria = ?", (tipo_sentimiento,))
+
+    def buscar_criticos(self) -> List[Comentario]:
+        """
+        Busca comentarios que requieren atención crítica, por urgencia (P0 primero)
+        """
+        return self._consultar(
+            "es_critico = 1", (),
+            orden="COALESCE(urgencia_prioridad, 'P3'), COALESCE(urgencia_puntuacion, 0) DESC, rowid"
+        )
+
+    def buscar_por_fecha(self, desde: Optional[datetime] = None,
+                         hasta: Optional[datetime] = None) -> List[Comentario]:
+        """
+        Busca comentarios analizados en [desde, hasta), en orden de fecha de análisis
+        """
+        condiciones = []
+        parametros = []
+        if desde is not None:
+            condiciones.append("fecha_analisis >= ?")
+            parametros.append(desde.isoformat())
+        if hasta is not None:
+            condiciones.append("fecha_analisis < ?")
+            parametros.append(hasta.isoformat())
+        if not condiciones:
+            condiciones.append("fecha_analisis IS NOT NULL")
+        return self._consultar(" AND ".join(condiciones), tuple(parametros), orden="fecha_analisis, rowid")
+
+    def limpiar(self) -> None:
+        """
+        Limpia todos los comentarios del repositorio
+        """
+        with self._lock:
+            cursor = self._conexion.execute("DELETE FROM comentarios")
+            self._conexion.commit()
+        logger.info(f"🧹 Repositorio limpiado: {cursor.rowcount} comentarios removidos")
+
+    def obtener_estadisticas(self) -> Dict[str, int]:
+        """
+        Obtiene estadísticas del repositorio (una sola consulta agregada)
+        """
+        with self._lock:
+            total, con_sentimiento, criticos, alta_calidad = self._conexion.execute(
+                "SELECT COUNT(*), COUNT(sentimiento_categoria), "
+                "COALESCE(SUM(es_critico), 0), COALESCE(SUM(alta_calidad), 0) FROM comentarios"
+            ).fetchone()
+        return {
+            'total': total,
+            'con_sentimiento': con_sentimiento,
+            'criticos': criticos,
+            'alta_calidad': alta_calidad
+        }
+
+    def cerrar(self) -> None:
+        """Cierra la conexión SQLite"""
+        with self._lock:
+            self._conexion.close()
+
+    def cleanup(self) -> None:
+        """Compatibilidad con ContenedorDependencias.cleanup_singletons"""
+        self.cerrar()
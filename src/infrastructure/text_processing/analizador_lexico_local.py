@@ -0,0 +1,171 @@
+"""
+Clasificador local por léxico y reglas para comentarios triviales
+"""
+import unicodedata
+import logging
+from typing import Any, Dict, List, Optional
+
+from ...domain.services.analizador_sentimientos import IAnalizadorSentimientos
+from ...domain.value_objects.sentimiento import Sentimiento
+from .procesador_texto_basico import ProcesadorTextoBasico
+
+
+logger = logging.getLogger(__name__)
+
+
+class AnalizadorLexicoLocal(IAnalizadorSentimientos):
+    """
+    Resuelve sin IA los comentarios cortos de sentimiento evidente ("pésimo", "todo bien")
+
+    Devuelve el mismo formato abreviado que la IA (sent/conf/tema/emo/urg). Solo
+    responde cuando la confianza alcanza el umbral; el resto se deriva al
+    AnalizadorMaestroIA. Cualquier palabra fuera del léxico baja la confianza,
+    así un comentario con contenido propio nunca se resuelve localmente.
+    """
+
+    MAX_PALABRAS = 4
+    CONFIANZA_BASE = 0.95
+    PENALIZACION_PALABRA_DESCONOCIDA = 0.1
+
+    # Léxico sin acentos (el texto se normaliza igual antes de comparar)
+    POSITIVAS = {
+        'bien', 'bueno', 'buena', 'buenisimo', 'buenisima', 'excelente', 'excelentes', 'genial',
+        'perfecto', 'perfecta', 'ok', 'okey', 'gracias', 'satisfecho', 'satisfecha', 'conforme',
+        'rapido', 'rapida', 'recomendable', 'recomendado', 'optimo', 'impecable', 'espectacular',
+        'encantado', 'encantada', 'feliz', 'contento', 'contenta', 'barato', 'estable', 'joya',
+    }
+    NEGATIVAS = {
+        'mal', 'malo', 'mala', 'malisimo', 'malisima', 'pesimo', 'pesima', 'horrible', 'terrible',
+        'fatal', 'desastre', 'nefasto', 'nefasta', 'lento', 'lenta', 'caro', 'cara', 'deficiente',
+        'peor', 'basura', 'insatisfecho', 'insatisfecha', 'inestable', 'estafa', 'verguenza',
+    }
+    # Negativas fuertes: emoción de enojo en lugar de frustración
+    NEGATIVAS_FUERTES = {'pesimo', 'pesima', 'horrible', 'terrible', 'nefasto', 'nefasta',
+                         'basura', 'estafa', 'malisimo', 'malisima', 'desastre', 'verguenza'}
+    NEUTRAS = {'regular', 'normal', 'ninguno', 'ninguna', 'nada', 'sin comentarios', 'ninguna sugerencia',
+               'ns', 'nc', 'na', 'n a', 'mas o menos', 'ni fu ni fa'}
+    NEGACIONES = {'no', 'nunca', 'jamas', 'ni', 'tampoco'}
+    # Palabras que no cambian el sentimiento (intensificadores y conectores)
+    NEUTRALES_DE_RELLENO = {
+        'muy', 'todo', 'toda', 'super', 're', 'mas', 'bastante', 'demasiado', 'tan', 'el', 'la', 'los',
+        'las', 'es', 'esta', 'un', 'una', 'y', 'de', 'del', 'me', 'parece', 'servicio', 'atencion',
+        'internet', 'conexion', 'senal', 'precio', 'factura', 'velocidad', 'cobertura', 'plan',
+    }
+    TEMAS = {
+        'vel': {'rapido', 'rapida', 'lento', 'lenta', 'velocidad', 'conexion', 'internet', 'estable', 'inestable'},
+        'pre': {'caro', 'cara', 'barato', 'precio', 'plan'},
+        'cob': {'senal', 'cobertura'},
+        'fac': {'factura', 'estafa'},
+    }
+
+    def __init__(self, umbral_confianza: float = 0.9,
+                 procesador_texto: Optional[ProcesadorTextoBasico] = None):
+        """
+        Args:
+            umbral_confianza: Confianza mínima (0-1) para responder sin IA
+            procesador_texto: Normalizador compartido con el resto del pipeline
+        """
+        self.umbral_confianza = umbral_confianza
+        self.procesador_texto = procesador_texto or ProcesadorTextoBasico()
+
+    def clasificar(self, texto: str) -> Optional[Dict[str, Any]]:
+        """
+        Clasifica un comentario trivial en formato abreviado
+
+        Returns:
+            Dict con sent/conf/tema/emo/urg, o None si el comentario debe ir a la IA
+        """
+        normalizado = self._normalizar(texto)
+        if not normalizado:
+            return None
+
+        if normalizado in self.NEUTRAS:
+            return self._resultado('neu', self.CONFIANZA_BASE, normalizado.split())
+
+        palabras = normalizado.split()
+        if len(palabras) > self.MAX_PALABRAS:
+            return None
+
+        positivas = [p for p in palabras if p in self.POSITIVAS]
+        negativas = [p for p in palabras if p in self.NEGATIVAS]
+        negaciones = [p for p in palabras if p in self.NEGACIONES]
+        desconocidas = [
+            p for p in palabras
+            if p not in self.POSITIVAS and p not in self.NEGATIVAS
+            and p not in self.NEGACIONES and p not in self.NEUTRALES_DE_RELLENO
+        ]
+
+        # Mezclas ("bueno pero caro") y dobles negaciones quedan para la IA
+        if bool(positivas) == bool(negativas) or len(negaciones) > 1:
+            return None
+
+        confianza = self.CONFIANZA_BASE - self.PENALIZACION_PALABRA_DESCONOCIDA * len(desconocidas)
+        if negaciones:
+            if negativas:
+                return None  # "no es malo" es ambiguo
+            sentimiento = 'neg'  # "no es bueno"
+            confianza -= self.PENALIZACION_PALABRA_DESCONOCIDA / 2
+        else:
+            sentimiento = 'pos' if positivas else 'neg'
+
+        if round(confianza, 2) < self.umbral_confianza:
+            return None
+        return self._resultado(sentimiento, confianza, palabras)
+
+    def clasificar_lote(self, textos: List[str]) -> Dict[int, Dict[str, Any]]:
+        """Clasifica los textos triviales; devuelve {posición: resultado} solo para los resueltos"""
+        resueltos = {}
+        for posicion, texto in enumerate(textos):
+            resultado = self.clasificar(texto)
+            if resultado is not None:
+                resueltos[posicion] = resultado
+        return resueltos
+
+    def analizar_sentimiento(self, texto: str) -> Sentimiento:
+        """
+        Analiza el sentimiento de un texto individual
+        """
+        resultado = self.clasificar(texto)
+        if resultado is None:
+            return Sentimiento.crear_neutral(0.3, "reglas")
+
+        confianza = round(resultado['conf'], 2)
+        if resultado['sent'] == 'pos':
+            return Sentimiento.crear_positivo(confianza, "reglas")
+        if resultado['sent'] == 'neg':
+            return Sentimiento.crear_negativo(confianza, "reglas")
+        return Sentimiento.crear_neutral(confianza, "reglas")
+
+    def analizar_lote(self, textos: List[str]) -> List[Sentimiento]:
+        """
+        Analiza el sentimiento de múltiples textos
+        """
+        return [self.analizar_sentimiento(texto) for texto in textos]
+
+    def es_disponible(self) -> bool:
+        """
+        El clasificador local no depende de servicios externos
+        """
+        return True
+
+    def _normalizar(self, texto: str) -> str:
+        limpio = self.procesador_texto.limpiar_texto(texto)
+        sin_acentos = unicodedata.normalize('NFKD', limpio)
+        return ''.join(c for c in sin_acentos if not unicodedata.combining(c))
+
+    def _resultado(self, sentimiento: str, confianza: float, palabras: List[str]) -> Dict[str, Any]:
+        tema = next((codigo for codigo, claves in self.TEMAS.items() if claves.intersection(palabras)), 'ser')
+        if sentimiento == 'pos':
+            emocion, urgencia = 'sat', 'b'
+        elif sentimiento == 'neg':
+            emocion = 'eno' if self.NEGATIVAS_FUERTES.intersection(palabras) else 'fru'
+            urgencia = 'm'
+        else:
+            emocion, urgencia = 'neu', 'b'
+        return {
+            'sent': sentimiento,
+            'conf': round(confianza, 2),
+            'tema': tema,
+            'emo': emocion,
+            'urg': urgencia,
+        }
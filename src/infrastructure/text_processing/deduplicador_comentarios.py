@@ -0,0 +1,174 @@
+"""
+Agrupación de comentarios duplicados y casi duplicados antes del análisis IA
+"""
+import zlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from .procesador_texto_basico import ProcesadorTextoBasico
+from ...application.dtos.analisis_completo_ia import indexar_por_i
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GruposComentarios:
+    """Resultado de la agrupación: un representante por grupo y a qué grupo va cada fila"""
+    representantes: List[str]
+    asignacion: List[int]
+
+    @property
+    def total_original(self) -> int:
+        return len(self.asignacion)
+
+    @property
+    def duplicados_removidos(self) -> int:
+        return len(self.asignacion) - len(self.representantes)
+
+    def expandir(self, resultados_representantes: List[Dict]) -> List[Dict]:
+        """
+        Copia el resultado de cada representante a todas las filas de su grupo ('i' = fila original)
+
+        El resultado de cada representante se toma por su 'i' (1-based sobre
+        representantes); las filas de un grupo sin resultado quedan fuera.
+        """
+        por_grupo = indexar_por_i(resultados_representantes, len(self.representantes))
+        if len(por_grupo) < len(self.representantes):
+            logger.warning(f"⚠️ {len(self.representantes) - len(por_grupo)}/{len(self.representantes)} "
+                           f"representantes sin resultado - sus filas quedan sin analizar")
+        return [
+            dict(por_grupo[grupo], i=posicion + 1)
+            for posicion, grupo in enumerate(self.asignacion)
+            if grupo in por_grupo
+        ]
+
+
+class DeduplicadorComentarios:
+    """
+    Colapsa comentarios repetidos para analizar un solo representante por grupo
+
+    - Duplicados exactos: mismo texto tras limpiar_texto (minúsculas, sin puntuación).
+    - Casi duplicados (opcional): MinHash + LSH sobre trigramas de la clave de
+      _generar_clave_agrupacion, confirmados con Jaccard exacto. Nunca se agrupan
+      textos que difieren en negación ("funciona bien" / "no funciona bien").
+
+    El representante es la primera aparición, así el orden de análisis sigue al del archivo.
+    """
+
+    PALABRAS_NEGACION = {'no', 'nunca', 'jamás', 'jamas', 'ni', 'nada', 'sin', 'tampoco'}
+    NUM_PERMUTACIONES = 64
+    FILAS_POR_BANDA = 4
+    _PRIMO = (1 << 31) - 1
+
+    def __init__(self, procesador_texto: Optional[ProcesadorTextoBasico] = None,
+                 usar_casi_duplicados: bool = False, umbral_similitud: float = 0.85):
+        """
+        Args:
+            procesador_texto: Normalizador compartido con el resto del pipeline
+            usar_casi_duplicados: Activa la agrupación MinHash/LSH además de la exacta
+            umbral_similitud: Jaccard mínimo (0-1) para considerar dos textos casi iguales
+        """
+        self.procesador_texto = procesador_texto or ProcesadorTextoBasico()
+        self.usar_casi_duplicados = usar_casi_duplicados
+        self.umbral_similitud = umbral_similitud
+
+        generador = np.random.default_rng(20240917)
+        self._coef_a = generador.integers(1, self._PRIMO, self.NUM_PERMUTACIONES, dtype=np.uint64)
+        self._coef_b = generador.integers(0, self._PRIMO, self.NUM_PERMUTACIONES, dtype=np.uint64)
+
+    def agrupar(self, comentarios: List[str]) -> GruposComentarios:
+        """Agrupa los comentarios y devuelve representantes + asignación por fila"""
+        claves_exactas = [self.procesador_texto.limpiar_texto(c) for c in comentarios]
+
+        # 1. Duplicados exactos normalizados
+        grupo_por_clave: Dict[str, int] = {}
+        primera_fila: List[int] = []
+        asignacion: List[int] = []
+        for posicion, clave in enumerate(claves_exactas):
+            # Textos que quedan vacíos al limpiar (solo símbolos) no se agrupan entre sí
+            clave = clave or f"\x00{posicion}"
+            if clave not in grupo_por_clave:
+                grupo_por_clave[clave] = len(primera_fila)
+                primera_fila.append(posicion)
+            asignacion.append(grupo_por_clave[clave])
+
+        # 2. Casi duplicados entre los representantes exactos
+        if self.usar_casi_duplicados and len(primera_fila) > 1:
+            fusion = self._agrupar_casi_duplicados([claves_exactas[p] for p in primera_fila])
+            asignacion = [fusion[g] for g in asignacion]
+            grupos_finales = sorted(set(fusion))
+            renumeracion = {g: nuevo for nuevo, g in enumerate(grupos_finales)}
+            asignacion = [renumeracion[g] for g in asignacion]
+            primera_fila = [primera_fila[g] for g in grupos_finales]
+
+        grupos = GruposComentarios(
+            representantes=[comentarios[p] for p in primera_fila],
+            asignacion=asignacion
+        )
+        if grupos.duplicados_removidos:
+            logger.info(f"🔁 Deduplicación: {grupos.total_original} → {len(grupos.representantes)} comentarios "
+                        f"({grupos.duplicados_removidos} duplicados)")
+        return grupos
+
+    def _agrupar_casi_duplicados(self, textos_limpios: List[str]) -> List[int]:
+        """
+        Une textos casi iguales; devuelve para cada texto el índice de su representante
+
+        El representante es siempre el menor índice del grupo.
+        """
+        padres = list(range(len(textos_limpios)))
+
+        def raiz(x: int) -> int:
+            while padres[x] != x:
+                padres[x] = padres[padres[x]]
+                x = padres[x]
+            return x
+
+        shingles = [self._shingles(t) for t in textos_limpios]
+        negaciones = [bool(self.PALABRAS_NEGACION.intersection(t.split())) for t in textos_limpios]
+
+        cubetas: Dict[tuple, List[int]] = {}
+        for indice, conjunto in enumerate(shingles):
+            if not conjunto:
+                continue
+            firma = self._firma_minhash(conjunto)
+            for banda in range(0, self.NUM_PERMUTACIONES, self.FILAS_POR_BANDA):
+                clave = (banda, negaciones[indice], firma[banda:banda + self.FILAS_POR_BANDA].tobytes())
+                cubetas.setdefault(clave, []).append(indice)
+
+        for candidatos in cubetas.values():
+            if len(candidatos) < 2:
+                continue
+            base = candidatos[0]
+            for otro in candidatos[1:]:
+                if raiz(base) == raiz(otro):
+                    continue
+                if self._jaccard(shingles[base], shingles[otro]) >= self.umbral_similitud:
+                    a, b = raiz(base), raiz(otro)
+                    padres[max(a, b)] = min(a, b)
+
+        return [raiz(i) for i in range(len(textos_limpios))]
+
+    def _shingles(self, texto_limpio: str) -> Set[int]:
+        """Trigramas de caracteres de la clave de agrupación (sin palabras vacías, ordenada)"""
+        clave = self.procesador_texto._generar_clave_agrupacion(texto_limpio)
+        if not clave:
+            return set()
+        clave = f" {clave} "
+        return {zlib.crc32(clave[i:i + 3].encode('utf-8')) for i in range(len(clave) - 2)}
+
+    def _firma_minhash(self, shingles: Set[int]) -> np.ndarray:
+        valores = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        # a, b < 2^31 y x < 2^32: a*x + b cabe en uint64 sin desbordar
+        hashes = (np.outer(self._coef_a, valores) + self._coef_b[:, None]) % np.uint64(self._PRIMO)
+        return hashes.min(axis=1)
+
+    @staticmethod
+    def _jaccard(a: Set[int], b: Set[int]) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
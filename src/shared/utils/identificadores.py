@@ -0,0 +1,16 @@
+"""
+Identificadores deterministas de comentarios
+"""
+import hashlib
+
+
+def id_estable(prefijo: str, indice: int, texto: str, nombre_archivo: str = '') -> str:
+    """
+    Id de un comentario que no cambia entre procesos: fila + sha256 del archivo de origen y el texto
+
+    hash() de str cambia en cada proceso (PYTHONHASHSEED), así que tras un reinicio el mismo
+    archivo generaba ids nuevos y un repositorio persistente duplicaba sus filas en lugar de
+    reemplazarlas.
+    """
+    huella = hashlib.sha256(f"{nombre_archivo}\x1f{texto}".encode('utf-8')).hexdigest()[:16]
+    return f"{prefijo}_{indice}_{huella}"
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Test del motor async de AnalizadorMaestroIA
+Valida concurrencia acotada por semáforo, pool compartido y progreso en el hilo principal
+"""
+
+import sys
+import json
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    print("✅ Successfully imported async engine components")
+except ImportError as e:
+    print(f"❌ Failed to import async engine components: {e}")
+    sys.exit(1)
+
+
+class FakeAsyncStream:
+    """Stream async de chunks con el formato de chat.completions (stream=True)"""
+
+    def __init__(self, contenido, tamano_chunk=40):
+        self.chunks = [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=contenido[i:i + tamano_chunk]),
+                                                     finish_reason=None)], usage=None)
+            for i in range(0, len(contenido), tamano_chunk)
+        ]
+        self.chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=100)))
+
+    def __aiter__(self):
+        return self._iterar()
+
+    async def _iterar(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+
+class FakeAsyncCompletions:
+    """Simula chat.completions del cliente AsyncOpenAI registrando la concurrencia"""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def create(self, **kwargs):
+        self.owner.en_vuelo += 1
+        self.owner.temperaturas.append(kwargs['temperature'])
+        self.owner.max_en_vuelo = max(self.owner.max_en_vuelo, self.owner.en_vuelo)
+        try:
+            await asyncio.sleep(0.05)
+            prompt = kwargs['messages'][1]['content']
+            total = int(prompt.split('Analiza ')[1].split(' ')[0])
+            contenido = {
+                'general': {'total': total, 'tendencia': 'positiva', 'resumen': 'ok'},
+                'comentarios': [
+                    {'i': i, 'sent': 'pos', 'conf': 0.9, 'tema': 'ser', 'emo': 'sat', 'urg': 'b'}
+                    for i in range(1, total + 1)
+                ],
+                'stats': {'pos': total, 'neu': 0, 'neg': 0, 'tema_top': 'ser', 'urg': 0}
+            }
+            if kwargs.get('stream'):
+                return FakeAsyncStream(json.dumps(contenido))
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(contenido)))],
+                usage=SimpleNamespace(total_tokens=100)
+            )
+        finally:
+            self.owner.en_vuelo -= 1
+
+
+class FakeAsyncClient:
+    """Cliente AsyncOpenAI falso: un solo pool compartido por ejecución"""
+
+    instancias = 0
+
+    def __init__(self):
+        FakeAsyncClient.instancias += 1
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.temperaturas = []
+        self.cerrado = False
+        self.chat = SimpleNamespace(completions=FakeAsyncCompletions(self))
+
+    async def close(self):
+        self.cerrado = True
+
+
+def crear_analizador(max_concurrencia: int) -> AnalizadorMaestroIA:
+    analizador = AnalizadorMaestroIA(
+        api_key="test-key-async",
+        modelo="gpt-4o-mini",
+        usar_cache=False,
+        configuracion={'max_concurrent_batches': max_concurrencia}
+    )
+    analizador.disponible = True
+    return analizador
+
+
+def test_semaforo_y_pool_compartido():
+    """El motor async respeta el límite de concurrencia y usa un solo cliente"""
+    print("\n🧪 Testing bounded concurrency with a shared client...")
+
+    analizador = crear_analizador(max_concurrencia=3)
+    clientes = []
+
+    def crear_cliente(max_conexiones):
+        cliente = FakeAsyncClient()
+        clientes.append(cliente)
+        return cliente
+
+    analizador._crear_cliente_async = crear_cliente
+    lotes = [[f"comentario {n}-{i}" for i in range(10)] for n in range(8)]
+
+    async def consumir():
+        return [item async for item in analizador.procesar_lotes_async(lotes)]
+
+    resultados = asyncio.run(consumir())
+
+    assert len(resultados) == 8, f"Expected 8 batches, got {len(resultados)}"
+    assert all(error is None for _, _, error in resultados), "Unexpected batch errors"
+    assert len(clientes) == 1, f"Expected one shared client, got {len(clientes)}"
+    assert clientes[0].max_en_vuelo <= 3, f"Concurrency exceeded: {clientes[0].max_en_vuelo}"
+    assert clientes[0].cerrado, "Shared client was not closed"
+    print(f"✅ PASS: 8 lotes, máx en vuelo={clientes[0].max_en_vuelo}, 1 cliente compartido")
+
+
+def test_temperatura_por_llamada_async():
+    """La temperatura de reintento llega a cada lote async sin tocar el analizador compartido"""
+    print("\n🧪 Testing per-call temperature on the async engine...")
+
+    analizador = crear_analizador(max_concurrencia=2)
+    cliente = FakeAsyncClient()
+    analizador._crear_cliente_async = lambda _max_conexiones: cliente
+    temperatura_original = analizador.temperatura
+    lotes = [[f"reintento {n}-{i}" for i in range(5)] for n in range(3)]
+
+    async def consumir():
+        return [item async for item in analizador.procesar_lotes_async(lotes, temperatura=0.4)]
+
+    resultados = asyncio.run(consumir())
+    assert all(error is None for _, _, error in resultados), "Unexpected batch errors"
+    assert cliente.temperaturas == [0.4] * 3, cliente.temperaturas
+    assert analizador.temperatura == temperatura_original
+
+    otro = FakeAsyncClient()
+    asyncio.run(analizador.analizar_excel_completo_async(lotes[0], otro))
+    assert otro.temperaturas == [temperatura_original], otro.temperaturas
+    print("✅ PASS: temperatura por llamada en el motor async")
+
+
+def test_caso_uso_progreso_hilo_principal():
+    """El caso de uso consume el motor async y notifica progreso en el hilo llamador"""
+    print("\n🧪 Testing use case progress callbacks on the calling thread...")
+
+    analizador = crear_analizador(max_concurrencia=4)
+    analizador._crear_cliente_async = lambda max_conexiones: FakeAsyncClient()
+
+    hilo_principal = threading.get_ident()
+    eventos = []
+
+    def progress_callback(data):
+        eventos.append((data['action'], data.get('current_batch'), threading.get_ident()))
+
+    caso_uso = AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None,
+        lector_archivos=None,
+        analizador_maestro=analizador,
+        max_comments_per_batch=60,
+        progress_callback=progress_callback,
+        configuracion={'use_async_engine': True, 'max_concurrent_batches': 4}
+    )
+
+    comentarios = [f"Comentario número {i} sobre el servicio" for i in range(300)]
+    resultado = caso_uso._procesar_en_lotes(comentarios)
+
+    exitos = [e for e in eventos if e[0] == 'batch_success']
+    assert len(exitos) == 5, f"Expected 5 batch_success events, got {len(exitos)}"
+    assert all(e[2] == hilo_principal for e in eventos), "Progress callback ran off the calling thread"
+    assert len(resultado.comentarios_analizados) == 300, "Aggregated results lost comments"
+    assert resultado.es_exitoso(), "Aggregated async result should be successful"
+    print(f"✅ PASS: {len(exitos)} lotes notificados en el hilo principal, 300 comentarios agregados")
+
+
+if __name__ == "__main__":
+    print("🔍 Async Engine Validation Test")
+    print("=" * 50)
+
+    try:
+        test_semaforo_y_pool_compartido()
+        test_temperatura_por_llamada_async()
+        test_caso_uso_progreso_hilo_principal()
+        print("\n✅ All async engine tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
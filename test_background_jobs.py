@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test del gestor de trabajos de análisis en segundo plano
+Valida que enviar() no bloquea, que el pool limita la concurrencia y que cada sesión ejecuta sus trabajos en orden
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.jobs.gestor_trabajos_analisis import GestorTrabajosAnalisis
+    print("✅ Successfully imported background job components")
+except ImportError as e:
+    print(f"❌ Failed to import background job components: {e}")
+    sys.exit(1)
+
+
+def esperar(gestor, trabajo_id, estado, timeout=5.0):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        actual = gestor.estado(trabajo_id)
+        if actual and actual['estado'] == estado:
+            return actual
+        time.sleep(0.01)
+    raise AssertionError(f"Trabajo {trabajo_id} no llegó a '{estado}': {gestor.estado(trabajo_id)}")
+
+
+def test_enviar_no_bloquea_y_expone_progreso():
+    """El id vuelve al instante; el progreso parcial y el resultado se consultan después"""
+    print("\n🧪 Testing non-blocking submit and progress polling...")
+
+    gestor = GestorTrabajosAnalisis(max_workers=1)
+    liberar = threading.Event()
+
+    def analisis(reportar_progreso):
+        reportar_progreso({'action': 'batch_success', 'current_batch': 1, 'total_batches': 2})
+        liberar.wait(5)
+        return 'resultado'
+
+    inicio = time.time()
+    trabajo_id = gestor.enviar('sesion-a', 'semanal.xlsx', analisis)
+    assert time.time() - inicio < 0.5
+
+    estado = esperar(gestor, trabajo_id, 'ejecutando')
+    limite = time.time() + 5
+    while not estado['progreso'] and time.time() < limite:
+        estado = gestor.estado(trabajo_id)
+    assert estado['progreso']['current_batch'] == 1 and not estado['terminado']
+    assert gestor.obtener_resultado(trabajo_id) is None, "No result before completion"
+
+    liberar.set()
+    esperar(gestor, trabajo_id, 'completado')
+    assert gestor.obtener_resultado(trabajo_id) == 'resultado'
+    assert gestor.estado(trabajo_id) is None, "Collected jobs leave the manager"
+    gestor.cerrar()
+    print("✅ PASS: enviar() devuelve el id al instante y el resultado se recoge al terminar")
+
+
+def test_pool_acotado_y_orden_por_sesion():
+    """Nunca corren más trabajos que workers, y cada sesión procesa su cola en orden"""
+    print("\n🧪 Testing bounded pool and per-session ordering...")
+
+    gestor = GestorTrabajosAnalisis(max_workers=2)
+    lock = threading.Lock()
+    en_curso = {'actual': 0, 'maximo': 0}
+    orden = []
+
+    def crear(sesion, numero):
+        def analisis(_reportar):
+            with lock:
+                en_curso['actual'] += 1
+                en_curso['maximo'] = max(en_curso['maximo'], en_curso['actual'])
+                orden.append((sesion, numero))
+            time.sleep(0.05)
+            with lock:
+                en_curso['actual'] -= 1
+            return numero
+        return analisis
+
+    ids = [gestor.enviar(sesion, f"archivo_{n}.xlsx", crear(sesion, n))
+           for n in range(3) for sesion in ('sesion-a', 'sesion-b', 'sesion-c')]
+    assert len(gestor.listar('sesion-a')) == 3
+    for trabajo_id in ids:
+        esperar(gestor, trabajo_id, 'completado')
+
+    assert en_curso['maximo'] == 2, f"Pool limit exceeded: {en_curso['maximo']}"
+    for sesion in ('sesion-a', 'sesion-b', 'sesion-c'):
+        assert [n for s, n in orden if s == sesion] == [0, 1, 2]
+    gestor.cerrar()
+    print("✅ PASS: concurrencia limitada por el pool y colas por sesión en orden")
+
+
+def test_errores_y_cancelacion():
+    """Un trabajo que falla guarda su error; uno en cola se puede cancelar"""
+    print("\n🧪 Testing failures and cancellation...")
+
+    gestor = GestorTrabajosAnalisis(max_workers=1)
+    liberar = threading.Event()
+
+    def falla(_reportar):
+        liberar.wait(5)
+        raise ValueError("archivo sin columna de comentarios")
+
+    fallido = gestor.enviar('sesion-a', 'roto.xlsx', falla)
+    esperar(gestor, fallido, 'ejecutando')
+    en_cola = gestor.enviar('sesion-a', 'siguiente.xlsx', lambda _r: 'no debería correr')
+    assert gestor.estado(en_cola)['posicion_cola'] == 1
+    assert gestor.cancelar(en_cola)
+    assert not gestor.cancelar(fallido), "Running jobs cannot be cancelled"
+
+    liberar.set()
+    estado = esperar(gestor, fallido, 'fallido')
+    assert 'sin columna' in estado['error'] and estado['terminado']
+    assert gestor.estado(en_cola)['estado'] == 'cancelado'
+    assert gestor.olvidar(fallido) and gestor.estado(fallido) is None
+    gestor.cerrar()
+    print("✅ PASS: errores visibles para la UI y cancelación de trabajos en cola")
+
+
+if __name__ == "__main__":
+    print("🔍 Background Jobs Validation Test")
+    print("=" * 50)
+
+    try:
+        test_enviar_no_bloquea_y_expone_progreso()
+        test_pool_acotado_y_orden_por_sesion()
+        test_errores_y_cancelacion()
+        print("\n✅ All background job tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test del runner de línea de comandos para análisis masivo
+Valida que procesa varios archivos sin Streamlit, comparte el analizador y escribe JSONL/XLSX con tiempos y tokens
+"""
+
+import sys
+import json
+import tempfile
+import importlib.util
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    spec = importlib.util.spec_from_file_location('analisis_masivo', current_dir / 'scripts' / 'analisis_masivo.py')
+    analisis_masivo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(analisis_masivo)
+    from src.infrastructure.dependency_injection.contenedor_dependencias import ContenedorDependencias
+    from src.infrastructure.dependency_injection.registro_recursos_proceso import obtener_registro_recursos
+    from test_shared_resources import FakeOpenAI
+    print("✅ Successfully imported batch CLI components")
+except ImportError as e:
+    print(f"❌ Failed to import batch CLI components: {e}")
+    sys.exit(1)
+
+
+def configuracion_cli(directorio, **extra):
+    return dict({
+        'openai_api_key': 'sk-test-cli',
+        'openai_modelo': 'gpt-4o-mini',
+        'result_cache_path': str(Path(directorio) / 'cache.sqlite3'),
+        'checkpoint_dir': str(Path(directorio) / 'checkpoints'),
+        'use_streaming_responses': False,
+        'use_async_engine': False,
+        'local_classifier_enabled': False,
+        'rate_limit_scheduler_enabled': False,
+    }, **extra)
+
+
+def crear_exportaciones(directorio, cantidad=3, filas=12):
+    carpeta = Path(directorio) / 'exports'
+    carpeta.mkdir()
+    for n in range(cantidad):
+        lineas = ['Comentario,NPS'] + [f"Exportación {n} comentario {i} sobre la señal,{i % 11}" for i in range(filas)]
+        (carpeta / f"semana_{n}.csv").write_text('\n'.join(lineas), encoding='utf-8')
+    (carpeta / 'notas.txt').write_text('ignorar', encoding='utf-8')
+    return carpeta
+
+
+def test_lote_de_archivos_sin_streamlit():
+    """Varios archivos en paralelo con un solo analizador, resultados por archivo e informe con etapas"""
+    print("\n🧪 Testing headless batch run...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        obtener_registro_recursos().liberar()
+        configuracion = configuracion_cli(tmp)
+        analizador = ContenedorDependencias(configuracion).obtener_analizador_maestro_ia()
+        cliente = FakeOpenAI()
+        analizador.client = cliente
+        analizador.disponible = True
+        analizador.retry_wrapper = None
+
+        archivos = analisis_masivo.expandir_entradas([str(crear_exportaciones(tmp))])
+        assert [a.name for a in archivos] == ['semana_0.csv', 'semana_1.csv', 'semana_2.csv']
+
+        salida = Path(tmp) / 'resultados'
+        informes = analisis_masivo.ejecutar_lote(archivos, salida, ['jsonl', 'xlsx'], 2, configuracion,
+                                                 intervalo=0.05)
+
+        assert [Path(i['archivo']).name for i in informes] == [a.name for a in archivos]
+        assert all('error' not in i for i in informes), informes
+        assert cliente.llamadas == 3, "Every file went through the one shared analyzer"
+        for informe in informes:
+            assert informe['comentarios'] == 12 and informe['tokens'] > 0
+            assert set(informe['etapas']) == {'lectura', 'analisis_ia', 'escritura'}
+
+        filas = [json.loads(l) for l in (salida / 'semana_1.analisis.jsonl').read_text(encoding='utf-8').splitlines()]
+        assert len(filas) == 12 and filas[0]['archivo'] == 'semana_1.csv'
+        assert filas[3]['nps'] == 3 and filas[0]['sentimiento']
+        assert (salida / 'semana_1.analisis.xlsx').exists()
+        obtener_registro_recursos().liberar()
+    print("✅ PASS: 3 archivos, un analizador compartido, JSONL y XLSX por archivo")
+
+
+def test_archivo_fallido_no_detiene_el_lote():
+    """Un archivo ilegible queda en el informe con su error y el código de salida es 1"""
+    print("\n🧪 Testing failed file reporting...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        obtener_registro_recursos().liberar()
+        roto = Path(tmp) / 'roto.xlsx'
+        roto.write_bytes(b'no es un excel')
+
+        informes = analisis_masivo.ejecutar_lote([roto], Path(tmp) / 'resultados', ['jsonl'], 1,
+                                                 configuracion_cli(tmp), intervalo=0.05)
+        assert len(informes) == 1 and 'error' in informes[0]
+        assert not (Path(tmp) / 'resultados' / 'roto.analisis.jsonl').exists()
+        obtener_registro_recursos().liberar()
+    print("✅ PASS: el error se informa por archivo")
+
+
+if __name__ == "__main__":
+    print("🔍 Batch CLI Validation Test")
+    print("=" * 50)
+
+    try:
+        test_lote_de_archivos_sin_streamlit()
+        test_archivo_fallido_no_detiene_el_lote()
+        print("\n✅ All batch CLI tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test del procesamiento paralelo con pool acotado y cola de finalización
+Valida el límite real de workers, el orden de agregación y el progreso en el hilo llamador
+"""
+
+import sys
+import time
+import random
+import threading
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    print("✅ Successfully imported parallel processing components")
+except ImportError as e:
+    print(f"❌ Failed to import parallel processing components: {e}")
+    sys.exit(1)
+
+
+class AnalizadorConcurrencia(AnalizadorMaestroIA):
+    """Analizador que mide hilos usados y llamadas simultáneas"""
+
+    def __init__(self):
+        super().__init__(api_key="test-key-pool", modelo="gpt-4o-mini", usar_cache=False)
+        self.disponible = True
+        self._lock_medicion = threading.Lock()
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.hilos = set()
+
+    def analizar_excel_completo(self, comentarios_raw, on_comentario=None):
+        with self._lock_medicion:
+            self.en_vuelo += 1
+            self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+            self.hilos.add(threading.get_ident())
+        try:
+            time.sleep(random.uniform(0.01, 0.05))
+            if comentarios_raw[0].startswith("FALLA"):
+                raise RuntimeError("API simulada caída")
+            return self.consolidar_resultados([
+                {'i': i + 1, 'sent': 'pos', 'conf': 0.9, 'tema': c, 'emo': 'sat', 'urg': 'b'}
+                for i, c in enumerate(comentarios_raw)
+            ])
+        finally:
+            with self._lock_medicion:
+                self.en_vuelo -= 1
+
+
+def crear_caso_uso(analizador, eventos, max_workers):
+    def progress_callback(data):
+        eventos.append((data['action'], data.get('current_batch'), threading.get_ident()))
+
+    return AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None,
+        lector_archivos=None,
+        analizador_maestro=analizador,
+        max_comments_per_batch=120,
+        progress_callback=progress_callback,
+        configuracion={'use_async_engine': False, 'max_concurrent_batches': max_workers,
+                       'token_aware_batching': False}
+    )
+
+
+def test_pool_acotado_y_orden():
+    """2000 comentarios (17 lotes) nunca usan más de max_concurrent_batches hilos"""
+    print("\n🧪 Testing bounded worker pool with 17 batches...")
+
+    analizador = AnalizadorConcurrencia()
+    eventos = []
+    caso_uso = crear_caso_uso(analizador, eventos, max_workers=4)
+
+    comentarios = [f"c{i:04d}" for i in range(2000)]
+    resultado = caso_uso._procesar_en_lotes(comentarios)
+
+    exitos = [e for e in eventos if e[0] == 'batch_success']
+    assert len(exitos) == 17, f"Expected 17 batch_success events, got {len(exitos)}"
+    assert analizador.max_en_vuelo <= 4, f"Concurrency exceeded: {analizador.max_en_vuelo}"
+    assert len(analizador.hilos) <= 4, f"Too many worker threads: {len(analizador.hilos)}"
+    assert all(e[2] == threading.get_ident() for e in eventos), "Progress callback ran off the calling thread"
+    assert [c['tema'] for c in resultado.comentarios_analizados] == comentarios, "Batch order not preserved"
+    assert resultado.total_comentarios == 2000 and resultado.es_exitoso()
+    print(f"✅ PASS: 17 lotes con {len(analizador.hilos)} hilos, máx en vuelo={analizador.max_en_vuelo}")
+
+
+def test_lote_fallido_notificado():
+    """Un lote con excepción se notifica como fallo sin detener el resto"""
+    print("\n🧪 Testing failed batch notification...")
+
+    analizador = AnalizadorConcurrencia()
+    eventos = []
+    caso_uso = crear_caso_uso(analizador, eventos, max_workers=3)
+
+    comentarios = [f"c{i:04d}" for i in range(360)]
+    comentarios[120] = "FALLA"
+    caso_uso._procesar_en_lotes(comentarios)
+
+    fallos = [e[1] for e in eventos if e[0] == 'batch_failure']
+    exitos = [e[1] for e in eventos if e[0] == 'batch_success']
+    assert fallos == [2], f"Expected failure on batch 2, got {fallos}"
+    assert sorted(exitos) == [1, 3], f"Unexpected successes: {exitos}"
+    print("✅ PASS: Lote 2 notificado como fallo, lotes 1 y 3 completados")
+
+
+if __name__ == "__main__":
+    print("🔍 Bounded Executor Validation Test")
+    print("=" * 50)
+
+    try:
+        test_pool_acotado_y_orden()
+        test_lote_fallido_notificado()
+        print("\n✅ All bounded executor tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
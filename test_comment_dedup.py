@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test de deduplicación de comentarios antes del análisis IA
+Valida agrupación exacta y MinHash, y que cada fila original recibe su resultado
+(o ninguno, si la IA omitió a su representante)
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.text_processing.deduplicador_comentarios import DeduplicadorComentarios
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    print("✅ Successfully imported dedup components")
+except ImportError as e:
+    print(f"❌ Failed to import dedup components: {e}")
+    sys.exit(1)
+
+
+class FakeAnalizador(AnalizadorMaestroIA):
+    """Analizador que registra lo enviado y clasifica por palabras clave"""
+
+    def __init__(self):
+        super().__init__(api_key="test-key-dedup", modelo="gpt-4o-mini", usar_cache=False)
+        self.disponible = True
+        self.enviados = []
+
+    def analizar_excel_completo(self, comentarios_raw, on_comentario=None):
+        self.enviados.extend(comentarios_raw)
+        return self.consolidar_resultados([
+            {'i': i + 1, 'sent': 'neg' if 'lento' in c.lower() else 'pos', 'conf': 0.9, 'tema': 'ser'}
+            for i, c in enumerate(comentarios_raw)
+        ], tokens_utilizados=10 * len(comentarios_raw))
+
+
+def test_duplicados_exactos():
+    """Mayúsculas, puntuación y espacios no impiden agrupar"""
+    print("\n🧪 Testing exact normalized duplicates...")
+
+    comentarios = ["Excelente servicio!", "excelente   servicio", "Internet lento", "EXCELENTE SERVICIO.", "!!!", "???"]
+    grupos = DeduplicadorComentarios().agrupar(comentarios)
+
+    assert grupos.representantes == ["Excelente servicio!", "Internet lento", "!!!", "???"]
+    assert grupos.asignacion == [0, 0, 1, 0, 2, 3]
+    print(f"✅ PASS: {grupos.total_original} → {len(grupos.representantes)} comentarios")
+
+
+def test_casi_duplicados_respetan_negacion():
+    """MinHash agrupa variaciones menores pero nunca mezcla negaciones"""
+    print("\n🧪 Testing MinHash near-duplicates and negation guard...")
+
+    comentarios = [
+        "el servicio de internet es excelente y rapido",
+        "servicio de internet excelente y rapido",
+        "el servicio de internet es excelente y rapidoo",
+        "el servicio de internet no es excelente y rapido",
+        "la factura llego con un cobro indebido",
+    ]
+    exacto = DeduplicadorComentarios().agrupar(comentarios)
+    casi = DeduplicadorComentarios(usar_casi_duplicados=True, umbral_similitud=0.8).agrupar(comentarios)
+
+    assert len(exacto.representantes) == 5
+    assert casi.asignacion[0] == casi.asignacion[1] == casi.asignacion[2], casi.asignacion
+    assert casi.asignacion[3] != casi.asignacion[0], "Negated comment must not be merged"
+    assert len(casi.representantes) == 3 and casi.representantes[0] == comentarios[0]
+    print(f"✅ PASS: casi duplicados {len(comentarios)} → {len(casi.representantes)}")
+
+
+def test_caso_uso_expande_resultados():
+    """Solo los representantes van a la IA y cada fila recibe su resultado en orden"""
+    print("\n🧪 Testing use case sends representatives and expands results...")
+
+    analizador = FakeAnalizador()
+    caso_uso = AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None,
+        lector_archivos=None,
+        analizador_maestro=analizador,
+        deduplicador=DeduplicadorComentarios()
+    )
+    comentarios = ["Muy bueno", "Internet lento", "muy bueno.", "MUY BUENO", "internet LENTO", "Atención ok"]
+
+    resultado = caso_uso._analizar_deduplicado(comentarios)
+
+    assert analizador.enviados == ["Muy bueno", "Internet lento", "Atención ok"]
+    assert [c['i'] for c in resultado.comentarios_analizados] == list(range(1, 7))
+    assert [c['sent'] for c in resultado.comentarios_analizados] == ['pos', 'neg', 'pos', 'pos', 'neg', 'pos']
+    assert resultado.es_exitoso() and resultado.tokens_utilizados == 30
+    assert resultado.distribucion_sentimientos['neg'] == 2
+
+    entidades = caso_uso._mapear_a_entidades_dominio(resultado, [{'comentario': c} for c in comentarios])
+    assert [e.indice_original for e in entidades] == list(range(6))
+    assert [e.texto_original for e in entidades] == comentarios
+    print("✅ PASS: 6 filas, 3 enviadas a la IA, indice_original conservado")
+
+
+def test_ia_omite_un_representante():
+    """Menos resultados que representantes: el grupo omitido queda sin resultado, los demás no se corren"""
+    print("\n🧪 Testing short AI response for representatives...")
+
+    grupos = DeduplicadorComentarios().agrupar(["Muy bueno", "Internet lento", "muy bueno.", "Atención ok", "internet LENTO"])
+    expandidos = grupos.expandir([{'i': 2, 'sent': 'neg'}, {'i': 3, 'sent': 'neu'}])
+    assert [(c['i'], c['sent']) for c in expandidos] == [(2, 'neg'), (4, 'neu'), (5, 'neg')]
+
+    class AnalizadorOmite(FakeAnalizador):
+        def analizar_excel_completo(self, comentarios_raw, on_comentario=None):
+            completo = super().analizar_excel_completo(comentarios_raw, on_comentario)
+            return self.consolidar_resultados(completo.comentarios_analizados[1:])
+
+    caso_uso = AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None,
+        lector_archivos=None,
+        analizador_maestro=AnalizadorOmite(),
+        deduplicador=DeduplicadorComentarios()
+    )
+    comentarios = ["Muy bueno", "Internet lento", "muy bueno.", "MUY BUENO", "internet LENTO", "Atención ok"]
+    resultado = caso_uso._analizar_deduplicado(comentarios)
+    assert [(c['i'], c['sent']) for c in resultado.comentarios_analizados] == [(2, 'neg'), (5, 'neg'), (6, 'pos')]
+
+    entidades = caso_uso._mapear_a_entidades_dominio(resultado, [{'comentario': c} for c in comentarios])
+    assert [e.texto_original for e in entidades] == ["Internet lento", "internet LENTO", "Atención ok"]
+    print("✅ PASS: el grupo omitido queda sin resultado, sin corrimiento")
+
+
+if __name__ == "__main__":
+    print("🔍 Comment Deduplication Validation Test")
+    print("=" * 50)
+
+    try:
+        test_duplicados_exactos()
+        test_casi_duplicados_respetan_negacion()
+        test_caso_uso_expande_resultados()
+        test_ia_omite_un_representante()
+        print("\n✅ All dedup tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test de la lectura rápida de CSV (UTF-8 estricto + pyarrow en bloques)
+Valida que produce lo mismo que read_csv, que chardet solo corre con archivos no UTF-8
+y que un CSV que pyarrow rechaza a mitad de camino se completa con pandas sin duplicar filas
+"""
+
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.file_handlers.lector_archivos_excel import (
+        LectorArchivosExcel, extraer_comentarios_dataframe
+    )
+    print("✅ Successfully imported fast CSV reader components")
+except ImportError as e:
+    print(f"❌ Failed to import fast CSV reader components: {e}")
+    sys.exit(1)
+
+
+class LectorContador(LectorArchivosExcel):
+    """Cuenta las llamadas a chardet"""
+
+    def __init__(self):
+        super().__init__()
+        self.detecciones_chardet = 0
+
+    def _detectar_encoding(self, content_bytes):
+        self.detecciones_chardet += 1
+        return super()._detectar_encoding(content_bytes)
+
+
+def crear_csv(texto, encoding='utf-8', nombre='export.csv'):
+    datos = io.BytesIO(texto.encode(encoding))
+    datos.name = nombre
+    return datos
+
+
+def leer_con_pandas(archivo, encoding):
+    """Camino anterior: DataFrame completo con todas las columnas + extracción por columnas"""
+    archivo.seek(0)
+    df = pd.read_csv(archivo, encoding=encoding)
+    archivo.seek(0)
+    return extraer_comentarios_dataframe(df, LectorArchivosExcel()._encontrar_columna_comentario(df))
+
+
+def test_misma_salida_que_read_csv():
+    """Comillas con saltos de línea, NA, vacíos, NPS sucio, BOM y latin-1"""
+    print("\n🧪 Testing parity with pandas.read_csv...")
+
+    texto = (
+        "ID,Canal,Comentario Final,NPS,Nota\n"
+        "1,web,\"  Señal débil en Ñemby, \"\"otra vez\"\" \",10,4.5\n"
+        "2,app,NA,9,3\n"
+        "3,web,\"Línea uno\nlínea dos\",x,abc\n"
+        "4,web,,7.9,2\n"
+        "5,tel,nan,5,\n"
+        "\n"
+        "6,web,Factura incorrecta,-3,1\n"
+    )
+    casos = [(crear_csv(texto), 'utf-8'), (crear_csv('﻿' + texto), 'utf-8-sig'),
+             (crear_csv(texto, 'latin-1'), 'latin-1')]
+    for archivo, encoding in casos:
+        esperado = leer_con_pandas(archivo, encoding)
+        obtenido = LectorArchivosExcel().leer_comentarios(archivo)
+        assert obtenido == esperado, f"{encoding}:\n{obtenido}\n!=\n{esperado}"
+    assert [c['indice_original'] for c in obtenido] == [0, 2, 5]
+    print(f"✅ PASS: {len(obtenido)} comentarios idénticos a read_csv en UTF-8, UTF-8 con BOM y latin-1")
+
+
+def test_chardet_solo_si_no_es_utf8():
+    """Un export UTF-8 no pasa por chardet; uno latin-1 sí, sobre la muestra"""
+    print("\n🧪 Testing strict UTF-8 shortcut...")
+
+    filas = "".join(f"{i},Atención número {i}\n" for i in range(20000))
+    lector = LectorContador()
+    lector.leer_comentarios(crear_csv("ID,Comentario\n" + filas))
+    assert lector.detecciones_chardet == 0
+
+    # El único byte no UTF-8 está al final: la validación recorre todo el archivo
+    lector.leer_comentarios(crear_csv("ID,Comentario\n" + filas + "20000,Ñandutí\n", 'latin-1'))
+    assert lector.detecciones_chardet == 1
+    print("✅ PASS: chardet solo para el archivo latin-1")
+
+
+def test_bloques_y_fallback_a_mitad_de_archivo():
+    """Bloques exactos; una fila corta al final hace seguir a pandas sin repetir ni perder filas"""
+    print("\n🧪 Testing chunked output and pandas fallback...")
+
+    filas = [f"{i},\"Comentario {i} con texto suficiente para ocupar varios bloques\",{i % 11}"
+             for i in range(60000)]
+    archivo = crear_csv("ID,Comentario,NPS\n" + "\n".join(filas) + "\n60000,corta\n")
+
+    bloques = list(LectorArchivosExcel().leer_comentarios_por_bloques(archivo, tamano_bloque=7000))
+    assert [len(b) for b in bloques] == [7000] * 8 + [4001]
+    comentarios = [c for b in bloques for c in b]
+    assert [c['indice_original'] for c in comentarios] == list(range(60001))
+    assert comentarios == leer_con_pandas(archivo, 'utf-8')
+    print("✅ PASS: 60001 filas en orden y sin duplicados")
+
+
+if __name__ == "__main__":
+    print("🔍 Fast CSV Reader Validation Test")
+    print("=" * 50)
+
+    try:
+        test_misma_salida_que_read_csv()
+        test_chardet_solo_si_no_es_utf8()
+        test_bloques_y_fallback_a_mitad_de_archivo()
+        print("\n✅ All fast CSV reader tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
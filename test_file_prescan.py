@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test del pre-escaneo de archivos (encabezado + muestra)
+Valida las filas estimadas de XLSX y CSV, que los archivos inválidos fallan antes de leerse
+y que el caso de uso notifica un plan de lotes estimado
+"""
+
+import io
+import sys
+import time
+from pathlib import Path
+
+from openpyxl import Workbook
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.file_handlers.lector_archivos_excel import LectorArchivosExcel
+    from src.infrastructure.cache.cache_archivos_parseados import CacheArchivosParseados
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    from src.shared.exceptions.archivo_exception import ArchivoException
+    print("✅ Successfully imported prescan components")
+except ImportError as e:
+    print(f"❌ Failed to import prescan components: {e}")
+    sys.exit(1)
+
+
+def crear_xlsx(encabezado, filas, nombre='export.xlsx'):
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(encabezado)
+    for fila in filas:
+        hoja.append(fila)
+    datos = io.BytesIO()
+    libro.save(datos)
+    datos.seek(0)
+    datos.name = nombre
+    return datos
+
+
+def crear_csv(texto, nombre='export.csv'):
+    datos = io.BytesIO(texto.encode('utf-8'))
+    datos.name = nombre
+    return datos
+
+
+def test_filas_estimadas():
+    """XLSX por dimensión de la hoja, CSV por tamaño en bytes, archivos chicos exactos"""
+    print("\n🧪 Testing row count estimation...")
+
+    lector = LectorArchivosExcel()
+    xlsx = crear_xlsx(['ID', 'Canal', 'Comentario Final', 'NPS'],
+                      [[i, 'web', f"Comentario {i}", i % 11] for i in range(20000)])
+    inicio = time.time()
+    preescaneo = lector.preescanear(xlsx)
+    assert time.time() - inicio < 1.0, "prescan must not walk the sheet"
+    assert preescaneo['columna_comentario'] == 'Comentario Final'
+    assert preescaneo['filas_estimadas'] == 20000 and preescaneo['metodo_estimacion'] == 'dimension'
+
+    csv = crear_csv("ID,Comentario,NPS\n" + "".join(
+        f"{i},\"Comentario {i} de largo {'x' * (i % 30)}\",{i % 11}\n" for i in range(50000)))
+    preescaneo = lector.preescanear(csv)
+    assert preescaneo['metodo_estimacion'] == 'tamano_bytes' and preescaneo['encoding'] == 'utf-8'
+    assert abs(preescaneo['filas_estimadas'] - 50000) < 5000, preescaneo['filas_estimadas']
+
+    chico = crear_csv("Comentario\nHola\n\"Dos\nlíneas\"\n")
+    assert lector.preescanear(chico)['filas_estimadas'] == 2
+    print("✅ PASS: 20000 filas XLSX exactas, CSV dentro del 10%")
+
+
+def test_archivos_invalidos_fallan_antes():
+    """Vacíos o sin columna de comentarios: ArchivoException desde el pre-escaneo"""
+    print("\n🧪 Testing fail-fast on invalid files...")
+
+    invalidos = [crear_xlsx(['Comentario'], []), crear_xlsx(['ID', 'Valor'], [[1, 2]]),
+                 crear_csv("ID,Valor\n1,2\n"), crear_csv("Comentario\n")]
+    for archivo in invalidos:
+        try:
+            LectorArchivosExcel().preescanear(archivo)
+            raise AssertionError(f"Expected ArchivoException for {archivo.name}")
+        except ArchivoException:
+            pass
+    print("✅ PASS: errores de archivo antes de la lectura completa")
+
+
+def test_cache_da_cifras_exactas():
+    """Con el archivo ya parseado, filas y comentarios salen de la cache"""
+    print("\n🧪 Testing prescan from the parsed file cache...")
+
+    lector = LectorArchivosExcel(CacheArchivosParseados())
+    archivo = crear_csv("Comentario,NPS\nHola,3\n,4\nChau,5\n")
+    lector.leer_comentarios(archivo)
+    preescaneo = lector.preescanear(archivo)
+    assert preescaneo['metodo_estimacion'] == 'cache'
+    assert (preescaneo['filas_estimadas'], preescaneo['comentarios']) == (3, 2)
+    print("✅ PASS: cifras exactas desde la cache")
+
+
+def test_caso_uso_notifica_plan_estimado():
+    """El caso de uso notifica 'start' estimado y acotado a max_file_comments"""
+    print("\n🧪 Testing estimated batch plan notification...")
+
+    eventos = []
+    caso_uso = AnalizarExcelMaestroCasoUso.__new__(AnalizarExcelMaestroCasoUso)
+    caso_uso.lector_archivos = LectorArchivosExcel()
+    caso_uso.max_comments_per_batch = 100
+    caso_uso.progress_callback = eventos.append
+
+    archivo = crear_xlsx(['Comentario'], [[f"Comentario {i}"] for i in range(5000)])
+    caso_uso._preescanear_archivo(archivo, 2000)
+    assert eventos == [{'action': 'start', 'total_batches': 20, 'total_comments': 2000, 'estimated': True,
+                        'current_batch': 0, 'progress_percentage': 0.0}], eventos
+
+    try:
+        caso_uso._preescanear_archivo(crear_csv("ID,Valor\n1,2\n"), 2000)
+        raise AssertionError("Expected ArchivoException")
+    except ArchivoException:
+        pass
+    print("✅ PASS: plan de 20 lotes notificado antes de leer")
+
+
+if __name__ == "__main__":
+    print("🔍 File Prescan Validation Test")
+    print("=" * 50)
+
+    try:
+        test_filas_estimadas()
+        test_archivos_invalidos_fallan_antes()
+        test_cache_da_cifras_exactas()
+        test_caso_uso_notifica_plan_estimado()
+        print("\n✅ All prescan tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test de recuperación de comentarios faltantes
+Valida que solo se reenvían los índices ausentes y que se reinsertan en su posición original
+"""
+
+import sys
+import json
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    print("✅ Successfully imported gap recovery components")
+except ImportError as e:
+    print(f"❌ Failed to import gap recovery components: {e}")
+    sys.exit(1)
+
+
+def contar_comentarios_prompt(prompt):
+    """Comentarios numerados que contiene un prompt maestro"""
+    return [linea for linea in prompt.split('\n') if linea.split('. ', 1)[0].isdigit()]
+
+
+def respuesta(indices, sentimiento='pos'):
+    return json.dumps({
+        'general': {'total': len(indices), 'tendencia': 'positiva', 'resumen': 'ok'},
+        'comentarios': [
+            {'i': i, 'sent': sentimiento, 'conf': 0.9, 'tema': 'ser', 'emo': 'sat', 'urg': 'b'}
+            for i in indices
+        ],
+        'stats': {'pos': len(indices), 'neu': 0, 'neg': 0, 'tema_top': 'ser', 'urg': 0}
+    })
+
+
+class FakeGapClient:
+    """Primera llamada omite algunos índices; las siguientes responden todo lo pedido"""
+
+    def __init__(self, omitir):
+        self.omitir = set(omitir)
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _contenido(self, kwargs):
+        prompt = kwargs['messages'][-1]['content']
+        self.prompts.append(prompt)
+        total = len(contar_comentarios_prompt(prompt))
+        if len(self.prompts) == 1:
+            return respuesta([i for i in range(1, total + 1) if i not in self.omitir])
+        return respuesta(list(range(1, total + 1)), sentimiento='neg')
+
+    def create(self, **kwargs):
+        contenido = self._contenido(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=contenido), finish_reason='stop')],
+            usage=SimpleNamespace(total_tokens=100)
+        )
+
+
+class FakeGapAsyncClient(FakeGapClient):
+    async def create(self, **kwargs):
+        return FakeGapClient.create(self, **kwargs)
+
+
+def crear_analizador(cliente, rondas=1):
+    analizador = AnalizadorMaestroIA(
+        api_key="test-key-gaps", modelo="gpt-4o-mini", usar_cache=False,
+        configuracion={'use_streaming_responses': False, 'gap_recovery_rounds': rondas}
+    )
+    analizador.disponible = True
+    analizador.retry_wrapper = None
+    analizador.client = cliente
+    return analizador
+
+
+def test_recupera_solo_faltantes():
+    """Un segundo lote pequeño con solo los faltantes completa el resultado"""
+    print("\n🧪 Testing follow-up batch with only missing indices...")
+
+    cliente = FakeGapClient(omitir=[3, 7, 8])
+    analizador = crear_analizador(cliente)
+    comentarios = [f"comentario numero {i}" for i in range(1, 11)]
+
+    resultado = analizador.analizar_excel_completo(comentarios)
+
+    assert len(cliente.prompts) == 2, f"Expected one follow-up call, got {len(cliente.prompts) - 1}"
+    reenviados = contar_comentarios_prompt(cliente.prompts[1])
+    assert len(reenviados) == 3, f"Only missing comments should be re-sent: {reenviados}"
+    assert all(f"comentario numero {n}" in cliente.prompts[1] for n in (3, 7, 8))
+
+    indices = [c['i'] for c in resultado.comentarios_analizados]
+    assert indices == list(range(1, 11)), f"Results not merged by index: {indices}"
+    recuperados = [c['i'] for c in resultado.comentarios_analizados if c['sent'] == 'neg']
+    assert recuperados == [3, 7, 8], f"Recovered results landed in wrong slots: {recuperados}"
+    assert resultado.es_exitoso() and resultado.tokens_utilizados == 200
+    assert resultado.distribucion_sentimientos['neg'] == 3
+    print("✅ PASS: 3/10 faltantes recuperados en una llamada de seguimiento")
+
+
+def test_recuperacion_desactivada():
+    """Con gap_recovery_rounds=0 no hay llamadas extra"""
+    print("\n🧪 Testing gap recovery disabled...")
+
+    cliente = FakeGapClient(omitir=[2])
+    resultado = crear_analizador(cliente, rondas=0).analizar_excel_completo([f"c {i}" for i in range(5)])
+
+    assert len(cliente.prompts) == 1
+    assert len(resultado.comentarios_analizados) == 4
+    print("✅ PASS: sin recuperación el resultado parcial se conserva")
+
+
+def test_recuperacion_async():
+    """El camino asíncrono recupera igual que el síncrono"""
+    print("\n🧪 Testing gap recovery on async path...")
+
+    cliente = FakeGapAsyncClient(omitir=[1, 5])
+    analizador = crear_analizador(cliente)
+    resultado = asyncio.run(analizador.analizar_excel_completo_async(
+        [f"comentario {i}" for i in range(6)], cliente_async=SimpleNamespace(chat=cliente.chat)
+    ))
+
+    assert len(cliente.prompts) == 2 and len(contar_comentarios_prompt(cliente.prompts[1])) == 2
+    assert [c['i'] for c in resultado.comentarios_analizados] == list(range(1, 7))
+    assert resultado.es_exitoso()
+    print("✅ PASS: recuperación asíncrona de 2/6 faltantes")
+
+
+if __name__ == "__main__":
+    print("🔍 Gap Recovery Validation Test")
+    print("=" * 50)
+
+    try:
+        test_recupera_solo_faltantes()
+        test_recuperacion_desactivada()
+        test_recuperacion_async()
+        print("\n✅ All gap recovery tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test de los índices secundarios del repositorio en memoria
+Valida que las consultas indexadas devuelven lo mismo (y en el mismo orden) que recorrer
+todo el repositorio, incluso tras actualizaciones, desalojos LRU y limpiar()
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.repositories.repositorio_comentarios_memoria import RepositorioComentariosMemoria
+    from src.domain.entities.comentario import Comentario
+    from src.domain.value_objects.sentimiento import Sentimiento
+    from src.domain.value_objects.calidad_comentario import CalidadComentario, NivelCalidad
+    from src.domain.value_objects.nivel_urgencia import NivelUrgencia, PrioridadUrgencia
+    print("✅ Successfully imported indexed repository components")
+except ImportError as e:
+    print(f"❌ Failed to import indexed repository components: {e}")
+    sys.exit(1)
+
+
+SENTIMIENTOS = [None, Sentimiento.crear_positivo, Sentimiento.crear_neutral, Sentimiento.crear_negativo]
+
+
+def crear_comentario(aleatorio, id_comentario):
+    comentario = Comentario(id=id_comentario, texto=f"Comentario {id_comentario}",
+                            texto_limpio=f"comentario {id_comentario}")
+    fabrica = aleatorio.choice(SENTIMIENTOS)
+    if fabrica:
+        comentario.sentimiento = fabrica(aleatorio.choice([0.5, 0.8, 0.95]))
+    if aleatorio.random() < 0.7:
+        comentario.calidad = CalidadComentario(aleatorio.choice(list(NivelCalidad)), True, "medio", 20)
+    if aleatorio.random() < 0.7:
+        comentario.urgencia = NivelUrgencia(aleatorio.choice(list(PrioridadUrgencia)), [],
+                                            aleatorio.choice([0.0, 2.5, 6.0, 8.5, 10.0]))
+    return comentario
+
+
+def consultas_por_recorrido(repo):
+    """Resultados del algoritmo anterior: recorrer y ordenar en cada llamada"""
+    todos = repo.obtener_todos()
+    criticos = sorted((c for c in todos if c.es_critico()), key=lambda c: (
+        c.urgencia.prioridad.value if c.urgencia else "P3",
+        -c.urgencia.puntuacion if c.urgencia else 0
+    ))
+    por_sentimiento = {
+        tipo: [c for c in todos if c.sentimiento and c.sentimiento.categoria.value == tipo]
+        for tipo in ('positivo', 'neutral', 'negativo')
+    }
+    estadisticas = {
+        'total': len(todos),
+        'con_sentimiento': sum(1 for c in todos if c.sentimiento),
+        'criticos': len(criticos),
+        'alta_calidad': sum(1 for c in todos if c.calidad and c.calidad.es_alta_calidad())
+    }
+    return criticos, por_sentimiento, estadisticas
+
+
+def verificar(repo):
+    criticos, por_sentimiento, estadisticas = consultas_por_recorrido(repo)
+    assert [c.id for c in repo.buscar_criticos()] == [c.id for c in criticos]
+    for tipo, esperados in por_sentimiento.items():
+        assert [c.id for c in repo.buscar_por_sentimiento(tipo)] == [c.id for c in esperados], tipo
+    assert repo.obtener_estadisticas() == estadisticas, (repo.obtener_estadisticas(), estadisticas)
+
+
+def test_indices_igual_que_recorrido():
+    """Altas, actualizaciones y desalojos por cantidad: mismas respuestas que el recorrido"""
+    print("\n🧪 Testing index parity under updates and LRU eviction...")
+
+    aleatorio = random.Random(24)
+    repo = RepositorioComentariosMemoria(max_comentarios=300, max_memory_mb=100)
+    for paso in range(3000):
+        # Ids repetidos: actualizaciones que mueven el comentario al final del orden LRU
+        repo.guardar(crear_comentario(aleatorio, f"c{aleatorio.randrange(600)}"))
+        if paso % 250 == 0:
+            verificar(repo)
+    verificar(repo)
+    assert len(repo.obtener_todos()) == 300
+    print(f"✅ PASS: {repo.obtener_estadisticas()}")
+
+
+def test_desalojo_por_memoria_y_limpiar():
+    """El desalojo por memoria y limpiar() dejan los índices consistentes"""
+    print("\n🧪 Testing memory eviction and clear...")
+
+    aleatorio = random.Random(7)
+    repo = RepositorioComentariosMemoria(max_comentarios=10000, max_memory_mb=0.01)
+    repo.guardar_lote([crear_comentario(aleatorio, f"m{i}") for i in range(200)])
+    assert 0 < len(repo.obtener_todos()) < 200
+    verificar(repo)
+
+    repo.limpiar()
+    assert repo.buscar_criticos() == [] and repo.buscar_por_sentimiento('negativo') == []
+    assert repo.obtener_estadisticas() == {'total': 0, 'con_sentimiento': 0, 'criticos': 0, 'alta_calidad': 0}
+    repo.guardar_lote([crear_comentario(aleatorio, f"n{i}") for i in range(20)])
+    verificar(repo)
+    print("✅ PASS: índices consistentes tras desalojar y limpiar")
+
+
+def test_orden_criticos():
+    """P0 primero, mayor puntuación primero y empates en orden de inserción"""
+    print("\n🧪 Testing critical ordering...")
+
+    repo = RepositorioComentariosMemoria()
+    for id_comentario, puntuacion in (("a", 6.0), ("b", 9.0), ("c", 6.0)):
+        comentario = Comentario(id=id_comentario, texto="Sin servicio", texto_limpio="sin servicio")
+        comentario.urgencia = NivelUrgencia(PrioridadUrgencia.P0, [], puntuacion)
+        repo.guardar(comentario)
+    muy_negativo = Comentario(id="d", texto="Pésimo", texto_limpio="pésimo",
+                              sentimiento=Sentimiento.crear_negativo(0.9))
+    repo.guardar(muy_negativo)
+    assert [c.id for c in repo.buscar_criticos()] == ["b", "a", "c", "d"]
+
+    # Re-guardar "a" la pasa detrás de "c" entre los empatados
+    repo.guardar(repo.obtener_por_id("a"))
+    assert [c.id for c in repo.buscar_criticos()] == ["b", "c", "a", "d"]
+    print("✅ PASS: orden de criticidad estable")
+
+
+if __name__ == "__main__":
+    print("🔍 Indexed Memory Repository Validation Test")
+    print("=" * 50)
+
+    try:
+        test_indices_igual_que_recorrido()
+        test_desalojo_por_memoria_y_limpiar()
+        test_orden_criticos()
+        print("\n✅ All indexed repository tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test de la sonda de disponibilidad perezosa y compartida
+Valida que construir analizadores no llama a la API y que el sondeo se comparte con TTL
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.sonda_disponibilidad_api import obtener_sonda_disponibilidad
+    from src.shared.exceptions.ia_exception import IAException
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.infrastructure.external_services.analizador_openai import AnalizadorOpenAI
+    import httpx
+    import openai
+    print("✅ Successfully imported health probe components")
+except ImportError as e:
+    print(f"❌ Failed to import health probe components: {e}")
+    sys.exit(1)
+
+
+class FakeClient:
+    """Cliente que cuenta sondeos y falla si se usa una chat completion de prueba"""
+
+    def __init__(self, disponible=True):
+        self.disponible = disponible
+        self.sondeos = 0
+        self.models = SimpleNamespace(retrieve=self.retrieve)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def retrieve(self, modelo):
+        self.sondeos += 1
+        if not self.disponible:
+            raise ConnectionError("sin red")
+        return SimpleNamespace(id=modelo)
+
+    def create(self, **kwargs):
+        raise AssertionError("Health probe must not issue a paid completion")
+
+
+def crear_analizador(api_key, cliente):
+    analizador = AnalizadorMaestroIA(api_key=api_key, modelo="gpt-4o-mini", usar_cache=False)
+    analizador.client = cliente
+    return analizador
+
+
+def test_construccion_sin_red_y_sondeo_compartido():
+    """Construir no sondea; varios analizadores comparten un único sondeo"""
+    print("\n🧪 Testing lazy shared probe...")
+
+    obtener_sonda_disponibilidad().invalidar()
+    cliente = FakeClient()
+
+    inicio = time.time()
+    analizadores = [crear_analizador("test-key-probe-shared", cliente) for _ in range(5)]
+    duracion = time.time() - inicio
+
+    assert cliente.sondeos == 0, "Construction must not probe the API"
+    assert all(a.es_disponible() for a in analizadores)
+    assert cliente.sondeos == 1, f"Expected one shared probe, got {cliente.sondeos}"
+    print(f"✅ PASS: 5 analizadores construidos en {duracion:.2f}s, 1 sondeo compartido")
+
+
+def test_ttl_negativo_y_llamada_real():
+    """Un fallo se reintenta tras el TTL negativo; una llamada real exitosa evita el sondeo"""
+    print("\n🧪 Testing negative TTL and inference from real requests...")
+
+    sonda = obtener_sonda_disponibilidad()
+    sonda.invalidar()
+    cliente = FakeClient(disponible=False)
+    analizador = crear_analizador("test-key-probe-ttl", cliente)
+
+    assert not analizador.es_disponible()
+    assert not analizador.es_disponible()
+    assert cliente.sondeos == 1, "Negative result should be cached"
+    assert not analizador._disponible_para_llamada(), "Known failure must block analysis"
+
+    # La llamada real confirma disponibilidad sin necesitar otro sondeo
+    analizador._registrar_resultado_api()
+    assert analizador.es_disponible() and cliente.sondeos == 1
+
+    # Sin información previa, el análisis no espera a un sondeo
+    otro = crear_analizador("test-key-probe-unknown", FakeClient())
+    assert otro._disponible_para_llamada() and otro.client.sondeos == 0
+    print("✅ PASS: fallo cacheado, éxito inferido de la llamada real, análisis sin sondeo previo")
+
+
+def test_analizador_openai_alimenta_la_sonda():
+    """Las llamadas reales de AnalizadorOpenAI también registran éxito y errores permanentes"""
+    print("\n🧪 Testing per-comment analyzer feeding the probe...")
+
+    sonda = obtener_sonda_disponibilidad()
+    sonda.invalidar()
+    cliente = FakeClient()
+    cliente.chat.completions.create = lambda **kwargs: SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content='[{"sentimiento": "positivo", "confianza": 0.9}]'))]
+    )
+    analizador = AnalizadorOpenAI(api_key="test-key-probe-individual", modelo="gpt-4o-mini",
+                                  configuracion={'rate_limit_scheduler_enabled': False})
+    analizador.client = cliente
+
+    analizador._hacer_llamada_api(["Excelente atención"])
+    assert sonda.estado_conocido("test-key-probe-individual", "gpt-4o-mini") is True
+    assert analizador.disponible and cliente.sondeos == 0, "A real success must stand in for the probe"
+
+    def rechazar(**kwargs):
+        respuesta = httpx.Response(401, request=httpx.Request('POST', 'http://simulado/chat/completions'))
+        raise openai.AuthenticationError("Incorrect API key", response=respuesta, body=None)
+
+    cliente.chat.completions.create = rechazar
+    try:
+        analizador._hacer_llamada_api(["Excelente atención"])
+        raise AssertionError("Expected IAException")
+    except IAException:
+        pass
+    assert sonda.estado_conocido("test-key-probe-individual", "gpt-4o-mini") is False
+    assert not analizador.disponible and cliente.sondeos == 0
+    print("✅ PASS: éxito y credenciales inválidas registrados sin sondear")
+
+
+def test_disponible_forzado():
+    """El modo degradado fija la disponibilidad sin sondear"""
+    print("\n🧪 Testing forced availability (degraded mode)...")
+
+    cliente = FakeClient()
+    analizador = crear_analizador("test-key-probe-forced", cliente)
+    analizador.disponible = False
+
+    assert not analizador.es_disponible() and cliente.sondeos == 0
+    print("✅ PASS: modo degradado sin llamadas de red")
+
+
+if __name__ == "__main__":
+    print("🔍 Lazy Health Probe Validation Test")
+    print("=" * 50)
+
+    try:
+        test_construccion_sin_red_y_sondeo_compartido()
+        test_ttl_negativo_y_llamada_real()
+        test_analizador_openai_alimenta_la_sonda()
+        test_disponible_forzado()
+        print("\n✅ All health probe tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test del backend de grabación/reproducción del LLM
+Valida que lo grabado se reproduce sin red, con latencia lognormal reproducible
+"""
+
+import sys
+import json
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.backend_grabacion_llm import (
+        CassetteLLM, ModeloLatencia, CassetteSinRespuestaError
+    )
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    print("✅ Successfully imported record/replay components")
+except ImportError as e:
+    print(f"❌ Failed to import record/replay components: {e}")
+    sys.exit(1)
+
+
+def respuesta_maestra(total):
+    return json.dumps({
+        'general': {'total': total, 'tendencia': 'positiva', 'resumen': 'ok'},
+        'comentarios': [
+            {'i': i, 'sent': 'pos' if i % 2 else 'neg', 'conf': 0.9, 'tema': 'ser', 'emo': 'sat', 'urg': 'b'}
+            for i in range(1, total + 1)
+        ],
+        'stats': {'pos': (total + 1) // 2, 'neu': 0, 'neg': total // 2, 'tema_top': 'ser', 'urg': 0}
+    })
+
+
+class FakeOpenAI:
+    """Cliente 'real' que cuenta llamadas y responde según el número de comentarios del prompt"""
+
+    def __init__(self):
+        self.llamadas = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.models = SimpleNamespace(retrieve=lambda modelo: SimpleNamespace(id=modelo))
+
+    def create(self, **kwargs):
+        self.llamadas += 1
+        time.sleep(0.01)
+        prompt = kwargs['messages'][-1]['content']
+        total = sum(1 for linea in prompt.split('\n') if linea.split('. ', 1)[0].isdigit())
+        contenido = respuesta_maestra(total)
+        uso = SimpleNamespace(prompt_tokens=100, completion_tokens=50, total_tokens=150)
+        if kwargs.get('stream'):
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=contenido), finish_reason=None)],
+                                usage=None),
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason='stop')],
+                                usage=None),
+                SimpleNamespace(choices=[], usage=uso),
+            ])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=contenido), finish_reason='stop')],
+            usage=uso
+        )
+
+
+def crear_analizador(configuracion, cliente_real=None):
+    analizador = AnalizadorMaestroIA(api_key="test-key-replay", modelo="gpt-4o-mini", usar_cache=False,
+                                     configuracion=configuracion)
+    if cliente_real is not None:
+        # En record el backend envuelve al cliente real
+        analizador.client = analizador._backend_llm.cliente_sync(cliente_real)
+    analizador.disponible = True
+    analizador.retry_wrapper = None
+    return analizador
+
+
+def test_grabar_y_reproducir():
+    """Lo grabado (streaming y no streaming) se reproduce idéntico y sin red"""
+    print("\n🧪 Testing record then replay...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = str(Path(tmp) / "llm.jsonl")
+        lotes = [[f"comentario {lote}-{i}" for i in range(n)] for lote, n in enumerate((5, 8))]
+
+        real = FakeOpenAI()
+        grabados = []
+        for streaming in (True, False):
+            grabador = crear_analizador({'llm_backend': 'record', 'llm_cassette_path': ruta,
+                                         'use_streaming_responses': streaming}, real)
+            grabados.extend(grabador.analizar_excel_completo(lote) for lote in lotes)
+        assert real.llamadas == 4 and len(CassetteLLM(ruta)) == 4
+
+        reproductor = crear_analizador({'llm_backend': 'replay', 'llm_cassette_path': ruta,
+                                        'llm_replay_latency_scale': 0})
+        reproducidos = [reproductor.analizar_excel_completo(lote) for lote in lotes]
+
+        for original, reproducido in zip(grabados, reproducidos):
+            assert reproducido.comentarios_analizados == original.comentarios_analizados
+            assert reproducido.tokens_utilizados == 150 and reproducido.es_exitoso()
+
+        try:
+            reproductor.client.chat.completions.create(model="gpt-4o-mini", messages=[{'role': 'user', 'content': 'x'}])
+            raise AssertionError("Unrecorded request must fail in replay mode")
+        except CassetteSinRespuestaError:
+            pass
+    print("✅ PASS: 4 respuestas grabadas y reproducidas sin llamadas reales")
+
+
+def test_latencia_lognormal_reproducible():
+    """Las muestras respetan p50/p95 y la misma semilla da la misma secuencia"""
+    print("\n🧪 Testing lognormal latency model...")
+
+    modelo = ModeloLatencia(p50=2.0, p95=6.0, semilla=7)
+    muestras = sorted(modelo.muestrear() for _ in range(4000))
+    p50, p95 = muestras[2000], muestras[3800]
+
+    assert 1.8 < p50 < 2.2, f"p50 {p50:.2f}"
+    assert 5.2 < p95 < 6.8, f"p95 {p95:.2f}"
+    otra = ModeloLatencia(p50=2.0, p95=6.0, semilla=7)
+    nueva = ModeloLatencia(p50=2.0, p95=6.0, semilla=7)
+    assert [otra.muestrear() for _ in range(5)] == [nueva.muestrear() for _ in range(5)]
+
+    ajustado = ModeloLatencia.desde_muestras([0.5, 1.0, 1.0, 1.2, 3.0])
+    assert ajustado.p50 == 1.0 and ajustado.p95 == 1.2
+    print(f"✅ PASS: p50={p50:.2f}s p95={p95:.2f}s, secuencia reproducible")
+
+
+def test_replay_async_con_latencia():
+    """El motor async reproduce lotes concurrentes respetando la latencia simulada"""
+    print("\n🧪 Testing async replay with simulated latency...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = str(Path(tmp) / "llm.jsonl")
+        lotes = [[f"lote {lote} comentario {i}" for i in range(4)] for lote in range(4)]
+
+        grabador = crear_analizador({'llm_backend': 'record', 'llm_cassette_path': ruta}, FakeOpenAI())
+        for lote in lotes:
+            grabador.analizar_excel_completo(lote)
+
+        reproductor = crear_analizador({'llm_backend': 'replay', 'llm_cassette_path': ruta,
+                                        'llm_replay_latency_p50': 0.2, 'llm_replay_latency_p95': 0.25})
+
+        async def consumir():
+            return [r async for r in reproductor.procesar_lotes_async(lotes, max_concurrencia=4)]
+
+        inicio = time.time()
+        resultados = asyncio.run(consumir())
+        duracion = time.time() - inicio
+
+        assert all(error is None and resultado.es_exitoso() for _, resultado, error in resultados)
+        assert 0.15 < duracion < 0.6, f"4 concurrent batches at ~0.2s took {duracion:.2f}s"
+    print(f"✅ PASS: 4 lotes concurrentes reproducidos en {duracion:.2f}s")
+
+
+if __name__ == "__main__":
+    print("🔍 LLM Record/Replay Backend Validation Test")
+    print("=" * 50)
+
+    try:
+        test_grabar_y_reproducir()
+        test_latencia_lognormal_reproducible()
+        test_replay_async_con_latencia()
+        print("\n✅ All record/replay tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test del clasificador local de comentarios triviales
+Valida las reglas del léxico, el umbral configurable y que solo el resto llega a la IA,
+también cuando la IA omite un comentario y otros salen del cache
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.text_processing.analizador_lexico_local import AnalizadorLexicoLocal
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    from src.domain.services.analizador_sentimientos import IAnalizadorSentimientos
+    from src.infrastructure.cache.cache_resultados_comentarios import CacheResultadosComentarios
+    from src.infrastructure.external_services.ai_engine_constants import AIEngineConstants
+    print("✅ Successfully imported local classifier components")
+except ImportError as e:
+    print(f"❌ Failed to import local classifier components: {e}")
+    sys.exit(1)
+
+
+class FakeAnalizador(AnalizadorMaestroIA):
+    """Analizador que registra los comentarios que llegan a la IA"""
+
+    def __init__(self):
+        super().__init__(api_key="test-key-local", modelo="gpt-4o-mini", usar_cache=False)
+        self.disponible = True
+        self.enviados = []
+
+    def analizar_excel_completo(self, comentarios_raw, on_comentario=None):
+        self.enviados.extend(comentarios_raw)
+        return self.consolidar_resultados([
+            {'i': i + 1, 'sent': 'neu', 'conf': 0.8, 'tema': 'ser', 'emo': 'neu', 'urg': 'b'}
+            for i in range(len(comentarios_raw))
+        ], tokens_utilizados=50)
+
+
+class FakeAnalizadorOmite(FakeAnalizador):
+    """La IA omite el primer comentario de cada llamada; cada resultado lleva su texto"""
+
+    def analizar_excel_completo(self, comentarios_raw, on_comentario=None):
+        self.enviados.extend(comentarios_raw)
+        return self.consolidar_resultados([
+            {'i': i + 1, 'sent': 'neu', 'conf': 0.8, 'tema': 'ser', '_texto': texto}
+            for i, texto in enumerate(comentarios_raw) if i > 0
+        ], tokens_utilizados=50)
+
+
+def test_reglas_lexico():
+    """Triviales se resuelven; mezclas, negaciones ambiguas y textos largos van a la IA"""
+    print("\n🧪 Testing lexicon rules...")
+
+    clasificador = AnalizadorLexicoLocal()
+    assert isinstance(clasificador, IAnalizadorSentimientos)
+
+    esperados = {
+        "Pésimo": 'neg', "todo bien!": 'pos', "OK": 'pos', "Internet muy lento": 'neg',
+        "no es bueno": 'neg', "Regular": 'neu', "sin comentarios": 'neu',
+    }
+    for texto, sentimiento in esperados.items():
+        resultado = clasificador.clasificar(texto)
+        assert resultado and resultado['sent'] == sentimiento, f"{texto!r}: {resultado}"
+        assert set(resultado) == {'sent', 'conf', 'tema', 'emo', 'urg'}
+
+    for texto in ("bueno pero caro", "no es malo", "el técnico nunca vino a la casa",
+                  "excelente atención de Carlos", ""):
+        assert clasificador.clasificar(texto) is None, f"{texto!r} should go to the AI"
+
+    assert clasificador.clasificar("Internet muy lento")['tema'] == 'vel'
+    assert clasificador.clasificar("pésimo")['emo'] == 'eno'
+    assert clasificador.analizar_sentimiento("horrible").es_negativo()
+    print(f"✅ PASS: {len(esperados)} triviales resueltos, 5 derivados a la IA")
+
+
+def test_umbral_configurable():
+    """Bajar el umbral acepta comentarios con una palabra fuera del léxico"""
+    print("\n🧪 Testing configurable confidence threshold...")
+
+    texto = "excelente atención de Carlos"
+    assert AnalizadorLexicoLocal(umbral_confianza=0.9).clasificar(texto) is None
+    resultado = AnalizadorLexicoLocal(umbral_confianza=0.8).clasificar(texto)
+    assert resultado and resultado['sent'] == 'pos' and resultado['conf'] == 0.85
+    print("✅ PASS: umbral 0.9 deriva, umbral 0.8 resuelve localmente")
+
+
+def test_caso_uso_deriva_solo_el_resto():
+    """Solo los no triviales llegan a la IA y el orden se conserva"""
+    print("\n🧪 Testing use case routes only non-trivial comments...")
+
+    analizador = FakeAnalizador()
+    caso_uso = AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None,
+        lector_archivos=None,
+        analizador_maestro=analizador,
+        clasificador_local=AnalizadorLexicoLocal()
+    )
+    comentarios = ["Pésimo", "La factura llegó con un cargo que no reconozco", "todo bien", "ok",
+                   "El técnico vino dos veces y sigue sin funcionar"]
+
+    resultado = caso_uso._analizar_con_clasificador_local(comentarios)
+
+    assert analizador.enviados == [comentarios[1], comentarios[4]]
+    assert [c['i'] for c in resultado.comentarios_analizados] == [1, 2, 3, 4, 5]
+    assert [c['sent'] for c in resultado.comentarios_analizados] == ['neg', 'neu', 'pos', 'pos', 'neu']
+    assert [c.get('_origen') for c in resultado.comentarios_analizados].count('local') == 3
+    assert resultado.es_exitoso() and resultado.tokens_utilizados == 50
+    print("✅ PASS: 3/5 resueltos localmente, 2 enviados a la IA")
+
+
+def test_ia_omite_un_comentario():
+    """Locales + cache + IA con un comentario omitido: sin corrimiento ni error"""
+    print("\n🧪 Testing partial AI response mixed with local results...")
+
+    analizador = FakeAnalizadorOmite()
+    cache = CacheResultadosComentarios(':memory:')
+    comentarios = ["Pésimo", "La factura llegó con un cargo que no reconozco", "todo bien",
+                   "El técnico vino dos veces y sigue sin funcionar", "ok", "Me cambiaron el plan sin avisar"]
+    cache.guardar_lote([comentarios[5]], [{'i': 1, 'sent': 'neg', 'conf': 0.9}],
+                       analizador.modelo, analizador.seed, AIEngineConstants.PROMPT_VERSION)
+    caso_uso = AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None,
+        lector_archivos=None,
+        analizador_maestro=analizador,
+        cache_resultados=cache,
+        clasificador_local=AnalizadorLexicoLocal()
+    )
+
+    resultado = caso_uso._analizar_con_clasificador_local(comentarios)
+    cache.cerrar()
+
+    # La IA recibe las filas 2 y 4 y omite la 2: queda sin resultado, la 4 conserva el suyo
+    assert analizador.enviados == [comentarios[1], comentarios[3]]
+    por_fila = {c['i']: c for c in resultado.comentarios_analizados}
+    assert sorted(por_fila) == [1, 3, 4, 5, 6]
+    assert por_fila[4]['_texto'] == comentarios[3]
+    assert por_fila[6].get('_origen') == 'cache' and por_fila[6]['sent'] == 'neg'
+    assert [por_fila[i].get('_origen') for i in (1, 3, 5)] == ['local'] * 3
+    print("✅ PASS: 5/6 con su propio resultado, el omitido queda sin resultado")
+
+
+if __name__ == "__main__":
+    print("🔍 Local Fast-Path Classifier Validation Test")
+    print("=" * 50)
+
+    try:
+        test_reglas_lexico()
+        test_umbral_configurable()
+        test_caso_uso_deriva_solo_el_resto()
+        test_ia_omite_un_comentario()
+        print("\n✅ All local classifier tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
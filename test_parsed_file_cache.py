@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test de la cache de archivos parseados
+Valida que un mismo contenido se parsea una sola vez, que el spill a disco sobrevive a una cache nueva
+y que una lectura cortada por el límite no deja entradas incompletas
+"""
+
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+from openpyxl import Workbook
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.file_handlers.lector_archivos_excel import LectorArchivosExcel
+    from src.infrastructure.cache.cache_archivos_parseados import CacheArchivosParseados
+    print("✅ Successfully imported parsed file cache components")
+except ImportError as e:
+    print(f"❌ Failed to import parsed file cache components: {e}")
+    sys.exit(1)
+
+
+class LectorContador(LectorArchivosExcel):
+    """Cuenta los parseos reales (los aciertos de cache no pasan por aquí)"""
+
+    def __init__(self, cache_parseados=None):
+        super().__init__(cache_parseados)
+        self.parseos = 0
+        self.detecciones_encoding = 0
+
+    def _parsear_por_bloques(self, archivo, tamano_bloque, parseado=None):
+        self.parseos += 1
+        yield from super()._parsear_por_bloques(archivo, tamano_bloque, parseado)
+
+    def _detectar_encoding(self, content_bytes):
+        self.detecciones_encoding += 1
+        return super()._detectar_encoding(content_bytes)
+
+
+def crear_csv(filas, nombre='export.csv', encoding='latin-1'):
+    texto = "ID,Comentario Final,NPS,Nota\n" + "".join(
+        f"{i},{comentario},{nps},{nota}\n" for i, comentario, nps, nota in filas)
+    datos = io.BytesIO(texto.encode(encoding))
+    datos.name = nombre
+    return datos
+
+
+def crear_xlsx(encabezado, filas, nombre='export.xlsx'):
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(encabezado)
+    for fila in filas:
+        hoja.append(fila)
+    datos = io.BytesIO()
+    libro.save(datos)
+    datos.seek(0)
+    datos.name = nombre
+    return datos
+
+
+def test_un_parseo_por_contenido():
+    """Vista previa, lectura completa y lectura por bloques del mismo archivo parsean una vez"""
+    print("\n🧪 Testing single parse per file content...")
+
+    filas = [(i, f"Señal débil en Ñemby {i}", i % 11, '' if i % 3 else 4.5) for i in range(50)]
+    lector = LectorContador(CacheArchivosParseados())
+    sin_cache = LectorArchivosExcel().leer_comentarios(crear_csv(filas))
+
+    parseado = lector.leer_archivo_parseado(crear_csv(filas))
+    assert parseado.columna_comentario == 'Comentario Final'
+    assert parseado.columnas == ['ID', 'Comentario Final', 'NPS', 'Nota']
+    assert parseado.total_filas == 50 and len(parseado) == 50
+    assert parseado.encoding is not None
+
+    # Otro objeto con los mismos bytes (como el BytesIO que arma la página para el análisis)
+    assert lector.leer_comentarios(crear_csv(filas)) == sin_cache
+    assert [len(b) for b in lector.leer_comentarios_por_bloques(crear_csv(filas), 20)] == [20, 20, 10]
+    assert lector.parseos == 1 and lector.detecciones_encoding == 1, (lector.parseos, lector.detecciones_encoding)
+
+    # Contenido distinto o misma data con otra extensión: parseo nuevo
+    lector.leer_comentarios(crear_csv(filas[:10]))
+    assert lector.parseos == 2
+    print("✅ PASS: 4 lecturas, 1 parseo y 1 detección de encoding")
+
+
+def test_spill_a_disco_entre_procesos():
+    """Un archivo grande vuelca a Parquet y una cache nueva (otro proceso) lo restaura sin parsear"""
+    print("\n🧪 Testing disk spill...")
+
+    archivo = crear_xlsx(['Comentario', 'NPS', 'Nota'],
+                         [[f"Comentario {i}", i % 11 if i % 4 else None, 3.5 if i % 2 else None]
+                          for i in range(300)])
+    with tempfile.TemporaryDirectory() as directorio:
+        primero = LectorContador(CacheArchivosParseados(directorio, umbral_spill_comentarios=100))
+        esperado = primero.leer_comentarios(archivo)
+        assert any(Path(directorio).glob('*.json')), "spill expected above the threshold"
+
+        segundo = LectorContador(CacheArchivosParseados(directorio, umbral_spill_comentarios=100))
+        assert segundo.leer_comentarios(archivo) == esperado
+        assert segundo.parseos == 0
+        assert segundo.cache_parseados.estadisticas['aciertos_disco'] == 1
+
+        # Archivos chicos quedan solo en memoria
+        chico = crear_xlsx(['Comentario'], [["Hola"]], nombre='chico.xlsx')
+        segundo.leer_comentarios(chico)
+        assert len(list(Path(directorio).glob('*.json'))) == 1
+    print("✅ PASS: restaurado desde disco con la misma salida")
+
+
+def test_lectura_cortada_no_se_guarda():
+    """Si el caso de uso deja de iterar en el límite, la cache no guarda un archivo incompleto"""
+    print("\n🧪 Testing partial reads...")
+
+    archivo = crear_xlsx(['Comentario'], [[f"Comentario {i}"] for i in range(500)])
+    lector = LectorContador(CacheArchivosParseados())
+    for numero, _ in enumerate(lector.leer_comentarios_por_bloques(archivo, 100)):
+        if numero == 1:
+            break
+    assert len(lector.leer_comentarios(archivo)) == 500
+    assert lector.parseos == 2
+    assert len(lector.leer_comentarios(archivo)) == 500
+    assert lector.parseos == 2
+    print("✅ PASS: solo las lecturas completas quedan en cache")
+
+
+if __name__ == "__main__":
+    print("🔍 Parsed File Cache Validation Test")
+    print("=" * 50)
+
+    try:
+        test_un_parseo_por_contenido()
+        test_spill_a_disco_entre_procesos()
+        test_lectura_cortada_no_se_guarda()
+        print("\n✅ All parsed file cache tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
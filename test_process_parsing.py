@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test del parseo de archivos en procesos worker
+Valida que el pool produce lo mismo que el parseo en el proceso, que las hojas de un libro
+se combinan en orden y que los errores de archivo cruzan el límite del proceso
+"""
+
+import io
+import sys
+from pathlib import Path
+
+from openpyxl import Workbook
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.file_handlers.lector_archivos_excel import LectorArchivosExcel
+    from src.infrastructure.file_handlers.parseador_procesos import (
+        ParseadorProcesos, empaquetar_parseado, desempaquetar_parseado
+    )
+    from src.infrastructure.cache.cache_archivos_parseados import CacheArchivosParseados
+    from src.shared.exceptions.archivo_exception import ArchivoException
+    print("✅ Successfully imported process parsing components")
+except ImportError as e:
+    print(f"❌ Failed to import process parsing components: {e}")
+    sys.exit(1)
+
+
+def crear_libro(hojas, nombre='export.xlsx'):
+    """hojas: lista de (encabezado, filas)"""
+    libro = Workbook()
+    libro.remove(libro.active)
+    for numero, (encabezado, filas) in enumerate(hojas):
+        hoja = libro.create_sheet(f"Hoja{numero + 1}")
+        hoja.append(encabezado)
+        for fila in filas:
+            hoja.append(fila)
+    datos = io.BytesIO()
+    libro.save(datos)
+    datos.seek(0)
+    datos.name = nombre
+    return datos
+
+
+def crear_csv(texto, nombre='export.csv'):
+    datos = io.BytesIO(texto.encode('utf-8'))
+    datos.name = nombre
+    return datos
+
+
+def test_paquete_compacto_ida_y_vuelta():
+    """Las columnas viajan y vuelven iguales, con None en NPS/Nota faltantes"""
+    print("\n🧪 Testing compact packaging...")
+
+    parseado = LectorArchivosExcel().leer_archivo_parseado(
+        crear_csv("Comentario,NPS,Nota\nHola,3,\nSeñal débil,,4.5\n,1,1\n"))
+    paquete = empaquetar_parseado(parseado)
+    assert not any(hasattr(valor, 'columns') for valor in paquete.values()), "no DataFrames"
+    vuelta = desempaquetar_parseado(paquete, 'huella', desplazamiento=10)
+    assert vuelta.comentarios() == [
+        {'comentario': 'Hola', 'indice_original': 10, 'nps': 3},
+        {'comentario': 'Señal débil', 'indice_original': 11, 'nota': 4.5},
+    ]
+    assert (vuelta.huella, vuelta.total_filas, vuelta.columna_comentario) == ('huella', 3, 'Comentario')
+    print("✅ PASS: columnas idénticas tras el viaje")
+
+
+def test_pool_igual_que_en_proceso():
+    """CSV, una hoja y todas las hojas: mismo resultado en el pool que en el proceso"""
+    print("\n🧪 Testing pool parity...")
+
+    parseador = ParseadorProcesos(max_workers=2, umbral_bytes=0)
+    try:
+        libro = crear_libro([
+            (['ID', 'Comentario', 'NPS'], [[i, f"Primera {i}", i % 11] for i in range(300)]),
+            (['ID', 'Valor'], [[1, 2], [3, 4]]),
+            (['Canal', 'Feedback', 'Nota'], [['web', f"Segunda {i}", 3.5] for i in range(200)]),
+        ])
+        csv = crear_csv("ID,Comentario\n" + "".join(f"{i},Texto {i}\n" for i in range(500)))
+
+        for archivo, todas in ((libro, False), (libro, True), (csv, False)):
+            local = LectorArchivosExcel(leer_todas_las_hojas=todas)
+            remoto = LectorArchivosExcel(parseador_procesos=parseador, leer_todas_las_hojas=todas)
+            esperado = local.leer_comentarios(archivo)
+            assert remoto.leer_comentarios(archivo) == esperado, archivo.name
+            assert remoto.leer_archivo_parseado(archivo).total_filas == local.leer_archivo_parseado(archivo).total_filas
+
+        todas = LectorArchivosExcel(leer_todas_las_hojas=True).leer_comentarios(libro)
+        assert len(todas) == 500
+        assert todas[300] == {'comentario': 'Segunda 0', 'indice_original': 300, 'nota': 3.5}
+    finally:
+        parseador.cerrar()
+    print("✅ PASS: CSV, primera hoja y libro completo idénticos")
+
+
+def test_errores_y_cache():
+    """ArchivoException del worker llega al llamador; el resultado del pool queda en la cache"""
+    print("\n🧪 Testing errors and cache through the pool...")
+
+    parseador = ParseadorProcesos(max_workers=1, umbral_bytes=0)
+    try:
+        lector = LectorArchivosExcel(CacheArchivosParseados(), parseador_procesos=parseador)
+        try:
+            lector.leer_comentarios(crear_csv("ID,Valor\n1,2\n"))
+            raise AssertionError("Expected ArchivoException")
+        except ArchivoException as e:
+            assert "columna de comentarios" in str(e)
+
+        archivo = crear_csv("Comentario\nUno\nDos\n")
+        lector.leer_comentarios(archivo)
+        assert lector.cache_parseados.obtener(lector._huella_archivo(archivo)) is not None
+
+        # Bajo el umbral no se usa el pool
+        parseador.umbral_bytes = 1024 * 1024
+        assert not lector._parsear_fuera(archivo)
+    finally:
+        parseador.cerrar()
+    print("✅ PASS: errores claros y resultado cacheado")
+
+
+if __name__ == "__main__":
+    print("🔍 Process Parsing Validation Test")
+    print("=" * 50)
+
+    try:
+        test_paquete_compacto_ida_y_vuelta()
+        test_pool_igual_que_en_proceso()
+        test_errores_y_cache()
+        print("\n✅ All process parsing tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Test del planificador de límites RPM/TPM compartido por el proceso
+Valida admisión por presupuesto, lectura de headers x-ratelimit-* y concurrencia adaptativa
+"""
+
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.planificador_limites_api import (
+        PlanificadorLimitesAPI, parsear_duracion, obtener_planificador_limites
+    )
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    from src.infrastructure.external_services import retry_strategy
+    from scripts.servidor_openai_simulado import ServidorOpenAISimulado
+    import httpx
+    import openai
+    print("✅ Successfully imported rate limit scheduler components")
+except ImportError as e:
+    print(f"❌ Failed to import rate limit scheduler components: {e}")
+    sys.exit(1)
+
+
+def test_parsear_duracion():
+    """Formatos de x-ratelimit-reset-* y retry-after"""
+    print("\n🧪 Testing reset header parsing...")
+
+    assert parsear_duracion('20ms') == 0.02
+    assert parsear_duracion('1.5s') == 1.5
+    assert parsear_duracion('6m0s') == 360
+    assert parsear_duracion('1h2m3s') == 3723
+    assert parsear_duracion('2.5') == 2.5
+    assert parsear_duracion(None) is None and parsear_duracion('nada') is None
+    print("✅ PASS: duraciones parseadas")
+
+
+def test_admision_por_presupuesto_tpm():
+    """Una reserva que no entra en el TPM espera al relleno de la cubeta"""
+    print("\n🧪 Testing TPM admission...")
+
+    planificador = PlanificadorLimitesAPI(rpm=1000, tpm=60000, max_concurrencia=4)
+    with planificador.reservar(40000):
+        pass
+    with planificador.reservar(20000):
+        pass
+
+    inicio = time.monotonic()
+    with planificador.reservar(2000):         # Quedan ~0: espera ~2s de relleno a 1000 tokens/s
+        pass
+    espera = time.monotonic() - inicio
+    assert 1.5 < espera < 3, f"Expected ~2s wait for TPM refill, got {espera:.2f}s"
+    assert planificador.estadisticas['admitidas'] == 3
+    print(f"✅ PASS: admisión esperó {espera:.1f}s al relleno de tokens")
+
+
+def test_headers_y_concurrencia_adaptativa():
+    """Headers restantes recortan el presupuesto; 429 pausa y reduce a la mitad; holgura recupera"""
+    print("\n🧪 Testing header feedback and adaptive concurrency...")
+
+    planificador = PlanificadorLimitesAPI(rpm=500, tpm=200000, max_concurrencia=8)
+    planificador.registrar_respuesta(200, {
+        'x-ratelimit-limit-requests': '100', 'x-ratelimit-remaining-requests': '5',
+        'x-ratelimit-limit-tokens': '20000', 'x-ratelimit-remaining-tokens': '1500',
+    })
+    assert planificador.peticiones.capacidad == 100 and planificador.tokens.capacidad == 20000
+    assert planificador.tokens.disponible <= 1500
+    assert planificador.limite_concurrencia == 4, "Scarce budget must halve concurrency"
+
+    planificador.registrar_respuesta(429, {'retry-after': '0.3'})
+    assert planificador.limite_concurrencia == 2 and planificador.estadisticas['rechazos_429'] == 1
+    inicio = time.monotonic()
+    with planificador.reservar(10):
+        pass
+    assert time.monotonic() - inicio >= 0.25, "Admission must wait for retry-after"
+
+    for _ in range(10):
+        planificador.registrar_respuesta(200, {
+            'x-ratelimit-limit-requests': '100', 'x-ratelimit-remaining-requests': '90',
+            'x-ratelimit-limit-tokens': '20000', 'x-ratelimit-remaining-tokens': '18000',
+        })
+    assert planificador.limite_concurrencia == 8, "Spare budget grows back up to the configured max"
+    print("✅ PASS: 8 → 4 → 2 → 8 lotes simultáneos según presupuesto")
+
+
+def test_limite_de_concurrencia_entre_hilos():
+    """Nunca hay más llamadas en vuelo que el límite vigente"""
+    print("\n🧪 Testing in-flight limit across threads...")
+
+    planificador = PlanificadorLimitesAPI(rpm=10000, tpm=10 ** 7, max_concurrencia=3)
+    maximo = {'actual': 0, 'pico': 0}
+    lock = threading.Lock()
+
+    def llamada():
+        with planificador.reservar(100):
+            with lock:
+                maximo['actual'] += 1
+                maximo['pico'] = max(maximo['pico'], maximo['actual'])
+            time.sleep(0.02)
+            with lock:
+                maximo['actual'] -= 1
+
+    hilos = [threading.Thread(target=llamada) for _ in range(12)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert maximo['pico'] == 3, f"Peak in-flight {maximo['pico']}"
+    assert obtener_planificador_limites('sk-a', 'gpt-4o-mini') is obtener_planificador_limites('sk-a', 'gpt-4o-mini')
+    assert obtener_planificador_limites('sk-a', 'gpt-4o-mini') is not obtener_planificador_limites('sk-b', 'gpt-4o-mini')
+    print("✅ PASS: pico de 3 llamadas en vuelo y un planificador por clave+modelo")
+
+
+def test_reintento_pasa_por_admision():
+    """Cada intento del retry wrapper reserva presupuesto y el backoff no retiene el hueco"""
+    print("\n🧪 Testing per-attempt admission under the retry wrapper...")
+
+    planificador = PlanificadorLimitesAPI(rpm=10000, tpm=10 ** 7, max_concurrencia=1)
+    en_vuelo_en_backoff = []
+
+    def crear(**kwargs):
+        if planificador.estadisticas['admitidas'] == 1:
+            respuesta_429 = httpx.Response(429, request=httpx.Request('POST', 'http://simulado/chat/completions'))
+            raise openai.RateLimitError("Rate limit reached", response=respuesta_429, body=None)
+        contenido = json.dumps({
+            'general': {'total': 1, 'tendencia': 'neutral', 'resumen': 'ok'},
+            'comentarios': [{'i': 1, 'sent': 'neu', 'conf': 0.8, 'tema': 'ser', 'emo': 'neu', 'urg': 'b'}],
+            'stats': {'pos': 0, 'neu': 1, 'neg': 0, 'tema_top': 'ser', 'urg': 0}
+        })
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=contenido), finish_reason='stop')],
+            usage=SimpleNamespace(total_tokens=100)
+        )
+
+    analizador = AnalizadorMaestroIA(api_key="sk-test-reintento", modelo="gpt-4o-mini", usar_cache=False,
+                                     configuracion={'use_streaming_responses': False})
+    analizador.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=crear)))
+    analizador._planificador = planificador
+    analizador.retry_wrapper = retry_strategy.OpenAIRetryWrapper(
+        retry_strategy.RetryStrategy(max_retries=2, base_delay=0.01, jitter=False))
+
+    sleep_original = retry_strategy.time.sleep
+    retry_strategy.time.sleep = lambda segundos: en_vuelo_en_backoff.append(planificador.en_vuelo)
+    try:
+        respuesta = analizador._hacer_llamada_api_maestra("1. Comentario de prueba", 1)
+    finally:
+        retry_strategy.time.sleep = sleep_original
+
+    assert respuesta['comentarios'][0]['sent'] == 'neu'
+    assert en_vuelo_en_backoff == [0], f"Backoff must not hold the slot: {en_vuelo_en_backoff}"
+    assert planificador.estadisticas['admitidas'] == 2, "The retry must go through admission again"
+    assert planificador.en_vuelo == 0
+    print("✅ PASS: 2 intentos admitidos, hueco libre durante el backoff")
+
+
+def test_lotes_paralelos_sin_tormenta_de_429():
+    """Contra el servidor simulado el planificador evita los 429 que sufren los lotes sin planificar"""
+    print("\n🧪 Testing scheduled parallel batches against the stub server...")
+
+    with ServidorOpenAISimulado(rpm=600, tpm=14000, latencia_p50=0.05, latencia_p95=0.1) as servidor:
+        configuracion = {'openai_base_url': servidor.base_url, 'use_async_engine': False,
+                         'token_aware_batching': False, 'max_concurrent_batches': 4,
+                         'rate_limit_rpm': 600, 'rate_limit_tpm': 14000}
+        analizador = AnalizadorMaestroIA(api_key="sk-test-planificador", modelo="gpt-4o-mini", usar_cache=False,
+                                         configuracion=configuracion)
+        analizador.retry_wrapper = None
+        caso_uso = AnalizarExcelMaestroCasoUso(
+            repositorio_comentarios=None,
+            lector_archivos=None,
+            analizador_maestro=analizador,
+            max_comments_per_batch=50,
+            configuracion=configuracion
+        )
+        comentarios = [f"Comentario de carga {i} sobre el servicio" for i in range(160)]
+
+        resultado = caso_uso._procesar_en_lotes(comentarios)
+
+        assert len(resultado.comentarios_analizados) == 160
+        planificador = analizador._planificador
+        print(f"   servidor: {servidor.estadisticas}")
+        print(f"   planificador: {planificador.estadisticas}")
+        assert servidor.estadisticas['rechazadas_429'] == 0, "Scheduler must keep batches under the TPM limit"
+        assert planificador.estadisticas['esperas'] > 0, "Some batch must have waited for budget"
+    print("✅ PASS: 160 comentarios sin 429, los lotes esperaron presupuesto")
+
+
+if __name__ == "__main__":
+    print("🔍 Rate Limit Scheduler Validation Test")
+    print("=" * 50)
+
+    try:
+        test_parsear_duracion()
+        test_admision_por_presupuesto_tpm()
+        test_headers_y_concurrencia_adaptativa()
+        test_limite_de_concurrencia_entre_hilos()
+        test_reintento_pasa_por_admision()
+        test_lotes_paralelos_sin_tormenta_de_429()
+        print("\n✅ All rate limit scheduler tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Test de coalescencia de lotes idénticos en vuelo (single-flight)
+Valida que sesiones concurrentes con el mismo lote comparten una sola llamada a la API
+"""
+
+import sys
+import json
+import time
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.infrastructure.external_services.coalescedor_peticiones import (
+        CoalescedorPeticiones, obtener_coalescedor_peticiones
+    )
+    from src.shared.exceptions.ia_exception import IAException
+    print("✅ Successfully imported request coalescing components")
+except ImportError as e:
+    print(f"❌ Failed to import request coalescing components: {e}")
+    sys.exit(1)
+
+
+def respuesta_maestra(total):
+    return json.dumps({
+        'general': {'total': total, 'tendencia': 'neutral', 'resumen': 'ok'},
+        'comentarios': [
+            {'i': i, 'sent': 'neu', 'conf': 0.8, 'tema': 'ser', 'emo': 'neu', 'urg': 'b'}
+            for i in range(1, total + 1)
+        ],
+        'stats': {'pos': 0, 'neu': total, 'neg': 0, 'tema_top': 'ser', 'urg': 0}
+    })
+
+
+class FakeOpenAI:
+    """Cliente lento que cuenta llamadas (sync y async)"""
+
+    def __init__(self, demora=0.3, fallar=False):
+        self.llamadas = 0
+        self.demora = demora
+        self.fallar = fallar
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _respuesta(self, kwargs):
+        with self._lock:
+            self.llamadas += 1
+        if self.fallar:
+            raise RuntimeError("API caída")
+        prompt = kwargs['messages'][-1]['content']
+        total = sum(1 for linea in prompt.split('\n') if linea.split('. ', 1)[0].isdigit())
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=respuesta_maestra(total)), finish_reason='stop')],
+            usage=SimpleNamespace(total_tokens=100)
+        )
+
+    def create(self, **kwargs):
+        time.sleep(self.demora)
+        return self._respuesta(kwargs)
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create_async))
+
+    async def create_async(self, **kwargs):
+        await asyncio.sleep(self.demora)
+        return self._respuesta(kwargs)
+
+
+def crear_sesion(cliente, **configuracion):
+    """Cada sesión de Streamlit construye su propio analizador"""
+    configuracion = dict({'use_streaming_responses': False}, **configuracion)
+    analizador = AnalizadorMaestroIA(api_key="test-key-coalescing", modelo="gpt-4o-mini", usar_cache=False,
+                                     configuracion=configuracion)
+    analizador.client = cliente
+    analizador.disponible = True
+    analizador.retry_wrapper = None
+    return analizador
+
+
+def analizar_en_hilos(sesiones_y_lotes):
+    resultados = [None] * len(sesiones_y_lotes)
+
+    def trabajar(posicion, sesion, lote):
+        try:
+            resultados[posicion] = sesion.analizar_excel_completo(lote)
+        except Exception as e:
+            resultados[posicion] = e
+
+    hilos = [threading.Thread(target=trabajar, args=(i, s, l)) for i, (s, l) in enumerate(sesiones_y_lotes)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def test_sesiones_concurrentes_comparten_llamada():
+    """Tres sesiones con el mismo lote en vuelo hacen una sola llamada"""
+    print("\n🧪 Testing identical in-flight batches across sessions...")
+
+    cliente = FakeOpenAI()
+    lote = [f"Comentario semanal {i}" for i in range(10)]
+    coalescedor = obtener_coalescedor_peticiones()
+    coalescidas_antes = coalescedor.estadisticas['coalescidas']
+
+    resultados = analizar_en_hilos([(crear_sesion(cliente), lote) for _ in range(3)])
+
+    assert cliente.llamadas == 1, f"Expected 1 API call, got {cliente.llamadas}"
+    assert all(r is resultados[0] for r in resultados), "Followers receive the leader's result"
+    assert resultados[0].es_exitoso() and len(resultados[0].comentarios_analizados) == 10
+    assert coalescedor.estadisticas['coalescidas'] - coalescidas_antes == 2
+    assert coalescedor.en_vuelo() == 0, "Finished batches leave the registry"
+
+    # Terminado el vuelo, un lote nuevo vuelve a llamar (no hay cache en este test)
+    crear_sesion(cliente).analizar_excel_completo(lote)
+    assert cliente.llamadas == 2
+    print("✅ PASS: 3 sesiones, 1 llamada a la API")
+
+
+def test_otro_orden_o_deshabilitado_no_coalesce():
+    """Mismo contenido en otro orden (misma clave de cache) o coalescencia apagada llaman por separado"""
+    print("\n🧪 Testing order guard and disabled coalescing...")
+
+    cliente = FakeOpenAI()
+    lote = [f"Opinión {i}" for i in range(6)]
+    resultados = analizar_en_hilos([(crear_sesion(cliente), lote), (crear_sesion(cliente), list(reversed(lote)))])
+    assert cliente.llamadas == 2 and all(r.es_exitoso() for r in resultados)
+
+    cliente = FakeOpenAI()
+    analizar_en_hilos([(crear_sesion(cliente, request_coalescing_enabled=False), lote) for _ in range(2)])
+    assert cliente.llamadas == 2
+    print("✅ PASS: sin coalescencia cuando el orden difiere o está deshabilitada")
+
+
+def test_error_del_lider_se_propaga():
+    """Si la llamada original falla, quienes esperaban reciben el error"""
+    print("\n🧪 Testing leader failure propagation...")
+
+    cliente = FakeOpenAI(fallar=True)
+    lote = [f"Reclamo {i}" for i in range(4)]
+    resultados = analizar_en_hilos([(crear_sesion(cliente), lote) for _ in range(2)])
+
+    assert cliente.llamadas == 1
+    assert all(isinstance(r, IAException) for r in resultados), resultados
+    assert obtener_coalescedor_peticiones().en_vuelo() == 0
+    print("✅ PASS: el error se propaga y el registro queda limpio")
+
+
+def test_coalescencia_async_entre_event_loops():
+    """Un seguidor async espera al líder aunque corra en otro hilo/event loop"""
+    print("\n🧪 Testing async coalescing...")
+
+    cliente = FakeAsyncOpenAI()
+    lote = [f"Comentario async {i}" for i in range(5)]
+
+    async def dos_sesiones():
+        return await asyncio.gather(*(crear_sesion(cliente).analizar_excel_completo_async(lote, cliente)
+                                      for _ in range(2)))
+
+    mismo_loop = asyncio.run(dos_sesiones())
+    assert cliente.llamadas == 1 and mismo_loop[0] is mismo_loop[1]
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.extend(asyncio.run(dos_sesiones()))) for _ in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert cliente.llamadas == 2, f"Two loops x two sessions must share one call, got {cliente.llamadas - 1}"
+    assert len({id(r) for r in resultados}) == 1
+    print("✅ PASS: una llamada por lote entre sesiones async y event loops distintos")
+
+
+def test_coalescedor_aislado():
+    """ejecutar() del coalescedor: el seguidor no ejecuta su función"""
+    print("\n🧪 Testing standalone coalescer...")
+
+    coalescedor = CoalescedorPeticiones()
+    ejecuciones = []
+
+    def calcular():
+        ejecuciones.append(1)
+        time.sleep(0.2)
+        return 'resultado'
+
+    salida = []
+    hilos = [threading.Thread(target=lambda: salida.append(coalescedor.ejecutar('k', ['a', 'b'], calcular)))
+             for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len(ejecuciones) == 1 and salida == ['resultado'] * 4
+    print("✅ PASS: 4 llamadores, 1 ejecución")
+
+
+if __name__ == "__main__":
+    print("🔍 Request Coalescing Validation Test")
+    print("=" * 50)
+
+    try:
+        test_sesiones_concurrentes_comparten_llamada()
+        test_otro_orden_o_deshabilitado_no_coalesce()
+        test_error_del_lider_se_propaga()
+        test_coalescencia_async_entre_event_loops()
+        test_coalescedor_aislado()
+        print("\n✅ All request coalescing tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test del cache persistente de resultados por comentario
+Valida persistencia entre instancias, que solo los fallos de cache se envían a la API
+y que cada resultado se ubica por su 'i' (una respuesta corta no corre ni cachea etiquetas ajenas)
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.cache.cache_resultados_comentarios import CacheResultadosComentarios
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    from src.infrastructure.external_services.ai_engine_constants import AIEngineConstants
+    print("✅ Successfully imported cache components")
+except ImportError as e:
+    print(f"❌ Failed to import cache components: {e}")
+    sys.exit(1)
+
+
+class AnalizadorContador(AnalizadorMaestroIA):
+    """Analizador que registra qué comentarios llegan a la 'API'"""
+
+    def __init__(self):
+        super().__init__(api_key="test-key-cache", modelo="gpt-4o-mini", usar_cache=False)
+        self.disponible = True
+        self.enviados = []
+
+    def analizar_excel_completo(self, comentarios_raw, on_comentario=None):
+        self.enviados.extend(comentarios_raw)
+        return self.consolidar_resultados([
+            {'i': i + 1, 'sent': 'neg' if 'malo' in c else 'pos', 'conf': 0.9,
+             'tema': 'ser', 'emo': 'sat', 'urg': 'b'}
+            for i, c in enumerate(comentarios_raw)
+        ])
+
+
+class AnalizadorOmiteUno(AnalizadorContador):
+    """La 'API' omite el primer comentario de cada llamada (los demás conservan su 'i')"""
+
+    def analizar_excel_completo(self, comentarios_raw, on_comentario=None):
+        completo = super().analizar_excel_completo(comentarios_raw, on_comentario)
+        return self.consolidar_resultados(completo.comentarios_analizados[1:])
+
+
+def test_persistencia_entre_instancias():
+    """Un resultado guardado sobrevive a una nueva instancia del cache"""
+    print("\n🧪 Testing persistence across cache instances...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = Path(tmp) / "cache.sqlite3"
+        cache = CacheResultadosComentarios(str(ruta))
+        escritos = cache.guardar_lote(
+            ["Excelente servicio"], [{'i': 1, 'sent': 'pos', 'conf': 0.95, 'tema': 'ser', 'emo': 'sat', 'urg': 'b'}],
+            "gpt-4o-mini", 12345, "v1"
+        )
+        cache.cerrar()
+
+        reabierto = CacheResultadosComentarios(str(ruta))
+        aciertos = reabierto.obtener_lote(["  excelente   SERVICIO "], "gpt-4o-mini", 12345, "v1")
+        otro_modelo = reabierto.obtener_lote(["Excelente servicio"], "gpt-4o", 12345, "v1")
+        otra_version = reabierto.obtener_lote(["Excelente servicio"], "gpt-4o-mini", 12345, "v2")
+        reabierto.cerrar()
+
+    assert escritos == 1, "Entry was not written"
+    assert aciertos == {0: {'sent': 'pos', 'conf': 0.95, 'tema': 'ser', 'emo': 'sat', 'urg': 'b'}}, aciertos
+    assert not otro_modelo and not otra_version, "Key must include model and prompt version"
+    print("✅ PASS: Normalized hit after reopen; model/version isolate entries")
+
+
+def test_caso_uso_envia_solo_fallos():
+    """La segunda carga solo envía a la API los comentarios nuevos"""
+    print("\n🧪 Testing that only cache misses reach the API...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CacheResultadosComentarios(str(Path(tmp) / "cache.sqlite3"))
+        analizador = AnalizadorContador()
+        caso_uso = AnalizarExcelMaestroCasoUso(
+            repositorio_comentarios=None,
+            lector_archivos=None,
+            analizador_maestro=analizador,
+            max_comments_per_batch=60,
+            cache_resultados=cache
+        )
+
+        semana_1 = ["Buen servicio", "Servicio malo", "Todo correcto"]
+        caso_uso._analizar_con_cache(semana_1)
+        analizador.enviados.clear()
+
+        semana_2 = ["Servicio malo", "Nuevo comentario", "Buen servicio"]
+        resultado = caso_uso._analizar_con_cache(semana_2)
+        cache.cerrar()
+
+    assert analizador.enviados == ["Nuevo comentario"], f"Unexpected API payload: {analizador.enviados}"
+    assert [c['sent'] for c in resultado.comentarios_analizados] == ['neg', 'pos', 'pos'], "Order not preserved"
+    assert resultado.comentarios_analizados[0].get('_origen') == 'cache'
+    assert resultado.es_exitoso(), "Merged result should be successful"
+    print("✅ PASS: 2/3 comentarios desde cache, orden original preservado")
+
+
+def test_respuesta_corta_no_corre_resultados():
+    """Un comentario omitido por la API no corre los resultados ni se cachea con etiqueta ajena"""
+    print("\n🧪 Testing short API response with cache hits...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CacheResultadosComentarios(str(Path(tmp) / "cache.sqlite3"))
+
+        # Directo al cache: el resultado de 'i'=2 no puede quedar asociado al texto 1
+        cache.guardar_lote(["servicio malo ayer", "servicio bueno hoy"],
+                           [{'i': 2, 'sent': 'pos', 'conf': 0.9}], "gpt-4o-mini", 1, "v1")
+        assert cache.obtener_lote(["servicio malo ayer", "servicio bueno hoy"], "gpt-4o-mini", 1, "v1") == {
+            1: {'sent': 'pos', 'conf': 0.9}}
+
+        analizador = AnalizadorOmiteUno()
+        caso_uso = AnalizarExcelMaestroCasoUso(
+            repositorio_comentarios=None,
+            lector_archivos=None,
+            analizador_maestro=analizador,
+            max_comments_per_batch=60,
+            cache_resultados=cache
+        )
+        version = AIEngineConstants.PROMPT_VERSION
+        cache.guardar_lote(["Todo correcto"], [{'i': 1, 'sent': 'neu', 'conf': 0.9}],
+                           analizador.modelo, analizador.seed, version)
+
+        comentarios = ["Todo correcto", "Servicio perdido", "Servicio malo", "Buen servicio"]
+        resultado = caso_uso._analizar_con_cache(comentarios)
+        posteriores = cache.obtener_lote(comentarios, analizador.modelo, analizador.seed, version)
+        cache.cerrar()
+
+    # Cache: fila 1; API: filas 2-4 sin la primera ("Servicio perdido")
+    assert [(c['i'], c['sent']) for c in resultado.comentarios_analizados] == [(1, 'neu'), (3, 'neg'), (4, 'pos')]
+    assert sorted(posteriores) == [0, 2, 3] and posteriores[2]['sent'] == 'neg' and posteriores[3]['sent'] == 'pos'
+    print("✅ PASS: sin corrimiento; el comentario omitido no se cachea")
+
+
+def test_lotes_con_faltantes_conservan_fila():
+    """Un lote saltado o un comentario omitido no corre los resultados de los lotes siguientes"""
+    print("\n🧪 Testing global 'i' across batches...")
+
+    analizador = AnalizadorContador()
+    caso_uso = AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None, lector_archivos=None,
+        analizador_maestro=analizador, max_comments_per_batch=2
+    )
+    lotes = [["Servicio malo", "Buen servicio"], ["Todo correcto", "Señal mala"], ["Servicio malo otra vez", "Bien"]]
+    resultados_por_lote = {
+        1: analizador.analizar_excel_completo(lotes[0]),
+        # Lote 2 saltado; el lote 3 omite su primer comentario
+        3: analizador.consolidar_resultados([{'i': 2, 'sent': 'pos', 'conf': 0.9}]),
+    }
+    comentarios = caso_uso._comentarios_con_indice_global(lotes, resultados_por_lote)
+    assert [(c['i'], c['sent']) for c in comentarios] == [(1, 'neg'), (2, 'pos'), (6, 'pos')]
+
+    datos = [{'comentario': texto, 'nps': n} for n, texto in enumerate(t for lote in lotes for t in lote)]
+    entidades = caso_uso._mapear_a_entidades_dominio(analizador.consolidar_resultados(comentarios), datos)
+    assert [(e.indice_original, e.texto_original, e.calificacion_nps) for e in entidades] == [
+        (0, "Servicio malo", 0), (1, "Buen servicio", 1), (5, "Bien", 5)]
+    print("✅ PASS: cada resultado queda en su fila original")
+
+
+if __name__ == "__main__":
+    print("🔍 Persistent Result Cache Validation Test")
+    print("=" * 50)
+
+    try:
+        test_persistencia_entre_instancias()
+        test_caso_uso_envia_solo_fallos()
+        test_respuesta_corta_no_corre_resultados()
+        test_lotes_con_faltantes_conservan_fila()
+        print("\n✅ All result cache tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test de trabajos reanudables con checkpoints por lote
+Valida que un análisis interrumpido se reanuda sin volver a enviar los lotes completados
+"""
+
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.cache.almacen_checkpoints import AlmacenCheckpoints
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.infrastructure.repositories.repositorio_comentarios_memoria import RepositorioComentariosMemoria
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import (
+        AnalizarExcelMaestroCasoUso, ComandoAnalisisExcelMaestro
+    )
+    from src.shared.exceptions.ia_exception import IAException
+    print("✅ Successfully imported checkpoint components")
+except ImportError as e:
+    print(f"❌ Failed to import checkpoint components: {e}")
+    sys.exit(1)
+
+
+class FakeAnalizador(AnalizadorMaestroIA):
+    """Analizador que registra los lotes enviados y puede 'morir' en un lote dado"""
+
+    def __init__(self, fallar_con=None):
+        super().__init__(api_key="test-key-checkpoint", modelo="gpt-4o-mini", usar_cache=False)
+        self.disponible = True
+        self.lotes_enviados = []
+        self.fallar_con = fallar_con
+
+    def analizar_excel_completo(self, comentarios_raw, on_comentario=None):
+        if self.fallar_con and self.fallar_con in comentarios_raw:
+            raise IAException("Pod reiniciado a mitad del análisis")
+        self.lotes_enviados.append(list(comentarios_raw))
+        return self.consolidar_resultados([
+            {'i': i + 1, 'sent': 'neg' if 'lento' in c else 'pos', 'conf': 0.9, 'tema': 'ser'}
+            for i, c in enumerate(comentarios_raw)
+        ], tokens_utilizados=10 * len(comentarios_raw))
+
+    async def analizar_excel_completo_async(self, comentarios_raw, cliente_async=None, on_comentario=None):
+        return self.analizar_excel_completo(comentarios_raw, on_comentario)
+
+
+class FakeLector:
+    def leer_comentarios(self, archivo):
+        return [{'comentario': linea} for linea in archivo.getvalue().decode('utf-8').splitlines()]
+
+
+def crear_caso_uso(analizador, almacen, **configuracion):
+    configuracion = dict({
+        'max_comments': 50, 'min_batch_size_threshold': 50, 'token_aware_batching': False,
+        'dedup_enabled': False, 'local_classifier_enabled': False, 'use_async_engine': False,
+    }, **configuracion)
+    return AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=RepositorioComentariosMemoria(),
+        lector_archivos=FakeLector(),
+        analizador_maestro=analizador,
+        max_comments_per_batch=50,
+        configuracion=configuracion,
+        almacen_checkpoints=almacen
+    )
+
+
+def archivo(comentarios):
+    return io.BytesIO('\n'.join(comentarios).encode('utf-8'))
+
+
+def ejecutar(caso_uso, comentarios):
+    return caso_uso.ejecutar(ComandoAnalisisExcelMaestro(archivo_cargado=archivo(comentarios),
+                                                         nombre_archivo='semanal.xlsx'))
+
+
+def comprobar_reanudacion(comentarios, **configuracion):
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = AlmacenCheckpoints(tmp)
+
+        # Primera ejecución: el lote que contiene el comentario 120 falla (lotes de 50 → lote 3)
+        interrumpido = FakeAnalizador(fallar_con=comentarios[120])
+        resultado = ejecutar(crear_caso_uso(interrumpido, almacen, **configuracion), comentarios)
+        assert not resultado.es_exitoso()
+        completados = len(interrumpido.lotes_enviados)
+        trabajos = [p for p in Path(tmp).iterdir() if p.is_dir()]
+        assert len(trabajos) == 1 and len(almacen.lotes_guardados(trabajos[0].name)) == completados
+
+        # Mismo archivo otra vez: solo se envía lo que faltaba
+        reanudado = FakeAnalizador()
+        resultado = ejecutar(crear_caso_uso(reanudado, almacen, **configuracion), comentarios)
+        assert resultado.es_exitoso(), resultado.mensaje
+        assert resultado.total_comentarios == len(comentarios)
+        total_lotes = (len(comentarios) + 49) // 50
+        assert len(reanudado.lotes_enviados) == total_lotes - completados
+        assert comentarios[120] in reanudado.lotes_enviados[0]
+        assert [c.texto_original for c in resultado.comentarios_analizados] == comentarios
+
+        # Trabajo terminado: checkpoints eliminados
+        assert not [p for p in Path(tmp).iterdir() if p.is_dir()]
+        return completados, total_lotes
+
+
+def test_reanudacion_secuencial():
+    """Con procesamiento secuencial se reanuda desde el último lote completado"""
+    print("\n🧪 Testing sequential resume...")
+
+    comentarios = [f"Comentario {i} internet {'lento' if i % 3 else 'rapido'}" for i in range(140)]
+    completados, total = comprobar_reanudacion(comentarios)
+    assert completados == 2
+    print(f"✅ PASS: {completados}/{total} lotes restaurados, solo el resto fue a la API")
+
+
+def test_reanudacion_paralela_y_async():
+    """Workers en hilos y motor async guardan y restauran checkpoints por número de lote"""
+    print("\n🧪 Testing parallel and async resume...")
+
+    comentarios = [f"Reclamo {i} servicio {'lento' if i % 2 else 'bueno'}" for i in range(240)]
+    completados, total = comprobar_reanudacion(comentarios, max_concurrent_batches=1)
+    assert (completados, total) == (4, 5), "The other batches finish and are checkpointed"
+    completados, total = comprobar_reanudacion(comentarios, use_async_engine=True, max_concurrent_batches=1)
+    assert (completados, total) == (4, 5)
+    print(f"✅ PASS: {total} lotes, reanudación con hilos y con motor async")
+
+
+def test_checkpoint_no_coincidente_o_danado():
+    """Otro archivo, otro contenido de lote o un JSON dañado nunca se restauran"""
+    print("\n🧪 Testing checkpoint validation...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = AlmacenCheckpoints(tmp)
+        analizador = FakeAnalizador()
+        lote = ["uno", "dos"]
+        analisis = analizador.analizar_excel_completo(lote)
+
+        trabajo = AlmacenCheckpoints.clave_trabajo('hash-archivo', {'modelo': 'gpt-4o-mini'})
+        assert trabajo != AlmacenCheckpoints.clave_trabajo('hash-archivo', {'modelo': 'gpt-4o'})
+        almacen.guardar_lote(trabajo, 1, lote, analisis)
+
+        restaurado = almacen.cargar_lote(trabajo, 1, lote)
+        assert restaurado.comentarios_analizados == analisis.comentarios_analizados
+        assert restaurado.fecha_analisis == analisis.fecha_analisis and restaurado.es_exitoso()
+        assert almacen.cargar_lote(trabajo, 1, ["uno", "tres"]) is None
+        assert almacen.cargar_lote(trabajo, 2, lote) is None
+
+        (Path(tmp) / trabajo / "lote_00001.json").write_text("{trunc", encoding='utf-8')
+        assert almacen.cargar_lote(trabajo, 1, lote) is None
+        assert not list((Path(tmp) / trabajo).glob('.tmp_*')), "No temp files left behind"
+    print("✅ PASS: checkpoints validados por lote y tolerantes a corrupción")
+
+
+if __name__ == "__main__":
+    print("🔍 Resumable Jobs Validation Test")
+    print("=" * 50)
+
+    try:
+        test_reanudacion_secuencial()
+        test_reanudacion_paralela_y_async()
+        test_checkpoint_no_coincidente_o_danado()
+        print("\n✅ All resumable job tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Test del registro de recursos compartidos por el proceso
+Valida que sesiones con la misma configuración comparten analizador y cache, y no el estado del usuario
+"""
+
+import sys
+import json
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.dependency_injection.contenedor_dependencias import ContenedorDependencias
+    from src.infrastructure.dependency_injection.registro_recursos_proceso import (
+        RegistroRecursosProceso, obtener_registro_recursos
+    )
+    print("✅ Successfully imported shared resource components")
+except ImportError as e:
+    print(f"❌ Failed to import shared resource components: {e}")
+    sys.exit(1)
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.llamadas = 0
+        self.temperaturas = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @staticmethod
+    def sentimiento(texto):
+        return 'neg' if 'horrible' in texto else 'pos' if 'bueno' in texto else 'neu'
+
+    def create(self, **kwargs):
+        self.llamadas += 1
+        self.temperaturas.append(kwargs['temperature'])
+        prompt = kwargs['messages'][-1]['content']
+        textos = [linea.split('. ', 1)[1] for linea in prompt.split('\n')
+                  if linea.split('. ', 1)[0].isdigit() and '. ' in linea]
+        total = len(textos)
+        contenido = json.dumps({
+            'general': {'total': total, 'tendencia': 'neutral', 'resumen': 'ok'},
+            'comentarios': [{'i': i, 'sent': self.sentimiento(texto), 'conf': 0.8, 'tema': 'ser', 'emo': 'neu',
+                             'urg': 'b'} for i, texto in enumerate(textos, 1)],
+            'stats': {'pos': 0, 'neu': total, 'neg': 0, 'tema_top': 'ser', 'urg': 0}
+        })
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=contenido), finish_reason='stop')],
+            usage=SimpleNamespace(total_tokens=100)
+        )
+
+
+def configuracion_base(directorio, **extra):
+    return dict({
+        'openai_api_key': 'sk-test-shared',
+        'openai_modelo': 'gpt-4o-mini',
+        'result_cache_path': str(Path(directorio) / 'cache.sqlite3'),
+        'use_streaming_responses': False,
+    }, **extra)
+
+
+def test_sesiones_comparten_recursos_pesados():
+    """Mismo analizador, cliente y cache persistente; repositorio propio por sesión"""
+    print("\n🧪 Testing shared heavy resources across sessions...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        obtener_registro_recursos().liberar()
+        sesion_a = ContenedorDependencias(configuracion_base(tmp))
+        sesion_b = ContenedorDependencias(configuracion_base(tmp))
+
+        analizador = sesion_a.obtener_analizador_maestro_ia()
+        assert analizador is sesion_b.obtener_analizador_maestro_ia()
+        assert analizador.client is sesion_b.obtener_analizador_maestro_ia().client, "One HTTP pool per process"
+        assert sesion_a.obtener_cache_resultados() is sesion_b.obtener_cache_resultados()
+        assert sesion_a.obtener_repositorio_comentarios() is not sesion_b.obtener_repositorio_comentarios()
+
+        otra_clave = ContenedorDependencias(configuracion_base(tmp, openai_api_key='sk-test-otra'))
+        assert otra_clave.obtener_analizador_maestro_ia() is not analizador, "Different keys never share"
+
+        # "Limpiar Cache" de una sesión no cierra lo que usan las demás
+        sesion_a.cleanup_singletons()
+        cache = sesion_b.obtener_cache_resultados()
+        cache.guardar_lote(['Texto de prueba'], [{'sent': 'pos'}], 'gpt-4o-mini', 42, 'v1')
+        assert cache.obtener_lote(['Texto de prueba'], 'gpt-4o-mini', 42, 'v1')
+
+        estadisticas = obtener_registro_recursos().obtener_estadisticas()
+        assert estadisticas['nombres'] == ['analizador_maestro_ia', 'cache_resultados'], estadisticas
+        assert obtener_registro_recursos().liberar() == 3
+    print("✅ PASS: analizador y cache compartidos, repositorio por sesión")
+
+
+def test_deshabilitado_crea_por_sesion():
+    """SHARED_RESOURCES_ENABLED=false conserva el comportamiento por sesión"""
+    print("\n🧪 Testing per-session fallback...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configuracion = configuracion_base(tmp, shared_resources_enabled=False)
+        sesion_a = ContenedorDependencias(configuracion)
+        sesion_b = ContenedorDependencias(configuracion)
+        assert sesion_a.obtener_analizador_maestro_ia() is not sesion_b.obtener_analizador_maestro_ia()
+        sesion_a.cleanup_singletons()
+        sesion_b.cleanup_singletons()
+    print("✅ PASS: recursos por sesión cuando se deshabilita")
+
+
+def test_cache_en_memoria_caliente_entre_sesiones():
+    """El cache LRU del analizador compartido evita repetir lotes entre sesiones"""
+    print("\n🧪 Testing warm in-memory cache across sessions...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        obtener_registro_recursos().liberar()
+        analizador = ContenedorDependencias(configuracion_base(tmp)).obtener_analizador_maestro_ia()
+        cliente = FakeOpenAI()
+        analizador.client = cliente
+        analizador.disponible = True
+        analizador.retry_wrapper = None
+
+        lote = [f"Comentario semanal {i}" for i in range(5)]
+        primero = analizador.analizar_excel_completo(lote)
+
+        otra_sesion = ContenedorDependencias(configuracion_base(tmp)).obtener_analizador_maestro_ia()
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(otra_sesion.analizar_excel_completo(lote)))
+                 for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        assert cliente.llamadas == 1, f"Expected cache hits, got {cliente.llamadas} API calls"
+        assert all(r is primero for r in resultados)
+        obtener_registro_recursos().liberar()
+    print("✅ PASS: 9 análisis del mismo lote, 1 llamada a la API")
+
+
+def test_temperatura_por_llamada():
+    """Un reintento con otra temperatura no modifica el analizador compartido ni su cache"""
+    print("\n🧪 Testing per-call retry temperature...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        obtener_registro_recursos().liberar()
+        analizador = ContenedorDependencias(configuracion_base(tmp)).obtener_analizador_maestro_ia()
+        cliente = FakeOpenAI()
+        analizador.client = cliente
+        analizador.disponible = True
+        analizador.retry_wrapper = None
+        temperatura_original = analizador.temperatura
+
+        lote = [f"Comentario de reintento {i}" for i in range(3)]
+        analizador.analizar_excel_completo(lote, temperatura=0.4)
+        assert analizador.temperatura == temperatura_original
+        analizador.analizar_excel_completo(lote)
+
+        assert cliente.temperaturas == [0.4, temperatura_original], cliente.temperaturas
+        obtener_registro_recursos().liberar()
+    print("✅ PASS: temperatura de reintento solo en su llamada")
+
+
+def test_mismo_lote_en_otro_orden():
+    """El cache es posicional: el mismo lote reordenado no reutiliza las etiquetas del primero"""
+    print("\n🧪 Testing reordered batch against the shared cache...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        obtener_registro_recursos().liberar()
+        analizador = ContenedorDependencias(configuracion_base(tmp)).obtener_analizador_maestro_ia()
+        cliente = FakeOpenAI()
+        analizador.client = cliente
+        analizador.disponible = True
+        analizador.retry_wrapper = None
+
+        primero = analizador.analizar_excel_completo(["muy bueno", "horrible"])
+        segundo = analizador.analizar_excel_completo(["horrible", "muy bueno"])
+
+        assert [c['sent'] for c in primero.comentarios_analizados] == ['pos', 'neg']
+        assert [c['sent'] for c in segundo.comentarios_analizados] == ['neg', 'pos']
+        assert cliente.llamadas == 2, f"Reordered batch must miss the cache, got {cliente.llamadas} API calls"
+        obtener_registro_recursos().liberar()
+    print("✅ PASS: lote reordenado con sus propias etiquetas")
+
+
+def test_registro_crea_una_vez_bajo_concurrencia():
+    """Creaciones simultáneas de la misma clave ejecutan la factory una sola vez"""
+    print("\n🧪 Testing concurrent creation...")
+
+    registro = RegistroRecursosProceso()
+    creaciones = []
+
+    def factory():
+        creaciones.append(1)
+        threading.Event().wait(0.05)
+        return object()
+
+    instancias = []
+    hilos = [threading.Thread(target=lambda: instancias.append(registro.obtener('pesado', 'h1', factory)))
+             for _ in range(10)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(creaciones) == 1 and len({id(i) for i in instancias}) == 1
+    assert registro.obtener('pesado', 'h2', factory) is not instancias[0]
+    print("✅ PASS: una creación por clave")
+
+
+if __name__ == "__main__":
+    print("🔍 Shared Process Resources Validation Test")
+    print("=" * 50)
+
+    try:
+        test_sesiones_comparten_recursos_pesados()
+        test_deshabilitado_crea_por_sesion()
+        test_cache_en_memoria_caliente_entre_sesiones()
+        test_temperatura_por_llamada()
+        test_mismo_lote_en_otro_orden()
+        test_registro_crea_una_vez_bajo_concurrencia()
+        print("\n✅ All shared resource tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
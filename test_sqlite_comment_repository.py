@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test del repositorio de comentarios SQLite
+Valida que responde igual que el repositorio en memoria, que los datos sobreviven reabrir
+el archivo, que las consultas usan los índices y que el contenedor lo selecciona por config
+"""
+
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.repositories.repositorio_comentarios_memoria import RepositorioComentariosMemoria
+    from src.infrastructure.repositories.repositorio_comentarios_sqlite import RepositorioComentariosSQLite
+    from src.infrastructure.dependency_injection.contenedor_dependencias import ContenedorDependencias
+    from src.domain.entities.comentario import Comentario
+    from src.domain.value_objects.sentimiento import Sentimiento
+    from src.domain.value_objects.calidad_comentario import CalidadComentario, NivelCalidad
+    from src.domain.value_objects.nivel_urgencia import NivelUrgencia, PrioridadUrgencia
+    print("✅ Successfully imported SQLite repository components")
+except ImportError as e:
+    print(f"❌ Failed to import SQLite repository components: {e}")
+    sys.exit(1)
+
+
+SENTIMIENTOS = [None, Sentimiento.crear_positivo, Sentimiento.crear_neutral, Sentimiento.crear_negativo]
+INICIO = datetime(2026, 1, 1, 9, 30)
+
+
+def crear_comentario(aleatorio, id_comentario):
+    comentario = Comentario(id=id_comentario, texto=f"Señal débil {id_comentario}",
+                            texto_limpio=f"señal débil {id_comentario}",
+                            fecha_analisis=INICIO + timedelta(days=aleatorio.randrange(120), microseconds=7),
+                            temas=['cobertura'], emociones=['frustración'],
+                            calificacion_nps=aleatorio.choice([None, 3, 9]))
+    fabrica = aleatorio.choice(SENTIMIENTOS)
+    if fabrica:
+        comentario.sentimiento = fabrica(aleatorio.choice([0.5, 0.8, 0.95]))
+    if aleatorio.random() < 0.7:
+        comentario.calidad = CalidadComentario(aleatorio.choice(list(NivelCalidad)), True, "medio", 20)
+    if aleatorio.random() < 0.7:
+        comentario.urgencia = NivelUrgencia(aleatorio.choice(list(PrioridadUrgencia)), ["sin servicio"],
+                                            aleatorio.choice([0.0, 2.5, 6.0, 8.5, 10.0]))
+    return comentario
+
+
+def test_igual_que_memoria():
+    """Mismos comentarios, mismo orden y mismas estadísticas que el repositorio en memoria"""
+    print("\n🧪 Testing parity with the in-memory repository...")
+
+    aleatorio = random.Random(25)
+    memoria = RepositorioComentariosMemoria(max_comentarios=100000)
+    sqlite = RepositorioComentariosSQLite(':memory:')
+    for _ in range(10):
+        lote = [crear_comentario(aleatorio, f"c{aleatorio.randrange(400)}") for _ in range(80)]
+        memoria.guardar_lote(lote)
+        sqlite.guardar_lote(lote)
+    sqlite.guardar(memoria.obtener_todos()[0])
+    memoria.guardar(memoria.obtener_todos()[0])
+
+    assert sqlite.obtener_todos() == memoria.obtener_todos()
+    assert sqlite.buscar_criticos() == memoria.buscar_criticos()
+    for tipo in ('positivo', 'neutral', 'negativo'):
+        assert sqlite.buscar_por_sentimiento(tipo) == memoria.buscar_por_sentimiento(tipo), tipo
+    assert sqlite.obtener_estadisticas() == memoria.obtener_estadisticas()
+    assert sqlite.obtener_por_id("no-existe") is None
+    print(f"✅ PASS: {sqlite.obtener_estadisticas()}")
+
+
+def test_persistencia_y_lote():
+    """Los comentarios sobreviven reabrir el archivo; los inválidos del lote se omiten"""
+    print("\n🧪 Testing persistence and bulk insert...")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = Path(directorio) / "sub" / "comentarios.sqlite3"
+        repo = RepositorioComentariosSQLite(str(ruta))
+        aleatorio = random.Random(3)
+        lote = [crear_comentario(aleatorio, f"p{i}") for i in range(500)]
+        lote.append(Comentario(id="vacio", texto="   ", texto_limpio=""))
+        repo.guardar_lote(lote)
+        assert repo._conexion.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        repo.cerrar()
+
+        reabierto = RepositorioComentariosSQLite(str(ruta))
+        assert reabierto.obtener_todos() == lote[:500]
+        assert reabierto.obtener_por_id("vacio") is None
+
+        desde, hasta = INICIO + timedelta(days=30), INICIO + timedelta(days=60)
+        en_rango = reabierto.buscar_por_fecha(desde, hasta)
+        assert sorted(c.id for c in en_rango) == sorted(c.id for c in lote[:500] if desde <= c.fecha_analisis < hasta)
+        assert [c.fecha_analisis for c in en_rango] == sorted(c.fecha_analisis for c in en_rango)
+
+        reabierto.limpiar()
+        assert reabierto.obtener_estadisticas() == {'total': 0, 'con_sentimiento': 0, 'criticos': 0, 'alta_calidad': 0}
+        reabierto.cerrar()
+    print("✅ PASS: 500 comentarios persistidos, 1 omitido")
+
+
+def test_consultas_usan_indices():
+    """Sentimiento, críticos y fecha se resuelven con índices, sin recorrer la tabla"""
+    print("\n🧪 Testing query plans...")
+
+    repo = RepositorioComentariosSQLite(':memory:')
+
+    def plan(condicion, parametros):
+        filas = repo._conexion.execute(
+            f"EXPLAIN QUERY PLAN SELECT id FROM comentarios WHERE {condicion}", parametros).fetchall()
+        return ' '.join(str(fila[-1]) for fila in filas)
+
+    assert 'idx_comentarios_sentimiento' in plan("sentimiento_categoria = ?", ('negativo',))
+    assert 'idx_comentarios_urgencia' in plan("es_critico = 1", ())
+    assert 'idx_comentarios_fecha' in plan("fecha_analisis >= ?", ('2026-01-01',))
+    print("✅ PASS: los tres índices se usan")
+
+
+GUARDAR_ANALISIS = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+from src.infrastructure.repositories.repositorio_comentarios_sqlite import RepositorioComentariosSQLite
+analizador = AnalizadorMaestroIA(api_key="sk-test-ids", modelo="gpt-4o-mini", usar_cache=False)
+caso_uso = AnalizarExcelMaestroCasoUso(repositorio_comentarios=None, lector_archivos=None,
+                                       analizador_maestro=analizador)
+textos = ["Sin señal en casa", "Buena atención", "Factura incorrecta"]
+resultado = analizador.consolidar_resultados([{'i': i, 'sent': 'neg', 'conf': 0.9} for i in range(1, 4)])
+repo = RepositorioComentariosSQLite(sys.argv[2])
+repo.guardar_lote(caso_uso._mapear_a_entidades_dominio(resultado, [{'comentario': t} for t in textos], sys.argv[3]))
+print(repo.obtener_estadisticas()['total'])
+repo.cerrar()
+"""
+
+
+def test_reanalizar_tras_reinicio_no_duplica():
+    """Los ids no dependen de hash() del proceso: re-analizar tras reiniciar reemplaza las filas"""
+    print("\n🧪 Testing stable ids across processes...")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = str(Path(directorio) / "historial.sqlite3")
+
+        def analizar_en_proceso(semilla, nombre_archivo):
+            entorno = dict(os.environ, PYTHONHASHSEED=str(semilla))
+            salida = subprocess.run([sys.executable, "-c", GUARDAR_ANALISIS, str(current_dir), ruta, nombre_archivo],
+                                    env=entorno, capture_output=True, text=True, check=True)
+            return int(salida.stdout.strip().splitlines()[-1])
+
+        assert analizar_en_proceso(1, "encuesta_marzo.xlsx") == 3
+        assert analizar_en_proceso(2, "encuesta_marzo.xlsx") == 3, "Same file after a restart must not duplicate"
+        assert analizar_en_proceso(3, "encuesta_abril.xlsx") == 6, "Another file keeps its own rows"
+    print("✅ PASS: mismo archivo reemplaza, otro archivo suma")
+
+
+def test_contenedor_selecciona_backend():
+    """'comment_repository_backend' elige la implementación"""
+    print("\n🧪 Testing container backend selection...")
+
+    assert isinstance(ContenedorDependencias({}).obtener_repositorio_comentarios(), RepositorioComentariosMemoria)
+    with tempfile.TemporaryDirectory() as directorio:
+        contenedor = ContenedorDependencias({
+            'comment_repository_backend': 'sqlite',
+            'comment_repository_path': str(Path(directorio) / 'comentarios.sqlite3'),
+            'shared_resources_enabled': False
+        })
+        repo = contenedor.obtener_repositorio_comentarios()
+        assert isinstance(repo, RepositorioComentariosSQLite)
+        assert contenedor.obtener_repositorio_comentarios() is repo
+        contenedor.cleanup_singletons()
+    print("✅ PASS: memoria por defecto, SQLite por configuración")
+
+
+if __name__ == "__main__":
+    print("🔍 SQLite Comment Repository Validation Test")
+    print("=" * 50)
+
+    try:
+        test_igual_que_memoria()
+        test_persistencia_y_lote()
+        test_consultas_usan_indices()
+        test_reanalizar_tras_reinicio_no_duplica()
+        test_contenedor_selecciona_backend()
+        print("\n✅ All SQLite repository tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
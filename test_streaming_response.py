@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Test de respuestas maestras en streaming
+Valida la entrega incremental por comentario y la recuperación de respuestas truncadas
+"""
+
+import sys
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.parser_json_incremental import ParserComentariosIncremental
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    print("✅ Successfully imported streaming components")
+except ImportError as e:
+    print(f"❌ Failed to import streaming components: {e}")
+    sys.exit(1)
+
+
+def respuesta_maestra(total):
+    return json.dumps({
+        'general': {'total': total, 'tendencia': 'positiva', 'resumen': 'Clientes "satisfechos" {ok}'},
+        'comentarios': [
+            {'i': i, 'sent': 'pos' if i % 3 else 'neg', 'conf': 0.9, 'tema': 'ser', 'emo': 'sat', 'urg': 'b'}
+            for i in range(1, total + 1)
+        ],
+        'stats': {'pos': total - total // 3, 'neu': 0, 'neg': total // 3, 'tema_top': 'ser', 'urg': 0}
+    }, ensure_ascii=False)
+
+
+class FakeStreamClient:
+    """Cliente sync que devuelve la respuesta en chunks y registra lo entregado al callback"""
+
+    def __init__(self, contenido, cortar_en=None, tamano_chunk=25):
+        if cortar_en is not None:
+            contenido = contenido[:cortar_en]
+        self.contenido = contenido
+        self.tamano_chunk = tamano_chunk
+        self.truncado = cortar_en is not None
+        self.chunks_enviados = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        assert kwargs.get('stream') is True, "Streaming was not requested"
+        return self._stream()
+
+    def _stream(self):
+        for i in range(0, len(self.contenido), self.tamano_chunk):
+            self.chunks_enviados += 1
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=self.contenido[i:i + self.tamano_chunk]),
+                                         finish_reason=None)],
+                usage=None
+            )
+        yield SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=None),
+                                     finish_reason='length' if self.truncado else 'stop')],
+            usage=None
+        )
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=321))
+
+
+def crear_analizador(cliente, configuracion=None):
+    analizador = AnalizadorMaestroIA(api_key="test-key-stream", modelo="gpt-4o-mini", usar_cache=False,
+                                     configuracion=configuracion)
+    analizador.disponible = True
+    analizador.retry_wrapper = None
+    analizador.client = cliente
+    return analizador
+
+
+def test_parser_fragmentos_arbitrarios():
+    """El parser emite cada comentario una sola vez sin importar el corte de los chunks"""
+    print("\n🧪 Testing incremental parser with arbitrary chunk sizes...")
+
+    contenido = respuesta_maestra(7)
+    for tamano in (1, 3, 17, len(contenido)):
+        parser = ParserComentariosIncremental()
+        emitidos = []
+        for i in range(0, len(contenido), tamano):
+            emitidos.extend(parser.alimentar(contenido[i:i + tamano]))
+        assert [c['i'] for c in emitidos] == list(range(1, 8)), f"chunk={tamano}: {emitidos}"
+        assert parser.esta_completo() and parser.finalizar() == json.loads(contenido)
+    print("✅ PASS: 7 comentarios emitidos en orden con chunks de 1, 3, 17 y completo")
+
+
+def test_entrega_incremental():
+    """Los comentarios llegan al callback antes de terminar el stream"""
+    print("\n🧪 Testing per-comment delivery during streaming...")
+
+    cliente = FakeStreamClient(respuesta_maestra(20))
+    analizador = crear_analizador(cliente)
+    chunks_al_primer_comentario = []
+
+    def on_comentario(comentario):
+        if not chunks_al_primer_comentario:
+            chunks_al_primer_comentario.append(cliente.chunks_enviados)
+
+    resultado = analizador.analizar_excel_completo([f"comentario {i}" for i in range(20)], on_comentario=on_comentario)
+
+    total_chunks = cliente.chunks_enviados
+    assert chunks_al_primer_comentario[0] < total_chunks / 2, "First comment arrived too late"
+    assert len(resultado.comentarios_analizados) == 20 and resultado.es_exitoso()
+    assert resultado.tokens_utilizados == 321, "Usage from final chunk was lost"
+    print(f"✅ PASS: primer comentario en el chunk {chunks_al_primer_comentario[0]}/{total_chunks}")
+
+
+def test_respuesta_truncada_conserva_parseados():
+    """Una respuesta cortada devuelve los comentarios ya completos"""
+    print("\n🧪 Testing truncated response recovery...")
+
+    contenido = respuesta_maestra(20)
+    corte = contenido.index('{"i": 13')
+    # Sin recuperación de faltantes para observar el resultado truncado tal cual
+    analizador = crear_analizador(FakeStreamClient(contenido, cortar_en=corte + 10),
+                                  configuracion={'gap_recovery_rounds': 0})
+
+    resultado = analizador.analizar_excel_completo([f"comentario {i}" for i in range(20)])
+
+    indices = [c['i'] for c in resultado.comentarios_analizados]
+    assert indices == list(range(1, 13)), f"Unexpected recovered indices: {indices}"
+    assert resultado.total_comentarios == 20, "Truncated result must keep the expected total"
+    assert not resultado.es_exitoso(), "Truncated result must not be reported as complete"
+    assert resultado.distribucion_sentimientos['neg'] == 4
+    print("✅ PASS: 12/20 comentarios recuperados de la respuesta truncada")
+
+
+def test_caso_uso_notifica_comentarios():
+    """El caso de uso publica 'comment_streamed' hasta el total de comentarios"""
+    print("\n🧪 Testing use case streaming progress notifications...")
+
+    analizador = crear_analizador(FakeStreamClient(respuesta_maestra(15)))
+    eventos = []
+    caso_uso = AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None,
+        lector_archivos=None,
+        analizador_maestro=analizador,
+        max_comments_per_batch=60,
+        progress_callback=lambda data: eventos.append(dict(data))
+    )
+
+    caso_uso._analizar_comentarios_api([f"comentario {i}" for i in range(15)])
+
+    streamed = [e for e in eventos if e['action'] == 'comment_streamed']
+    assert streamed, "No streaming progress was notified"
+    assert streamed[-1]['comments_received'] == 15 and streamed[-1]['progress_percentage'] == 100.0
+    print(f"✅ PASS: {len(streamed)} notificaciones de streaming (limitadas por frecuencia)")
+
+
+if __name__ == "__main__":
+    print("🔍 Streaming Response Validation Test")
+    print("=" * 50)
+
+    try:
+        test_parser_fragmentos_arbitrarios()
+        test_entrega_incremental()
+        test_respuesta_truncada_conserva_parseados()
+        test_caso_uso_notifica_comentarios()
+        print("\n✅ All streaming response tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test del lector XLSX por streaming (openpyxl read-only)
+Valida que produce lo mismo que read_excel, que entrega bloques y que el caso de uso deja de leer pasado el límite
+"""
+
+import io
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.file_handlers.lector_archivos_excel import (
+        LectorArchivosExcel, extraer_comentarios_dataframe
+    )
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    from src.shared.exceptions.archivo_exception import ArchivoException
+    print("✅ Successfully imported streaming reader components")
+except ImportError as e:
+    print(f"❌ Failed to import streaming reader components: {e}")
+    sys.exit(1)
+
+
+def crear_xlsx(encabezado, filas, nombre='export.xlsx'):
+    libro = Workbook()
+    hoja = libro.active
+    hoja.append(encabezado)
+    for fila in filas:
+        hoja.append(fila)
+    datos = io.BytesIO()
+    libro.save(datos)
+    datos.seek(0)
+    datos.name = nombre
+    return datos
+
+
+def leer_con_pandas(archivo):
+    """Camino anterior: DataFrame completo + extracción por columnas"""
+    lector = LectorArchivosExcel()
+    archivo.seek(0)
+    df = pd.read_excel(io.BytesIO(archivo.read()), engine='openpyxl')
+    return extraer_comentarios_dataframe(df, lector._encontrar_columna_comentario(df))
+
+
+def test_misma_salida_que_read_excel():
+    """Vacíos, 'nan' literales, NPS/Nota sucios y filas cortas dan el mismo resultado"""
+    print("\n🧪 Testing parity with pandas.read_excel...")
+
+    filas = [
+        [1, '  Muy buen servicio ', 10, 4.5],
+        [2, None, 9, 3],
+        [3, 'nan', None, None],
+        [4, 'Internet lento', 'x', 'abc'],
+        [5, 'Señal débil en Luque', 7.9, '2'],
+        [6, '   ', 5, 1],
+        [7, 'Atención excelente'],
+        [8, 'Factura incorrecta', -3, None],
+    ]
+    archivo = crear_xlsx(['ID', 'Comentario Final', 'NPS', 'Nota'], filas)
+
+    esperado = leer_con_pandas(archivo)
+    obtenido = LectorArchivosExcel().leer_comentarios(archivo)
+    assert obtenido == esperado, f"\n{obtenido}\n!=\n{esperado}"
+    assert [c['indice_original'] for c in obtenido] == [0, 3, 4, 6, 7]
+
+    # Sin encabezado reconocible: primera columna con texto, como el fallback de pandas
+    sin_nombre = crear_xlsx(['ID', 'Campo libre'], [[i, f"Texto {i}"] for i in range(5)])
+    assert LectorArchivosExcel().leer_comentarios(sin_nombre) == leer_con_pandas(sin_nombre)
+    print(f"✅ PASS: {len(obtenido)} comentarios idénticos a read_excel")
+
+
+def test_bloques_y_errores():
+    """Bloques del tamaño pedido en orden; archivos vacíos o sin texto dan ArchivoException"""
+    print("\n🧪 Testing chunked output and errors...")
+
+    archivo = crear_xlsx(['Comentario', 'NPS'], [[f"Comentario {i}", i % 11] for i in range(2500)])
+    bloques = list(LectorArchivosExcel().leer_comentarios_por_bloques(archivo, tamano_bloque=1000))
+    assert [len(b) for b in bloques] == [1000, 1000, 500]
+    assert [c['indice_original'] for b in bloques for c in b] == list(range(2500))
+
+    for vacio in (crear_xlsx(['Comentario'], []), crear_xlsx(['ID', 'Valor'], [[1, 2], [3, 4]])):
+        try:
+            LectorArchivosExcel().leer_comentarios(vacio)
+            raise AssertionError("Expected ArchivoException")
+        except ArchivoException:
+            pass
+    print("✅ PASS: bloques en orden y errores de archivo claros")
+
+
+def test_caso_uso_deja_de_leer_en_el_limite():
+    """Con max_file_comments el lector no recorre el resto del archivo"""
+    print("\n🧪 Testing early stop at max_file_comments...")
+
+    class LectorContador(LectorArchivosExcel):
+        def __init__(self):
+            super().__init__()
+            self.bloques_entregados = 0
+
+        def leer_comentarios_por_bloques(self, archivo, tamano_bloque=1000):
+            for bloque in super().leer_comentarios_por_bloques(archivo, tamano_bloque=100):
+                self.bloques_entregados += 1
+                yield bloque
+
+    lector = LectorContador()
+    caso_uso = AnalizarExcelMaestroCasoUso.__new__(AnalizarExcelMaestroCasoUso)
+    caso_uso.lector_archivos = lector
+    archivo = crear_xlsx(['Comentario'], [[f"Comentario {i}"] for i in range(5000)])
+
+    comentarios = caso_uso._leer_comentarios(archivo, 250)
+    assert len(comentarios) == 251, "limit + 1 so the caller knows the file was larger"
+    assert lector.bloques_entregados == 3, lector.bloques_entregados
+    print("✅ PASS: 3 de 50 bloques leídos para un límite de 250")
+
+
+def test_memoria_pico_menor_que_read_excel():
+    """El streaming no construye el DataFrame ni el modelo completo de openpyxl"""
+    print("\n🧪 Testing peak memory...")
+
+    archivo = crear_xlsx(['ID', 'Comentario', 'NPS', 'Nota', 'Canal', 'Ciudad'],
+                         [[i, f"El servicio de internet {i} estuvo lento toda la semana", i % 11, i % 5,
+                           'web', 'Asunción'] for i in range(20000)])
+
+    tracemalloc.start()
+    leer_con_pandas(archivo)
+    _, pico_pandas = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    for _ in LectorArchivosExcel().leer_comentarios_por_bloques(archivo):
+        pass
+    _, pico_streaming = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert pico_streaming * 2 < pico_pandas, (pico_streaming, pico_pandas)
+    print(f"✅ PASS: pico {pico_streaming / 1e6:.1f} MB vs {pico_pandas / 1e6:.1f} MB con read_excel")
+
+
+if __name__ == "__main__":
+    print("🔍 Streaming XLSX Reader Validation Test")
+    print("=" * 50)
+
+    try:
+        test_misma_salida_que_read_excel()
+        test_bloques_y_errores()
+        test_caso_uso_deja_de_leer_en_el_limite()
+        test_memoria_pico_menor_que_read_excel()
+        print("\n✅ All streaming reader tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test del empaquetador de lotes por tokens
+Valida orden, límites de comentarios/tokens y que ningún lote exceda la capacidad del analizador
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.external_services.empaquetador_lotes import EmpaquetadorLotesTokens
+    from src.infrastructure.external_services.analizador_maestro_ia import AnalizadorMaestroIA
+    from src.application.use_cases.analizar_excel_maestro_caso_uso import AnalizarExcelMaestroCasoUso
+    print("✅ Successfully imported batch packer components")
+except ImportError as e:
+    print(f"❌ Failed to import batch packer components: {e}")
+    sys.exit(1)
+
+
+def test_cortos_comparten_largos_se_separan():
+    """Comentarios cortos llenan lotes grandes; los largos cierran lotes por contexto"""
+    print("\n🧪 Testing packing of short vs long comments...")
+
+    empaquetador = EmpaquetadorLotesTokens(
+        modelo="gpt-4o-mini", max_comentarios_lote=200, limite_salida=14000, limite_contexto=16384
+    )
+
+    cortos = [f"Buen servicio {i}" for i in range(300)]
+    lotes_cortos = empaquetador.empaquetar(cortos)
+    largos = [("Internet lento y caro, nadie atiende el reclamo. " * 12) + str(i) for i in range(300)]
+    lotes_largos = empaquetador.empaquetar(largos)
+
+    assert [c for lote in lotes_cortos for c in lote] == cortos, "Order not preserved"
+    assert [c for lote in lotes_largos for c in lote] == largos, "Order not preserved"
+    assert len(lotes_largos) > len(lotes_cortos), "Long comments should need more batches"
+
+    for lote in lotes_cortos + lotes_largos:
+        entrada = 450 + sum(empaquetador.tokens_entrada_comentario(c) for c in lote)
+        assert empaquetador.tokens_salida(len(lote)) <= 14000, "Output budget exceeded"
+        assert entrada + empaquetador.tokens_salida(len(lote)) <= 16384, "Context budget exceeded"
+    print(f"✅ PASS: 300 cortos → {len(lotes_cortos)} lotes, 300 largos → {len(lotes_largos)} lotes")
+
+
+def test_respeta_capacidad_del_analizador():
+    """Los lotes nunca superan lo que _limitar_comentarios dejaría pasar"""
+    print("\n🧪 Testing analyzer per-call capacity...")
+
+    analizador = AnalizadorMaestroIA(
+        api_key="test-key-packer", modelo="gpt-4o-mini", usar_cache=False, max_tokens=12000,
+        configuracion={'max_comments_medium': 50, 'production_token_limit': 14000}
+    )
+    capacidad = analizador.capacidad_comentarios_por_llamada()
+    caso_uso = AnalizarExcelMaestroCasoUso(
+        repositorio_comentarios=None,
+        lector_archivos=None,
+        analizador_maestro=analizador,
+        max_comments_per_batch=120
+    )
+
+    comentarios = [f"Comentario {i}" for i in range(500)]
+    lotes = caso_uso._dividir_en_lotes(comentarios)
+
+    assert capacidad == 50, f"Unexpected capacity: {capacidad}"
+    assert all(len(lote) <= capacidad for lote in lotes), "A batch would be truncated by the analyzer"
+    assert all(len(analizador._limitar_comentarios(lote)) == len(lote) for lote in lotes)
+    assert len(lotes) == 10
+    print(f"✅ PASS: 500 comentarios → {len(lotes)} lotes de ≤{capacidad}")
+
+
+if __name__ == "__main__":
+    print("🔍 Token-Aware Batch Packer Validation Test")
+    print("=" * 50)
+
+    try:
+        test_cortos_comparten_largos_se_separan()
+        test_respeta_capacidad_del_analizador()
+        print("\n✅ All batch packer tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test de la extracción vectorizada de comentarios en LectorArchivosExcel
+Valida que la salida coincide con el recorrido fila a fila (iterrows) y que escala a exportaciones grandes
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add src to path
+current_dir = Path(__file__).parent
+if str(current_dir) not in sys.path:
+    sys.path.insert(0, str(current_dir))
+
+try:
+    from src.infrastructure.file_handlers.lector_archivos_excel import (
+        LectorArchivosExcel, extraer_comentarios_dataframe
+    )
+    print("✅ Successfully imported vectorized extraction components")
+except ImportError as e:
+    print(f"❌ Failed to import vectorized extraction components: {e}")
+    sys.exit(1)
+
+
+def extraer_con_iterrows(df, columna_comentario):
+    """Implementación anterior, fila a fila, como referencia"""
+    comentarios = []
+    for index, row in df.iterrows():
+        comentario_texto = str(row[columna_comentario]).strip()
+        if not comentario_texto or comentario_texto.lower() in ['nan', 'none', '']:
+            continue
+        comentario_data = {'comentario': comentario_texto, 'indice_original': index}
+        if 'NPS' in df.columns:
+            nps_value = row.get('NPS')
+            if pd.notna(nps_value):
+                try:
+                    comentario_data['nps'] = int(float(nps_value))
+                except (ValueError, TypeError):
+                    pass
+        if 'Nota' in df.columns:
+            nota_value = row.get('Nota')
+            if pd.notna(nota_value):
+                try:
+                    comentario_data['nota'] = float(nota_value)
+                except (ValueError, TypeError):
+                    pass
+        comentarios.append(comentario_data)
+    return comentarios
+
+
+def test_misma_salida_que_iterrows():
+    """Vacíos, 'nan'/'None' literales, espacios, números y NPS/Nota sucios se tratan igual"""
+    print("\n🧪 Testing parity with row-by-row extraction...")
+
+    df = pd.DataFrame({
+        'Comentario Final': ['  Muy buen servicio ', None, 'nan', 'NONE', '   ', 'Internet lento',
+                             np.nan, 42, 'Señal débil en Luque', 'ok'],
+        'NPS': [10, 9.7, None, 'x', ' 7 ', '3', -2.5, True, np.nan, 'siete'],
+        'Nota': ['4.5', 3, None, 'abc', 1, np.nan, '2', 5.0, '1e3', ''],
+    }, index=[10, 11, 12, 13, 14, 15, 16, 17, 18, 19])
+
+    esperado = extraer_con_iterrows(df, 'Comentario Final')
+    obtenido = extraer_comentarios_dataframe(df, 'Comentario Final')
+    assert obtenido == esperado, f"\n{obtenido}\n!=\n{esperado}"
+    assert [c['indice_original'] for c in obtenido] == [10, 15, 17, 18, 19]
+    assert all(type(c['indice_original']) is int and type(c.get('nps', 0)) is int for c in obtenido)
+
+    sin_extras = df[['Comentario Final']]
+    assert extraer_comentarios_dataframe(sin_extras, 'Comentario Final') == extraer_con_iterrows(sin_extras, 'Comentario Final')
+    assert LectorArchivosExcel()._extraer_comentarios(df, 'Comentario Final') == esperado
+    print(f"✅ PASS: {len(obtenido)} comentarios idénticos a iterrows")
+
+
+def test_exportacion_grande():
+    """50k filas se extraen en una fracción del tiempo de iterrows"""
+    print("\n🧪 Testing 50k-row extraction speed...")
+
+    filas = 50_000
+    df = pd.DataFrame({
+        'Comentario': [f"Comentario {i} sobre la señal" if i % 7 else None for i in range(filas)],
+        'NPS': [i % 11 for i in range(filas)],
+        'Nota': [(i % 5) + 0.5 for i in range(filas)],
+    })
+
+    inicio = time.perf_counter()
+    vectorizado = extraer_comentarios_dataframe(df, 'Comentario')
+    tiempo_vectorizado = time.perf_counter() - inicio
+
+    muestra = df.iloc[:5_000]
+    inicio = time.perf_counter()
+    referencia = extraer_con_iterrows(muestra, 'Comentario')
+    tiempo_iterrows_estimado = (time.perf_counter() - inicio) * (filas / len(muestra))
+
+    assert vectorizado[:len(referencia)] == referencia
+    assert len(vectorizado) == filas - len(range(0, filas, 7))
+    assert tiempo_vectorizado * 5 < tiempo_iterrows_estimado, (tiempo_vectorizado, tiempo_iterrows_estimado)
+    print(f"✅ PASS: {tiempo_vectorizado:.3f}s vectorizado vs ~{tiempo_iterrows_estimado:.2f}s con iterrows")
+
+
+if __name__ == "__main__":
+    print("🔍 Vectorized Extraction Validation Test")
+    print("=" * 50)
+
+    try:
+        test_misma_salida_que_iterrows()
+        test_exportacion_grande()
+        print("\n✅ All vectorized extraction tests completed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)